@@ -0,0 +1,127 @@
+"""話者クラスタリングのベンチマーク（1段階 vs 2段階）
+
+合成した長時間録音の話者埋め込みで、pyannote と同じ centroid 法の凝集型クラスタリングを
+全埋め込みに一度にかける方式（diarize.clustering: default 相当）と、2段階クラスタリング
+（two_stage）の DER と処理時間を比べる。
+
+使い方:
+    PYTHONPATH=src python benchmarks/bench_clustering.py --hours 0.25 0.5 1 2
+
+合成データ:
+    pyannote/speaker-diarization-3.1 と同じく 10 秒のチャンクを 1 秒ずつずらし、
+    チャンクごとに最大 3 人のローカル話者の埋め込みを作る（1時間 ≈ 5,000 埋め込み）。
+    話者ごとの埋め込みは録音の途中でゆっくりドリフトし、発話量の少ない話者も含む。
+
+DER:
+    話者区間の検出は両方式で共通なので、ここでの DER は話者の取り違え（confusion）だけを
+    数える。推定話者と正解話者は発話量の多い組から貪欲に1対1で対応付ける。
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from kaiwa.clustering import (
+    DEFAULT_MIN_CLUSTER_SIZE,
+    DEFAULT_THRESHOLD,
+    _merge_small_clusters,
+    _normalize,
+    agglomerative,
+    two_stage_clustering,
+)
+
+EMBEDDINGS_PER_HOUR = 5000
+DIM = 192
+
+
+def synthesize(hours: float, num_speakers: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """時間順の (埋め込み, 正解話者) を作る。"""
+    rng = np.random.default_rng(seed)
+    n = int(hours * EMBEDDINGS_PER_HOUR)
+
+    # 発話量に偏りを持たせる（最後の話者はほとんど話さない）
+    weights = np.linspace(1.0, 0.2, num_speakers)
+    weights[-1] = 0.03
+    weights /= weights.sum()
+
+    # 平均 30 埋め込み（≈ 20 秒）の話者ターンを並べる
+    labels = np.empty(n, dtype=np.int64)
+    pos = 0
+    while pos < n:
+        length = int(rng.geometric(1 / 30))
+        labels[pos : pos + length] = rng.choice(num_speakers, p=weights)
+        pos += length
+
+    # 話者同士も似た成分を共有し（コサイン類似度 ≈ 0.4）、声は録音中にゆっくりドリフトする
+    common = rng.standard_normal(DIM)
+    base = 0.8 * common + rng.standard_normal((num_speakers, DIM))
+    drift = rng.standard_normal((num_speakers, DIM))
+    progress = np.linspace(0.0, 1.0, n)[:, None]
+    voices = base[labels] + 0.3 * progress * drift[labels]
+    noise = 0.8 * rng.standard_normal((n, DIM))
+    return _normalize(voices + noise), labels
+
+
+def confusion_der(reference: np.ndarray, hypothesis: np.ndarray) -> float:
+    """発話量の多い組から1対1で対応付けたときの取り違えの割合。"""
+    table = np.zeros((reference.max() + 1, hypothesis.max() + 1), dtype=np.int64)
+    np.add.at(table, (reference, hypothesis), 1)
+    matched = 0
+    used_ref: set[int] = set()
+    used_hyp: set[int] = set()
+    for flat in np.argsort(-table, axis=None):
+        r, h = divmod(int(flat), table.shape[1])
+        if r in used_ref or h in used_hyp or table[r, h] == 0:
+            continue
+        matched += table[r, h]
+        used_ref.add(r)
+        used_hyp.add(h)
+    return 1.0 - matched / len(reference)
+
+
+def single_stage(embeddings: np.ndarray) -> np.ndarray:
+    """全埋め込みを一度にクラスタリングする（pyannote のデフォルトと同じ手順）。"""
+    labels = agglomerative(embeddings, DEFAULT_THRESHOLD)
+    return _merge_small_clusters(embeddings, labels, DEFAULT_MIN_CLUSTER_SIZE, None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, nargs="+", default=[0.25, 0.5, 1.0])
+    parser.add_argument("--speakers", type=int, default=6)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--max-single-stage", type=int, default=8000,
+        help="1段階方式を実行する埋め込み数の上限（超えたら省略）",
+    )
+    args = parser.parse_args()
+
+    print(f"{'時間':>6} {'埋め込み':>8} | {'1段階 秒':>9} {'DER':>6} {'話者':>4} | {'2段階 秒':>9} {'DER':>6} {'話者':>4}")
+    for hours in args.hours:
+        embeddings, reference = synthesize(hours, args.speakers)
+
+        start = time.perf_counter()
+        labels = two_stage_clustering(
+            embeddings, DEFAULT_THRESHOLD, args.chunk_size,
+            min_cluster_size=DEFAULT_MIN_CLUSTER_SIZE,
+        )
+        two_stage = (time.perf_counter() - start, confusion_der(reference, labels), labels.max() + 1)
+
+        if len(embeddings) <= args.max_single_stage:
+            start = time.perf_counter()
+            labels = single_stage(embeddings)
+            single = f"{time.perf_counter() - start:9.2f} {confusion_der(reference, labels):6.1%} {labels.max() + 1:4d}"
+        else:
+            single = f"{'省略':>9} {'-':>6} {'-':>4}"
+
+        print(
+            f"{hours:5.2f}h {len(embeddings):8d} | {single} | "
+            f"{two_stage[0]:9.2f} {two_stage[1]:6.1%} {two_stage[2]:4d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""話者分離の推論エンジンのベンチマーク（PyTorch vs ONNX Runtime）
+
+diarize.backend: torch / onnx で、pyannote のセグメンテーション（PyanNet）と
+話者埋め込み（WeSpeaker ResNet34）の CPU 推論時間と出力の差を比べる。
+
+使い方:
+    # モデルの構造だけで比べる（重みはランダム、HuggingFace トークン不要）
+    PYTHONPATH=src python benchmarks/bench_onnx.py --minutes 2 --threads 1 4
+
+    # 実際の録音で話者分離全体を比べる（Keychain の HF トークンを使用）
+    PYTHONPATH=src python benchmarks/bench_onnx.py --audio recording.wav --threads 4
+
+実際の録音では、両エンジンの話者ターンを 10ms ごとのラベルにして、話者の対応付け後に
+一致しない時間の割合（取り違え率）も表示する。
+
+必要なパッケージ: onnxruntime, onnx（pip install onnxruntime onnx）
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+from bench_clustering import confusion_der
+
+from kaiwa.onnx_backend import select_backend
+from kaiwa.transcribe import SAMPLE_RATE
+
+FRAME_RATE = 100  # 話者ラベルを比べる間隔（10ms）
+
+
+def random_pipeline() -> types.SimpleNamespace:
+    """学習済みモデルと同じ構造・ランダムな重みのセグメンテーションと埋め込み。"""
+    import torch
+    from pyannote.audio import Inference
+    from pyannote.audio.core.task import Problem, Resolution, Specifications
+    from pyannote.audio.models.embedding import WeSpeakerResNet34
+    from pyannote.audio.models.segmentation import PyanNet
+
+    torch.manual_seed(0)
+    segmentation = PyanNet(sincnet={"stride": 10})
+    # segmentation-3.0 と同じ出力（3話者までの powerset = 7 クラス、10秒チャンク）
+    segmentation.specifications = Specifications(
+        problem=Problem.MONO_LABEL_CLASSIFICATION,
+        resolution=Resolution.FRAME,
+        duration=10.0,
+        classes=[f"class_{i}" for i in range(7)],
+    )
+    segmentation.build()
+    embedding = WeSpeakerResNet34()
+    return types.SimpleNamespace(
+        _segmentation=Inference(segmentation.eval(), duration=10.0, step=1.0, skip_aggregation=True),
+        _embedding=types.SimpleNamespace(model_=embedding.eval()),
+    )
+
+
+def bench_models(minutes: float, threads: int, cache_dir: str) -> None:
+    """ランダムな音声でセグメンテーションと埋め込みの推論時間・出力差を比べる。"""
+    import torch
+
+    pipeline = random_pipeline()
+    waveform = 0.1 * torch.randn(1, int(minutes * 60 * SAMPLE_RATE))
+    # get_embeddings と同じく、10秒チャンクとセグメンテーションのフレーム数（589）の重み
+    chunks = 0.1 * torch.randn(64, 1, 10 * SAMPLE_RATE)
+    masks = torch.rand(64, 589)
+
+    def run() -> tuple[float, float, np.ndarray, np.ndarray]:
+        start = time.perf_counter()
+        segmentations = pipeline._segmentation({"waveform": waveform, "sample_rate": SAMPLE_RATE}).data
+        seg_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        with torch.inference_mode():
+            embeddings = pipeline._embedding.model_(chunks, weights=masks).numpy()
+        return seg_seconds, time.perf_counter() - start, segmentations, embeddings
+
+    torch.set_num_threads(threads)
+    # どちらのエンジンも初回の実行（メモリ確保・ONNX のエクスポート）は計測から除く
+    select_backend(pipeline, {"backend": "torch"})
+    run()
+    torch_seg, torch_emb, seg_ref, emb_ref = run()
+    select_backend(pipeline, {"backend": "onnx", "onnx_threads": threads, "onnx_cache_dir": cache_dir})
+    run()
+    onnx_seg, onnx_emb, seg_out, emb_out = run()
+
+    print(
+        f"{threads:7d} | {torch_seg:9.2f} {onnx_seg:9.2f} {torch_seg / onnx_seg:5.2f}x | "
+        f"{torch_emb:9.2f} {onnx_emb:9.2f} {torch_emb / onnx_emb:5.2f}x | "
+        f"{np.abs(seg_ref - seg_out).max():9.1e} {np.abs(emb_ref - emb_out).max():9.1e}"
+    )
+
+
+def frame_labels(turns, num_frames: int) -> np.ndarray:
+    """話者ターンを 10ms ごとの話者番号にする（話者なしは -1、重なりは後のターン）。"""
+    labels = np.full(num_frames, -1, dtype=np.int64)
+    speakers = {name: i for i, name in enumerate(sorted(set(turns["speaker"])))}
+    for start, end, speaker in zip(turns["start"], turns["end"], turns["speaker"]):
+        labels[int(start * FRAME_RATE) : int(end * FRAME_RATE)] = speakers[speaker]
+    return labels
+
+
+def bench_audio(audio_path: Path, threads: int, cache_dir: str) -> None:
+    """実際の録音で話者分離全体の時間と、両エンジンの話者ターンの違いを比べる。"""
+    from kaiwa.diarize import run_diarization
+    from kaiwa.transcribe import load_audio
+    from kaiwa.utils import get_keychain_password
+
+    hf_token = get_keychain_password("kaiwa", "hf-token")
+    if not hf_token:
+        raise SystemExit("HuggingFace トークンが Keychain にありません")
+    audio = load_audio(audio_path)
+    num_frames = int(len(audio) / SAMPLE_RATE * FRAME_RATE)
+
+    results = {}
+    for backend in ("torch", "onnx", "onnx"):  # onnx の1回目はエクスポートを含む
+        config = {
+            "diarize": {
+                "backend": backend,
+                "onnx_threads": threads,
+                "onnx_cache_dir": cache_dir,
+                "skip_silence": False,
+                "windowed": False,
+            },
+        }
+        start = time.perf_counter()
+        turns = run_diarization(audio, hf_token, config, num_threads=threads)
+        results[backend] = (time.perf_counter() - start, frame_labels(turns, num_frames))
+
+    (torch_seconds, reference), (onnx_seconds, hypothesis) = results["torch"], results["onnx"]
+    voiced = (reference >= 0) & (hypothesis >= 0)
+    print(f"音声: {len(audio) / SAMPLE_RATE / 60:.1f} 分、スレッド: {threads}")
+    print(f"  torch: {torch_seconds:.1f} 秒 / onnx: {onnx_seconds:.1f} 秒（{torch_seconds / onnx_seconds:.2f}x）")
+    print(f"  発話判定の不一致: {np.mean((reference >= 0) != (hypothesis >= 0)):.2%}")
+    if voiced.any():
+        print(f"  話者の取り違え: {confusion_der(reference[voiced], hypothesis[voiced]):.2%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio", type=Path, help="実際の録音で話者分離全体を比べる")
+    parser.add_argument("--minutes", type=float, default=2.0, help="ランダム音声の長さ（分）")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        if args.audio:
+            for threads in args.threads:
+                bench_audio(args.audio, threads, cache_dir)
+            return
+
+        print(f"ランダム音声 {args.minutes:g} 分（セグメンテーション）/ 64 チャンク（埋め込み）")
+        print(
+            f"{'スレッド':>7} | {'seg torch':>9} {'onnx':>9} {'速度':>6} | "
+            f"{'emb torch':>9} {'onnx':>9} {'速度':>6} | {'seg 最大差':>9} {'emb 最大差':>9}"
+        )
+        for threads in args.threads:
+            bench_models(args.minutes, threads, cache_dir)
+
+
+if __name__ == "__main__":
+    main()
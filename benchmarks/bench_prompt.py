@@ -0,0 +1,142 @@
+"""要約プロンプトの文字起こし形式のベンチマーク（full vs compact）
+
+claude.transcript_format: full（出力と同じ `[開始 → 終了] SPEAKER_00: テキスト` の行）と
+compact（同じ話者の発話をまとめ、話者を別名に、時刻を開始時刻だけにした行）で、
+要約に渡す文字起こしの入力トークン数を比べる。
+
+使い方:
+    # 合成の会話（話者3人、数秒ごとのセグメント）で推定トークン数を比べる
+    PYTHONPATH=src python benchmarks/bench_prompt.py --minutes 30 60 120
+
+    # 実際の録音の話者分離結果（作業ディレクトリの 03_diarize.json）を使う
+    PYTHONPATH=src python benchmarks/bench_prompt.py --segments ~/Transcripts/work/<録音>/03_diarize.json
+
+    # トークンカウント API で実際の入力トークン数を数え、要約1回の所要時間も比べる
+    PYTHONPATH=src python benchmarks/bench_prompt.py --minutes 30 --count --latency
+
+--count / --latency は Keychain の Anthropic API キーを使う（--latency は要約を生成するため課金される）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+from kaiwa.summarize import SUMMARIZE_PROMPT, compact_transcript, estimate_tokens
+from kaiwa.utils import format_timestamp
+
+_PHRASES = [
+    "来週のリリースの件ですが",
+    "テストはほぼ終わっています",
+    "そうですね、確認しておきます",
+    "先方からの返事はまだです",
+    "その方向で進めましょう",
+    "見積もりを金曜までに出します",
+    "なるほど",
+    "はい",
+]
+
+
+def synthetic_segments(minutes: float, speakers: int, seed: int = 0) -> list[dict[str, Any]]:
+    """話者が数発話ごとに入れ替わる、数秒ごとのセグメントの合成会話。"""
+    rng = random.Random(seed)
+    segments = []
+    time_s = 0.0
+    speaker = 0
+    while time_s < minutes * 60:
+        if rng.random() < 0.4:
+            speaker = rng.randrange(speakers)
+        duration = rng.uniform(2.0, 7.0)
+        text = "、".join(rng.choice(_PHRASES) for _ in range(rng.randint(1, 3))) + "。"
+        segments.append(
+            {"start": time_s, "end": time_s + duration, "speaker": f"SPEAKER_{speaker:02d}", "text": text}
+        )
+        time_s += duration + rng.uniform(0.0, 1.0)
+    return segments
+
+
+def full_transcript(segments: list[dict[str, Any]]) -> str:
+    """cli の出力と同じ `[開始 → 終了] 話者: テキスト` の行。"""
+    return "\n".join(
+        f"[{format_timestamp(seg['start'])} → {format_timestamp(seg['end'])}] "
+        f"{seg.get('speaker', 'UNKNOWN')}: {seg['text'].strip()}"
+        for seg in segments
+    )
+
+
+def measure(
+    label: str,
+    segments: list[dict[str, Any]],
+    client: Any | None,
+    model: str,
+    latency: bool,
+) -> None:
+    """full / compact の推定トークン数（と実際のトークン数・所要時間）を表示する。"""
+    texts = {"full": full_transcript(segments), "compact": compact_transcript(segments)}
+    row = [f"{label:>12}", f"{len(segments):6d}"]
+    for name in ("full", "compact"):
+        row.append(f"{estimate_tokens(texts[name]):9d}")
+    row.append(f"{estimate_tokens(texts['compact']) / estimate_tokens(texts['full']):6.0%}")
+    if client is not None:
+        counted = {}
+        for name, text in texts.items():
+            result = client.messages.count_tokens(
+                model=model, system=SUMMARIZE_PROMPT, messages=[{"role": "user", "content": text}]
+            )
+            counted[name] = result.input_tokens
+        row.append(f"{counted['full']:9d} {counted['compact']:9d} {counted['compact'] / counted['full']:6.0%}")
+    if client is not None and latency:
+        for name, text in texts.items():
+            start = time.perf_counter()
+            client.messages.create(
+                model=model,
+                max_tokens=1024,
+                system=SUMMARIZE_PROMPT,
+                messages=[{"role": "user", "content": text}],
+            )
+            row.append(f"{name} {time.perf_counter() - start:5.1f}秒")
+    print(" | ".join(row))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[30.0, 60.0, 120.0])
+    parser.add_argument("--speakers", type=int, default=3)
+    parser.add_argument("--segments", type=Path, nargs="+", help="話者分離結果の JSON（03_diarize.json）")
+    parser.add_argument("--count", action="store_true", help="トークンカウント API で実際に数える")
+    parser.add_argument("--latency", action="store_true", help="要約1回の所要時間も比べる（--count が必要）")
+    parser.add_argument("--model", default="claude-3-5-haiku-latest")
+    args = parser.parse_args()
+
+    client = None
+    if args.count:
+        import anthropic
+
+        from kaiwa.utils import get_keychain_password
+
+        api_key = get_keychain_password("kaiwa", "anthropic-api-key")
+        if not api_key:
+            raise SystemExit("Anthropic API キーが Keychain にありません")
+        client = anthropic.Anthropic(api_key=api_key)
+
+    header = f"{'入力':>12} | {'セグ数':>6} | {'推定 full':>9} | {'compact':>9} | {'比':>6}"
+    if client is not None:
+        header += f" | {'実測 full':>9} {'compact':>9} {'比':>6}"
+    print(header)
+    if args.segments:
+        for path in args.segments:
+            with open(path.expanduser(), encoding="utf-8") as f:
+                segments = json.load(f)["segments"]
+            measure(path.parent.name[:12], segments, client, args.model, args.latency)
+        return
+    for minutes in args.minutes:
+        segments = synthetic_segments(minutes, args.speakers)
+        measure(f"合成 {minutes:g} 分", segments, client, args.model, args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""スレッド予算のベンチマーク（同時実行ジョブのスループット）
+
+監視デーモンが複数の kaiwa process を同時に起動した状況を、CPU 負荷の高い推論を行う
+子プロセスを同時に J 個起動して再現し、ジョブごとのスレッド数を変えたときの
+全体のスループット（1秒あたりに終わる処理単位）を比べる。
+
+    naive   : 各ジョブがコア数ぶんのスレッドを使う（スレッド予算なし、合計 J × コア数）
+    budget B: plan_threads() と同じく B ÷ J スレッドずつ（B = 0 ならコア数）
+
+使い方:
+    # torch の行列積（pyannote のセグメンテーション・埋め込みと同じ CPU 負荷の代わり）
+    PYTHONPATH=src python benchmarks/bench_threads.py --jobs 1 2 4 --budgets 0 4
+
+    # faster-whisper で実際の録音を文字起こし（CTranslate2、先頭 --seconds 秒）
+    PYTHONPATH=src python benchmarks/bench_threads.py --audio recording.wav --seconds 60
+
+--cores を指定すると naive のスレッド数（コア数）をその値とみなす。コア数の少ないマシンで、
+多コアのマシン向けに自動設定されたスレッド数が過剰になった状況を再現できる。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from kaiwa.threads import plan_threads
+
+_MATMUL_SIZE = 384
+
+
+def worker(threads: int, work: int, audio: Path | None, seconds: float) -> None:
+    """子プロセス: threads スレッドで work 単位の推論を行う。"""
+    if audio is None:
+        import torch
+
+        torch.set_num_threads(threads)
+        torch.manual_seed(0)
+        a = torch.randn(_MATMUL_SIZE, _MATMUL_SIZE)
+        b = torch.randn(_MATMUL_SIZE, _MATMUL_SIZE)
+        for _ in range(work):
+            for _ in range(20):
+                a = torch.tanh(a @ b)
+        return
+
+    from faster_whisper import WhisperModel
+
+    from kaiwa.transcribe import SAMPLE_RATE, load_audio
+
+    samples = load_audio(audio)[: int(seconds * SAMPLE_RATE)]
+    model = WhisperModel("tiny", device="cpu", compute_type="int8", cpu_threads=threads)
+    for _ in range(work):
+        segments, _ = model.transcribe(samples, language="ja", beam_size=1)
+        list(segments)
+
+
+def run_jobs(jobs: int, threads: int, args: argparse.Namespace) -> float:
+    """jobs 個の子プロセスを同時に起動し、すべて終わるまでの秒数を返す。"""
+    command = [
+        sys.executable, __file__, "--worker", "--threads", str(threads),
+        "--work", str(args.work), "--seconds", str(args.seconds),
+    ]
+    if args.audio:
+        command += ["--audio", str(args.audio)]
+    # torch の OpenMP スレッドプールも同じスレッド数にそろえる
+    env = {**os.environ, "OMP_NUM_THREADS": str(threads)}
+    start = time.perf_counter()
+    procs = [subprocess.Popen(command, env=env) for _ in range(jobs)]
+    for proc in procs:
+        if proc.wait() != 0:
+            raise SystemExit(f"ベンチマークの子プロセスが失敗しました（終了コード {proc.returncode}）")
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0], help="threads.budget（0 = コア数）")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="naive のスレッド数")
+    parser.add_argument("--work", type=int, default=5, help="1ジョブの処理単位数")
+    parser.add_argument("--audio", type=Path, help="faster-whisper で文字起こしする録音")
+    parser.add_argument("--seconds", type=float, default=60.0, help="--audio の先頭から使う秒数")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--threads", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.threads, args.work, args.audio, args.seconds)
+        return
+
+    workload = f"faster-whisper tiny（{args.seconds:g} 秒）" if args.audio else "torch 行列積"
+    print(f"{workload}、1ジョブ {args.work} 単位、コア数 {os.cpu_count()}（naive: {args.cores} スレッド）")
+    print(f"{'ジョブ':>5} | {'設定':>9} {'スレッド':>6} | {'所要 秒':>8} {'単位/秒':>8} {'naive 比':>8}")
+    for jobs in args.jobs:
+        naive = run_jobs(jobs, args.cores, args)
+        rows = [("naive", args.cores, naive)]
+        for budget in args.budgets:
+            threads = plan_threads({"threads": {"budget": budget}}, jobs=jobs)["asr"]
+            label = f"budget {budget or os.cpu_count()}"
+            rows.append((label, threads, run_jobs(jobs, threads, args)))
+        for label, threads, seconds in rows:
+            print(
+                f"{jobs:5d} | {label:>9} {threads:6d} | {seconds:8.2f} "
+                f"{jobs * args.work / seconds:8.2f} {naive / seconds:7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
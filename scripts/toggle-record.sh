@@ -13,6 +13,7 @@ export PATH="/opt/homebrew/bin:/usr/local/bin:$PATH"
 KAIWA_DIR="$HOME/.kaiwa"
 PID_FILE="$KAIWA_DIR/recording.pid"
 CURRENT_FILE="$KAIWA_DIR/current_recording.txt"
+LIVE_PID_FILE="$KAIWA_DIR/live.pid"
 VENV_PYTHON="$KAIWA_DIR/venv/bin/python"
 KAIWA_SRC="$(cd "$(dirname "$0")/.." && pwd)/src"
 
@@ -80,8 +81,17 @@ if [ -f "${PID_FILE}" ]; then
     notify "⏹ kaiwa" "録音を停止しました。処理を開始します..."
     afplay /System/Library/Sounds/Pop.aiff &
 
+    # ライブ文字起こし（live.enabled: true）が動いていれば、残りの処理はそちらが行う
+    LIVE_PID=""
+    if [ -f "${LIVE_PID_FILE}" ]; then
+        LIVE_PID=$(cat "${LIVE_PID_FILE}")
+        rm -f "${LIVE_PID_FILE}"
+    fi
+
     # 処理パイプライン起動
-    if [ -f "${CURRENT_FILE}" ]; then
+    if [ -n "${LIVE_PID}" ] && kill -0 "${LIVE_PID}" 2>/dev/null; then
+        echo "🎧 ライブ文字起こし (PID ${LIVE_PID}) が処理を引き継ぎます"
+    elif [ -f "${CURRENT_FILE}" ]; then
         RECORDING_FILE=$(cat "${CURRENT_FILE}")
         if [ -f "${RECORDING_FILE}" ]; then
             PYTHONPATH="${KAIWA_SRC}" nohup "${VENV_PYTHON}" -m kaiwa.cli process "${RECORDING_FILE}" > /dev/null 2>&1 &
@@ -95,7 +105,12 @@ else
     echo "${FILENAME}" > "${CURRENT_FILE}"
 
     nohup sox -d -r 16000 -c 1 -b 16 "${FILENAME}" > /dev/null 2>&1 &
-    echo $! > "${PID_FILE}"
+    SOX_PID=$!
+    echo "${SOX_PID}" > "${PID_FILE}"
+
+    # ライブ文字起こし（live.enabled: false なら即終了し、停止時に process が起動する）
+    PYTHONPATH="${KAIWA_SRC}" nohup "${VENV_PYTHON}" -m kaiwa.cli live "${FILENAME}" --recorder-pid "${SOX_PID}" > /dev/null 2>&1 &
+    echo $! > "${LIVE_PID_FILE}"
 
     notify "🔴 kaiwa" "録音を開始しました"
     afplay /System/Library/Sounds/Tink.aiff &
@@ -0,0 +1,156 @@
+"""kaiwa — ステージキャッシュモジュール
+
+作業ディレクトリの中間成果物を、音声内容のハッシュ・関係する設定・モデル
+（パッケージ）バージョンから作ったフィンガープリントで管理する。
+フィンガープリントが一致するステージは再実行せず、保存済みの結果を読み込む。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+from kaiwa.utils import _save_intermediate
+
+logger = logging.getLogger("kaiwa")
+
+MANIFEST_NAME = "stage_manifest.json"
+
+# 実行順のステージと、その出力ファイル
+STAGES = ("transcribe", "diarize", "summarize")
+STAGE_FILES = {
+    "transcribe": "01_transcribe.json",
+    "diarize": "03_diarize.json",
+    "summarize": "04_summary.json",
+}
+
+# ステージごとに結果へ影響する設定セクションとパッケージ
+_STAGE_CONFIG_SECTIONS = {
+    "transcribe": ("whisper",),
+    "diarize": ("diarize", "speakers"),
+    "summarize": ("claude",),
+}
+_STAGE_PACKAGES = {
+    "transcribe": ("faster-whisper", "ctranslate2", "whisperx"),
+    "diarize": ("pyannote.audio", "whisperx"),
+    "summarize": ("anthropic",),
+}
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """ファイル内容の SHA-256 を返す。"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _package_version(name: str) -> str | None:
+    """インストール済みパッケージのバージョンを返す。未インストールなら None。"""
+    from importlib import metadata
+
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+class StageCache:
+    """作業ディレクトリ単位のステージキャッシュ。
+
+    Parameters
+    ----------
+    work_dir : Path
+        中間成果物ディレクトリ。
+    audio_path : Path
+        入力音声ファイル（内容ハッシュをフィンガープリントに含める）。
+    config : dict
+        設定辞書。
+    from_step : str | None
+        このステージ以降を強制的に再実行する。None ならキャッシュを最大限使う。
+    extra : dict | None
+        ステージ別の追加パラメータ（CLI の話者数ヒント等）。
+    """
+
+    def __init__(
+        self,
+        work_dir: Path,
+        audio_path: Path,
+        config: dict[str, Any],
+        from_step: str | None = None,
+        extra: dict[str, dict[str, Any]] | None = None,
+    ):
+        if from_step is not None and from_step not in STAGES:
+            raise ValueError(f"不明なステップ: {from_step}")
+
+        self.work_dir = work_dir
+        self.config = config
+        self.from_step = from_step
+        self.extra = extra or {}
+        self.audio_hash = hash_file(audio_path)
+        self._manifest_path = work_dir / MANIFEST_NAME
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self) -> dict[str, str]:
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def fingerprint(self, stage: str) -> str:
+        """ステージのフィンガープリントを返す。上流ステージのものを連鎖的に含む。"""
+        index = STAGES.index(stage)
+        payload = {
+            "stage": stage,
+            "audio": self.audio_hash,
+            "config": {
+                section: self.config.get(section, {})
+                for section in _STAGE_CONFIG_SECTIONS[stage]
+            },
+            "packages": {name: _package_version(name) for name in _STAGE_PACKAGES[stage]},
+            "extra": self.extra.get(stage, {}),
+            "upstream": self.fingerprint(STAGES[index - 1]) if index > 0 else None,
+        }
+        if stage == "diarize":
+            # 話者分離はデバイス設定も結果に影響する
+            payload["device"] = self.config.get("whisper", {}).get("device", "cpu")
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _forced(self, stage: str) -> bool:
+        return self.from_step is not None and STAGES.index(stage) >= STAGES.index(self.from_step)
+
+    def load(self, stage: str) -> dict[str, Any] | None:
+        """フィンガープリントが一致すれば保存済みの出力を返す。なければ None。"""
+        if self._forced(stage) or self._manifest.get(stage) != self.fingerprint(stage):
+            return None
+
+        path = self.work_dir / STAGE_FILES[stage]
+        try:
+            with open(path, encoding="utf-8") as f:
+                data: dict[str, Any] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        logger.info("  ♻️  キャッシュ使用: %s (%s)", stage, path.name)
+        return data
+
+    def store(self, stage: str, data: dict[str, Any] | None = None) -> None:
+        """ステージ完了を記録する。data を渡すとステージの出力ファイルとして保存する。
+
+        transcribe / diarize の出力ファイルは各モジュールが保存済みのため data は不要。
+        """
+        if data is not None:
+            _save_intermediate(self.work_dir / STAGE_FILES[stage], data)
+
+        self._manifest[stage] = self.fingerprint(stage)
+        # 下流ステージの記録は上流が変わった時点で無効
+        for downstream in STAGES[STAGES.index(stage) + 1 :]:
+            self._manifest.pop(downstream, None)
+        _save_intermediate(self._manifest_path, self._manifest)
@@ -0,0 +1,123 @@
+"""kaiwa — チャンネルごとの音量による話者分離
+
+ピンマイクを1人1本ずつステレオ（多チャンネル）インターフェースに挿して録音した場合、
+各話者の声は自分のチャンネルで最も大きく録れている。単語の時間範囲ごとに
+チャンネル別の RMS を比べ、最も大きいチャンネルをその単語の話者とする。
+
+チャンネルごとに 10ms フレームの2乗和の累積和を一度だけ作れば、任意の区間の RMS は
+差分1回で求まるため、全単語をまとめてベクトル演算できる（pyannote は使わない）。
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from kaiwa.transcribe import SAMPLE_RATE
+from kaiwa.words import WordTable
+
+logger = logging.getLogger("kaiwa")
+
+_HOP = 160  # 10ms（単語の区間はこの単位に丸める）
+
+
+def probe_channels(audio_path: Path) -> int:
+    """ffprobe で音声ファイルのチャンネル数を返す。取得できなければ 1。"""
+    try:
+        proc = subprocess.run(
+            [
+                "ffprobe", "-v", "error", "-select_streams", "a:0",
+                "-show_entries", "stream=channels", "-of", "csv=p=0", str(audio_path),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=30,
+        )
+        return int(proc.stdout.strip().splitlines()[0])
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError) as e:
+        logger.warning("⚠️ チャンネル数を取得できませんでした: %s", e)
+        return 1
+
+
+def load_channels(audio_path: Path, num_channels: int) -> np.ndarray:
+    """音声ファイルをチャンネルを保ったまま 16kHz float32 の (チャンネル, サンプル) 配列にデコードする。
+
+    whisperx.load_audio と同じ ffmpeg の変換で、モノラルへのダウンミックスだけを行わない。
+    """
+    try:
+        proc = subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-threads", "0", "-i", str(audio_path),
+                "-f", "s16le", "-ac", str(num_channels), "-acodec", "pcm_s16le",
+                "-ar", str(SAMPLE_RATE), "-",
+            ],
+            capture_output=True,
+            check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"音声のデコードに失敗しました: {e.stderr.decode(errors='replace')}") from e
+
+    data = np.frombuffer(proc.stdout, dtype="<i2")
+    data = data[: len(data) - len(data) % num_channels]
+    channels: np.ndarray = data.reshape(-1, num_channels).T.astype(np.float32) / 32768.0
+    return channels
+
+
+def channel_turns(channels: np.ndarray, result: dict[str, Any]) -> dict[str, list]:
+    """単語（タイムスタンプのない単語しかないセグメントはセグメント）ごとの話者ターンを作る。
+
+    Parameters
+    ----------
+    channels : np.ndarray
+        (チャンネル, サンプル) の 16kHz 音声。
+    result : dict
+        文字起こし結果辞書（segments を含む）。
+
+    Returns
+    -------
+    dict[str, list]
+        start / end / speaker 列の話者ターン（apply_diarization にそのまま渡せる）。
+        話者はチャンネル番号 i に対応する SPEAKER_{i:02d}。
+    """
+    segments = result.get("segments", [])
+    table = WordTable(segments)
+    starts = table.columns["start"]
+    ends = table.columns["end"]
+    timed = ~np.isnan(starts) & ~np.isnan(ends)
+
+    # 時刻付きの単語が1つもないセグメントはセグメント全体を1区間とする
+    has_timed = np.zeros(len(segments), dtype=bool)
+    has_timed[table.columns["segment"][timed]] = True
+    untimed = [seg for seg, found in zip(segments, has_timed) if not found]
+    spans_start = np.concatenate([starts[timed], [seg.get("start", 0.0) for seg in untimed]])
+    spans_end = np.concatenate([ends[timed], [seg.get("end", 0.0) for seg in untimed]])
+
+    num_frames = channels.shape[1] // _HOP
+    frame_rate = SAMPLE_RATE / _HOP
+    lo = np.clip(np.round(spans_start * frame_rate).astype(np.int64), 0, num_frames)
+    hi = np.clip(np.round(spans_end * frame_rate).astype(np.int64), 0, num_frames)
+    keep = hi > lo
+    lo, hi = lo[keep], hi[keep]
+    spans_start, spans_end = spans_start[keep], spans_end[keep]
+
+    # フレームごとの2乗和（einsum で2乗の一時配列を作らない）の累積和（先頭に 0）から、
+    # 区間ごとの平均パワーを差分で求める
+    frames = channels[:, : num_frames * _HOP].reshape(channels.shape[0], num_frames, _HOP)
+    power = np.zeros((channels.shape[0], num_frames + 1), dtype=np.float64)
+    np.cumsum(np.einsum("cfh,cfh->cf", frames, frames), axis=1, out=power[:, 1:])
+    rms = np.sqrt((power[:, hi] - power[:, lo]) / (hi - lo))
+    loudest = rms.argmax(axis=0)
+
+    logger.info(
+        "  🎚️  チャンネル別の音量で話者分離: %dch、%d 区間", channels.shape[0], len(loudest)
+    )
+    return {
+        "start": spans_start.tolist(),
+        "end": spans_end.tolist(),
+        "speaker": [f"SPEAKER_{channel:02d}" for channel in loudest.tolist()],
+    }
@@ -7,13 +7,18 @@ argparse ベースのコマンドラインインターフェース。
 from __future__ import annotations
 
 import argparse
+import logging
+import re
 import sys
 import time
 import traceback
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from kaiwa import __version__
+from kaiwa.cache import STAGES, StageCache
 from kaiwa.config import load_config
+from kaiwa.threads import job_slot, plan_threads
 from kaiwa.utils import (
     SecureString,
     format_timestamp,
@@ -23,6 +28,9 @@ from kaiwa.utils import (
     validate_audio,
 )
 
+if TYPE_CHECKING:
+    from kaiwa.output import MarkdownDraft
+
 
 def cmd_process(args: argparse.Namespace) -> None:
     """音声ファイルを処理するサブコマンド。"""
@@ -42,13 +50,326 @@ def cmd_process(args: argparse.Namespace) -> None:
         notify("kaiwa ❌", f"検証エラー: {message}")
         sys.exit(1)
 
-    # ----- API キー取得 -----
-    hf_token = get_keychain_password("kaiwa", "hf-token")
-    if not hf_token:
-        logger.error("❌ HuggingFace トークンが見つかりません")
-        notify("kaiwa ❌", "HFトークンが見つかりません")
+    # ----- 常駐サーバーへの委譲（起動していなければプロセス内で処理） -----
+    if getattr(args, "daemon", False):
+        from kaiwa.server import submit_job
+
+        exit_code = submit_job(
+            audio_path,
+            min_speakers=args.min_speakers,
+            max_speakers=args.max_speakers,
+            from_step=getattr(args, "from_step", None),
+            speakers=getattr(args, "speakers", None),
+            transcript_only=getattr(args, "transcript_only", False),
+        )
+        if exit_code is not None:
+            if exit_code != 0:
+                sys.exit(exit_code)
+            return
+
+    # 同時実行中の他の kaiwa ジョブとスレッド予算を分け合う
+    with job_slot():
+        policy = _diarize_policy(config, args)
+        hf_token, secure_anthropic_key = _get_api_keys(logger, require_hf_token=policy == "full")
+        work_dir = _prepare_work_dir(audio_path, config, logger)
+        cache = _stage_cache(work_dir, audio_path, config, args)
+
+        # ----- Step 1-2: 文字起こし + アラインメント -----
+        audio = None
+        diarized = None
+        result = cache.load("transcribe")
+        if result is None and _use_concurrent(config) and policy not in ("single", "off"):
+            # ----- Step 1-3: 文字起こしと話者分離を並行実行 -----
+            audio, result, diarized = _transcribe_and_diarize(
+                audio_path, config, work_dir, hf_token, args, cache
+            )
+        elif result is None:
+            notify("kaiwa", "📝 Step 1: 文字起こし開始...")
+
+            from kaiwa.diarize import needs_speech_regions
+            from kaiwa.transcribe import transcribe
+
+            asr_threads = plan_threads(config)["asr"]
+            audio, result = transcribe(
+                audio_path,
+                _with_asr_threads(config, asr_threads),
+                work_dir=work_dir,
+                detect_speech=needs_speech_regions(policy, config.get("diarize", {})),
+            )
+            cache.store("transcribe")
+
+            notify("kaiwa", f"✅ 文字起こし完了 ({len(result['segments'])}セグメント)")
+
+        _finish_pipeline(
+            audio,
+            result,
+            audio_path,
+            config,
+            work_dir,
+            hf_token,
+            secure_anthropic_key,
+            args,
+            start_time,
+            cache,
+            diarized=diarized,
+        )
+
+
+def cmd_recluster(args: argparse.Namespace) -> None:
+    """話者数ヒントを変えて、保存済みの特徴量から話者のクラスタリングだけをやり直すサブコマンド。
+
+    文字起こしはキャッシュを使い、話者分離はセグメンテーション・埋め込みの計算を省略する。
+    特徴量が保存されていなければ通常の話者分離を行う。要約・Markdown は作り直す。
+    """
+    logger = setup_logging()
+    config = load_config()
+    start_time = time.time()
+
+    audio_path = Path(args.audio_file).resolve()
+
+    logger.info("🎙️  kaiwa — 話者の再クラスタリング")
+    logger.info("入力: %s", audio_path)
+
+    valid, message = validate_audio(audio_path)
+    if not valid:
+        logger.error("❌ 音声ファイル検証エラー: %s", message)
+        notify("kaiwa ❌", f"検証エラー: {message}")
+        sys.exit(1)
+
+    hf_token, secure_anthropic_key = _get_api_keys(logger)
+    work_dir = _prepare_work_dir(audio_path, config, logger)
+    cache = _stage_cache(work_dir, audio_path, config, args)
+
+    result = cache.load("transcribe")
+    if result is None:
+        logger.error("❌ 文字起こし結果がありません。先に kaiwa process を実行してください")
+        notify("kaiwa ❌", "文字起こし結果がありません")
         sys.exit(1)
 
+    from kaiwa.diarize import recluster
+
+    diarized = None
+    try:
+        diarized = recluster(
+            result,
+            _require_hf_token(hf_token, logger),
+            config,
+            work_dir,
+            min_speakers=args.min_speakers,
+            max_speakers=args.max_speakers,
+            recording=cache.audio_hash,
+        )
+    except FileNotFoundError as e:
+        logger.warning("⚠️ %s。通常の話者分離を実行します", e)
+    else:
+        cache.store("diarize")
+        notify("kaiwa", "✅ 再クラスタリング完了")
+
+    _finish_pipeline(
+        None,
+        result,
+        audio_path,
+        config,
+        work_dir,
+        hf_token,
+        secure_anthropic_key,
+        args,
+        start_time,
+        cache,
+        diarized=diarized,
+    )
+
+
+def _diarize_policy(config: dict[str, Any], args: argparse.Namespace) -> str:
+    """CLI 引数（--speakers / --transcript-only）と設定から話者分離の方法を決める。"""
+    from kaiwa.diarize import resolve_policy
+
+    try:
+        return resolve_policy(
+            config.get("diarize", {}),
+            speakers=getattr(args, "speakers", None),
+            transcript_only=getattr(args, "transcript_only", False),
+        )
+    except ValueError as e:
+        logging.getLogger("kaiwa").error("❌ %s", e)
+        notify("kaiwa ❌", "設定エラー")
+        sys.exit(1)
+
+
+def _speaker_hints(args: argparse.Namespace) -> tuple[int | None, int | None]:
+    """(最小話者数, 最大話者数) のヒントを返す。--speakers N（2以上）は min = max = N。"""
+    speakers = getattr(args, "speakers", None)
+    if speakers and speakers > 1:
+        return speakers, speakers
+    return args.min_speakers, args.max_speakers
+
+
+def _diarize_without_pyannote(
+    policy: str,
+    audio_path: Path,
+    result: dict[str, Any],
+    config: dict[str, Any],
+    work_dir: Path,
+) -> dict[str, Any]:
+    """pyannote を使わない policy（channels / single / off）で話者分離ステージを完了する。"""
+    from kaiwa.diarize import diarize_by_channels, label_without_diarization
+
+    if policy == "channels":
+        notify("kaiwa", "🎚️ Step 3: チャンネル別の音量で話者分離中...")
+        return diarize_by_channels(audio_path, result, work_dir=work_dir)
+    return label_without_diarization(result, policy, work_dir=work_dir)
+
+
+def _use_concurrent(config: dict[str, Any]) -> bool:
+    """文字起こしと話者分離を並行実行するかを判定する。"""
+    return bool(config.get("diarize", {}).get("concurrent", True))
+
+
+def _with_asr_threads(config: dict[str, Any], asr_threads: int) -> dict[str, Any]:
+    """文字起こしのスレッド数（whisper.cpu_threads）を設定した設定辞書を返す。"""
+    return {**config, "whisper": {**config.get("whisper", {}), "cpu_threads": asr_threads}}
+
+
+def _transcribe_and_diarize(
+    audio_path: Path,
+    config: dict[str, Any],
+    work_dir: Path,
+    hf_token: str | None,
+    args: argparse.Namespace,
+    cache: StageCache,
+) -> tuple[Any, dict[str, Any], dict[str, Any]]:
+    """文字起こしと話者分離（pyannote）を別スレッドで並行実行し、完了後に話者を割り当てる。
+
+    話者分離は音声だけを入力とするため文字起こしの完了を待つ必要がない。
+    CTranslate2 と torch はどちらも推論中に GIL を解放するのでスレッドで並行できる。
+    HF トークンは pyannote で話者分離する場合だけ必要なので、その時点で確認する。
+
+    Returns
+    -------
+    tuple[Any, dict, dict]
+        (音声データ, 文字起こし結果, 話者情報付きの結果)。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from kaiwa.diarize import apply_diarization, choose_policy, needs_speech_regions, run_diarization
+    from kaiwa.profiles import resolve_speed_settings
+    from kaiwa.speakers import speaker_store_enabled
+    from kaiwa.transcribe import detect_speech_regions, load_audio, transcribe
+    from kaiwa.utils import _save_intermediate
+
+    logger = logging.getLogger("kaiwa")
+    notify("kaiwa", "📝 Step 1-3: 文字起こしと話者分離を並行実行中...")
+
+    # デコードは1回だけ行い、両方のステージで同じ配列を共有する
+    audio = load_audio(audio_path)
+    whisper_cfg, diarize_cfg = config.get("whisper", {}), config.get("diarize", {})
+    policy = _diarize_policy(config, args)
+    # 速度プロファイルは並行実行の前に1回だけ決める（auto の計測が話者分離と競合しないように）。
+    # 発話区間の検出と文字起こしで同じ設定（VAD パラメータ）を使う
+    speed = resolve_speed_settings(whisper_cfg, audio)
+    # 事前チェック（auto）の発話区間は話者分離の方法を決める前に必要
+    speech_regions = detect_speech_regions(audio, whisper_cfg, speed) if policy == "auto" else None
+
+    # 単一話者・チャンネル別の場合は pyannote を使わず、文字起こしの後に話者を割り当てる
+    policy = choose_policy(policy, audio, speech_regions, config, audio_path=audio_path)
+    if policy != "full":
+        asr_threads = plan_threads(config)["asr"]
+        _, result = transcribe(
+            audio_path,
+            _with_asr_threads(config, asr_threads),
+            work_dir=work_dir,
+            audio=audio,
+            speech_regions=speech_regions,
+            detect_speech=False,
+            speed={**speed, "cpu_threads": asr_threads},
+        )
+        cache.store("transcribe")
+        notify("kaiwa", f"✅ 文字起こし完了 ({len(result['segments'])}セグメント)")
+        diarized = _diarize_without_pyannote(policy, audio_path, result, config, work_dir)
+        cache.store("diarize")
+        return audio, result, diarized
+
+    token = _require_hf_token(hf_token, logger)
+    threads = plan_threads(config, concurrent=True)
+    asr_threads, diarize_threads = threads["asr"], threads["diarize"]
+    logger.info(
+        "⚡ 文字起こし・話者分離を並行実行（スレッド: 文字起こし %d / 話者分離 %d、同時実行ジョブ %d）",
+        asr_threads, diarize_threads, threads["jobs"],
+    )
+    asr_config = _with_asr_threads(config, asr_threads)
+    return_embeddings = speaker_store_enabled(config)
+    min_speakers, max_speakers = _speaker_hints(args)
+
+    def diarize_job() -> tuple[list[list[float]] | None, Any]:
+        # 無音除外の発話区間は話者分離のワーカー内で検出し、文字起こしの開始を遅らせない
+        regions = speech_regions
+        if regions is None and needs_speech_regions(policy, diarize_cfg):
+            regions = detect_speech_regions(audio, whisper_cfg, speed)
+        return regions, run_diarization(
+            audio,
+            token,
+            config,
+            min_speakers=min_speakers,
+            max_speakers=max_speakers,
+            num_threads=diarize_threads,
+            return_embeddings=return_embeddings,
+            speech_regions=regions,
+            work_dir=work_dir,
+        )
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="kaiwa") as executor:
+        diarize_future = executor.submit(diarize_job)
+        transcribe_future = executor.submit(
+            transcribe,
+            audio_path,
+            asr_config,
+            work_dir=work_dir,
+            audio=audio,
+            speech_regions=speech_regions,
+            detect_speech=False,
+            speed={**speed, "cpu_threads": asr_threads},
+        )
+
+        _, result = transcribe_future.result()
+        cache.store("transcribe")
+        notify("kaiwa", f"✅ 文字起こし完了 ({len(result['segments'])}セグメント)")
+
+        speech_regions, output = diarize_future.result()
+
+    # 話者分離側で検出した発話区間も文字起こしの結果に残し、--from-step diarize で再利用する
+    if result.get("speech_regions") is None and speech_regions is not None:
+        result["speech_regions"] = speech_regions
+        _save_intermediate(work_dir / "01_transcribe.json", result)
+
+    # ----- 結合: 単語への話者割り当て + セグメント再分割 -----
+    diarize_segments, embeddings = output if return_embeddings else (output, None)
+    diarized = apply_diarization(
+        diarize_segments,
+        result,
+        work_dir=work_dir,
+        embeddings=embeddings,
+        config=config if return_embeddings else None,
+        recording=cache.audio_hash,
+    )
+    cache.store("diarize")
+    notify("kaiwa", "✅ 話者分離完了")
+
+    return audio, result, diarized
+
+
+def _get_api_keys(
+    logger: logging.Logger, require_hf_token: bool = True
+) -> tuple[str | None, SecureString | None]:
+    """Keychain から HF トークンと Anthropic API キーを取得する。
+
+    require_hf_token が True で HF トークンがなければ処理を続行できないため終了する。
+    False（pyannote を使わない可能性がある場合）は、必要になった時点で
+    _require_hf_token() で確認する。
+    """
+    hf_token = get_keychain_password("kaiwa", "hf-token")
+    if require_hf_token:
+        _require_hf_token(hf_token, logger)
+
     anthropic_key = get_keychain_password("kaiwa", "anthropic-api-key")
     secure_anthropic_key = None
     if anthropic_key:
@@ -57,11 +378,25 @@ def cmd_process(args: argparse.Namespace) -> None:
     else:
         logger.info("🔑 Anthropic API キー: 未設定（要約スキップ）")
 
-    # ----- 中間成果物ディレクトリ -----
+    return hf_token, secure_anthropic_key
+
+
+def _require_hf_token(hf_token: str | None, logger: logging.Logger) -> str:
+    """pyannote に必要な HF トークンを返す。なければ終了する。"""
+    if not hf_token:
+        logger.error("❌ HuggingFace トークンが見つかりません")
+        notify("kaiwa ❌", "HFトークンが見つかりません")
+        sys.exit(1)
+    return hf_token
+
+
+def _prepare_work_dir(
+    audio_path: Path, config: dict[str, Any], logger: logging.Logger
+) -> Path:
+    """録音ごとの中間成果物ディレクトリを作成して返す。"""
     work_base = Path(config.get("paths", {}).get("work", "~/Transcripts/work")).expanduser()
     
     # パストラバーサル対策: ファイル名から危険な文字を除去
-    import re
     stem = audio_path.stem
     safe_stem = re.sub(r'[^\w\-.]', '_', stem)
     work_dir = work_base / safe_stem
@@ -74,55 +409,137 @@ def cmd_process(args: argparse.Namespace) -> None:
     
     work_dir.mkdir(parents=True, exist_ok=True)
     logger.info("📁 作業ディレクトリ: %s", work_dir)
+    return work_dir
+
+
+def _stage_cache(
+    work_dir: Path,
+    audio_path: Path,
+    config: dict[str, Any],
+    args: argparse.Namespace,
+) -> StageCache:
+    """CLI 引数を反映したステージキャッシュを作成する。"""
+    min_speakers, max_speakers = _speaker_hints(args)
+    diarize_extra: dict[str, Any] = {"min_speakers": min_speakers, "max_speakers": max_speakers}
+    # 指定時のみ含め、既存のキャッシュのフィンガープリントを変えない
+    if getattr(args, "speakers", None) == 1:
+        diarize_extra["speakers"] = 1
+    if getattr(args, "transcript_only", False):
+        diarize_extra["transcript_only"] = True
+    return StageCache(
+        work_dir,
+        audio_path,
+        config,
+        from_step=getattr(args, "from_step", None),
+        extra={"diarize": diarize_extra},
+    )
 
-    # ----- Step 1-2: 文字起こし + アラインメント -----
-    notify("kaiwa", "📝 Step 1: 文字起こし開始...")
-
-    from kaiwa.transcribe import transcribe
 
-    audio, result = transcribe(audio_path, config, work_dir=work_dir)
-
-    notify("kaiwa", f"✅ 文字起こし完了 ({len(result['segments'])}セグメント)")
+def _finish_pipeline(
+    audio: Any,
+    result: dict[str, Any],
+    audio_path: Path,
+    config: dict[str, Any],
+    work_dir: Path,
+    hf_token: str | None,
+    secure_anthropic_key: SecureString | None,
+    args: argparse.Namespace,
+    start_time: float,
+    cache: StageCache,
+    diarized: dict[str, Any] | None = None,
+) -> None:
+    """文字起こし後のステップ（話者分離 → 要約 → Markdown → クリーンアップ）を実行する。
+
+    audio が None（文字起こしをキャッシュから読んだ場合）は、話者分離が
+    必要になった時点で初めてデコードする。diarized を渡した場合（文字起こしと
+    並行して話者分離済み）は話者分離を省略する。
+    """
+    logger = logging.getLogger("kaiwa")
 
     # ----- Step 3: 話者分離 -----
-    notify("kaiwa", "👥 Step 3: 話者分離中...")
-
-    from kaiwa.diarize import diarize
-
-    result = diarize(
-        audio,
-        result,
-        hf_token,
-        config,
-        work_dir=work_dir,
-        min_speakers=args.min_speakers,
-        max_speakers=args.max_speakers,
-    )
-
-    notify("kaiwa", "✅ 話者分離完了")
+    if diarized is None:
+        diarized = cache.load("diarize")
+    if diarized is not None:
+        result = diarized
+    else:
+        from kaiwa.diarize import choose_policy, diarize
+        from kaiwa.transcribe import load_audio
+
+        policy = _diarize_policy(config, args)
+        if policy == "auto" and audio is None:
+            audio = load_audio(audio_path)
+        policy = choose_policy(
+            policy, audio, result.get("speech_regions"), config, audio_path=audio_path
+        )
+
+        if policy == "full":
+            notify("kaiwa", "👥 Step 3: 話者分離中...")
+            if audio is None:
+                audio = load_audio(audio_path)
+            min_speakers, max_speakers = _speaker_hints(args)
+            result = diarize(
+                audio,
+                result,
+                _require_hf_token(hf_token, logger),
+                config,
+                work_dir=work_dir,
+                min_speakers=min_speakers,
+                max_speakers=max_speakers,
+                num_threads=plan_threads(config)["diarize"],
+                recording=cache.audio_hash,
+            )
+            notify("kaiwa", "✅ 話者分離完了")
+        else:
+            result = _diarize_without_pyannote(policy, audio_path, result, config, work_dir)
+        cache.store("diarize")
 
     # ----- 文字起こしテキストの構築 -----
+    # 文字起こしのみ（話者分離しない）の場合は話者ラベルを付けない
+    with_speakers = any("speaker" in seg for seg in result["segments"])
     transcript_lines = []
     for seg in result["segments"]:
         speaker = seg.get("speaker", "UNKNOWN")
         start = format_timestamp(seg.get("start", 0))
         end = format_timestamp(seg.get("end", 0))
         text = seg.get("text", "").strip()
-        transcript_lines.append(f"[{start} → {end}] {speaker}: {text}")
+        if with_speakers:
+            transcript_lines.append(f"[{start} → {end}] {speaker}: {text}")
+        else:
+            transcript_lines.append(f"[{start} → {end}] {text}")
 
     transcript_text = "\n".join(transcript_lines)
 
     # ----- Step 4: 要約生成 -----
     summary = None
     title = None
-    if secure_anthropic_key:
+    draft: MarkdownDraft | None = None
+    cached_summary = cache.load("summarize")
+    if cached_summary is not None:
+        title = cached_summary.get("title")
+        summary = cached_summary.get("summary")
+    elif secure_anthropic_key:
         notify("kaiwa", "🤖 Step 4: Claude で要約生成中...")
 
-        from kaiwa.summarize import summarize
+        from kaiwa.output import MarkdownDraft
+        from kaiwa.summarize import compact_transcript, summarize, transcript_format
+
+        # プロンプトには出力用の行ではなく、トークン数の少ないコンパクトな形式を渡す
+        prompt_text = transcript_text
+        if transcript_format(config) == "compact":
+            prompt_text = compact_transcript(result["segments"])
 
-        title, summary = summarize(transcript_text, secure_anthropic_key.get(), config)
+        # ストリーミング時は生成中の要約を出力ファイルの隣に書き出し、Step 5 の後に削除する
+        if config.get("claude", {}).get("stream", False):
+            draft = MarkdownDraft(transcript_lines, audio_path, config)
+        title, summary = summarize(
+            prompt_text,
+            secure_anthropic_key.get(),
+            config,
+            on_progress=draft.update if draft else None,
+        )
 
         if summary:
+            cache.store("summarize", {"title": title, "summary": summary})
             notify("kaiwa", f"✅ 要約生成完了: {title or '(タイトルなし)'}")
         else:
             logger.warning("⚠️ 要約生成に失敗しました")
@@ -136,9 +553,13 @@ def cmd_process(args: argparse.Namespace) -> None:
     from kaiwa.output import generate_markdown
 
     elapsed = time.time() - start_time
-    output_file = generate_markdown(
-        transcript_lines, summary, audio_path, elapsed, config, title=title
-    )
+    try:
+        output_file = generate_markdown(
+            transcript_lines, summary, audio_path, elapsed, config, title=title
+        )
+    finally:
+        if draft:
+            draft.finish()
 
     # ----- クリーンアップ -----
     cleanup_cfg = config.get("cleanup", {})
@@ -157,6 +578,123 @@ def cmd_process(args: argparse.Namespace) -> None:
     notify("kaiwa ✅", f"処理完了！ {output_file.name} ({elapsed_min}分{elapsed_sec}秒)")
 
 
+def cmd_live(args: argparse.Namespace) -> None:
+    """録音中の WAV を追跡して逐次文字起こしし、録音停止後に残りの処理を行うサブコマンド。"""
+    logger = setup_logging()
+    config = load_config()
+
+    if not config.get("live", {}).get("enabled", False):
+        # 無効時は何もしない（録音停止時に toggle-record.sh が process を起動する）
+        logger.debug("ライブ文字起こしは無効です (live.enabled: false)")
+        return
+
+    audio_path = Path(args.audio_file).resolve()
+
+    logger.info("🎙️  kaiwa — ライブ文字起こし")
+    logger.info("入力: %s", audio_path)
+
+    policy = _diarize_policy(config, args)
+    hf_token, secure_anthropic_key = _get_api_keys(logger, require_hf_token=policy == "full")
+    work_dir = _prepare_work_dir(audio_path, config, logger)
+
+    from kaiwa.live import transcribe_live
+
+    # 録音中は区間の文字起こしのあいだだけ実行中のジョブとして登録される（live.py）
+    audio, result, stopped_at = transcribe_live(
+        audio_path,
+        args.recorder_pid,
+        _with_asr_threads(config, plan_threads(config)["asr"]),
+        work_dir=work_dir,
+    )
+
+    # ----- 録音完了後の音声ファイル検証 -----
+    valid, message = validate_audio(audio_path)
+    if not valid:
+        logger.error("❌ 音声ファイル検証エラー: %s", message)
+        notify("kaiwa ❌", f"検証エラー: {message}")
+        sys.exit(1)
+
+    # 録音完了後の内容で記録し、process での再実行時に文字起こしを再利用できるようにする
+    cache = _stage_cache(work_dir, audio_path, config, args)
+    cache.store("transcribe")
+
+    notify("kaiwa", f"✅ 文字起こし完了 ({len(result['segments'])}セグメント)")
+
+    # 話者分離以降は同時実行中の他の kaiwa ジョブとスレッド予算を分け合う
+    with job_slot():
+        # 処理時間は録音停止からの経過時間として報告する
+        _finish_pipeline(
+            audio,
+            result,
+            audio_path,
+            config,
+            work_dir,
+            hf_token,
+            secure_anthropic_key,
+            args,
+            stopped_at,
+            cache,
+        )
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    """モデルを常駐させてジョブを受け付けるサブコマンド。"""
+    logger = setup_logging()
+    config = load_config()
+
+    hf_token = get_keychain_password("kaiwa", "hf-token")
+    if not hf_token:
+        logger.error("❌ HuggingFace トークンが見つかりません")
+        sys.exit(1)
+
+    from kaiwa.server import serve
+
+    socket_path = Path(args.socket).expanduser() if args.socket else None
+    try:
+        serve(config, hf_token, socket_path=socket_path)
+    except RuntimeError as e:
+        logger.error("❌ %s", e)
+        sys.exit(1)
+
+
+def cmd_speakers(args: argparse.Namespace) -> None:
+    """話者埋め込みストアの一覧表示・名前の登録・登録解除を行うサブコマンド。"""
+    config = load_config()
+
+    from kaiwa.speakers import SpeakerStore
+
+    store = SpeakerStore(config.get("speakers", {}).get("store_dir"))
+
+    if args.action == "list":
+        entries = store.entries
+        if not entries:
+            print("保存済みの話者はありません（speakers.enabled: true で処理すると保存されます）")
+            return
+        for name, count in sorted(store.names().items()):
+            print(f"{name}\t{count} 録音")
+        unnamed = [e for e in entries if not e.get("name")]
+        if unnamed:
+            print(f"\n未登録の話者（{len(unnamed)}）:")
+            for entry in unnamed:
+                print(f"  {entry['recording'][:12]}\t{entry.get('title') or '-'}\t{entry['label']}")
+    elif args.action == "enroll":
+        try:
+            store.enroll(args.recording, args.label, args.name)
+        except KeyError:
+            print(f"❌ 保存されていない話者です: {args.recording} / {args.label}", file=sys.stderr)
+            sys.exit(1)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ {args.recording} / {args.label} を「{args.name}」として登録しました")
+    elif args.action == "forget":
+        count = store.forget(args.name)
+        if not count:
+            print(f"❌ 登録されていない名前です: {args.name}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ 「{args.name}」の登録を解除しました（{count} 件）")
+
+
 def cmd_version(args: argparse.Namespace) -> None:
     """バージョンを表示するサブコマンド。"""
     print(f"kaiwa {__version__}")
@@ -185,8 +723,103 @@ def main() -> None:
         default=None,
         help="最大話者数のヒント（未指定で自動推定）",
     )
+    process_parser.add_argument(
+        "--speakers",
+        type=int,
+        default=None,
+        help="話者数（1 なら pyannote を使わず全発話を1人に割り当てる）",
+    )
+    process_parser.add_argument(
+        "--transcript-only",
+        action="store_true",
+        help="話者分離を行わず文字起こしのみ出力する",
+    )
+    process_parser.add_argument(
+        "--from-step",
+        choices=STAGES,
+        default=None,
+        help="指定したステップ以降をキャッシュを使わずに再実行する",
+    )
+    process_parser.add_argument(
+        "--no-daemon",
+        dest="daemon",
+        action="store_false",
+        help="常駐サーバーを使わずにプロセス内で処理する",
+    )
     process_parser.set_defaults(func=cmd_process)
 
+    # live サブコマンド
+    live_parser = subparsers.add_parser(
+        "live", help="録音中の WAV を逐次文字起こしし、録音停止後に処理を完了する"
+    )
+    live_parser.add_argument("audio_file", help="録音中の WAV ファイルのパス")
+    live_parser.add_argument(
+        "--recorder-pid",
+        type=int,
+        required=True,
+        help="録音プロセス（sox）の PID。終了を検知したら残りの処理を行う",
+    )
+    live_parser.add_argument(
+        "--min-speakers",
+        type=int,
+        default=None,
+        help="最小話者数のヒント（未指定で自動推定）",
+    )
+    live_parser.add_argument(
+        "--max-speakers",
+        type=int,
+        default=None,
+        help="最大話者数のヒント（未指定で自動推定）",
+    )
+    live_parser.set_defaults(func=cmd_live)
+
+    # recluster サブコマンド
+    recluster_parser = subparsers.add_parser(
+        "recluster",
+        help="話者数ヒントを変えて話者のクラスタリングだけをやり直す（process 済みの音声）",
+    )
+    recluster_parser.add_argument("audio_file", help="process 済みの音声ファイルのパス")
+    recluster_parser.add_argument(
+        "--min-speakers",
+        type=int,
+        default=None,
+        help="最小話者数のヒント（未指定で自動推定）",
+    )
+    recluster_parser.add_argument(
+        "--max-speakers",
+        type=int,
+        default=None,
+        help="最大話者数のヒント（未指定で自動推定）",
+    )
+    recluster_parser.set_defaults(func=cmd_recluster)
+
+    # serve サブコマンド
+    serve_parser = subparsers.add_parser(
+        "serve", help="モデルを常駐させ、process ジョブを受け付ける"
+    )
+    serve_parser.add_argument(
+        "--socket",
+        default=None,
+        help="Unix ソケットのパス（デフォルト: ~/.kaiwa/kaiwa.sock）",
+    )
+    serve_parser.set_defaults(func=cmd_serve)
+
+    # speakers サブコマンド
+    speakers_parser = subparsers.add_parser(
+        "speakers", help="話者埋め込みストアを管理する（登録済みの話者を名前で表示）"
+    )
+    speakers_sub = speakers_parser.add_subparsers(dest="action", required=True)
+    speakers_sub.add_parser("list", help="登録済みの名前と未登録の話者を表示する")
+    enroll_parser = speakers_sub.add_parser("enroll", help="録音内の話者に名前を登録する")
+    enroll_parser.add_argument(
+        "recording", help="録音の識別子（speakers list に表示される ID、または作業ディレクトリ名）"
+    )
+    enroll_parser.add_argument("label", help="話者ラベル（例: SPEAKER_00）")
+    enroll_parser.add_argument("name", help="登録する名前")
+    forget_parser = speakers_sub.add_parser("forget", help="名前の登録を解除する")
+    forget_parser.add_argument("name", help="登録を解除する名前")
+    speakers_parser.set_defaults(func=cmd_speakers)
+
     # version サブコマンド
     version_parser = subparsers.add_parser("version", help="バージョンを表示する")
     version_parser.set_defaults(func=cmd_version)
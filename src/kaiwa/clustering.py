@@ -0,0 +1,338 @@
+"""kaiwa — 長時間録音向けの話者クラスタリング
+
+pyannote の話者分離は、チャンク（約10秒）× ローカル話者ごとの埋め込みを
+凝集型クラスタリング（centroid 法）でまとめる。全埋め込みの距離行列を扱うため
+録音の長さに対して計算量・メモリが2乗以上で増え、数時間の録音では話者分離時間の
+大半を占める。
+
+ここでは2段階クラスタリングを提供する。
+
+1. 時間順に chunk_size 個ずつ区切った埋め込みをそれぞれ凝集型クラスタリングする
+2. 1段目のクラスタのセントロイドを（要素数で重み付けして）もう一度凝集型クラスタリングする
+
+centroid 法は「クラスタ = セントロイド + 要素数」で表せるため、2段目は1段目の続きの
+併合と等価で、違いは1段目の併合がチャンク内に限られることだけ。計算量は
+O(N × chunk_size) に下がる。
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger("kaiwa")
+
+CLUSTERING_BACKENDS = ("default", "two_stage")
+
+# pyannote/speaker-diarization-3.1 の学習済みパラメータ（パイプラインから取れない場合に使う）
+DEFAULT_THRESHOLD = 0.7045654963945799
+DEFAULT_MIN_CLUSTER_SIZE = 12
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """行ごとに L2 正規化する（ゼロベクトルはそのまま）。"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def agglomerative(
+    vectors: np.ndarray,
+    threshold: float,
+    sizes: np.ndarray | None = None,
+    min_clusters: int | None = None,
+    max_clusters: int | None = None,
+) -> np.ndarray:
+    """centroid 法の凝集型クラスタリング。
+
+    セントロイド間のユークリッド距離が最小の組から併合し、最小距離が threshold を
+    超えたら止める（scipy の linkage(method="centroid") を threshold で切るのと同じ）。
+    行ごとの最近傍をキャッシュし、距離行列の全走査は併合に関わる行だけで行う。
+
+    Parameters
+    ----------
+    vectors : np.ndarray
+        (N, D) のセントロイド（正規化済みの埋め込み、またはその平均）。
+    threshold : float
+        併合するセントロイド間距離の上限。
+    sizes : np.ndarray | None
+        各行の要素数（重み）。None ならすべて1。
+    min_clusters : int | None
+        これより少なくなるまでは併合しない。
+    max_clusters : int | None
+        threshold を超えても、これ以下になるまで併合を続ける。
+
+    Returns
+    -------
+    np.ndarray
+        (N,) のクラスタ番号（0 始まり、初出順）。
+    """
+    n = len(vectors)
+    if n <= 1:
+        return np.zeros(n, dtype=np.int64)
+
+    centroids = np.array(vectors, dtype=np.float64)
+    weights = np.ones(n) if sizes is None else np.asarray(sizes, dtype=np.float64).copy()
+    limit = threshold * threshold
+    floor = max(min_clusters or 1, 1)
+
+    sq = np.einsum("ij,ij->i", centroids, centroids)
+    dist = sq[:, None] + sq[None, :] - 2 * centroids @ centroids.T
+    np.fill_diagonal(dist, np.inf)
+    nearest = dist.argmin(axis=1)
+    nearest_dist = dist[np.arange(n), nearest]
+
+    parent = np.arange(n)
+    active = np.ones(n, dtype=bool)
+    count = n
+    while count > floor:
+        i = int(nearest_dist.argmin())
+        if nearest_dist[i] > limit and (max_clusters is None or count <= max_clusters):
+            break
+        j = int(nearest[i])
+
+        # j を i に併合する
+        total = weights[i] + weights[j]
+        centroids[i] = (weights[i] * centroids[i] + weights[j] * centroids[j]) / total
+        weights[i] = total
+        parent[j] = i
+        active[j] = False
+        count -= 1
+
+        dist[j, :] = np.inf
+        dist[:, j] = np.inf
+        nearest_dist[j] = np.inf
+        diff = centroids - centroids[i]
+        row = np.einsum("ij,ij->i", diff, diff)
+        row[~active] = np.inf
+        row[i] = np.inf
+        dist[i, :] = row
+        dist[:, i] = row
+
+        nearest[i] = int(row.argmin())
+        nearest_dist[i] = row[nearest[i]]
+        # i に近づいた行は最近傍を i に、最近傍が i / j だった行は探し直す
+        closer = active & (row < nearest_dist)
+        nearest[closer] = i
+        nearest_dist[closer] = row[closer]
+        stale = np.flatnonzero(active & ((nearest == i) | (nearest == j)) & ~closer)
+        for r in stale:
+            if r == i:
+                continue
+            nearest[r] = int(dist[r].argmin())
+            nearest_dist[r] = dist[r, nearest[r]]
+
+    # 併合先をたどって根を求め、初出順に番号を振る
+    roots = parent.copy()
+    while True:
+        next_roots = parent[roots]
+        if np.array_equal(next_roots, roots):
+            break
+        roots = next_roots
+    _, first, labels = np.unique(roots, return_index=True, return_inverse=True)
+    order = np.argsort(np.argsort(first))
+    return order[labels]
+
+
+def _merge_small_clusters(
+    vectors: np.ndarray, labels: np.ndarray, min_cluster_size: int, min_clusters: int | None
+) -> np.ndarray:
+    """要素数が min_cluster_size 未満のクラスタを、最も近い大きなクラスタに吸収する。
+
+    大きなクラスタが min_clusters に満たない場合は何もしない（pyannote と同じ方針）。
+    """
+    counts = np.bincount(labels)
+    large = np.flatnonzero(counts >= min_cluster_size)
+    if len(large) == len(counts) or len(large) < max(min_clusters or 1, 1):
+        return labels
+    centroids = _normalize(np.stack([vectors[labels == k].mean(axis=0) for k in large]))
+    small = ~np.isin(labels, large)
+    nearest = (_normalize(vectors[small]) @ centroids.T).argmax(axis=1)
+    labels = labels.copy()
+    labels[small] = large[nearest]
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels
+
+
+def two_stage_clustering(
+    embeddings: np.ndarray,
+    threshold: float = DEFAULT_THRESHOLD,
+    chunk_size: int = 500,
+    min_clusters: int | None = None,
+    max_clusters: int | None = None,
+    min_cluster_size: int = 1,
+) -> np.ndarray:
+    """埋め込みを2段階の凝集型クラスタリングでまとめる。
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        (N, D) の話者埋め込み（時間順）。
+    threshold : float
+        併合する距離の上限（正規化した埋め込みのユークリッド距離）。
+    chunk_size : int
+        1段目で一度にクラスタリングする埋め込みの数。
+    min_clusters, max_clusters : int | None
+        2段目の話者数の下限・上限。
+    min_cluster_size : int
+        これより小さいクラスタは最も近い大きなクラスタに吸収する。
+
+    Returns
+    -------
+    np.ndarray
+        (N,) のクラスタ番号。
+    """
+    vectors = _normalize(np.asarray(embeddings, dtype=np.float64))
+    n = len(vectors)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # 1段目: チャンク内でクラスタリングし、クラスタのセントロイドと要素数を集める
+    chunk_size = max(int(chunk_size), 2)
+    local = np.empty(n, dtype=np.int64)
+    centroids: list[np.ndarray] = []
+    sizes: list[np.ndarray] = []
+    for start in range(0, n, chunk_size):
+        chunk = vectors[start : start + chunk_size]
+        labels = agglomerative(chunk, threshold)
+        k = int(labels.max()) + 1
+        sums = np.zeros((k, vectors.shape[1]))
+        np.add.at(sums, labels, chunk)
+        counts = np.bincount(labels, minlength=k)
+        local[start : start + chunk_size] = labels + sum(len(s) for s in sizes)
+        centroids.append(sums / counts[:, None])
+        sizes.append(counts)
+
+    # 2段目: セントロイドを要素数で重み付けしてクラスタリングする
+    merged = agglomerative(
+        np.concatenate(centroids),
+        threshold,
+        sizes=np.concatenate(sizes),
+        min_clusters=min_clusters,
+        max_clusters=max_clusters,
+    )
+    labels = merged[local]
+    if min_cluster_size > 1:
+        labels = _merge_small_clusters(vectors, labels, min_cluster_size, min_clusters)
+    return labels
+
+
+class TwoStageClustering:
+    """pyannote の SpeakerDiarization.clustering と差し替えられる2段階クラスタリング。
+
+    pyannote の BaseClustering と同じく (hard_clusters, soft_clusters, centroids) を返す。
+
+    Parameters
+    ----------
+    threshold : float
+        併合する距離の上限。
+    chunk_size : int
+        1段目で一度にクラスタリングする埋め込みの数。
+    min_cluster_size : int
+        これより小さいクラスタは最も近い大きなクラスタに吸収する。
+    default : Any
+        差し替え前の pyannote のクラスタリング（default に戻すときに使う）。
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        chunk_size: int = 500,
+        min_cluster_size: int = DEFAULT_MIN_CLUSTER_SIZE,
+        default: Any = None,
+    ):
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.min_cluster_size = min_cluster_size
+        self.default = default
+
+    def __call__(
+        self,
+        embeddings: np.ndarray,
+        segmentations: Any = None,
+        num_clusters: int | None = None,
+        min_clusters: int | None = None,
+        max_clusters: int | None = None,
+        **kwargs: Any,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(チャンク, ローカル話者, 次元) の埋め込みを録音全体の話者にまとめる。
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, np.ndarray]
+            hard_clusters (チャンク, ローカル話者)、
+            soft_clusters (チャンク, ローカル話者, 話者)、centroids (話者, 次元)。
+        """
+        num_chunks, num_local, dim = embeddings.shape
+        flat = embeddings.reshape(-1, dim)
+
+        # NaN の埋め込みと、チャンク内で一度も発話していないローカル話者を除く
+        valid = ~np.isnan(flat).any(axis=1)
+        if segmentations is not None:
+            data = np.asarray(getattr(segmentations, "data", segmentations))
+            valid &= (data.sum(axis=1) > 0).reshape(-1)
+
+        if num_clusters is not None:
+            min_clusters = max_clusters = num_clusters
+
+        if not valid.any():
+            hard = np.zeros((num_chunks, num_local), dtype=np.int8)
+            return hard, np.ones((num_chunks, num_local, 1)), np.zeros((1, dim))
+
+        labels = two_stage_clustering(
+            flat[valid],
+            threshold=self.threshold,
+            chunk_size=self.chunk_size,
+            min_clusters=min_clusters,
+            max_clusters=max_clusters,
+            min_cluster_size=self.min_cluster_size,
+        )
+        k = int(labels.max()) + 1
+        logger.debug("  2段階クラスタリング: 埋め込み %d → 話者 %d", int(valid.sum()), k)
+
+        active = flat[valid]
+        centroids = np.stack([active[labels == c].mean(axis=0) for c in range(k)])
+
+        # pyannote と同じく soft = 2 - コサイン距離、hard はその argmax
+        similarity = _normalize(np.nan_to_num(flat)) @ _normalize(centroids).T
+        soft = (1.0 + similarity).reshape(num_chunks, num_local, k)
+        hard = soft.argmax(axis=2).astype(np.int8)
+        hard.reshape(-1)[valid] = labels
+        return hard, soft, centroids
+
+
+def select_clustering(pipeline: Any, diarize_cfg: dict[str, Any]) -> None:
+    """diarize.clustering に従って pyannote パイプラインのクラスタリングを差し替える。
+
+    常駐サーバーではパイプラインを使い回すため、default に戻す場合は元のものを復元する。
+
+    Raises
+    ------
+    ValueError
+        clustering が CLUSTERING_BACKENDS 以外の場合。
+    """
+    backend = diarize_cfg.get("clustering", "default")
+    if backend not in CLUSTERING_BACKENDS:
+        raise ValueError(
+            f"diarize.clustering が不正です: {backend}（{' / '.join(CLUSTERING_BACKENDS)} のいずれか）"
+        )
+    current = getattr(pipeline, "clustering", None)
+    if current is None:
+        return
+    original = current.default if isinstance(current, TwoStageClustering) else current
+
+    if backend == "default":
+        if current is not original:
+            pipeline.clustering = original
+        return
+
+    threshold = diarize_cfg.get("clustering_threshold")
+    if threshold is None:
+        threshold = float(getattr(original, "threshold", DEFAULT_THRESHOLD))
+    pipeline.clustering = TwoStageClustering(
+        threshold=threshold,
+        chunk_size=diarize_cfg.get("clustering_chunk_size", 500),
+        min_cluster_size=int(getattr(original, "min_cluster_size", DEFAULT_MIN_CLUSTER_SIZE)),
+        default=original,
+    )
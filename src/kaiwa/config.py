@@ -8,23 +8,46 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any
 
-import yaml
-
 # デフォルト設定
 DEFAULTS: dict[str, Any] = {
     "whisper": {
         "model": "large-v3-turbo",
         "device": "cpu",  # cpu のみ対応（CTranslate2 が MPS 非対応のため）
-        "compute_type": "float32",
+        "profile": "auto",  # 速度プロファイル: fast / balanced / accurate / auto（初回計測して選択）
+        "profile_target_rtf": 0.5,  # auto: この実時間比以内で最も精度の高いプロファイルを選ぶ
+        "compute_type": None,  # None = プロファイルに従う（int8 / int8_float32 / float32）
+        "beam_size": None,  # None = プロファイルに従う
+        "cpu_threads": None,  # None = threads.budget から自動配分
+        "vad_parameters": {},  # faster-whisper の VadOptions（例: min_silence_duration_ms）
         "language": "ja",
         "batch_size": 8,
+        "mode": None,  # native / batched / whisperx（None = use_native_word_timestamps に従う）
         "use_native_word_timestamps": True,  # True=Whisper本体, False=wav2vec2
+        "parallel": "auto",  # VAD チャンク並列: auto / true / false
+        "parallel_min_duration": 1800,  # auto 時に並列化する音声長（秒）
+        "parallel_workers": 2,  # ワーカープロセス数
+        "parallel_chunk_seconds": 600,  # 1チャンクの目安長（秒）
     },
     "claude": {
         "model": "claude-3-5-haiku-latest",
         "max_tokens": 2048,
         "timeout": 120,
         "max_retries": 3,
+        "transcript_format": "compact",  # 要約に渡す文字起こしの形式（compact = 発話をまとめ話者を別名に / full = 出力と同じ行）
+        "count_tokens": True,  # map_reduce: auto で閾値に近いとき、トークンカウント API で入力トークン数を数えて判定する
+        "prompt_cache": True,  # 最小長に届く指示文または文字起こしまでをプロンプトキャッシュの対象にする（cache_control）
+        "summary_cache": True,  # 同じ文字起こし・設定の要約を再利用する（~/.kaiwa/summaries）
+        "summary_cache_dir": None,  # 要約キャッシュの保存先（None = ~/.kaiwa/summaries）
+        "summary_cache_max_days": 30,  # 最後に使われてからこの日数を過ぎた要約を削除（0 = 無期限）
+        "summary_cache_max_mb": 20,  # 要約キャッシュの合計サイズの上限（MB、0 = 無制限）
+        "stream": False,  # 要約をストリーミングで受け取り、生成中の要約を出力ファイルに書き出す
+        "stream_interval": 1.0,  # 生成中の要約を出力ファイルに書き出す間隔（秒）
+        "map_reduce": "auto",  # 分割要約（auto / true / false）
+        "map_reduce_min_tokens": 30000,  # auto 時に分割要約する文字起こしの推定トークン数
+        "chunk_tokens": 8000,  # 1チャンクの推定トークン数の上限（話者の発話の切れ目で分割）
+        "map_model": None,  # チャンクごとの部分要約のモデル（None = model と同じ）
+        "map_max_tokens": 1024,  # 部分要約1件の最大出力トークン数
+        "map_workers": 4,  # 部分要約を並列に生成する数
     },
     "paths": {
         "output": "~/Transcripts",
@@ -37,6 +60,40 @@ DEFAULTS: dict[str, Any] = {
     "diarize": {
         "min_speakers": None,  # None = 自動推定
         "max_speakers": None,  # None = 自動推定
+        "policy": "full",  # full = 常に pyannote / auto = 単一話者なら省略 / off = 文字起こしのみ / channels = チャンネル別の音量
+        "precheck_windows": 8,  # auto の事前チェックで比べるウィンドウの数
+        "precheck_window_seconds": 8,  # 事前チェックの1ウィンドウの長さ（秒）
+        "single_speaker_threshold": 1.5,  # これ未満の尤度比なら同じ声とみなす
+        "concurrent": True,  # 文字起こしと並行して実行する
+        "threads": 0,  # 話者分離（torch / ONNX Runtime）のスレッド数（0 = threads.budget から自動配分）
+        "windowed": "auto",  # ウィンドウ分割（auto / true / false）
+        "windowed_min_duration": 7200,  # auto 時にウィンドウ分割する音声長（秒）
+        "window_seconds": 1800,  # 1ウィンドウの長さ（秒）
+        "window_overlap_seconds": 60,  # 隣り合うウィンドウの重なり（秒、window_seconds 未満）
+        "window_link_threshold": 0.6,  # ウィンドウ間で同一話者とみなすコサイン類似度の下限
+        "skip_silence": True,  # 文字起こしの VAD で検出した無音区間を除いて話者分離する
+        "skip_silence_min_ratio": 0.2,  # 無音の割合がこれ未満なら除外しない（短縮効果が小さい）
+        "clustering": "default",  # 話者クラスタリング（default = pyannote / two_stage = 2段階）
+        "clustering_chunk_size": 500,  # two_stage の1段目で一度にまとめる埋め込みの数
+        "clustering_threshold": None,  # two_stage の併合距離の上限（None = pyannote の学習済み値）
+        "backend": "torch",  # 推論エンジン（torch / onnx = ONNX Runtime、要 onnxruntime）
+        "onnx_threads": 0,  # ONNX Runtime の intra-op スレッド数（0 = 話者分離のスレッド数 → コア数）
+        "onnx_cache_dir": "~/.kaiwa/onnx",  # ONNX にエクスポートしたモデルの保存先
+    },
+    "speakers": {
+        "enabled": False,  # 話者埋め込みを保存し、登録済みの話者を名前に置き換える
+        "store_dir": "~/.kaiwa/speakers",  # 話者埋め込みストアの保存先
+        "match_threshold": 0.75,  # 名前に対応付けるコサイン類似度の下限
+    },
+    "live": {
+        "enabled": False,  # 録音中に逐次文字起こし（toggle-record.sh から起動）
+        "min_window_seconds": 30,  # 1区間の最小長（秒）
+        "min_silence_seconds": 1.0,  # 区切りとみなす無音長（秒）
+        "poll_interval": 2.0,  # WAV の追記を確認する間隔（秒）
+    },
+    "threads": {
+        "budget": 0,  # 全ジョブ合計のスレッド数の上限（0 = CPU コア数）。同時実行ジョブ数で等分する
+        "diarize_share": 0.25,  # 並行実行時に話者分離へ割り当てる割合（残りは文字起こし）
     },
     "cleanup": {
         "work_retention_days": 7,  # 0 = 即座に削除, -1 = 削除しない
@@ -94,6 +151,8 @@ def load_config(config_path: Path | None = None) -> dict[str, Any]:
     dict[str, Any]
         マージ済みの設定辞書。
     """
+    import yaml
+
     path = config_path or CONFIG_PATH
     config = DEFAULTS.copy()
 
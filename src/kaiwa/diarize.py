@@ -6,14 +6,38 @@ pyannote.audio を使用した話者分離（ダイアライゼーション）
 
 from __future__ import annotations
 
+import bisect
+import json
 import logging
+import math
+import zipfile
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any
 
-from kaiwa.utils import _save_intermediate
+import numpy as np
+
+from kaiwa.clustering import select_clustering
+from kaiwa.onnx_backend import select_backend
+from kaiwa.transcribe import SAMPLE_RATE
+from kaiwa.utils import _get_model, _import_whisperx, _save_intermediate
+from kaiwa.words import WordTable
 
 logger = logging.getLogger("kaiwa")
 
+# 再クラスタリング（recluster）用に作業ディレクトリへ保存する特徴量
+FEATURES_FILE = "03_diarize_features.json"  # 時間軸の情報（SlidingWindow・無音除外の区間）
+SEGMENTATIONS_FILE = "03_segmentations.npy"  # (チャンク, フレーム, ローカル話者) の活性度
+CHUNK_EMBEDDINGS_FILE = "03_embeddings.npy"  # (チャンク, ローカル話者, 次元) の話者埋め込み
+
+# diarize.policy の値（CLI の --speakers 1 / --transcript-only は single / off になる）
+DIARIZE_POLICIES = ("full", "auto", "off", "channels")
+SINGLE_SPEAKER_LABEL = "SPEAKER_00"
+
+# 特徴量を計算する pyannote SpeakerDiarization のメソッド
+_FEATURE_STEPS = ("get_segmentations", "get_embeddings")
+
 
 def diarize(
     audio: Any,
@@ -23,6 +47,8 @@ def diarize(
     work_dir: Path | None = None,
     min_speakers: int | None = None,
     max_speakers: int | None = None,
+    num_threads: int = 0,
+    recording: str | None = None,
 ) -> dict[str, Any]:
     """話者分離を実行し、セグメントに話者情報を付与する。
 
@@ -42,26 +68,224 @@ def diarize(
         最小話者数。None なら自動推定。
     max_speakers : int | None
         最大話者数。None なら自動推定。
+    num_threads : int
+        torch / ONNX Runtime のスレッド数。0 ならライブラリのデフォルト。
+    recording : str | None
+        話者埋め込みストアでの録音の識別子（音声内容のハッシュ）。
 
     Returns
     -------
     dict
         話者情報が付与された結果辞書。
     """
-    import whisperx
-    from whisperx.diarize import DiarizationPipeline
+    from kaiwa.speakers import speaker_store_enabled
+
+    if work_dir:
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+    return_embeddings = speaker_store_enabled(config)
+    output = run_diarization(
+        audio,
+        hf_token,
+        config,
+        min_speakers=min_speakers,
+        max_speakers=max_speakers,
+        num_threads=num_threads,
+        return_embeddings=return_embeddings,
+        speech_regions=result.get("speech_regions"),
+        work_dir=work_dir,
+    )
+    diarize_segments, embeddings = output if return_embeddings else (output, None)
+    return apply_diarization(
+        diarize_segments,
+        result,
+        work_dir=work_dir,
+        embeddings=embeddings,
+        config=config if return_embeddings else None,
+        recording=recording,
+    )
+
+
+def run_diarization(
+    audio: Any,
+    hf_token: str,
+    config: dict[str, Any],
+    min_speakers: int | None = None,
+    max_speakers: int | None = None,
+    num_threads: int = 0,
+    return_embeddings: bool = False,
+    speech_regions: list[list[float]] | None = None,
+    work_dir: Path | None = None,
+) -> Any:
+    """pyannote で話者ターンを推定する（文字起こし結果は不要）。
+
+    音声だけを入力とするため、文字起こしと並行して実行できる。
+    speech_regions を渡すと発話区間だけを連結して話者分離し、時刻を元の時間軸に戻す。
+    work_dir を渡すとセグメンテーションと埋め込みを保存し、recluster() で再利用できるようにする。
+
+    Parameters
+    ----------
+    audio : Any
+        whisperx.load_audio() で読み込んだ音声データ。
+    hf_token : str
+        HuggingFace のアクセストークン。
+    config : dict
+        設定辞書。
+    min_speakers : int | None
+        最小話者数。None なら config → 自動推定。
+    max_speakers : int | None
+        最大話者数。None なら config → 自動推定。
+    num_threads : int
+        torch の CPU スレッド数。0 なら変更しない。
+    return_embeddings : bool
+        True なら話者ごとのセントロイド埋め込みも返す。
+    speech_regions : list[list[float]] | None
+        文字起こしの VAD で検出した発話区間（秒）。None なら音声全体を処理する。
+    work_dir : Path | None
+        セグメンテーション・埋め込みの保存先。None なら保存しない。
+
+    Returns
+    -------
+    Any
+        start / end / speaker 列を持つ話者ターン（DataFrame）。
+        return_embeddings が True なら (話者ターン, 話者ラベル → 埋め込み | None)。
+    """
+    device = config.get("whisper", {}).get("device", "cpu")
+    diarize_cfg = config.get("diarize", {})
+
+    logger.info("👥 話者分離開始...")
+    diarize_kwargs = _speaker_hints(diarize_cfg, min_speakers, max_speakers)
+    num_samples = len(audio)
+    if work_dir:
+        _clear_features(work_dir)
+
+    timeline = _speech_timeline(diarize_cfg, speech_regions, len(audio))
+    if timeline is not None:
+        if not timeline.lengths:
+            logger.info("  発話区間がないため話者分離をスキップします")
+            empty = _turns_frame({"start": [], "end": [], "speaker": []})
+            return (empty, {}) if return_embeddings else empty
+        logger.info(
+            "  🔇 無音区間を除いて話者分離: %.0f 秒 → %.0f 秒",
+            len(audio) / SAMPLE_RATE, timeline.speech_samples / SAMPLE_RATE,
+        )
+        audio = timeline.extract(audio)
+
+    diarize_model = _load_diarization_pipeline(hf_token, device)
+    select_clustering(getattr(diarize_model, "model", None), diarize_cfg)
+    select_backend(getattr(diarize_model, "model", None), diarize_cfg, num_threads)
+
+    if num_threads:
+        import torch
+
+        torch.set_num_threads(num_threads)
+
+    if _use_windowed(diarize_cfg, len(audio)):
+        # ウィンドウごとの特徴量は1回の再クラスタリングにまとめられないため保存しない
+        output = _diarize_windowed(
+            diarize_model, audio, diarize_cfg, diarize_kwargs, return_embeddings
+        )
+    else:
+        if return_embeddings:
+            diarize_kwargs["return_embeddings"] = True
+        with _capture_features(getattr(diarize_model, "model", None)) as features:
+            output = diarize_model(audio, **diarize_kwargs)
+        if work_dir and features:
+            _save_features(work_dir, features, num_samples, timeline)
+
+    output = _to_original_timeline(output, timeline, return_embeddings)
+
+    logger.info("  ✅ 話者分離完了")
+
+    return output
+
+
+def recluster(
+    result: dict[str, Any],
+    hf_token: str,
+    config: dict[str, Any],
+    work_dir: Path,
+    min_speakers: int | None = None,
+    max_speakers: int | None = None,
+    recording: str | None = None,
+) -> dict[str, Any]:
+    """保存済みのセグメンテーション・埋め込みからクラスタリングだけをやり直す。
+
+    話者数ヒントを変えて再実行する場合に、音声のデコード・セグメンテーション・
+    埋め込み計算を省略する。クラスタリングの後は diarize() と同じく単語への
+    話者割り当てとセグメント再分割を行う。
+
+    Parameters
+    ----------
+    result : dict
+        文字起こし結果（01_transcribe.json）。
+    hf_token : str
+        HuggingFace のアクセストークン。
+    config : dict
+        設定辞書。
+    work_dir : Path
+        run_diarization() が特徴量を保存した作業ディレクトリ。
+    min_speakers : int | None
+        最小話者数。None なら config → 自動推定。
+    max_speakers : int | None
+        最大話者数。None なら config → 自動推定。
+    recording : str | None
+        話者埋め込みストアでの録音の識別子（音声内容のハッシュ）。
+
+    Returns
+    -------
+    dict
+        話者情報が付与された結果辞書。
+
+    Raises
+    ------
+    FileNotFoundError
+        特徴量が保存されていない場合。
+    """
+    from kaiwa.speakers import speaker_store_enabled
 
+    meta, segmentations, embeddings = _load_features(work_dir)
     device = config.get("whisper", {}).get("device", "cpu")
     diarize_cfg = config.get("diarize", {})
 
-    # CLI引数 > config > 自動推定（None）の優先順位
+    logger.info("🔁 保存済みの特徴量から話者を再クラスタリング...")
+    diarize_kwargs = _speaker_hints(diarize_cfg, min_speakers, max_speakers)
+    return_embeddings = speaker_store_enabled(config)
+    if return_embeddings:
+        diarize_kwargs["return_embeddings"] = True
+
+    diarize_model = _load_diarization_pipeline(hf_token, device)
+    pipeline = getattr(diarize_model, "model", None)
+    select_clustering(pipeline, diarize_cfg)
+
+    # セグメンテーション・埋め込みは保存済みのものを返すので、音声の中身は使われない
+    with _replay_features(pipeline, segmentations, embeddings):
+        output = diarize_model(np.zeros(SAMPLE_RATE, dtype=np.float32), **diarize_kwargs)
+
+    timeline = None
+    if meta.get("speech_regions") is not None:
+        timeline = _SpeechTimeline(meta["speech_regions"], meta["num_samples"])
+    output = _to_original_timeline(output, timeline, return_embeddings)
+    logger.info("  ✅ 再クラスタリング完了")
+
+    diarize_segments, speaker_embeddings = output if return_embeddings else (output, None)
+    return apply_diarization(
+        diarize_segments,
+        result,
+        work_dir=work_dir,
+        embeddings=speaker_embeddings,
+        config=config if return_embeddings else None,
+        recording=recording,
+    )
+
+
+def _speaker_hints(
+    diarize_cfg: dict[str, Any], min_speakers: int | None, max_speakers: int | None
+) -> dict[str, Any]:
+    """話者数ヒントを DiarizationPipeline の引数にする（CLI 引数 > config > 自動推定）。"""
     _min_speakers = min_speakers or diarize_cfg.get("min_speakers")
     _max_speakers = max_speakers or diarize_cfg.get("max_speakers")
 
-    if work_dir:
-        work_dir.mkdir(parents=True, exist_ok=True)
-
-    logger.info("👥 話者分離開始...")
     if _min_speakers or _max_speakers:
         logger.info(
             "  話者数ヒント: min=%s, max=%s",
@@ -69,19 +293,60 @@ def diarize(
             _max_speakers or "auto",
         )
 
-    diarize_model = DiarizationPipeline(use_auth_token=hf_token, device=device)
-
     diarize_kwargs: dict[str, Any] = {}
     if _min_speakers is not None:
         diarize_kwargs["min_speakers"] = _min_speakers
     if _max_speakers is not None:
         diarize_kwargs["max_speakers"] = _max_speakers
+    return diarize_kwargs
 
-    diarize_segments = diarize_model(audio, **diarize_kwargs)
 
-    result = whisperx.assign_word_speakers(diarize_segments, result)
+def _to_original_timeline(
+    output: Any, timeline: _SpeechTimeline | None, return_embeddings: bool
+) -> Any:
+    """無音を除いて話者分離した場合に、話者ターンの時刻を元の時間軸に戻す。"""
+    if timeline is None:
+        return output
+    frame, embeddings = output if return_embeddings else (output, None)
+    frame = _turns_frame(timeline.to_original(frame))
+    return (frame, embeddings) if return_embeddings else frame
 
-    logger.info("  ✅ 話者分離完了")
+
+def apply_diarization(
+    diarize_segments: Any,
+    result: dict[str, Any],
+    work_dir: Path | None = None,
+    embeddings: dict[str, Any] | None = None,
+    config: dict[str, Any] | None = None,
+    recording: str | None = None,
+) -> dict[str, Any]:
+    """話者ターンを文字起こし結果に割り当て、話者交代ポイントでセグメントを分割する。
+
+    Parameters
+    ----------
+    diarize_segments : Any
+        run_diarization() の話者ターン。
+    result : dict
+        文字起こし結果辞書（segments を含む）。その場で更新する。
+    work_dir : Path | None
+        中間成果物の保存先ディレクトリ。None なら保存しない。
+    embeddings : dict[str, Any] | None
+        話者ラベル → 埋め込み。config と併せて渡すと、話者埋め込みストアで
+        登録済みの話者を名前に置き換え、この録音をストアに追加する。
+    config : dict | None
+        設定辞書（speakers セクションを参照）。None なら照合しない。
+    recording : str | None
+        話者埋め込みストアでの録音の識別子（音声内容のハッシュ）。ファイル名が同じ
+        別の録音と混同しないよう作業ディレクトリ名は使わない。None ならストアに追加しない。
+
+    Returns
+    -------
+    dict
+        話者情報が付与された結果辞書。
+    """
+    # 単語は列指向の WordTable に一度だけ展開し、話者割り当てと再分割で共有する
+    table = WordTable(result.get("segments", []))
+    result = assign_word_speakers(diarize_segments, result, table=table)
 
     # 中間成果物を保存（分割前）
     if work_dir:
@@ -89,7 +354,7 @@ def diarize(
 
     # ----- セグメント再分割 -----
     original_count = len(result.get("segments", []))
-    result["segments"] = _split_segments_by_speaker(result.get("segments", []))
+    result["segments"] = _split_segments_by_speaker(result.get("segments", []), table=table)
     new_count = len(result["segments"])
 
     if new_count != original_count:
@@ -97,6 +362,22 @@ def diarize(
             "  ✂️  セグメント再分割: %d → %d セグメント", original_count, new_count
         )
 
+    # ----- 登録済み話者の照合 -----
+    if config is not None:
+        from kaiwa.speakers import identify_speakers
+
+        # ストアの不具合で話者分離済みの結果を失わないよう、照合できなければラベルのまま続ける
+        try:
+            identify_speakers(
+                result,
+                embeddings,
+                config,
+                recording=recording,
+                title=work_dir.name if work_dir else None,
+            )
+        except (ValueError, KeyError, OSError, zipfile.BadZipFile) as e:
+            logger.warning("⚠️ 話者埋め込みストアを使えないため、話者の照合をスキップします: %s", e)
+
     # 中間成果物を保存（分割後）
     if work_dir:
         _save_intermediate(work_dir / "03_diarize.json", result)
@@ -104,91 +385,791 @@ def diarize(
     return result
 
 
-def _split_segments_by_speaker(segments: list[dict]) -> list[dict]:
+# ---------------------------------------------------------------------------
+# 話者分離ポリシー（pyannote を使わない経路）
+# ---------------------------------------------------------------------------
+
+
+def resolve_policy(
+    diarize_cfg: dict[str, Any],
+    speakers: int | None = None,
+    transcript_only: bool = False,
+) -> str:
+    """CLI 引数と diarize.policy から話者分離の方法を決める。
+
+    Returns
+    -------
+    str
+        "full"（pyannote）/ "auto"（事前チェックで決める）/
+        "single"（全セグメントを1人の話者にする）/ "off"（話者分離しない）/
+        "channels"（チャンネルごとの音量で決める）。
+
+    Raises
+    ------
+    ValueError
+        policy が DIARIZE_POLICIES 以外の場合。
+    """
+    if transcript_only:
+        return "off"
+    if speakers == 1:
+        return "single"
+    policy: str = diarize_cfg.get("policy", "full")
+    if policy not in DIARIZE_POLICIES:
+        raise ValueError(
+            f"diarize.policy が不正です: {policy}（{' / '.join(DIARIZE_POLICIES)} のいずれか）"
+        )
+    if speakers and policy == "auto":
+        # 話者数が明示されていれば事前チェックは不要
+        return "full"
+    return policy
+
+
+def needs_speech_regions(policy: str, diarize_cfg: dict[str, Any]) -> bool:
+    """話者分離の方法 policy で発話区間（VAD）が必要かを返す。
+
+    auto は事前チェックのウィンドウ選択に、pyannote を使う場合（full、モノラルで full に
+    切り替わる channels）は無音区間の除外（skip_silence）に使う。
+    """
+    if policy == "auto":
+        return True
+    return policy in ("full", "channels") and bool(diarize_cfg.get("skip_silence", True))
+
+
+def choose_policy(
+    policy: str,
+    audio: Any,
+    speech_regions: list[list[float]] | None,
+    config: dict[str, Any],
+    audio_path: Path | None = None,
+) -> str:
+    """auto なら話者数の事前チェックで single / full を選ぶ。
+
+    channels は audio_path が2チャンネル以上の場合だけ使い、モノラルなら full にする。
+    それ以外はそのまま返す。
+    """
+    if policy == "channels":
+        from kaiwa.channels import probe_channels
+
+        if audio_path is not None and probe_channels(audio_path) >= 2:
+            return "channels"
+        logger.warning("⚠️ モノラル録音のため、チャンネル別の話者分離の代わりに pyannote を使います")
+        return "full"
+    if policy != "auto":
+        return policy
+
+    from kaiwa.precheck import is_single_speaker
+
+    if is_single_speaker(audio, speech_regions, config.get("diarize", {})):
+        logger.info("  👤 単一話者と判定したため pyannote を省略します")
+        return "single"
+    return "full"
+
+
+def label_without_diarization(
+    result: dict[str, Any], policy: str, work_dir: Path | None = None
+) -> dict[str, Any]:
+    """pyannote を使わずに話者分離ステージを完了する。
+
+    single なら全セグメント・単語に SINGLE_SPEAKER_LABEL を付け、
+    off なら話者を付けない。どちらも 03_diarize.json を保存してキャッシュできるようにする。
+    """
+    if policy == "single":
+        for seg in result.get("segments", []):
+            seg["speaker"] = SINGLE_SPEAKER_LABEL
+            for word in seg.get("words", []):
+                word["speaker"] = SINGLE_SPEAKER_LABEL
+        logger.info("👤 全セグメントを %s に割り当てました", SINGLE_SPEAKER_LABEL)
+    else:
+        logger.info("⏭️ 話者分離スキップ（文字起こしのみ）")
+
+    if work_dir:
+        work_dir.mkdir(parents=True, exist_ok=True)
+        _save_intermediate(work_dir / "03_diarize.json", result)
+    return result
+
+
+def diarize_by_channels(
+    audio_path: Path,
+    result: dict[str, Any],
+    work_dir: Path | None = None,
+) -> dict[str, Any]:
+    """チャンネルごとの音量で話者を割り当てる（diarize.policy: channels）。
+
+    チャンネル i の話者を SPEAKER_{i:02d} とし、以降は pyannote の話者ターンと同じく
+    apply_diarization() で単語・セグメントに割り当てて再分割する。
+    """
+    from kaiwa.channels import channel_turns, load_channels, probe_channels
+
+    channels = load_channels(audio_path, probe_channels(audio_path))
+    turns = channel_turns(channels, result)
+    return apply_diarization(turns, result, work_dir=work_dir)
+
+
+def _use_windowed(diarize_cfg: dict[str, Any], num_samples: int) -> bool:
+    """ウィンドウ分割モードを使うかを判定する。
+
+    windowed: true/false で明示指定、"auto" なら windowed_min_duration 秒以上で有効。
+    ウィンドウ1つに収まる長さなら分割しない。
+    """
+    if num_samples <= diarize_cfg.get("window_seconds", 1800) * SAMPLE_RATE:
+        return False
+    windowed = diarize_cfg.get("windowed", "auto")
+    if windowed == "auto":
+        min_duration: float = diarize_cfg.get("windowed_min_duration", 7200)
+        return num_samples >= min_duration * SAMPLE_RATE
+    return bool(windowed)
+
+
+def _load_diarization_pipeline(hf_token: str, device: str) -> Any:
+    """WhisperX の DiarizationPipeline をロードする（常駐サーバーではキャッシュを再利用）。"""
+    _import_whisperx()  # torch.load パッチを pyannote のモデル読み込みより前に適用
+    from whisperx.diarize import DiarizationPipeline
+
+    return _get_model(
+        ("pyannote", device),
+        lambda: DiarizationPipeline(use_auth_token=hf_token, device=device),
+    )
+
+
+def _turns_frame(turns: dict[str, list]) -> Any:
+    """start / end / speaker の列から DiarizationPipeline と同じ形式の DataFrame を作る。"""
+    import pandas as pd
+
+    return pd.DataFrame(turns, columns=["start", "end", "speaker"])
+
+
+# ---------------------------------------------------------------------------
+# 再クラスタリング用の特徴量
+# ---------------------------------------------------------------------------
+
+
+@contextmanager
+def _capture_features(pipeline: Any) -> Iterator[dict[str, Any]]:
+    """pyannote パイプラインのセグメンテーションと埋め込みの計算結果を横取りして記録する。
+
+    SpeakerDiarization.get_segmentations / get_embeddings をインスタンス上で包む。
+    パイプラインがこれらを持たない場合は何も記録しない。
+    """
+    features: dict[str, Any] = {}
+    if pipeline is None or not all(hasattr(pipeline, name) for name in _FEATURE_STEPS):
+        yield features
+        return
+
+    originals = {name: getattr(pipeline, name) for name in _FEATURE_STEPS}
+
+    def recorder(name: str) -> Any:
+        def record(*args: Any, **kwargs: Any) -> Any:
+            features[name] = output = originals[name](*args, **kwargs)
+            return output
+
+        return record
+
+    for name in _FEATURE_STEPS:
+        setattr(pipeline, name, recorder(name))
+    try:
+        yield features
+    finally:
+        for name, original in originals.items():
+            setattr(pipeline, name, original)
+
+
+@contextmanager
+def _replay_features(pipeline: Any, segmentations: Any, embeddings: np.ndarray) -> Iterator[None]:
+    """pyannote パイプラインがセグメンテーションと埋め込みを計算せず、保存済みのものを使うようにする。"""
+    originals = {name: getattr(pipeline, name) for name in _FEATURE_STEPS}
+    replay = {"get_segmentations": segmentations, "get_embeddings": embeddings}
+    for name in _FEATURE_STEPS:
+        setattr(pipeline, name, lambda *args, _value=replay[name], **kwargs: _value)
+    try:
+        yield
+    finally:
+        for name, original in originals.items():
+            setattr(pipeline, name, original)
+
+
+def _clear_features(work_dir: Path) -> None:
+    """以前の実行で保存した特徴量を削除する（設定の異なる特徴量で再クラスタリングしないため）。"""
+    for name in (FEATURES_FILE, SEGMENTATIONS_FILE, CHUNK_EMBEDDINGS_FILE):
+        (work_dir / name).unlink(missing_ok=True)
+
+
+def _save_features(
+    work_dir: Path,
+    features: dict[str, Any],
+    num_samples: int,
+    timeline: _SpeechTimeline | None,
+) -> None:
+    """セグメンテーション・埋め込みと、時間軸の情報を作業ディレクトリに保存する。"""
+    if set(features) != set(_FEATURE_STEPS):
+        return
+    segmentations = features["get_segmentations"]
+    window = segmentations.sliding_window
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+    # セグメンテーションは 0〜1 の活性度なので半精度で十分（サイズを半分にする）
+    np.save(work_dir / SEGMENTATIONS_FILE, np.asarray(segmentations.data, dtype=np.float16))
+    np.save(work_dir / CHUNK_EMBEDDINGS_FILE, np.asarray(features["get_embeddings"], dtype=np.float32))
+    speech_regions = None
+    if timeline is not None:
+        speech_regions = [
+            [start / SAMPLE_RATE, (start + length) / SAMPLE_RATE]
+            for start, length in zip(timeline.starts, timeline.lengths)
+        ]
+    _save_intermediate(
+        work_dir / FEATURES_FILE,
+        {
+            "sliding_window": {
+                "start": float(window.start),
+                "duration": float(window.duration),
+                "step": float(window.step),
+            },
+            "num_samples": num_samples,
+            "speech_regions": speech_regions,
+        },
+    )
+    logger.debug("  再クラスタリング用の特徴量を保存: %s", work_dir)
+
+
+def _load_features(work_dir: Path) -> tuple[dict[str, Any], Any, np.ndarray]:
+    """保存済みの (時間軸の情報, セグメンテーション, 埋め込み) を読み込む。
+
+    Raises
+    ------
+    FileNotFoundError
+        特徴量が保存されていない場合。
+    """
+    paths = [work_dir / name for name in (FEATURES_FILE, SEGMENTATIONS_FILE, CHUNK_EMBEDDINGS_FILE)]
+    missing = [path.name for path in paths if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"再クラスタリング用の特徴量がありません: {', '.join(missing)}")
+
+    with open(paths[0], encoding="utf-8") as f:
+        meta = json.load(f)
+    segmentations = _sliding_window_feature(
+        np.load(paths[1]).astype(np.float32), meta["sliding_window"]
+    )
+    return meta, segmentations, np.load(paths[2])
+
+
+def _sliding_window_feature(data: np.ndarray, window: dict[str, float]) -> Any:
+    """保存した配列から pyannote の SlidingWindowFeature を作り直す。"""
+    from pyannote.core import SlidingWindow, SlidingWindowFeature
+
+    return SlidingWindowFeature(data, SlidingWindow(**window))
+
+
+# ---------------------------------------------------------------------------
+# 無音区間の除外
+# ---------------------------------------------------------------------------
+
+
+def _speech_timeline(
+    diarize_cfg: dict[str, Any], speech_regions: list[list[float]] | None, num_samples: int
+) -> _SpeechTimeline | None:
+    """無音区間を除いて話者分離する場合は発話区間のタイムラインを返す。
+
+    skip_silence が無効、発話区間が未取得、または無音の割合が
+    skip_silence_min_ratio 未満（連結しても短縮効果が小さい）なら None。
+    """
+    if speech_regions is None or not diarize_cfg.get("skip_silence", True):
+        return None
+    timeline = _SpeechTimeline(speech_regions, num_samples)
+    silence_ratio = 1 - timeline.speech_samples / max(num_samples, 1)
+    if timeline.lengths and silence_ratio < diarize_cfg.get("skip_silence_min_ratio", 0.2):
+        return None
+    return timeline
+
+
+class _SpeechTimeline:
+    """発話区間だけを連結した音声の時間軸と、元の時間軸との対応。
+
+    Parameters
+    ----------
+    speech_regions : list[list[float]]
+        発話区間 [開始秒, 終了秒] のリスト。
+    num_samples : int
+        元の音声のサンプル数。
+    """
+
+    def __init__(self, speech_regions: list[list[float]], num_samples: int):
+        # サンプル単位に丸めて音声の範囲に収め、重なり・接する区間はまとめる
+        merged: list[list[int]] = []
+        for start, end in sorted(speech_regions):
+            s = min(max(round(start * SAMPLE_RATE), 0), num_samples)
+            e = min(max(round(end * SAMPLE_RATE), 0), num_samples)
+            if e <= s:
+                continue
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+
+        self.starts = [s for s, _ in merged]
+        self.lengths = [e - s for s, e in merged]
+        # 連結後の時間軸での各区間の開始位置
+        self.compact_starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1])).tolist()
+        self.speech_samples = sum(self.lengths)
+
+    def extract(self, audio: Any) -> Any:
+        """発話区間だけを連結した音声を返す。"""
+        return np.concatenate([audio[s : s + n] for s, n in zip(self.starts, self.lengths)])
+
+    def to_original(self, frame: Any) -> dict[str, list]:
+        """連結後の時間軸の話者ターンを元の時間軸に戻す。
+
+        発話区間の境界（元の音声では無音を挟む位置）をまたぐターンは区間ごとに分ける。
+        """
+        turns: dict[str, list] = {"start": [], "end": [], "speaker": []}
+        for t_start, t_end, speaker in zip(frame["start"], frame["end"], frame["speaker"]):
+            a, b = float(t_start) * SAMPLE_RATE, float(t_end) * SAMPLE_RATE
+            i = max(bisect.bisect_right(self.compact_starts, a) - 1, 0)
+            while i < len(self.starts) and self.compact_starts[i] < b:
+                lo = max(a, self.compact_starts[i])
+                hi = min(b, self.compact_starts[i] + self.lengths[i])
+                if hi > lo:
+                    offset = self.starts[i] - self.compact_starts[i]
+                    turns["start"].append((lo + offset) / SAMPLE_RATE)
+                    turns["end"].append((hi + offset) / SAMPLE_RATE)
+                    turns["speaker"].append(speaker)
+                i += 1
+        return turns
+
+
+# ---------------------------------------------------------------------------
+# ウィンドウ分割の話者分離
+# ---------------------------------------------------------------------------
+
+
+def _plan_windows(num_samples: int, window: int, overlap: int) -> list[tuple[int, int]]:
+    """重なりを持つウィンドウ [start, end)（サンプル単位）に分割する。"""
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window, num_samples)
+        windows.append((start, end))
+        if end == num_samples:
+            return windows
+        start = end - overlap
+
+
+def _diarize_windowed(
+    diarize_model: Any,
+    audio: Any,
+    diarize_cfg: dict[str, Any],
+    diarize_kwargs: dict[str, Any],
+    return_embeddings: bool,
+) -> Any:
+    """重なりを持つウィンドウごとに話者分離し、埋め込みの類似度で話者をつなぐ。
+
+    pyannote のセグメンテーション・埋め込み・クラスタリングのメモリと計算量は
+    音声長に対して超線形に増えるため、長時間録音では一定長のウィンドウに分けて
+    処理する。ウィンドウをまたぐ話者の同一性は、ウィンドウごとの話者セントロイド
+    埋め込みのコサイン類似度で判定する。
+
+    Returns
+    -------
+    Any
+        start / end / speaker 列を持つ話者ターン（DataFrame）。
+        return_embeddings が True なら (話者ターン, 話者ラベル → 埋め込み)。
+
+    Raises
+    ------
+    ValueError
+        window_seconds が正でない、または window_overlap_seconds が 0 以上
+        window_seconds 未満でない場合（ウィンドウが先に進まなくなるため）。
+    """
+    window_seconds = diarize_cfg.get("window_seconds", 1800)
+    overlap_seconds = diarize_cfg.get("window_overlap_seconds", 60)
+    if window_seconds <= 0:
+        raise ValueError(f"diarize.window_seconds が不正です: {window_seconds}（正の秒数）")
+    if not 0 <= overlap_seconds < window_seconds:
+        raise ValueError(
+            f"diarize.window_overlap_seconds が不正です: {overlap_seconds}"
+            f"（0 以上 diarize.window_seconds（{window_seconds}）未満）"
+        )
+    window = int(window_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    windows = _plan_windows(len(audio), window, overlap)
+    logger.info(
+        "  🪟 ウィンドウ分割で話者分離: %d ウィンドウ（%d 分、重なり %d 秒）",
+        len(windows), window // SAMPLE_RATE // 60, overlap // SAMPLE_RATE,
+    )
+
+    # 最小話者数はウィンドウごとには成り立たないため、全体の最大話者数だけを各ウィンドウに渡す
+    max_speakers = diarize_kwargs.get("max_speakers")
+    window_kwargs = {"return_embeddings": True}
+    if max_speakers is not None:
+        window_kwargs["max_speakers"] = max_speakers
+
+    linker = _SpeakerLinker(diarize_cfg.get("window_link_threshold", 0.6))
+    turns: dict[str, list] = {"start": [], "end": [], "speaker": []}
+    for i, (start, end) in enumerate(windows):
+        frame, embeddings = diarize_model(audio[start:end], **window_kwargs)
+        if not embeddings:
+            logger.warning("⚠️ 話者埋め込みが取得できないため、ウィンドウ分割せずに話者分離します")
+            if return_embeddings:
+                diarize_kwargs = {**diarize_kwargs, "return_embeddings": True}
+            return diarize_model(audio, **diarize_kwargs)
+
+        mapping = linker.link(embeddings)
+        # 重なり部分は中点で切り分け、隣り合うウィンドウで同じ区間を二重に数えない
+        keep_from = (start + overlap / 2) / SAMPLE_RATE if i > 0 else 0.0
+        keep_to = (end - overlap / 2) / SAMPLE_RATE if i < len(windows) - 1 else end / SAMPLE_RATE
+        offset = start / SAMPLE_RATE
+        for t_start, t_end, label in zip(frame["start"], frame["end"], frame["speaker"]):
+            t_start = max(float(t_start) + offset, keep_from)
+            t_end = min(float(t_end) + offset, keep_to)
+            if t_end > t_start and label in mapping:
+                turns["start"].append(t_start)
+                turns["end"].append(t_end)
+                turns["speaker"].append(mapping[label])
+
+    relabel = linker.merge_to(max_speakers)
+    turns["speaker"] = [relabel[k] for k in turns["speaker"]]
+    diarize_segments = _turns_frame(turns)
+    logger.info("  ウィンドウ間で話者をつないだ結果: %d 人", len(set(relabel.values())))
+
+    if return_embeddings:
+        return diarize_segments, linker.embeddings()
+    return diarize_segments
+
+
+class _SpeakerLinker:
+    """ウィンドウごとの話者を、全体で共通の話者にセントロイド埋め込みで対応付ける。
+
+    全体の話者ごとに正規化済み埋め込みの和を持ち、各ウィンドウの話者を
+    類似度の高い組から貪欲に1対1で割り当てる（threshold 未満なら新しい話者）。
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._sums: list[np.ndarray] = []
+        self._merged: dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+    def _centroids(self) -> np.ndarray:
+        return self._normalize(np.asarray(self._sums))
+
+    def link(self, embeddings: dict[str, Any]) -> dict[str, int]:
+        """ウィンドウ内の話者ラベル → 全体の話者番号 を返し、セントロイドを更新する。"""
+        labels = list(embeddings)
+        local = self._normalize(np.asarray([embeddings[k] for k in labels], dtype=np.float64))
+        mapping: dict[str, int] = {}
+        if self._sums:
+            similarity = local @ self._centroids().T
+            used: set[int] = set()
+            for flat in np.argsort(-similarity, axis=None):
+                q, g = divmod(int(flat), similarity.shape[1])
+                if similarity[q, g] < self.threshold:
+                    break
+                if labels[q] in mapping or g in used:
+                    continue
+                mapping[labels[q]] = g
+                used.add(g)
+        for q, label in enumerate(labels):
+            if label in mapping:
+                self._sums[mapping[label]] = self._sums[mapping[label]] + local[q]
+            else:
+                mapping[label] = len(self._sums)
+                self._sums.append(local[q].copy())
+        return mapping
+
+    def merge_to(self, max_speakers: int | None) -> dict[int, str]:
+        """最大話者数を超える場合は最も似た話者同士を統合し、番号 → 話者ラベル を返す。"""
+        groups = {g: g for g in range(len(self._sums))}
+        sums = {g: s for g, s in enumerate(self._sums)}
+        while max_speakers and len(sums) > max_speakers:
+            keys = list(sums)
+            centroids = self._normalize(np.asarray([sums[k] for k in keys]))
+            similarity = centroids @ centroids.T
+            np.fill_diagonal(similarity, -np.inf)
+            a, b = divmod(int(np.argmax(similarity)), len(keys))
+            keep, drop = keys[min(a, b)], keys[max(a, b)]
+            sums[keep] = sums[keep] + sums.pop(drop)
+            groups = {g: keep if root == drop else root for g, root in groups.items()}
+
+        # 初登場順に SPEAKER_00, SPEAKER_01, ... と付け直す
+        names = {root: f"SPEAKER_{i:02d}" for i, root in enumerate(sorted(set(groups.values())))}
+        self._merged = {names[root]: sums[root] for root in names}
+        return {g: names[root] for g, root in groups.items()}
+
+    def embeddings(self) -> dict[str, list[float]]:
+        """merge_to() 後の話者ラベル → 正規化済みセントロイド埋め込み。"""
+        return {label: self._normalize(vector).tolist() for label, vector in self._merged.items()}
+
+
+# ---------------------------------------------------------------------------
+# 単語への話者割り当て
+# ---------------------------------------------------------------------------
+
+
+class _TurnIndex:
+    """話者ターンの区間集合に対し、任意区間との重なり長を話者ごとに求める索引。
+
+    話者ごとに開始・終了時刻をソートして累積和を持つと、
+    F(x) = Σ_ターン clamp(x - start, 0, end - start)
+         = x·#(start < x) - Σ_{start < x} start - x·#(end < x) + Σ_{end < x} end
+    が二分探索で求まり、区間 [qs, qe] との重なり長の合計は F(qe) - F(qs) になる。
+    """
+
+    # 上位2話者の差がこれ以下なら累積和の丸め誤差で順位が入れ替わり得るとみなす（秒）
+    TIE_TOLERANCE = 1e-6
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, codes: np.ndarray, n_speakers: int):
+        self._tables = []
+        self._by_start = []  # 直接計算用: 開始時刻順の (開始, 終了, 最大長) を Python のリストで保持
+        for k in range(n_speakers):
+            turn_starts, turn_ends = starts[codes == k], ends[codes == k]
+            order = np.argsort(turn_starts, kind="stable")
+            self._by_start.append((
+                turn_starts[order].tolist(),
+                turn_ends[order].tolist(),
+                float(np.max(turn_ends - turn_starts, initial=0.0)),
+            ))
+            s = np.sort(turn_starts)
+            e = np.sort(turn_ends)
+            self._tables.append((
+                s,
+                np.concatenate(([0.0], np.cumsum(s))),
+                e,
+                np.concatenate(([0.0], np.cumsum(e))),
+            ))
+
+    def overlaps(self, qs: np.ndarray, qe: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(話者数, クエリ数) の重なり長の合計と、正の重なりを持つターン数を返す。"""
+        totals = np.zeros((len(self._tables), len(qs)))
+        counts = np.zeros((len(self._tables), len(qs)), dtype=np.int64)
+        for k, (s, s_cum, e, e_cum) in enumerate(self._tables):
+
+            def integral(x: np.ndarray) -> np.ndarray:
+                i = np.searchsorted(s, x, side="left")
+                j = np.searchsorted(e, x, side="left")
+                return x * i - s_cum[i] - x * j + e_cum[j]
+
+            totals[k] = integral(qe) - integral(qs)
+            # start < qe かつ end > qs のターン数（qs < qe, start < end の前提で整数のまま厳密に数える）
+            counts[k] = (
+                np.searchsorted(s, qe, side="left") - np.searchsorted(e, qs, side="right")
+            )
+        return totals, counts
+
+    def exact_totals(self, qs: float, qe: float) -> list[float]:
+        """1区間について、ターンごとの重なりを直接計算して話者ごとに合計する。
+
+        重なり得るのは start が (qs - 最大長, qe) にあるターンだけなので、その範囲のみ調べる。
+        """
+        totals = []
+        for s, e, max_len in self._by_start:
+            lo = bisect.bisect_right(s, qs - max_len)
+            hi = bisect.bisect_left(s, qe)
+            intersections = (min(e[i], qe) - max(s[i], qs) for i in range(lo, hi))
+            totals.append(math.fsum(x for x in intersections if x > 0))
+        return totals
+
+
+def _best_speakers(index: _TurnIndex, qs: np.ndarray, qe: np.ndarray) -> np.ndarray:
+    """各区間で重なりの合計が最大の話者コードを返す。重なりがなければ -1。"""
+    if len(qs) == 0:
+        return np.zeros(0, dtype=np.int64)
+    totals, counts = index.overlaps(qs, qe)
+    hit = counts > 0
+    totals = np.where(hit, totals, -np.inf)
+    best = np.argmax(totals, axis=0)  # 同点なら話者ラベルの昇順で先のもの
+    valid = hit.any(axis=0) & (qe > qs)
+
+    # 重なり発話で単語が2話者のターンに完全に含まれる場合などの同点・僅差は
+    # 丸め誤差の影響を受けないよう直接計算し直す
+    if totals.shape[0] > 1:
+        top2 = -np.sort(-totals, axis=0)[:2]
+        second = np.isfinite(top2[1])
+        gap = np.where(second, top2[0] - np.where(second, top2[1], 0.0), np.inf)
+        for q in np.flatnonzero(valid & (gap <= _TurnIndex.TIE_TOLERANCE)):
+            exact = np.where(hit[:, q], index.exact_totals(float(qs[q]), float(qe[q])), -np.inf)
+            best[q] = np.argmax(exact)
+
+    return np.where(valid, best, -1)
+
+
+def assign_word_speakers(
+    diarize_segments: Any,
+    result: dict[str, Any],
+    table: WordTable | None = None,
+) -> dict[str, Any]:
+    """話者ターンとの重なりに基づき、セグメントと単語に speaker を付与する。
+
+    whisperx.assign_word_speakers（fill_nearest=False）と同じ規則で割り当てる:
+    正の重なりを持つターンについて話者ごとに重なり長を合計し、最大の話者を選ぶ。
+    重なりがなければ speaker は付与しない。whisperx が単語ごとに全ターンを
+    走査するのに対し、ソート済み配列の二分探索で一括処理する。
+
+    Parameters
+    ----------
+    diarize_segments : Any
+        start / end / speaker 列を持つ話者ターン（DiarizationPipeline の DataFrame 等）。
+    result : dict
+        segments を含む結果辞書。その場で更新する。
+    table : WordTable | None
+        segments から作成済みの WordTable。渡した場合は speaker 列も更新する。
+
+    Returns
+    -------
+    dict
+        speaker が付与された結果辞書（引数と同じオブジェクト）。
+    """
+    segments = result.get("segments", [])
+
+    starts = np.asarray(diarize_segments["start"], dtype=np.float64)
+    ends = np.asarray(diarize_segments["end"], dtype=np.float64)
+    labels = np.asarray(diarize_segments["speaker"], dtype=object)
+
+    # 長さ 0 以下のターンは正の重なりを持ち得ない
+    keep = ends > starts
+    starts, ends, labels = starts[keep], ends[keep], labels[keep]
+    if len(starts) == 0 or not segments:
+        return result
+
+    speakers, codes = np.unique(labels.astype(str), return_inverse=True)
+    index = _TurnIndex(starts, ends, codes, len(speakers))
+
+    # セグメント単位
+    seg_best = _best_speakers(
+        index,
+        np.array([seg["start"] for seg in segments], dtype=np.float64),
+        np.array([seg["end"] for seg in segments], dtype=np.float64),
+    )
+    for seg, code in zip(segments, seg_best):
+        if code >= 0:
+            seg["speaker"] = str(speakers[code])
+
+    # 単語単位（タイムスタンプのない単語は対象外）
+    if table is None:
+        table = WordTable(segments)
+    timed = np.flatnonzero(~np.isnan(table.columns["start"]))
+    word_best = _best_speakers(
+        index, table.columns["start"][timed], table.columns["end"][timed]
+    )
+    hit = word_best >= 0
+    timed, word_best = timed[hit], word_best[hit]
+    table_codes = np.array([table.label_code(str(label)) for label in speakers], dtype=np.int32)
+    table.columns["speaker"][timed] = table_codes[word_best]
+
+    # 出力（result の単語 dict）へ書き戻す
+    speaker_names = [str(label) for label in speakers]
+    for i, code in zip(timed.tolist(), word_best.tolist()):
+        table.words[i]["speaker"] = speaker_names[code]
+
+    return result
+
+
+# ---------------------------------------------------------------------------
+# セグメント再分割
+# ---------------------------------------------------------------------------
+
+
+def _split_segments_by_speaker(segments: list[dict], table: WordTable | None = None) -> list[dict]:
     """単語レベルの話者情報に基づき、話者交代ポイントでセグメントを分割する。
 
     WhisperX は単語ごとに話者を割り当てるが、セグメント単位では多数決で
     1人の話者に集約してしまう。この関数はその情報を活かして、話者が
     変わるポイントで新しいセグメントに分割する。
 
+    単語は WordTable（列指向の構造化配列）に展開し、話者の引き継ぎと
+    話者交代の境界検出を配列演算で行う。dict を作るのは分割後のセグメントだけで、
+    単語 dict は元のリストをスライスして再利用する。
+
     Parameters
     ----------
     segments : list[dict]
         WhisperX の assign_word_speakers 出力セグメント。
         各セグメントは words リストを持ち、各 word に speaker が付与されている。
+    table : WordTable | None
+        segments から作成済みの WordTable。None または別の segments のものなら作り直す。
 
     Returns
     -------
     list[dict]
         話者交代ポイントで分割されたセグメントのリスト。
     """
-    new_segments: list[dict] = []
-
-    for seg in segments:
-        words = seg.get("words", [])
+    if table is None or table.segments is not segments:
+        table = WordTable(segments)
+    n = len(table)
+    if n == 0:
+        return list(segments)
 
-        # 単語データがない場合はそのまま保持
-        if not words:
-            new_segments.append(seg)
-            continue
-
-        # 話者情報を持つ単語がない場合もそのまま保持
-        has_speaker_info = any(w.get("speaker") for w in words)
-        if not has_speaker_info:
-            new_segments.append(seg)
-            continue
+    columns = table.columns
+    segment_of = columns["segment"]
+    positions = np.arange(n)
 
-        # 連続する同一話者の単語をグループ化
-        groups: list[list[dict]] = []
-        current_group: list[dict] = []
-        current_speaker: str | None = None
+    # 話者情報がない単語は直前の話者を引き継ぐ（セグメントをまたいでは引き継がない）
+    speaker = columns["speaker"]
+    last_known = np.maximum.accumulate(np.where(speaker >= 0, positions, -1))
+    inherited = (last_known >= table.offsets[segment_of]) & (last_known >= 0)
+    filled = np.where(inherited, speaker[np.maximum(last_known, 0)], -1)
 
-        for word in words:
-            word_speaker = word.get("speaker")
+    # 連続する同一話者の単語をランとしてまとめる
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = (segment_of[1:] != segment_of[:-1]) | (filled[1:] != filled[:-1])
+    run_starts = np.flatnonzero(boundary)
+    run_ends = np.append(run_starts[1:], n)
+    run_segment = segment_of[run_starts]
 
-            # 話者情報がない単語は直前の話者を引き継ぐ
-            if word_speaker is None:
-                word_speaker = current_speaker
+    # 話者情報を持つ単語があり、かつランが2つ以上のセグメントだけ分割する
+    truthy_label = np.array([bool(label) for label in table.speaker_labels] + [False])
+    has_speaker_info = np.bincount(
+        segment_of, weights=truthy_label[speaker], minlength=len(segments)
+    ) > 0
+    runs_per_segment = np.bincount(run_segment, minlength=len(segments))
+    split = has_speaker_info & (runs_per_segment > 1)
 
-            if word_speaker != current_speaker and current_group:
-                groups.append(current_group)
-                current_group = []
+    # 各ランでタイミング情報を持つ最初と最後の単語
+    timed = ~np.isnan(columns["start"]) & ~np.isnan(columns["end"])
+    first_timed = np.minimum.reduceat(np.where(timed, positions, n), run_starts)
+    last_timed = np.maximum.reduceat(np.where(timed, positions, -1), run_starts)
 
-            current_speaker = word_speaker
-            current_group.append(word)
+    # dict に戻すのは分割するセグメントのランだけ（配列の値は Python のリストで取り出す）
+    selected = np.flatnonzero(split[run_segment])
+    runs = iter(zip(
+        run_segment[selected].tolist(),
+        run_starts[selected].tolist(),
+        run_ends[selected].tolist(),
+        first_timed[selected].tolist(),
+        last_timed[selected].tolist(),
+        columns["text_start"][run_starts[selected]].tolist(),
+        columns["text_end"][run_ends[selected] - 1].tolist(),
+    ))
+    run = next(runs, None)
 
-        if current_group:
-            groups.append(current_group)
-
-        # グループが1つなら分割不要
-        if len(groups) <= 1:
+    words = table.words
+    new_segments: list[dict] = []
+    for seg_index, (seg, split_here) in enumerate(zip(segments, split.tolist())):
+        if not split_here:
             new_segments.append(seg)
             continue
 
-        # 各グループから新しいセグメントを作成
-        for group in groups:
-            words_with_timing = [w for w in group if "start" in w and "end" in w]
+        # 各ランから新しいセグメントを作成
+        while run is not None and run[0] == seg_index:
+            _, first, last, timed_first, timed_last, text_start, text_end = run
+            run = next(runs, None)
 
-            if words_with_timing:
-                start = words_with_timing[0]["start"]
-                end = words_with_timing[-1]["end"]
-            else:
-                # タイミング情報がない場合はスキップ
+            # タイミング情報がない場合はスキップ
+            if timed_first >= last:
                 continue
 
-            text = "".join(w.get("word", "") for w in group).strip()
+            text = table.text[text_start:text_end].strip()
             if not text:
                 continue
 
-            speaker = group[0].get("speaker", seg.get("speaker", "UNKNOWN"))
-
-            new_seg = {
-                "start": start,
-                "end": end,
+            head = words[first]
+            new_segments.append({
+                "start": words[timed_first]["start"],
+                "end": words[timed_last]["end"],
                 "text": text,
-                "speaker": speaker,
-                "words": group,
-            }
-            new_segments.append(new_seg)
+                "speaker": head["speaker"] if "speaker" in head else seg.get("speaker", "UNKNOWN"),
+                "words": words[first:last],
+            })
 
     return new_segments
@@ -0,0 +1,260 @@
+"""kaiwa — ライブ文字起こしモジュール
+
+録音中（sox が書き込み中）の WAV ファイルを追跡し、VAD で区切りが確定した
+区間から順に文字起こしする。録音停止時には最後の区間だけを処理すればよいため、
+停止から Markdown 出力までの待ち時間が短くなる。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import numpy as np
+
+from kaiwa.profiles import decode_options, resolve_speed_settings
+from kaiwa.threads import job_slot
+from kaiwa.transcribe import (
+    SAMPLE_RATE,
+    _detect_speech,
+    _load_whisper_model,
+    _segment_to_dict,
+)
+from kaiwa.utils import _save_intermediate
+
+logger = logging.getLogger("kaiwa")
+
+
+class WavTail:
+    """書き込み中の WAV ファイルから、前回以降に追記された PCM を読み出す。
+
+    toggle-record.sh と同じ 16kHz / モノラル / 16bit PCM のみ対応する。
+    sox は録音終了時までヘッダーのデータ長を確定しないため、data チャンクの
+    長さは無視してファイル末尾まで読む。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._data_offset: int | None = None
+        self._position = 0  # data チャンク先頭からの読み出し済みバイト数
+
+    def _parse_header(self, f: BinaryIO) -> int | None:
+        """data チャンクの開始位置を返す。ヘッダー未書き込みなら None。"""
+        header = f.read(12)
+        if len(header) < 12:
+            return None
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"WAV ファイルではありません: {self.path}")
+
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"data":
+                return f.tell()
+            body = f.read(size + (size & 1))  # チャンクは偶数バイト境界
+            if len(body) < size:
+                return None
+            if chunk_id == b"fmt ":
+                _, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if (channels, rate, bits) != (1, SAMPLE_RATE, 16):
+                    raise ValueError(
+                        f"ライブ文字起こしは 16kHz/モノラル/16bit のみ対応: "
+                        f"{rate}Hz/{channels}ch/{bits}bit"
+                    )
+
+    def read_new(self) -> np.ndarray:
+        """新たに書き込まれたサンプルを float32（-1.0〜1.0）で返す。"""
+        if not self.path.exists():
+            return np.zeros(0, dtype=np.float32)
+
+        with open(self.path, "rb") as f:
+            if self._data_offset is None:
+                self._data_offset = self._parse_header(f)
+                if self._data_offset is None:
+                    return np.zeros(0, dtype=np.float32)
+            f.seek(self._data_offset + self._position)
+            data = f.read()
+
+        usable = len(data) - (len(data) % 2)  # サンプル途中までの書き込みは次回へ
+        self._position += usable
+        # whisperx.load_audio（ffmpeg s16le → / 32768）と同じ変換
+        return np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+class LiveTranscriber:
+    """VAD で確定した区間を逐次文字起こしし、全体の result を組み立てる。
+
+    Parameters
+    ----------
+    config : dict
+        設定辞書（whisper / live セクションを使用）。
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        whisper_cfg = config.get("whisper", {})
+        live_cfg = config.get("live", {})
+
+        self.language = whisper_cfg.get("language", "ja")
+        self.min_window = int(live_cfg.get("min_window_seconds", 30) * SAMPLE_RATE)
+        self.min_silence = int(live_cfg.get("min_silence_seconds", 1.0) * SAMPLE_RATE)
+
+        # 録音開始時点では計測用の音声がないため、auto は保存済みの計測結果を使う
+        speed = resolve_speed_settings(whisper_cfg)
+        self._options = decode_options(speed)
+        self._model = _load_whisper_model(
+            whisper_cfg.get("model", "large-v3-turbo"),
+            whisper_cfg.get("device", "cpu"),
+            speed["compute_type"],
+            speed["cpu_threads"],
+        )
+        # 容量倍増で伸ばすバッファ（追記のたびに全体をコピーしない）
+        self._buffer = np.zeros(SAMPLE_RATE * 60, dtype=np.float32)
+        self._length = 0
+        self._finalized = 0  # 文字起こし済みのサンプル位置
+        self._detected_language: str | None = None
+        self.segments: list[dict[str, Any]] = []
+
+    @property
+    def audio(self) -> np.ndarray:
+        """これまでに受け取った音声全体（コピーなしのビュー）。"""
+        return self._buffer[: self._length]
+
+    def feed(self, samples: np.ndarray) -> None:
+        """新しいサンプルをバッファに追加する。"""
+        needed = self._length + len(samples)
+        if needed > len(self._buffer):
+            grown = np.zeros(max(needed, len(self._buffer) * 2), dtype=np.float32)
+            grown[: self._length] = self.audio
+            self._buffer = grown
+        self._buffer[self._length : needed] = samples
+        self._length = needed
+
+    def _find_cut(self) -> int | None:
+        """未処理区間内で、十分な無音が続く最後の位置（無音の中点）を返す。"""
+        pending = self.audio[self._finalized :]
+        if len(pending) < self.min_window:
+            return None
+
+        regions = _detect_speech(pending)
+        if not regions:
+            # 発話なし → 無音区間として確定させ、次回以降の VAD 対象から外す
+            return self._finalized + len(pending)
+
+        # 次の発話開始（最後の発話の後ろはバッファ末尾）までの無音を調べる
+        next_starts = [start for start, _ in regions[1:]] + [len(pending)]
+        for (_, end), next_start in reversed(list(zip(regions, next_starts))):
+            if next_start - end < self.min_silence:
+                continue
+            cut = (end + next_start) // 2
+            if cut >= self.min_window:
+                return self._finalized + cut
+            break
+        return None
+
+    def _transcribe_window(self, end: int) -> None:
+        """[finalized, end) を文字起こしして segments に追加する。"""
+        offset = self._finalized / SAMPLE_RATE
+        # 文字起こし中だけ実行中のジョブとして登録し、録音を待つ間は他のジョブのスレッド予算を減らさない
+        with job_slot():
+            segments_gen, info = self._model.transcribe(
+                self.audio[self._finalized : end],
+                language=self.language,
+                word_timestamps=True,
+                vad_filter=True,
+                **self._options,
+            )
+            window_segments = [_segment_to_dict(seg, offset) for seg in segments_gen]
+        if self._detected_language is None:
+            self._detected_language = info.language
+
+        logger.info(
+            "  🎧 ライブ区間 %.0f〜%.0f秒: %d セグメント",
+            offset, end / SAMPLE_RATE, len(window_segments),
+        )
+        self.segments.extend(window_segments)
+        self._finalized = end
+
+    def process_ready(self) -> bool:
+        """区切りが確定した区間があれば文字起こしする。処理したら True。"""
+        cut = self._find_cut()
+        if cut is None:
+            return False
+        self._transcribe_window(cut)
+        return True
+
+    def finish(self) -> tuple[np.ndarray, dict[str, Any]]:
+        """残りの区間を文字起こしし、(音声全体, result) を返す。"""
+        if self._length > self._finalized:
+            self._transcribe_window(self._length)
+        result = {
+            "segments": self.segments,
+            "language": self._detected_language or self.language,
+        }
+        return self.audio, result
+
+
+def _is_running(pid: int) -> bool:
+    """プロセスが生存しているかを確認する。"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def transcribe_live(
+    audio_path: Path,
+    recorder_pid: int,
+    config: dict[str, Any],
+    work_dir: Path | None = None,
+) -> tuple[np.ndarray, dict[str, Any], float]:
+    """録音プロセスが終了するまで WAV を追跡しながら文字起こしする。
+
+    Parameters
+    ----------
+    audio_path : Path
+        録音中の WAV ファイルのパス。
+    recorder_pid : int
+        録音プロセス（sox）の PID。終了したら最後の区間を処理して返る。
+    config : dict
+        設定辞書。
+    work_dir : Path | None
+        中間成果物の保存先ディレクトリ。None なら保存しない。
+
+    Returns
+    -------
+    tuple[np.ndarray, dict, float]
+        (音声全体, result 辞書, 録音停止を検知した時刻)。
+        result は transcribe.transcribe() と同じ形式。
+    """
+    poll_interval = config.get("live", {}).get("poll_interval", 2.0)
+
+    logger.info("🎧 ライブ文字起こし開始: %s (録音 PID %d)", audio_path, recorder_pid)
+
+    tail = WavTail(audio_path)
+    live = LiveTranscriber(config)
+
+    while _is_running(recorder_pid):
+        live.feed(tail.read_new())
+        if not live.process_ready():
+            time.sleep(poll_interval)
+
+    stopped_at = time.time()
+    # sox は停止時に残りのデータを書き出す
+    live.feed(tail.read_new())
+    audio, result = live.finish()
+
+    logger.info("  ✅ 文字起こし完了: %d セグメント", len(result["segments"]))
+
+    if work_dir:
+        _save_intermediate(work_dir / "01_transcribe.json", result)
+
+    return audio, result, stopped_at
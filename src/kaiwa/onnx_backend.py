@@ -0,0 +1,229 @@
+"""kaiwa — pyannote モデルの ONNX Runtime 推論
+
+pyannote の話者分離は、セグメンテーション（PyanNet）と話者埋め込み（WeSpeaker ResNet34）の
+2つのニューラルネットを PyTorch の eager 実行で CPU 推論している。diarize.backend: onnx では
+この2つを初回だけ ONNX にエクスポートしてキャッシュし、以降は ONNX Runtime で実行する。
+
+差し替えるのはモジュールの forward だけで、チャンクの切り出し・fbank の計算・
+クラスタリングなどパイプラインの残りは pyannote のまま動くため、出力の形式は変わらない。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from kaiwa.transcribe import SAMPLE_RATE
+from kaiwa.utils import _get_model
+
+logger = logging.getLogger("kaiwa")
+
+INFERENCE_BACKENDS = ("torch", "onnx")
+ONNX_CACHE_DIR = Path.home() / ".kaiwa" / "onnx"
+
+_OPSET = 17
+_DEFAULT_CHUNK_SECONDS = 10.0  # pyannote/segmentation-3.0 のチャンク長
+
+
+class _OnnxForward:
+    """torch モジュールの forward の代わりに ONNX Runtime のセッションを実行する。
+
+    モジュールのインスタンス属性として設定し、元の forward（クラスのメソッド）を隠す。
+    """
+
+    def __init__(self, session: Any, path: Path, threads: int):
+        self.session = session
+        self.path = path
+        self.threads = threads
+        self.input_names = [node.name for node in session.get_inputs()]
+
+    def run(self, *inputs: Any) -> Any:
+        import torch
+
+        feeds = {
+            name: np.ascontiguousarray(tensor.detach().cpu().numpy(), dtype=np.float32)
+            for name, tensor in zip(self.input_names, inputs)
+        }
+        return torch.from_numpy(self.session.run(None, feeds)[0])
+
+    def __call__(self, waveforms: Any) -> Any:
+        return self.run(waveforms)
+
+
+class _ResNetForward(_OnnxForward):
+    """WeSpeaker ResNet の forward(fbank, weights) の代わり（戻り値の形も合わせる）。"""
+
+    def __call__(self, fbank: Any, weights: Any = None) -> Any:
+        import torch
+
+        if weights is None:
+            # 重みがすべて 1 の重み付き統計量は、重みなしの統計量と同じ
+            weights = torch.ones(fbank.shape[:2], dtype=fbank.dtype)
+        return torch.tensor(0.0), self.run(fbank, weights)
+
+
+def select_backend(pipeline: Any, diarize_cfg: dict[str, Any], num_threads: int = 0) -> None:
+    """diarize.backend に従って pyannote パイプラインの推論エンジンを切り替える。
+
+    常駐サーバーではパイプラインを使い回すため、torch に戻す場合は元の forward を復元する。
+    onnxruntime がインストールされていなければ警告して torch のまま実行する。
+
+    Parameters
+    ----------
+    pipeline : Any
+        pyannote の SpeakerDiarization（DiarizationPipeline.model）。
+    diarize_cfg : dict
+        diarize セクション（backend / onnx_threads / onnx_cache_dir）。
+    num_threads : int
+        話者分離に割り当てたスレッド数。onnx_threads が 0 のときに使う（0 ならコア数）。
+
+    Raises
+    ------
+    ValueError
+        backend が INFERENCE_BACKENDS 以外の場合。
+    """
+    backend = diarize_cfg.get("backend", "torch")
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(
+            f"diarize.backend が不正です: {backend}（{' / '.join(INFERENCE_BACKENDS)} のいずれか）"
+        )
+    targets = _targets(pipeline)
+    if backend == "torch" or not targets:
+        _restore(targets)
+        return
+
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        logger.warning(
+            "⚠️ onnxruntime がインストールされていないため PyTorch で話者分離します"
+            "（pip install onnxruntime onnx）"
+        )
+        _restore(targets)
+        return
+
+    threads = diarize_cfg.get("onnx_threads") or num_threads or os.cpu_count() or 1
+    cache_dir = Path(diarize_cfg.get("onnx_cache_dir") or ONNX_CACHE_DIR).expanduser()
+    for name, module in targets.items():
+        current = module.__dict__.get("forward")
+        if isinstance(current, _OnnxForward) and current.threads == threads:
+            continue
+        _restore({name: module})
+        path = export_onnx(name, module, pipeline, cache_dir)
+        session = _get_model(("onnx", str(path), threads), lambda: _create_session(path, threads))
+        forward_cls = _ResNetForward if name == "embedding" else _OnnxForward
+        module.forward = forward_cls(session, path, threads)
+    logger.info("  ⚡ ONNX Runtime で推論（スレッド: %d）", threads)
+
+
+def _targets(pipeline: Any) -> dict[str, Any]:
+    """ONNX に置き換える torch モジュール（セグメンテーション・埋め込みの ResNet 部分）。
+
+    埋め込みは fbank の計算（torchaudio）を除いた ResNet だけを置き換える。
+    WeSpeaker 以外の埋め込みモデルでは置き換えない。
+    """
+    targets: dict[str, Any] = {}
+    segmentation = getattr(getattr(pipeline, "_segmentation", None), "model", None)
+    if segmentation is not None:
+        targets["segmentation"] = segmentation
+    embedding = getattr(getattr(pipeline, "_embedding", None), "model_", None)
+    if embedding is not None and hasattr(embedding, "compute_fbank") and hasattr(embedding, "resnet"):
+        targets["embedding"] = embedding.resnet
+    return targets
+
+
+def _restore(targets: dict[str, Any]) -> None:
+    """インスタンスに設定した forward を外し、元の torch の forward に戻す。"""
+    for module in targets.values():
+        if isinstance(module.__dict__.get("forward"), _OnnxForward):
+            del module.forward
+
+
+def export_onnx(name: str, module: Any, pipeline: Any, cache_dir: Path) -> Path:
+    """モジュールを ONNX にエクスポートし、キャッシュのパスを返す。
+
+    ファイル名に重みと torch のバージョンのハッシュを含め、モデルが変わらない限り再利用する。
+    """
+    import torch
+
+    path = cache_dir / f"{name}-{_digest(module)}.onnx"
+    if path.exists():
+        return path
+
+    logger.info("  📦 %s モデルを ONNX にエクスポート中: %s", name, path)
+    wrapper, inputs, input_names, dynamic_axes = _export_spec(name, module, pipeline)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".onnx.tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            inputs,
+            str(tmp_path),
+            input_names=input_names,
+            output_names=["output"],
+            dynamic_axes=dynamic_axes,
+            opset_version=_OPSET,
+            do_constant_folding=True,
+            dynamo=False,
+        )
+    tmp_path.replace(path)
+    return path
+
+
+def _export_spec(name: str, module: Any, pipeline: Any) -> tuple[Any, tuple, list[str], dict]:
+    """エクスポートするモジュール・入力例・入力名・可変長の軸を返す。"""
+    import torch
+
+    duration = getattr(getattr(pipeline, "_segmentation", None), "duration", _DEFAULT_CHUNK_SECONDS)
+    waveforms = torch.zeros(1, 1, int(duration * SAMPLE_RATE))
+    if name == "segmentation":
+        return module, (waveforms,), ["waveforms"], {"waveforms": {0: "batch"}, "output": {0: "batch"}}
+
+    class _ResNetExport(torch.nn.Module):
+        """weights を必須の入力にし、埋め込みだけを返す。"""
+
+        def __init__(self, resnet: Any):
+            super().__init__()
+            self.resnet = resnet
+
+        def forward(self, fbank: Any, weights: Any) -> Any:
+            return self.resnet(fbank, weights=weights)[1]
+
+    # pyannote はセグメンテーションのフレーム数の重みを渡す（ResNet 内で補間される）
+    segmentation = pipeline._segmentation.model
+    fbank = pipeline._embedding.model_.compute_fbank(waveforms)
+    weights = torch.ones(1, segmentation(waveforms).shape[1])
+    return (
+        _ResNetExport(module),
+        (fbank, weights),
+        ["fbank", "weights"],
+        {"fbank": {0: "batch"}, "weights": {0: "batch"}, "output": {0: "batch"}},
+    )
+
+
+def _digest(module: Any) -> str:
+    """モジュールの重みと torch のバージョンから短いハッシュを作る。"""
+    import torch
+
+    h = hashlib.sha256(f"{type(module).__name__}:{torch.__version__}".encode())
+    for key, tensor in module.state_dict().items():
+        h.update(key.encode())
+        h.update(tensor.detach().cpu().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def _create_session(path: Path, threads: int) -> Any:
+    """スレッド数を指定した ONNX Runtime の CPU セッションを作る。"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
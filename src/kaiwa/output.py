@@ -8,6 +8,7 @@ from __future__ import annotations
 import errno
 import logging
 import re
+import time
 import unicodedata
 from datetime import datetime
 from pathlib import Path
@@ -39,6 +40,45 @@ def _sanitize_filename(title: str) -> str:
     return sanitized.strip('_.-')  # 先頭末尾のゴミ除去
 
 
+def _output_path(output_dir: Path, title: str | None, now: datetime) -> Path:
+    """出力ファイルのパス（YYYYMMDD_タイトル.md、タイトルなしなら YYYYMMDD_HHMMSS.md）。"""
+    date_prefix = now.strftime('%Y%m%d')
+    if title:
+        return output_dir / f"{date_prefix}_{_sanitize_filename(title)}.md"
+    return output_dir / f"{date_prefix}_{now.strftime('%H%M%S')}.md"
+
+
+def _render_markdown(
+    transcript_lines: list[str],
+    summary_text: str,
+    audio_path: Path,
+    elapsed_text: str,
+    config: dict[str, Any],
+    heading_title: str,
+) -> str:
+    """Markdown の本文を組み立てる。"""
+    transcript_text = "\n".join(transcript_lines)
+    whisper_model = config.get("whisper", {}).get("model", "large-v3-turbo")
+    claude_model = config.get("claude", {}).get("model", "claude-3-5-haiku-latest")
+
+    return f"""# {heading_title}
+
+## 📋 要約
+
+{summary_text}
+
+## 💬 全文（話者分離済み）
+
+{transcript_text}
+
+---
+*処理: WhisperX {whisper_model} + Claude {claude_model}*
+*元ファイル: {audio_path.name}*
+*処理時間: {elapsed_text}*
+*生成: kaiwa v{__version__}*
+"""
+
+
 def generate_markdown(
     transcript_lines: list[str],
     summary: str | None,
@@ -72,41 +112,21 @@ def generate_markdown(
     now = datetime.now()
     output_dir = Path(config.get("paths", {}).get("output", "~/Transcripts")).expanduser()
     output_dir.mkdir(parents=True, exist_ok=True)
-
-    # ファイル名: YYYYMMDD_タイトル.md（タイトルなしなら YYYYMMDD_HHMMSS.md）
-    date_prefix = now.strftime('%Y%m%d')
-    if title:
-        safe_title = _sanitize_filename(title)
-        output_file = output_dir / f"{date_prefix}_{safe_title}.md"
-    else:
-        output_file = output_dir / f"{date_prefix}_{now.strftime('%H%M%S')}.md"
+    output_file = _output_path(output_dir, title, now)
 
     elapsed_min = int(elapsed) // 60
     elapsed_sec = int(elapsed) % 60
 
-    transcript_text = "\n".join(transcript_lines)
     summary_text = summary if summary else "_要約スキップ（APIキー未設定またはエラー）_"
-
-    whisper_model = config.get("whisper", {}).get("model", "large-v3-turbo")
-    claude_model = config.get("claude", {}).get("model", "claude-3-5-haiku-latest")
-
     heading_title = title if title else now.strftime('%Y-%m-%d %H:%M')
-    md_content = f"""# {heading_title}
-
-## 📋 要約
-
-{summary_text}
-
-## 💬 全文（話者分離済み）
-
-{transcript_text}
-
----
-*処理: WhisperX {whisper_model} + Claude {claude_model}*
-*元ファイル: {audio_path.name}*
-*処理時間: {elapsed_min}分{elapsed_sec}秒*
-*生成: kaiwa v{__version__}*
-"""
+    md_content = _render_markdown(
+        transcript_lines,
+        summary_text,
+        audio_path,
+        f"{elapsed_min}分{elapsed_sec}秒",
+        config,
+        heading_title,
+    )
 
     try:
         output_file.write_text(md_content, encoding="utf-8")
@@ -122,3 +142,78 @@ def generate_markdown(
         raise
 
     return output_file
+
+
+def _draft_path(output_file: Path) -> Path:
+    """要約の途中経過を書き出すパス（.<出力ファイル名>.partial.md）。"""
+    return output_file.with_name(f".{output_file.stem}.partial.md")
+
+
+class MarkdownDraft:
+    """要約のストリーミング中に、生成済みの部分を出力ファイルの隣へ書き出す。
+
+    タイトル行を受け取った時点で最終的な出力ファイル名が決まるため、その隣の
+    .<ファイル名>.partial.md に要約の途中経過を書き、最終出力の後に削除する。
+    最終的な出力パスには書かないため、同じ日に同じタイトルの既存の出力を
+    上書き・削除することはない。
+    書き込みは interval 秒に1回までに間引き、一時ファイルからの置き換えで行う
+    （エディタや同期クライアントが書きかけのファイルを読まないように）。
+
+    Parameters
+    ----------
+    transcript_lines : list[str]
+        話者分離済みの文字起こし行リスト。
+    audio_path : Path
+        元の音声ファイルのパス。
+    config : dict
+        設定辞書（paths.output / claude.stream_interval を使用）。
+    """
+
+    def __init__(self, transcript_lines: list[str], audio_path: Path, config: dict[str, Any]):
+        self.transcript_lines = transcript_lines
+        self.audio_path = audio_path
+        self.config = config
+        self.output_dir = Path(config.get("paths", {}).get("output", "~/Transcripts")).expanduser()
+        self.interval = config.get("claude", {}).get("stream_interval", 1.0)
+        self.started = datetime.now()
+        self.path: Path | None = None
+        self._last_write = float("-inf")
+
+    def update(self, title: str | None, summary: str) -> None:
+        """要約の途中経過を書き換える（タイトルが変わらなければ interval 秒に1回まで）。"""
+        path = _draft_path(_output_path(self.output_dir, title, self.started))
+        now = time.monotonic()
+        if path == self.path and now - self._last_write < self.interval:
+            return
+
+        content = _render_markdown(
+            self.transcript_lines,
+            f"{summary}\n\n_…要約を生成中_",
+            self.audio_path,
+            "要約を生成中",
+            self.config,
+            title or self.started.strftime('%Y-%m-%d %H:%M'),
+        )
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            tmp_path.write_text(content, encoding="utf-8")
+            tmp_path.replace(path)
+        except OSError as e:
+            # 途中経過は最終出力の後に削除するため、書けなくても処理は続ける
+            logger.warning("⚠️ 要約の途中経過を書き出せませんでした: %s", e)
+            return
+
+        if path != self.path:
+            if self.path is not None:
+                self.path.unlink(missing_ok=True)
+            else:
+                logger.info("📝 要約の途中経過を書き出し中: %s", path)
+            self.path = path
+        self._last_write = now
+
+    def finish(self) -> None:
+        """途中経過のファイルを削除する（最終出力は generate_markdown() が書く）。"""
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+        self.path = None
@@ -0,0 +1,150 @@
+"""kaiwa — 話者数の事前チェック
+
+pyannote を動かす前に、話者が1人だけの録音（ボイスメモ等）かを安価に判定する。
+発話区間から数個のウィンドウを抜き出して MFCC を計算し、ウィンドウの組ごとに
+「1人の声（1つのガウス分布）」と「別々の声（2つのガウス分布）」の尤度比を比べる
+（BIC による話者交代検出と同じ統計量をフレーム数で正規化したもの）。
+どの組でも尤度比が小さければ単一話者とみなす。
+
+NumPy だけで計算し、モデルのロードや HuggingFace トークンは不要。
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+from typing import Any
+
+import numpy as np
+
+from kaiwa.transcribe import SAMPLE_RATE
+
+logger = logging.getLogger("kaiwa")
+
+_FRAME = 400  # 25ms
+_HOP = 160  # 10ms
+_N_FFT = 512
+_N_MELS = 40
+_N_CEPS = 13  # c0（音量）は使わず c1〜c12
+_MIN_WINDOW_SECONDS = 2.0
+
+
+def _mel_filterbank() -> np.ndarray:
+    """(メル帯域, FFT ビン) の三角フィルタバンク。"""
+    def hz_to_mel(f: np.ndarray) -> np.ndarray:
+        return 2595 * np.log10(1 + f / 700)
+
+    def mel_to_hz(m: np.ndarray) -> np.ndarray:
+        return 700 * (10 ** (m / 2595) - 1)
+
+    edges = mel_to_hz(np.linspace(hz_to_mel(np.array(20.0)), hz_to_mel(np.array(7600.0)), _N_MELS + 2))
+    bins = np.floor((_N_FFT + 1) * edges / SAMPLE_RATE).astype(int)
+    bank = np.zeros((_N_MELS, _N_FFT // 2 + 1))
+    for m in range(1, _N_MELS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        bank[m - 1, left:center] = (np.arange(left, center) - left) / max(center - left, 1)
+        bank[m - 1, center:right] = (right - np.arange(center, right)) / max(right - center, 1)
+    return bank
+
+
+_MEL_BANK = _mel_filterbank()
+_DCT = np.cos(np.pi / _N_MELS * (np.arange(_N_MELS)[None, :] + 0.5) * np.arange(_N_CEPS)[:, None])
+
+
+def _mfcc(samples: np.ndarray) -> np.ndarray:
+    """(フレーム, 12) の MFCC。音量の小さい下位 30% のフレーム（息継ぎ・無音）は除く。"""
+    frames = np.lib.stride_tricks.sliding_window_view(samples, _FRAME)[::_HOP] * np.hamming(_FRAME)
+    power = np.abs(np.fft.rfft(frames, _N_FFT)) ** 2
+    energy = np.log(power.sum(axis=1) + 1e-10)
+    cepstra: np.ndarray = np.log(power @ _MEL_BANK.T + 1e-10) @ _DCT.T
+    return cepstra[energy >= np.percentile(energy, 30), 1:]
+
+
+def _likelihood_ratio(x: np.ndarray, y: np.ndarray) -> float:
+    """2つのウィンドウを別々の声とみなしたときの、フレームあたりの対数尤度の改善量。"""
+    z = np.vstack([x, y])
+
+    def logdet(frames: np.ndarray) -> float:
+        return float(np.linalg.slogdet(np.cov(frames, rowvar=False))[1])
+
+    return 0.5 * (len(z) * logdet(z) - len(x) * logdet(x) - len(y) * logdet(y)) / len(z)
+
+
+def _sample_windows(
+    speech_regions: list[list[float]] | None,
+    num_samples: int,
+    count: int,
+    window_seconds: float,
+) -> list[tuple[int, int]]:
+    """発話区間全体から等間隔に、区間をまたがないウィンドウ（サンプル単位）を選ぶ。
+
+    発話が短い場合はウィンドウを短くする（2 つ取れなければ空リスト）。
+    """
+    if speech_regions is None:
+        regions = [(0, num_samples)]
+    else:
+        regions = [
+            (max(round(s * SAMPLE_RATE), 0), min(round(e * SAMPLE_RATE), num_samples))
+            for s, e in speech_regions
+        ]
+    speech = sum(max(e - s, 0) for s, e in regions)
+    window = int(min(window_seconds * SAMPLE_RATE, speech / 2))
+    if window < _MIN_WINDOW_SECONDS * SAMPLE_RATE:
+        return []
+
+    # ウィンドウを置ける開始位置を区間ごとに並べ、その上で等間隔に選ぶ
+    spans = [(s, e - window) for s, e in regions if e - s >= window]
+    if not spans:
+        return []
+    widths = np.array([end - start + 1 for start, end in spans])
+    offsets = np.concatenate(([0], np.cumsum(widths)))
+    picks = np.linspace(0, offsets[-1] - 1, min(count, max(2, int(speech // window))))
+    windows = []
+    for pick in picks.astype(int):
+        i = int(np.searchsorted(offsets, pick, side="right")) - 1
+        start = spans[i][0] + int(pick - offsets[i])
+        windows.append((start, start + window))
+    return sorted(set(windows))
+
+
+def is_single_speaker(
+    audio: Any,
+    speech_regions: list[list[float]] | None,
+    diarize_cfg: dict[str, Any],
+) -> bool:
+    """発話区間から抜き出したウィンドウがすべて同じ声とみなせるかを判定する。
+
+    Parameters
+    ----------
+    audio : Any
+        16kHz モノラルの音声データ。
+    speech_regions : list[list[float]] | None
+        VAD の発話区間（秒）。None なら音声全体から選ぶ。
+    diarize_cfg : dict
+        diarize セクション（precheck_windows / precheck_window_seconds /
+        single_speaker_threshold）。
+
+    Returns
+    -------
+    bool
+        単一話者とみなせれば True。比較できるだけの発話がない場合も True。
+    """
+    samples = np.asarray(audio, dtype=np.float32)
+    windows = _sample_windows(
+        speech_regions,
+        len(samples),
+        diarize_cfg.get("precheck_windows", 8),
+        diarize_cfg.get("precheck_window_seconds", 8),
+    )
+    if len(windows) < 2:
+        logger.info("  発話が短いため単一話者として扱います")
+        return True
+
+    features = [_mfcc(samples[start:end]) for start, end in windows]
+    score = max(_likelihood_ratio(a, b) for a, b in itertools.combinations(features, 2))
+    threshold: float = diarize_cfg.get("single_speaker_threshold", 1.5)
+    logger.info(
+        "  🔎 話者数の事前チェック: ウィンドウ %d 個、最大尤度比 %.2f（しきい値 %.2f）",
+        len(windows), score, threshold,
+    )
+    return score < threshold
@@ -0,0 +1,211 @@
+"""kaiwa — 速度プロファイルモジュール
+
+CTranslate2 の compute_type・ビームサイズ・VAD パラメータ・スレッド数を
+名前付きプロファイル（fast / balanced / accurate）として管理する。
+profile: auto の場合は初回だけこのマシンで各プロファイルの実時間比（RTF）を
+計測して選択し、結果を ~/.kaiwa/speed_profile.json に保存して以降は再利用する。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any
+
+from kaiwa.utils import _save_intermediate
+
+logger = logging.getLogger("kaiwa")
+
+SPEED_PROFILE_PATH = Path.home() / ".kaiwa" / "speed_profile.json"
+
+SAMPLE_RATE = 16000  # transcribe.SAMPLE_RATE と同じ（循環 import を避けるため再定義）
+
+# 速い順。auto はこの逆順（精度の高い順）に目標 RTF を満たすものを選ぶ
+PROFILES: dict[str, dict[str, Any]] = {
+    "fast": {
+        "compute_type": "int8",
+        "beam_size": 1,  # greedy デコード
+        "vad_parameters": {"min_silence_duration_ms": 500},
+    },
+    "balanced": {
+        "compute_type": "int8_float32",
+        "beam_size": 5,
+        "vad_parameters": {},
+    },
+    "accurate": {
+        "compute_type": "float32",
+        "beam_size": 5,
+        "vad_parameters": {},
+    },
+}
+
+# profile 未指定時（従来動作）の設定
+LEGACY_SETTINGS: dict[str, Any] = {
+    "compute_type": "float32",
+    "beam_size": None,  # None = faster-whisper のデフォルト
+    "vad_parameters": {},
+}
+
+# 個別指定でプロファイルを上書きできるキー
+_OVERRIDE_KEYS = ("compute_type", "beam_size", "cpu_threads", "vad_parameters")
+
+BENCHMARK_SECONDS = 60  # 計測に使う音声長（秒）
+
+
+def resolve_speed_settings(
+    whisper_cfg: dict[str, Any],
+    audio: Any | None = None,
+) -> dict[str, Any]:
+    """whisper セクションから実際に使う速度関連の設定を決定する。
+
+    優先順位: 個別キー（compute_type 等） > profile > 従来のデフォルト。
+
+    Parameters
+    ----------
+    whisper_cfg : dict
+        設定辞書の whisper セクション。
+    audio : Any | None
+        profile: auto で未計測の場合にベンチマークに使う音声配列。
+        None なら計測せず balanced を使う。
+
+    Returns
+    -------
+    dict
+        compute_type / beam_size / cpu_threads / vad_parameters / profile を持つ辞書。
+
+    Raises
+    ------
+    ValueError
+        profile が不正な場合。
+    """
+    profile = whisper_cfg.get("profile")
+
+    if profile is None:
+        settings = dict(LEGACY_SETTINGS)
+    elif profile == "auto":
+        profile = _auto_profile(whisper_cfg, audio)
+        settings = dict(PROFILES[profile])
+    elif profile in PROFILES:
+        settings = dict(PROFILES[profile])
+    else:
+        raise ValueError(
+            f"whisper.profile が不正です: {profile}"
+            f"（{' / '.join([*PROFILES, 'auto'])} のいずれか）"
+        )
+
+    settings["cpu_threads"] = 0  # 0 = CTranslate2 のデフォルト
+    for key in _OVERRIDE_KEYS:
+        if whisper_cfg.get(key) is not None:
+            settings[key] = whisper_cfg[key]
+    settings["profile"] = profile
+    return settings
+
+
+def decode_options(settings: dict[str, Any]) -> dict[str, Any]:
+    """WhisperModel.transcribe() に渡す追加キーワード引数を返す。"""
+    options: dict[str, Any] = {}
+    if settings.get("beam_size") is not None:
+        options["beam_size"] = settings["beam_size"]
+    if settings.get("vad_parameters"):
+        options["vad_parameters"] = dict(settings["vad_parameters"])
+    return options
+
+
+def _load_stored(model_name: str, device: str) -> dict[str, Any] | None:
+    """保存済みの計測結果を返す。モデル・デバイスが異なれば None。"""
+    try:
+        with open(SPEED_PROFILE_PATH, encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(stored, dict) or stored.get("profile") not in PROFILES:
+        return None
+    if stored.get("model") != model_name or stored.get("device") != device:
+        return None
+    return stored
+
+
+def _auto_profile(whisper_cfg: dict[str, Any], audio: Any | None) -> str:
+    """保存済みの計測結果を使い、なければ計測してプロファイル名を返す。"""
+    model_name = whisper_cfg.get("model", "large-v3-turbo")
+    device = whisper_cfg.get("device", "cpu")
+
+    stored = _load_stored(model_name, device)
+    if stored:
+        return str(stored["profile"])
+
+    if audio is None or len(audio) == 0:
+        logger.info("  📊 速度プロファイル未計測のため balanced を使用")
+        return "balanced"
+
+    target_rtf = whisper_cfg.get("profile_target_rtf", 0.5)
+    rtf = benchmark(audio, model_name, device, whisper_cfg.get("language", "ja"))
+    profile = select_profile(rtf, target_rtf)
+
+    _save_intermediate(SPEED_PROFILE_PATH, {
+        "profile": profile,
+        "model": model_name,
+        "device": device,
+        "target_rtf": target_rtf,
+        "rtf": rtf,
+        "measured_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    logger.info(
+        "  📊 速度プロファイル: %s (RTF %.2f) → %s に保存",
+        profile, rtf[profile], SPEED_PROFILE_PATH,
+    )
+    return profile
+
+
+def select_profile(rtf: dict[str, float], target_rtf: float) -> str:
+    """目標 RTF 以内で最も精度の高いプロファイルを返す。なければ最速のもの。"""
+    for name in reversed(list(PROFILES)):
+        if name in rtf and rtf[name] <= target_rtf:
+            return name
+    return min(rtf, key=rtf.__getitem__)
+
+
+def benchmark(
+    audio: Any,
+    model_name: str,
+    device: str,
+    language: str,
+) -> dict[str, float]:
+    """音声の先頭 BENCHMARK_SECONDS 秒で各プロファイルの RTF を計測する。
+
+    RTF（実時間比）= 処理時間 / 音声長。モデルのロード時間は含めない。
+    計測用のモデルはモデルキャッシュを通さずにロードし、計測ごとに解放する
+    （常駐サーバーで選ばれなかったプロファイルのモデルまで保持しないため）。
+
+    Returns
+    -------
+    dict[str, float]
+        プロファイル名 → RTF。
+    """
+    from kaiwa.transcribe import _load_whisper_model
+
+    sample = audio[: BENCHMARK_SECONDS * SAMPLE_RATE]
+    duration = len(sample) / SAMPLE_RATE
+
+    logger.info("📊 速度プロファイルを計測中（%.0f秒の音声 × %d 種類）...", duration, len(PROFILES))
+
+    rtf: dict[str, float] = {}
+    for name, settings in PROFILES.items():
+        model = _load_whisper_model(model_name, device, settings["compute_type"], cache=False)
+        start = time.perf_counter()
+        segments_gen, _ = model.transcribe(
+            sample,
+            language=language,
+            word_timestamps=True,
+            vad_filter=False,  # 発話量によらず同じ長さを処理させる
+            **decode_options(settings),
+        )
+        for _ in segments_gen:  # ジェネレータを消費して実際にデコードさせる
+            pass
+        rtf[name] = (time.perf_counter() - start) / duration
+        del model, segments_gen
+        logger.info("  %s (%s): RTF %.2f", name, settings["compute_type"], rtf[name])
+
+    return rtf
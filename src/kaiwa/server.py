@@ -0,0 +1,223 @@
+"""kaiwa — 常駐サーバーモジュール
+
+`kaiwa serve` で起動し、WhisperModel と DiarizationPipeline をメモリに保持したまま
+Unix ソケット経由で処理ジョブを受け付ける。`kaiwa process` はサーバーが
+起動していればジョブを委譲し、起動していなければプロセス内で処理する。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+from pathlib import Path
+from typing import Any
+
+from kaiwa.utils import enable_model_cache, notify
+
+logger = logging.getLogger("kaiwa")
+
+SOCKET_PATH = Path.home() / ".kaiwa" / "kaiwa.sock"
+
+
+# ---------------------------------------------------------------------------
+# クライアント
+# ---------------------------------------------------------------------------
+
+
+def submit_job(
+    audio_path: Path,
+    min_speakers: int | None = None,
+    max_speakers: int | None = None,
+    from_step: str | None = None,
+    socket_path: Path | None = None,
+    speakers: int | None = None,
+    transcript_only: bool = False,
+) -> int | None:
+    """常駐サーバーに処理ジョブを送り、完了まで待機する。
+
+    Parameters
+    ----------
+    audio_path : Path
+        処理する音声ファイルのパス。
+    min_speakers : int | None
+        最小話者数のヒント。
+    max_speakers : int | None
+        最大話者数のヒント。
+    from_step : str | None
+        このステップ以降をキャッシュを使わずに再実行する。
+    socket_path : Path | None
+        Unix ソケットのパス。None なら ~/.kaiwa/kaiwa.sock を使用。
+    speakers : int | None
+        話者数（1 なら話者分離を行わない）。
+    transcript_only : bool
+        話者分離を行わず文字起こしのみ出力する。
+
+    Returns
+    -------
+    int | None
+        サーバー側の終了コード。サーバーが起動していなければ None。
+    """
+    path = socket_path or SOCKET_PATH
+    if not path.exists():
+        return None
+
+    request = {
+        "audio_file": str(audio_path),
+        "min_speakers": min_speakers,
+        "max_speakers": max_speakers,
+        "from_step": from_step,
+        "speakers": speakers,
+        "transcript_only": transcript_only,
+    }
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(path))
+            logger.info("🔌 常駐サーバーにジョブを送信: %s", path)
+            sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except (ConnectionRefusedError, FileNotFoundError):
+        # ソケットファイルが残っているがサーバーは停止している
+        logger.debug("常駐サーバーに接続できません（プロセス内で処理します）: %s", path)
+        return None
+
+    if not line:
+        logger.warning("⚠️ 常駐サーバーが応答なしで切断しました")
+        return 1
+
+    try:
+        response = json.loads(line)
+    except json.JSONDecodeError:
+        logger.warning("⚠️ 常駐サーバーの応答が不正です: %r", line[:200])
+        return 1
+    return int(response.get("exit_code", 1))
+
+
+# ---------------------------------------------------------------------------
+# サーバー
+# ---------------------------------------------------------------------------
+
+
+def _run_job(request: dict[str, Any]) -> int:
+    """1件のジョブをプロセス内パイプラインで実行し、終了コードを返す。"""
+    from kaiwa.cli import cmd_process
+
+    args = argparse.Namespace(
+        audio_file=request["audio_file"],
+        min_speakers=request.get("min_speakers"),
+        max_speakers=request.get("max_speakers"),
+        from_step=request.get("from_step"),
+        speakers=request.get("speakers"),
+        transcript_only=bool(request.get("transcript_only", False)),
+        daemon=False,  # サーバー自身への再委譲を防ぐ
+    )
+    try:
+        cmd_process(args)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        logger.error("❌ ジョブ処理中のエラー: %s", e)
+        notify("kaiwa ❌", f"エラー: {e}")
+        return 1
+    return 0
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    """1接続 = 1ジョブ。JSON 1行を受け取り、終了コードを JSON 1行で返す。"""
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict) or "audio_file" not in request:
+                raise ValueError("audio_file がありません")
+        except ValueError as e:
+            logger.warning("⚠️ 不正なリクエスト: %s", e)
+            exit_code = 2
+        else:
+            exit_code = _run_job(request)
+        self.wfile.write(json.dumps({"exit_code": exit_code}).encode("utf-8") + b"\n")
+
+
+def _is_listening(path: Path) -> bool:
+    """ソケットの先でサーバーが応答するかを確認する。"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(path))
+        return True
+    except OSError:
+        return False
+
+
+def _preload_models(config: dict[str, Any], hf_token: str) -> None:
+    """設定に従って WhisperModel と DiarizationPipeline を事前ロードする。"""
+    from kaiwa.diarize import _load_diarization_pipeline
+    from kaiwa.cli import _use_concurrent
+    from kaiwa.profiles import resolve_speed_settings
+    from kaiwa.threads import plan_threads
+    from kaiwa.transcribe import _load_whisper_model, resolve_mode
+
+    whisper_cfg = config.get("whisper", {})
+    device = whisper_cfg.get("device", "cpu")
+
+    if resolve_mode(whisper_cfg) != "whisperx":
+        # auto で未計測の場合は最初のジョブで計測し、選ばれたモデルを追加ロードする
+        speed = resolve_speed_settings(whisper_cfg)
+        # サーバーのジョブ1件分のスレッド数でロードし、以降のジョブはこのスレッド数のまま再利用する
+        cpu_threads = plan_threads(config, concurrent=_use_concurrent(config), jobs=1)["asr"]
+        logger.info("📦 WhisperModel をロード中...")
+        _load_whisper_model(
+            whisper_cfg.get("model", "large-v3-turbo"),
+            device,
+            speed["compute_type"],
+            cpu_threads,
+        )
+
+    logger.info("📦 DiarizationPipeline をロード中...")
+    _load_diarization_pipeline(hf_token, device)
+
+
+def serve(
+    config: dict[str, Any],
+    hf_token: str,
+    socket_path: Path | None = None,
+) -> None:
+    """モデルをロードした状態で Unix ソケットのジョブ受付を開始する。
+
+    ジョブは到着順に1件ずつ処理する（モデルはスレッドセーフではないため）。
+
+    Parameters
+    ----------
+    config : dict
+        設定辞書。
+    hf_token : str
+        HuggingFace のアクセストークン。
+    socket_path : Path | None
+        Unix ソケットのパス。None なら ~/.kaiwa/kaiwa.sock を使用。
+    """
+    path = socket_path or SOCKET_PATH
+
+    if path.exists():
+        if _is_listening(path):
+            raise RuntimeError(f"常駐サーバーは既に起動しています: {path}")
+        path.unlink()  # 前回異常終了時のソケットファイル
+
+    enable_model_cache()
+    _preload_models(config, hf_token)
+
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    server = socketserver.UnixStreamServer(str(path), _JobHandler)
+    os.chmod(path, 0o600)  # 所有者のみ接続可能
+
+    logger.info("🟢 kaiwa serve — ジョブ受付中: %s", path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
+        logger.info("⏹ kaiwa serve — 停止しました")
@@ -0,0 +1,316 @@
+"""kaiwa — 話者埋め込みストア
+
+話者分離で pyannote が計算する話者ごとのセントロイド埋め込みを、録音ごとに
+~/.kaiwa/speakers/ へ保存する。名前を登録（enroll）した話者は、以降の録音で
+コサイン類似度の最近傍探索により自動的に名前へ置き換える。埋め込みは話者分離の
+副産物なので、照合のための追加のモデル推論は行わない。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger("kaiwa")
+
+SPEAKER_STORE_DIR = Path.home() / ".kaiwa" / "speakers"
+
+# 埋め込み行列と各行の情報を1ファイルにまとめ、両者の行数が食い違わないようにする
+#   vectors: (録音 × 話者, 次元) の L2 正規化済み float32 行列
+#   index:   行ごとの {"recording", "title", "label", "name"} の JSON 文字列
+# recording は音声内容のハッシュ（StageCache.audio_hash）、title は表示用の作業ディレクトリ名
+STORE_FILE = "store.npz"
+
+
+def speaker_store_enabled(config: dict[str, Any]) -> bool:
+    """話者埋め込みストアを使うかを判定する。"""
+    return bool(config.get("speakers", {}).get("enabled", False))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """行ごとに L2 正規化する（ゼロベクトルはそのまま）。"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class SpeakerStore:
+    """録音ごとの話者埋め込みと、登録済みの名前を保持するストア。
+
+    埋め込みは1つの行列として保存し、照合時は名前ごとのセントロイド行列との
+    内積1回で全話者の類似度を求める。録音の追加・名前の登録は行の追記・更新だけで、
+    既存の行を計算し直すことはない。
+
+    Parameters
+    ----------
+    path : Path | None
+        保存先ディレクトリ。None なら ~/.kaiwa/speakers。
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path).expanduser() if path else SPEAKER_STORE_DIR
+        self._vectors: np.ndarray | None = None
+        self._entries: list[dict[str, Any]] = []
+        self._centroids: tuple[list[str], np.ndarray] | None = None
+
+    # ----- 読み込み・保存 -----
+
+    def _load(self) -> None:
+        if self._vectors is not None:
+            return
+        store_path = self.path / STORE_FILE
+        if not store_path.exists():
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._entries = []
+            return
+        with np.load(store_path, allow_pickle=False) as data:
+            vectors = data["vectors"]
+            entries = json.loads(str(data["index"]))
+        if len(entries) != len(vectors):
+            raise ValueError(f"話者ストアが壊れています（行数の不一致）: {store_path}")
+        self._vectors, self._entries = vectors, entries
+
+    def _save(self) -> None:
+        assert self._vectors is not None
+        # 声の特徴量は個人情報のため所有者のみアクセス可能にする
+        self.path.mkdir(parents=True, exist_ok=True, mode=0o700)
+        # 一時ファイル名にプロセス ID を含め、同時に保存する別ジョブと書き込みが混ざらないようにする
+        tmp_path = self.path / f".{STORE_FILE}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                vectors=self._vectors,
+                index=np.array(json.dumps(self._entries, ensure_ascii=False)),
+            )
+        os.replace(tmp_path, self.path / STORE_FILE)
+        self._centroids = None
+
+    @property
+    def entries(self) -> list[dict[str, Any]]:
+        """保存済みの行（録音・話者ラベル・登録名）。"""
+        self._load()
+        return list(self._entries)
+
+    # ----- 追加・登録 -----
+
+    def add_recording(
+        self, recording: str, embeddings: dict[str, Any], title: str | None = None
+    ) -> None:
+        """録音の話者ごとの埋め込みを追加する。
+
+        同じ録音を再処理した場合は行を置き換え、登録済みの名前は引き継ぐ。
+
+        Parameters
+        ----------
+        recording : str
+            録音の識別子（音声内容のハッシュ）。ファイル名が同じ別の録音と区別する。
+        embeddings : dict[str, Any]
+            話者ラベル → 埋め込みベクトル。
+        title : str | None
+            表示・指定用の録音名（作業ディレクトリ名）。
+        """
+        self._load()
+        assert self._vectors is not None
+        if not embeddings:
+            return
+
+        labels = list(embeddings)
+        new_vectors = _normalize(np.asarray([embeddings[k] for k in labels], dtype=np.float32))
+        if len(self._vectors) and self._vectors.shape[1] != new_vectors.shape[1]:
+            logger.warning(
+                "⚠️ 埋め込みの次元が保存済みのものと異なるため話者ストアに追加しません（%d → %d）",
+                self._vectors.shape[1], new_vectors.shape[1],
+            )
+            return
+
+        previous = {
+            e["label"]: e.get("name") for e in self._entries if e["recording"] == recording
+        }
+        keep = [i for i, e in enumerate(self._entries) if e["recording"] != recording]
+        kept_vectors = self._vectors[keep] if len(self._vectors) else new_vectors[:0]
+
+        self._entries = [self._entries[i] for i in keep] + [
+            {"recording": recording, "title": title, "label": label, "name": previous.get(label)}
+            for label in labels
+        ]
+        self._vectors = np.concatenate([kept_vectors, new_vectors])
+        self._save()
+
+    def resolve_recording(self, key: str) -> str:
+        """録音の識別子（先頭の数文字でもよい）または録音名から、録音の識別子を返す。
+
+        Raises
+        ------
+        KeyError
+            該当する録音が保存されていない場合。
+        ValueError
+            複数の録音が該当する場合（同じ名前の録音など）。
+        """
+        self._load()
+        matches: list[str] = sorted({
+            e["recording"] for e in self._entries
+            if e["recording"].startswith(key) or e.get("title") == key
+        })
+        if not matches:
+            raise KeyError(key)
+        if len(matches) > 1:
+            raise ValueError(
+                f"録音を特定できません: {key}（{' / '.join(m[:12] for m in matches)} のいずれかを指定）"
+            )
+        return matches[0]
+
+    def enroll(self, recording: str, label: str, name: str) -> None:
+        """録音内の話者ラベルに名前を登録する。
+
+        recording には録音の識別子（先頭の数文字でもよい）または録音名を指定する。
+
+        Raises
+        ------
+        KeyError
+            録音・話者ラベルが保存されていない場合。
+        ValueError
+            複数の録音が該当する場合。
+        """
+        recording = self.resolve_recording(recording)
+        for entry in self._entries:
+            if entry["recording"] == recording and entry["label"] == label:
+                entry["name"] = name
+                self._save()
+                return
+        raise KeyError(f"{recording} / {label}")
+
+    def forget(self, name: str) -> int:
+        """名前の登録を解除し、解除した行数を返す（埋め込み自体は残す）。"""
+        self._load()
+        count = 0
+        for entry in self._entries:
+            if entry.get("name") == name:
+                entry["name"] = None
+                count += 1
+        if count:
+            self._save()
+        return count
+
+    def names(self) -> dict[str, int]:
+        """登録済みの名前と、その名前で登録された行数を返す。"""
+        self._load()
+        counts: dict[str, int] = {}
+        for entry in self._entries:
+            if entry.get("name"):
+                counts[entry["name"]] = counts.get(entry["name"], 0) + 1
+        return counts
+
+    # ----- 照合 -----
+
+    def _name_centroids(self) -> tuple[list[str], np.ndarray]:
+        """名前ごとのセントロイド（登録行の平均を正規化したもの）を返す。"""
+        self._load()
+        assert self._vectors is not None
+        if self._centroids is None:
+            rows = [i for i, e in enumerate(self._entries) if e.get("name")]
+            if not rows:
+                self._centroids = ([], np.zeros((0, self._vectors.shape[1]), dtype=np.float32))
+            else:
+                names, inverse = np.unique(
+                    [self._entries[i]["name"] for i in rows], return_inverse=True
+                )
+                sums = np.zeros((len(names), self._vectors.shape[1]), dtype=np.float32)
+                np.add.at(sums, inverse, self._vectors[rows])
+                self._centroids = ([str(n) for n in names], _normalize(sums))
+        return self._centroids
+
+    def match(self, embeddings: dict[str, Any], threshold: float) -> dict[str, str]:
+        """話者ごとの埋め込みを登録済みの名前に対応付ける。
+
+        類似度の高い組から貪欲に1対1で割り当て、threshold 未満の組は対応付けない。
+
+        Parameters
+        ----------
+        embeddings : dict[str, Any]
+            話者ラベル → 埋め込みベクトル。
+        threshold : float
+            対応付けるコサイン類似度の下限。
+
+        Returns
+        -------
+        dict[str, str]
+            話者ラベル → 名前。
+        """
+        names, centroids = self._name_centroids()
+        if not embeddings or not names:
+            return {}
+
+        labels = list(embeddings)
+        queries = _normalize(np.asarray([embeddings[k] for k in labels], dtype=np.float32))
+        if queries.shape[1] != centroids.shape[1]:
+            logger.warning("⚠️ 埋め込みの次元が保存済みのものと異なるため照合をスキップします")
+            return {}
+
+        similarity = queries @ centroids.T
+        mapping: dict[str, str] = {}
+        used: set[int] = set()
+        for flat in np.argsort(-similarity, axis=None):
+            q, c = divmod(int(flat), len(names))
+            if similarity[q, c] < threshold:
+                break
+            if labels[q] in mapping or c in used:
+                continue
+            mapping[labels[q]] = names[c]
+            used.add(c)
+        return mapping
+
+
+def identify_speakers(
+    result: dict[str, Any],
+    embeddings: dict[str, Any] | None,
+    config: dict[str, Any],
+    recording: str | None = None,
+    title: str | None = None,
+) -> dict[str, str]:
+    """登録済みの話者を照合して結果の話者ラベルを名前に置き換え、録音をストアに追加する。
+
+    Parameters
+    ----------
+    result : dict
+        話者分離済みの結果辞書。その場で更新する。
+    embeddings : dict[str, Any] | None
+        話者ラベル → 埋め込みベクトル（DiarizationPipeline の return_embeddings）。
+    config : dict
+        設定辞書。
+    recording : str | None
+        録音の識別子（音声内容のハッシュ）。None ならストアに追加しない。
+    title : str | None
+        表示・指定用の録音名（作業ディレクトリ名）。
+
+    Returns
+    -------
+    dict[str, str]
+        置き換えた話者ラベル → 名前。
+    """
+    if not embeddings:
+        logger.info("  話者埋め込みが取得できなかったため、話者の照合をスキップします")
+        return {}
+
+    speakers_cfg = config.get("speakers", {})
+    store = SpeakerStore(speakers_cfg.get("store_dir"))
+    mapping = store.match(embeddings, speakers_cfg.get("match_threshold", 0.75))
+
+    if mapping:
+        for label, name in sorted(mapping.items()):
+            logger.info("  🪪 %s → %s", label, name)
+        for seg in result.get("segments", []):
+            if seg.get("speaker") in mapping:
+                seg["speaker"] = mapping[seg["speaker"]]
+            for word in seg.get("words", []):
+                if word.get("speaker") in mapping:
+                    word["speaker"] = mapping[word["speaker"]]
+
+    if recording:
+        store.add_recording(recording, embeddings, title=title)
+
+    return mapping
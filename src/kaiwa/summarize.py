@@ -2,6 +2,9 @@
 
 Anthropic SDK を使用した Claude による会話要約。
 429/500 エラー時の指数バックオフリトライ付き。
+長い文字起こしは話者の発話の切れ目でチャンクに分け、部分要約を並列に生成してから統合する（map-reduce）。
+プロンプトに渡す文字起こしは、同じ話者の発話をまとめ、話者ラベルを短い別名に、時刻を開始時刻だけにした
+コンパクトな形式（claude.transcript_format: compact）で入力トークンを減らす。
 """
 
 from __future__ import annotations
@@ -9,12 +12,16 @@ from __future__ import annotations
 import logging
 import re
 import time
+from collections.abc import Callable
 from typing import Any
 
+from kaiwa.summary_cache import SummaryCache, summary_cache_key
+from kaiwa.utils import format_timestamp
+
 logger = logging.getLogger("kaiwa")
 
-# 要約プロンプト
-SUMMARIZE_PROMPT = """以下は対面会話の文字起こしです。話者分離されています。
+# 要約プロンプト（指示文は毎回同じなので system に置き、文字起こしはユーザーメッセージで渡す）
+SUMMARIZE_PROMPT = """ユーザーが送る文章は対面会話の文字起こしです。話者分離されています。
 
 ## 指示
 1. **最初の行**に、この会話の内容を端的に表すタイトルを出力してください。形式: `TITLE: タイトル名`
@@ -24,10 +31,47 @@ SUMMARIZE_PROMPT = """以下は対面会話の文字起こしです。話者分
 3. 決定事項があれば明記してください
 4. TODO/アクションアイテムがあれば抽出してください
 5. 重要な発言は引用形式で残してください
+"""
+
+# 分割要約: チャンクごとの部分要約（map）と、部分要約の統合（reduce）のプロンプト
+# （パート番号はユーザーメッセージ側に置き、全チャンクで同じ指示文をキャッシュできるようにする）
+MAP_PROMPT = """ユーザーが送る文章は長い対面会話の文字起こしの一部です。話者分離されています。
+
+## 指示
+このパートについて、後で全体の要約にまとめるためのメモを作成してください。タイトルは不要です。
+1. 話題と要点を箇条書きで（話者ラベルを残す）
+2. 決定事項
+3. TODO/アクションアイテム（担当者が分かれば併記）
+4. 重要な発言を引用形式で（時刻付き）
+"""
+
+REDUCE_PROMPT = """ユーザーが送る文章は、長い対面会話の文字起こしをパートごとに要約したメモです（時系列順）。
 
-## 文字起こし
+## 指示
+1. **最初の行**に、この会話の内容を端的に表すタイトルを出力してください。形式: `TITLE: タイトル名`
+   - 日本語で10〜20文字程度
+   - ファイル名に使うので簡潔に（例: 「プロジェクトX進捗会議」「採用面接_田中さん」「ブレスト_新機能アイデア」）
+2. 空行の後、会話全体の要点を箇条書きでまとめてください（パートをまたいで重複する内容は統合する）
+3. 決定事項があれば明記してください
+4. TODO/アクションアイテムがあれば抽出してください
+5. 重要な発言は引用形式で残してください
 """
 
+_SPEAKER_LINE = re.compile(r"^\[[^\]]*\]\s*([^:：]+?):\s")
+
+# プロンプトに渡す文字起こしの形式
+TRANSCRIPT_FORMATS = ("compact", "full")
+
+# コンパクト形式の話者の対応表（先頭行）。分割要約では各チャンクの先頭にも付ける
+SPEAKER_LEGEND = "話者の対応（要約では = の右側の名前を使う）: "
+
+_GENERIC_SPEAKER = re.compile(r"^SPEAKER_\d+$")
+_MERGE_SECONDS = 60  # コンパクト形式で同じ話者の発話を1行にまとめる最大の長さ（秒）
+
+# プロンプトキャッシュの最小トークン数（モデル名に含まれる文字列 → トークン数、上から順に照合）
+_MIN_CACHE_TOKENS = (("haiku-4-5", 4096), ("opus-4-5", 4096), ("haiku", 2048))
+_DEFAULT_MIN_CACHE_TOKENS = 1024  # Sonnet / Opus
+
 
 def _sanitize_markdown(text: str) -> str:
     """Markdownから危険な要素を除去する。
@@ -81,13 +125,170 @@ def _parse_title_and_summary(response: str) -> tuple[str | None, str]:
     return None, response
 
 
+def estimate_tokens(text: str) -> int:
+    """テキストのおおよそのトークン数（日本語などの非 ASCII は1文字1トークン、ASCII は4文字1トークン）。"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def split_transcript(transcript_text: str, chunk_tokens: int) -> list[str]:
+    """文字起こしを話者の発話の切れ目で chunk_tokens 以下のチャンクに分ける。
+
+    同じ話者が続く行を1つの発話としてまとめて詰め、1つの発話が chunk_tokens を超える場合だけ
+    行の切れ目で分ける（1行が上限を超える場合はその行だけのチャンクにする）。
+    話者ラベルのない文字起こし（文字起こしのみ）は行ごとに区切る。
+
+    Parameters
+    ----------
+    transcript_text : str
+        `[開始 → 終了] 話者: テキスト`（コンパクト形式は `[開始] 話者: テキスト`）の行からなる文字起こし。
+    chunk_tokens : int
+        1チャンクの推定トークン数の上限。
+
+    Returns
+    -------
+    list[str]
+        元の行の順序を保ったチャンクのリスト。
+    """
+    turns: list[list[str]] = []
+    previous = None
+    for line in transcript_text.splitlines():
+        if not line.strip():
+            continue
+        match = _SPEAKER_LINE.match(line)
+        speaker = match.group(1) if match else None
+        if turns and speaker is not None and speaker == previous:
+            turns[-1].append(line)
+        else:
+            turns.append([line])
+        previous = speaker
+
+    chunks: list[list[str]] = [[]]
+    size = 0
+    for turn in turns:
+        turn_tokens = sum(estimate_tokens(line) + 1 for line in turn)
+        pieces = [turn] if turn_tokens <= chunk_tokens else [[line] for line in turn]
+        for piece in pieces:
+            piece_tokens = sum(estimate_tokens(line) + 1 for line in piece)
+            if chunks[-1] and size + piece_tokens > chunk_tokens:
+                chunks.append([])
+                size = 0
+            chunks[-1].extend(piece)
+            size += piece_tokens
+    return ["\n".join(chunk) for chunk in chunks if chunk]
+
+
+def transcript_format(config: dict[str, Any]) -> str:
+    """プロンプトに渡す文字起こしの形式（claude.transcript_format）を返す。"""
+    fmt: str = config.get("claude", {}).get("transcript_format", "compact")
+    if fmt not in TRANSCRIPT_FORMATS:
+        raise ValueError(
+            f"claude.transcript_format が不正です: {fmt}（{' / '.join(TRANSCRIPT_FORMATS)} のいずれか）"
+        )
+    return fmt
+
+
+def compact_transcript(segments: list[dict[str, Any]]) -> str:
+    """要約プロンプト用のコンパクトな文字起こしを作る。
+
+    `[開始 → 終了] SPEAKER_00: テキスト` の行に比べて、次の3点で入力トークンを減らす。
+
+    - 同じ話者が続くセグメントは、開始から _MERGE_SECONDS 秒以内なら1行にまとめる
+    - SPEAKER_00 などの自動ラベルは A, B, … の別名にし、先頭行に対応表（SPEAKER_LEGEND）を置く
+      （登録済みの話者名はそのまま使う）
+    - 時刻は行の開始時刻だけにする
+
+    Parameters
+    ----------
+    segments : list[dict]
+        start / end / text（と speaker）を持つセグメント。
+
+    Returns
+    -------
+    str
+        `[開始] 別名: テキスト` 形式の行からなる文字起こし（話者分離なしなら `[開始] テキスト`）。
+    """
+    with_speakers = any("speaker" in seg for seg in segments)
+    turns: list[tuple[float, str | None, list[str]]] = []
+    for seg in segments:
+        text = seg.get("text", "").strip()
+        if not text:
+            continue
+        speaker = seg.get("speaker", "UNKNOWN") if with_speakers else None
+        start = seg.get("start", 0)
+        if turns and turns[-1][1] == speaker and start - turns[-1][0] < _MERGE_SECONDS:
+            turns[-1][2].append(text)
+        else:
+            turns.append((start, speaker, [text]))
+
+    aliases: dict[str, str] = {}
+    lines = []
+    for start, speaker, texts in turns:
+        prefix = f"[{format_timestamp(start)}] "
+        if speaker is not None:
+            if _GENERIC_SPEAKER.match(speaker):
+                if speaker not in aliases:
+                    aliases[speaker] = _alias(len(aliases))
+                speaker = aliases[speaker]
+            prefix += f"{speaker}: "
+        lines.append(prefix + " ".join(texts))
+    if aliases:
+        legend = ", ".join(f"{alias}={label}" for label, alias in aliases.items())
+        lines.insert(0, SPEAKER_LEGEND + legend)
+    return "\n".join(lines)
+
+
+def _alias(index: int) -> str:
+    """index 番目の話者の別名（A〜Z、27人目以降は S27 など）。"""
+    return chr(ord("A") + index) if index < 26 else f"S{index + 1}"
+
+
+def _split_for_map(transcript_text: str, chunk_tokens: int) -> list[str]:
+    """分割要約のチャンクに分ける。話者の対応表があれば各チャンクの先頭に付ける。"""
+    legend = ""
+    if transcript_text.startswith(SPEAKER_LEGEND):
+        legend, _, transcript_text = transcript_text.partition("\n")
+    chunks = split_transcript(transcript_text, chunk_tokens)
+    return [f"{legend}\n{chunk}" for chunk in chunks] if legend else chunks
+
+
+def _use_map_reduce(claude_cfg: dict[str, Any], tokens: int) -> bool:
+    """分割要約（map-reduce）を使うかを判定する。"""
+    setting = claude_cfg.get("map_reduce", "auto")
+    if setting == "auto":
+        min_tokens: int = claude_cfg.get("map_reduce_min_tokens", 30000)
+        return tokens >= min_tokens
+    return bool(setting)
+
+
+def _parse_partial(text: str) -> tuple[str | None, str] | None:
+    """ストリーミング中の応答からタイトルと要約本文を取り出す。
+
+    TITLE: 行が改行まで届いていない間はタイトルが途中で切れているため None を返す。
+    """
+    first_line, newline, _ = text.lstrip().partition("\n")
+    head = first_line.strip().upper()
+    if not newline and ("TITLE:".startswith(head) or head.startswith("TITLE:")):
+        return None
+    title, body = _parse_title_and_summary(_sanitize_markdown(text))
+    return title, body.strip()
+
+
 def summarize(
     transcript_text: str,
     api_key: str,
     config: dict[str, Any],
+    on_progress: Callable[[str | None, str], None] | None = None,
 ) -> tuple[str | None, str | None]:
     """Claude API で会話の要約とタイトルを生成する。
 
+    長い文字起こし（claude.map_reduce）は話者の発話の切れ目でチャンクに分けて並列に要約し（map）、
+    部分要約をまとめて最終的な要約とタイトルを生成する（reduce）。
+    auto では推定トークン数が閾値に近ければ、トークンカウント API で数えた入力トークン数で判定する
+    （claude.count_tokens）。
+    claude.stream が有効な場合は最終的な要約をストリーミングで受け取り、
+    受け取るたびに on_progress にそれまでのタイトルと要約本文を渡す。
+
     Parameters
     ----------
     transcript_text : str
@@ -96,6 +297,8 @@ def summarize(
         Anthropic API キー。
     config : dict
         設定辞書（claude セクションを使用）。
+    on_progress : Callable[[str | None, str], None] | None
+        ストリーミング中に (タイトル, 途中までの要約本文) で呼ばれるコールバック。
 
     Returns
     -------
@@ -110,7 +313,231 @@ def summarize(
     timeout = claude_cfg.get("timeout", 120)
     max_retries = claude_cfg.get("max_retries", 3)
 
+    chunk_tokens = claude_cfg.get("chunk_tokens", 8000)
+
+    estimated = estimate_tokens(transcript_text)
+    map_reduce = _use_map_reduce(claude_cfg, estimated)
+    # 推定は日本語の1文字1トークンを前提にした概算なので、閾値の半分以上なら実際に数えて判定する
+    preflight = (
+        claude_cfg.get("map_reduce", "auto") == "auto"
+        and claude_cfg.get("count_tokens", True)
+        and estimated * 2 >= claude_cfg.get("map_reduce_min_tokens", 30000)
+    )
+    chunks = [transcript_text]
+    if map_reduce and not preflight:
+        chunks = _split_for_map(transcript_text, chunk_tokens)
+
+    # キャッシュはトークン数を数える前に引き、キャッシュがあればネットワークを使わない
+    # （数えて判定する場合のキーは判定結果ではなく判定に使う設定から作る）
+    cache = _summary_cache(claude_cfg)
+    cache_key = _summary_cache_key(
+        transcript_text, claude_cfg, map_reduce=None if preflight else len(chunks) > 1
+    )
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info("  ♻️  要約キャッシュ使用（API 呼び出しなし、タイトル: %s）", cached[0] or "(なし)")
+            return cached
+
     client = anthropic.Anthropic(api_key=api_key, timeout=timeout)
+    if preflight:
+        # トークンカウント API は生成を行わず、要約の呼び出しより速い
+        counted = _count_tokens(client, model, SUMMARIZE_PROMPT, transcript_text)
+        if counted is not None:
+            logger.info("  🧮 入力トークン数: %d（推定 %d）", counted, estimated)
+            map_reduce = _use_map_reduce(claude_cfg, counted)
+            # チャンクの推定トークン数を実際のトークン数との比で補正する
+            chunk_tokens = max(1, chunk_tokens * estimated // max(counted, 1))
+        if map_reduce:
+            chunks = _split_for_map(transcript_text, chunk_tokens)
+
+    if len(chunks) > 1:
+        partials = _map_chunks(client, chunks, claude_cfg, max_retries)
+        if partials is None:
+            return None, None
+        prompt = REDUCE_PROMPT
+        content = "\n\n".join(
+            f"### パート {i}/{len(partials)}\n{partial}" for i, partial in enumerate(partials, 1)
+        )
+    else:
+        prompt = SUMMARIZE_PROMPT
+        content = transcript_text
+
+    on_text = None
+    if claude_cfg.get("stream", False):
+
+        def on_text(text: str) -> None:
+            parsed = _parse_partial(text)
+            if parsed is not None and on_progress is not None:
+                on_progress(*parsed)
+
+    system, user_content = _prompt_blocks(prompt, content, claude_cfg, model)
+    raw_text = _create_message(
+        client, model, max_tokens, system, user_content, max_retries, on_text=on_text
+    )
+    if raw_text is None:
+        return None, None
+    title, summary_body = _parse_title_and_summary(_sanitize_markdown(raw_text))
+    logger.info(
+        "  ✅ 要約生成完了 (%d 文字, タイトル: %s)",
+        len(summary_body),
+        title or "(なし)",
+    )
+    if cache is not None and summary_body:
+        # 呼び出し前に引いたキーで保存し、次回もトークン数を数えずに見つかるようにする
+        cache.put(cache_key, title, summary_body, model)
+    return title, summary_body
+
+
+def _count_tokens(client: Any, model: str, system: str, content: str) -> int | None:
+    """トークンカウント API で要約リクエストの入力トークン数を数える。失敗時は None（推定値で判定）。"""
+    import anthropic
+
+    try:
+        result = client.messages.count_tokens(
+            model=model,
+            system=system,
+            messages=[{"role": "user", "content": content}],
+        )
+    except (anthropic.APIError, AttributeError) as e:
+        logger.warning("  ⚠️ 入力トークン数を数えられませんでした（推定値で判定）: %s", e)
+        return None
+    tokens = getattr(result, "input_tokens", None)
+    return tokens if isinstance(tokens, int) else None
+
+
+def _summary_cache(claude_cfg: dict[str, Any]) -> SummaryCache | None:
+    """要約キャッシュを返す。claude.summary_cache が無効なら None。"""
+    if not claude_cfg.get("summary_cache", True):
+        return None
+    return SummaryCache(
+        claude_cfg.get("summary_cache_dir"),
+        max_age_days=claude_cfg.get("summary_cache_max_days", 30),
+        max_mb=claude_cfg.get("summary_cache_max_mb", 20),
+    )
+
+
+def _summary_cache_key(
+    transcript_text: str, claude_cfg: dict[str, Any], map_reduce: bool | None
+) -> str:
+    """要約キャッシュのキー。
+
+    キーには要約の結果に影響する値（モデル・最大トークン数・分割要約の設定・プロンプト）だけを含める。
+    map_reduce が None（トークンカウント API の結果で分割するかを決める）の場合は、
+    判定に使う閾値と分割要約の設定をキーに含める。
+    """
+    settings: dict[str, Any] = {
+        "model": claude_cfg.get("model", "claude-3-5-haiku-latest"),
+        "max_tokens": claude_cfg.get("max_tokens", 2048),
+        "map_reduce": "count" if map_reduce is None else map_reduce,
+    }
+    if map_reduce is None:
+        settings["map_reduce_min_tokens"] = claude_cfg.get("map_reduce_min_tokens", 30000)
+    if map_reduce is not False:
+        settings.update(
+            map_model=claude_cfg.get("map_model") or settings["model"],
+            map_max_tokens=claude_cfg.get("map_max_tokens", 1024),
+            chunk_tokens=claude_cfg.get("chunk_tokens", 8000),
+        )
+    return summary_cache_key(transcript_text, settings, (SUMMARIZE_PROMPT, MAP_PROMPT, REDUCE_PROMPT))
+
+
+def _map_chunks(
+    client: Any,
+    chunks: list[str],
+    claude_cfg: dict[str, Any],
+    max_retries: int,
+) -> list[str] | None:
+    """チャンクごとの部分要約を並列に生成する。1つでも失敗すれば None。"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    model = claude_cfg.get("map_model") or claude_cfg.get("model", "claude-3-5-haiku-latest")
+    max_tokens = claude_cfg.get("map_max_tokens", 1024)
+    workers = max(1, min(claude_cfg.get("map_workers", 4), len(chunks)))
+    logger.info(
+        "🧩 分割要約: %d チャンクを並列に要約 (並列数 %d, model=%s)", len(chunks), workers, model
+    )
+
+    def map_one(index: int) -> str | None:
+        content = f"（パート {index + 1}/{len(chunks)}）\n{chunks[index]}"
+        system, user_content = _prompt_blocks(MAP_PROMPT, content, claude_cfg, model)
+        return _create_message(client, model, max_tokens, system, user_content, max_retries)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kaiwa-map") as executor:
+        partials = list(executor.map(map_one, range(len(chunks))))
+    if any(partial is None for partial in partials):
+        logger.error("  ❌ 部分要約に失敗したチャンクがあります")
+        return None
+    return [partial.strip() for partial in partials if partial is not None]
+
+
+def _min_cache_tokens(model: str) -> int:
+    """モデルがキャッシュするプロンプトの最小トークン数。"""
+    for name, tokens in _MIN_CACHE_TOKENS:
+        if name in model:
+            return tokens
+    return _DEFAULT_MIN_CACHE_TOKENS
+
+
+def _prompt_blocks(
+    prompt: str, content: str, claude_cfg: dict[str, Any], model: str
+) -> tuple[str | list[dict[str, Any]], str | list[dict[str, Any]]]:
+    """(system, ユーザーメッセージの本文) を返す。claude.prompt_cache ならキャッシュ指定を付ける。
+
+    キャッシュ指定（cache_control）はそのブロックまでの接頭辞をキャッシュするが、
+    モデルごとの最小トークン数に満たない接頭辞は API がキャッシュしない。
+    指示文だけで最小長に届けば system に付け（同じ指示文の別リクエストと共有）、
+    届かなければ本文に付ける（同じ文字起こしを要約し直すリクエストと共有）。
+    本文を含めても届かなければ付けない。
+    """
+    if not claude_cfg.get("prompt_cache", True):
+        return prompt, content
+    minimum = _min_cache_tokens(model)
+    prompt_tokens = estimate_tokens(prompt)
+    if prompt_tokens >= minimum:
+        return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}], content
+    if prompt_tokens + estimate_tokens(content) >= minimum:
+        return prompt, [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+    return prompt, content
+
+
+def _log_usage(usage: Any) -> None:
+    """応答の入力トークン数とプロンプトキャッシュの読み込み・書き込みトークン数をログに出す。"""
+
+    def tokens(name: str) -> int:
+        value = getattr(usage, name, None)
+        return value if isinstance(value, int) else 0
+
+    logger.info(
+        "  💾 入力トークン: %d（キャッシュ読み込み %d / 書き込み %d）、出力トークン: %d",
+        tokens("input_tokens"),
+        tokens("cache_read_input_tokens"),
+        tokens("cache_creation_input_tokens"),
+        tokens("output_tokens"),
+    )
+
+
+def _create_message(
+    client: Any,
+    model: str,
+    max_tokens: int,
+    system: str | list[dict[str, Any]],
+    content: str | list[dict[str, Any]],
+    max_retries: int,
+    on_text: Callable[[str], None] | None = None,
+) -> str | None:
+    """Claude API を呼び出して応答テキストを返す（429/500 は指数バックオフでリトライ）。
+
+    system に指示文、ユーザーメッセージに文字起こしなどの本文を渡す。
+    on_text を渡すとストリーミング API を使い、テキストを受け取るたびにそれまでの応答全体を渡す。
+    ストリーミングでは応答が届き続ける限り claude.timeout（受信の間隔）で打ち切られない。
+
+    Returns
+    -------
+    str | None
+        応答テキスト。失敗時は None。
+    """
+    import anthropic
 
     for attempt in range(1, max_retries + 1):
         try:
@@ -121,27 +548,25 @@ def summarize(
                 model,
             )
 
-            message = client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                messages=[
+            request = {
+                "model": model,
+                "max_tokens": max_tokens,
+                "system": system,
+                "messages": [
                     {
                         "role": "user",
-                        "content": SUMMARIZE_PROMPT + transcript_text,
+                        "content": content,
                     }
                 ],
-            )
+            }
+            if on_text is not None:
+                return _stream_message(client, request, on_text)
+
+            message = client.messages.create(**request)
+            _log_usage(getattr(message, "usage", None))
 
             content_block = message.content[0]
-            raw_text = content_block.text if hasattr(content_block, "text") else str(content_block)
-            sanitized = _sanitize_markdown(raw_text)
-            title, summary_body = _parse_title_and_summary(sanitized)
-            logger.info(
-                "  ✅ 要約生成完了 (%d 文字, タイトル: %s)",
-                len(summary_body),
-                title or "(なし)",
-            )
-            return title, summary_body
+            return content_block.text if hasattr(content_block, "text") else str(content_block)
 
         except anthropic.RateLimitError as e:
             # 429: 指数バックオフ
@@ -155,7 +580,7 @@ def summarize(
                 time.sleep(wait_time)
             else:
                 logger.error("  ❌ リトライ上限に達しました (429)")
-                return None, None
+                return None
 
         except anthropic.InternalServerError as e:
             # 500: リトライ
@@ -169,15 +594,26 @@ def summarize(
                 time.sleep(wait_time)
             else:
                 logger.error("  ❌ リトライ上限に達しました (500)")
-                return None, None
+                return None
 
         except anthropic.APIError as e:
             # その他の API エラーはリトライしない
             logger.error("  ❌ Claude API エラー: %s", e)
-            return None, None
+            return None
 
         except Exception as e:
             logger.error("  ❌ 予期しないエラー: %s", e)
-            return None, None
+            return None
+
+    return None
+
 
-    return None, None
+def _stream_message(client: Any, request: dict[str, Any], on_text: Callable[[str], None]) -> str:
+    """ストリーミング API で応答を受け取り、テキストが届くたびに on_text を呼ぶ。"""
+    received = ""
+    with client.messages.stream(**request) as stream:
+        for text in stream.text_stream:
+            received += text
+            on_text(received)
+        _log_usage(getattr(stream.get_final_message(), "usage", None))
+    return received
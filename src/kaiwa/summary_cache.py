@@ -0,0 +1,116 @@
+"""kaiwa — 要約キャッシュ
+
+Claude による要約（タイトル・本文）を、文字起こしの内容・モデル・最大トークン数・
+プロンプトのバージョンから作ったキーで ~/.kaiwa/summaries/ に保存する。
+Markdown の書き出しに失敗したジョブの再実行や、作業ディレクトリを削除した後の
+再処理でも、同じ文字起こしなら API を呼ばずに要約を返す。
+
+ステージキャッシュ（cache.py）は録音の作業ディレクトリ単位で、claude セクションの
+どの設定が変わっても無効になるのに対し、こちらは要約の結果に影響する値だけをキーにする。
+キャッシュは最後に使われてからの日数と合計サイズの上限で古いものから削除する。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("kaiwa")
+
+SUMMARY_CACHE_DIR = Path.home() / ".kaiwa" / "summaries"
+
+
+def summary_cache_key(transcript_text: str, settings: dict[str, Any], prompts: tuple[str, ...]) -> str:
+    """文字起こし・要約の設定・プロンプトからキャッシュキー（SHA-256）を作る。
+
+    プロンプトは本文そのものをハッシュに含めるため、指示文を変更すると自動的に別のキーになる。
+    """
+    prompt_version = hashlib.sha256("\0".join(prompts).encode("utf-8")).hexdigest()
+    payload = {"transcript": transcript_text, "settings": settings, "prompt_version": prompt_version}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """キーごとに1つの JSON ファイルで要約を保持するディスクキャッシュ。
+
+    Parameters
+    ----------
+    path : Path | None
+        保存先ディレクトリ。None なら ~/.kaiwa/summaries。
+    max_age_days : float
+        最後に使われてからこの日数を過ぎたエントリを削除する（0 なら日数では削除しない）。
+    max_mb : float
+        合計サイズの上限（MB）。超えた分は最後に使われたのが古いものから削除する（0 なら無制限）。
+    """
+
+    def __init__(self, path: Path | None = None, max_age_days: float = 30, max_mb: float = 20):
+        self.path = Path(path).expanduser() if path else SUMMARY_CACHE_DIR
+        self.max_age_days = max_age_days
+        self.max_mb = max_mb
+
+    def _entry(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def get(self, key: str) -> tuple[str | None, str] | None:
+        """保存済みの (タイトル, 要約) を返す。なければ None。"""
+        entry = self._entry(key)
+        try:
+            with open(entry, encoding="utf-8") as f:
+                data = json.load(f)
+            summary = data["summary"]
+        except (OSError, json.JSONDecodeError, KeyError, TypeError):
+            return None
+        # 最終使用時刻として mtime を更新し、削除の順番を LRU にする
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return data.get("title"), summary
+
+    def put(self, key: str, title: str | None, summary: str, model: str) -> None:
+        """要約を保存し、古いエントリを削除する。保存に失敗しても処理は続ける。"""
+        entry = self._entry(key)
+        tmp_path = entry.with_suffix(".json.tmp")
+        data = {"title": title, "summary": summary, "model": model, "created": time.time()}
+        try:
+            # 会話の内容を含むため所有者のみアクセス可能にする
+            self.path.mkdir(parents=True, exist_ok=True, mode=0o700)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp_path.replace(entry)
+        except OSError as e:
+            logger.warning("  ⚠️ 要約キャッシュの保存に失敗: %s — %s", entry, e)
+            return
+        self.evict()
+
+    def evict(self) -> int:
+        """期限切れ・サイズ超過のエントリを削除し、削除した数を返す。"""
+        entries = []
+        for entry in self.path.glob("*.json"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda item: item[0], reverse=True)  # 最近使われた順
+
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+        limit = self.max_mb * 1024 * 1024 if self.max_mb else None
+        removed = 0
+        total = 0
+        for mtime, size, entry in entries:
+            if (cutoff is not None and mtime < cutoff) or (limit is not None and total + size > limit):
+                entry.unlink(missing_ok=True)
+                removed += 1
+            else:
+                total += size
+        if removed:
+            logger.debug("  要約キャッシュから %d 件を削除", removed)
+        return removed
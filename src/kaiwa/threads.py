@@ -0,0 +1,111 @@
+"""kaiwa — スレッド数の配分
+
+CTranslate2（faster-whisper）・torch（pyannote）・ONNX Runtime は、それぞれ指定がなければ
+コア数ぶんのスレッドを使う。監視デーモンが複数の録音の kaiwa process を同時に起動したり、
+文字起こしと話者分離を並行実行したりすると、合計スレッド数がコア数を大きく超えて
+コンテキストスイッチとキャッシュの奪い合いで全体のスループットが落ちる。
+
+ここでは ~/.kaiwa/jobs/ に実行中のジョブ（プロセス ID）を登録し、
+「スレッド予算（threads.budget、デフォルトはコア数）÷ 同時実行ジョブ数」を
+ジョブごとの上限として、各ステージのモデルにスレッド数を割り当てる。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("kaiwa")
+
+JOBS_DIR = Path.home() / ".kaiwa" / "jobs"
+
+
+def _alive(pid: int) -> bool:
+    """プロセスが存在するか。"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def active_jobs(jobs_dir: Path | None = None) -> int:
+    """実行中のジョブ数を返す。終了済みプロセスの登録は削除する。"""
+    jobs_dir = jobs_dir or JOBS_DIR
+    count = 0
+    for path in jobs_dir.glob("*.job") if jobs_dir.exists() else []:
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+        if _alive(pid):
+            count += 1
+        else:
+            path.unlink(missing_ok=True)
+    return count
+
+
+@contextmanager
+def job_slot(jobs_dir: Path | None = None) -> Iterator[None]:
+    """このプロセスを実行中のジョブとして登録する（終了時に解除）。"""
+    jobs_dir = jobs_dir or JOBS_DIR
+    jobs_dir.mkdir(parents=True, exist_ok=True)
+    path = jobs_dir / f"{os.getpid()}.job"
+    path.touch()
+    try:
+        yield
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def plan_threads(
+    config: dict[str, Any],
+    concurrent: bool = False,
+    jobs: int | None = None,
+) -> dict[str, int]:
+    """文字起こし・話者分離に割り当てるスレッド数を決める。
+
+    ジョブあたりの上限は threads.budget（0 ならコア数）を同時実行ジョブ数で割ったもの。
+    並行実行（文字起こしと話者分離を同時に実行）では上限を threads.diarize_share の割合で分け、
+    逐次実行ではそれぞれが上限まで使う。whisper.cpu_threads / diarize.threads の
+    明示指定はそのまま使う。
+
+    Parameters
+    ----------
+    config : dict
+        設定辞書。
+    concurrent : bool
+        文字起こしと話者分離を並行実行するか。
+    jobs : int | None
+        同時実行ジョブ数。None なら ~/.kaiwa/jobs/ の登録数（最低1）。
+
+    Returns
+    -------
+    dict[str, int]
+        asr（CTranslate2 の cpu_threads）/ diarize（torch・ONNX Runtime のスレッド数）/
+        jobs（同時実行ジョブ数）。
+    """
+    threads_cfg = config.get("threads", {})
+    budget = threads_cfg.get("budget") or os.cpu_count() or 1
+    if jobs is None:
+        jobs = active_jobs()
+    jobs = max(jobs, 1)
+    per_job = max(1, budget // jobs)
+    if jobs > 1:
+        logger.info("  ⚖️  同時実行ジョブ %d 件でスレッドを分割（1ジョブ %d スレッド）", jobs, per_job)
+
+    asr = config.get("whisper", {}).get("cpu_threads")
+    diarize = config.get("diarize", {}).get("threads")
+    if concurrent:
+        diarize = diarize or max(1, int(per_job * threads_cfg.get("diarize_share", 0.25)))
+        asr = asr or max(1, per_job - diarize)
+    else:
+        asr = asr or per_job
+        diarize = diarize or per_job
+    return {"asr": asr, "diarize": diarize, "jobs": jobs}
@@ -1,55 +1,50 @@
 """kaiwa — 文字起こしモジュール
 
-WhisperX を使用した音声文字起こし + アラインメント処理。
+faster-whisper / WhisperX を使用した音声文字起こし + 単語タイムスタンプ取得。
 """
 
 from __future__ import annotations
 
-# ============================================================
-# torch.load パッチ（PyTorch 2.8 + pyannote 互換性のため）
-# 必ず他の import より前に適用すること
-# ============================================================
-import torch
-import warnings
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
 
-_original_torch_load = torch.load
-
-
-def _patched_torch_load(*args, **kwargs):
-    # セキュリティ警告（初回のみ）
-    warnings.warn(
-        "torch.load で weights_only=False を使用しています。"
-        "信頼できるモデルソース（HuggingFace公式）のみを使用してください。",
-        category=RuntimeWarning,
-        stacklevel=2
-    )
-    kwargs["weights_only"] = False
-    return _original_torch_load(*args, **kwargs)
+from kaiwa.profiles import decode_options, resolve_speed_settings
+from kaiwa.utils import _get_model, _import_whisperx, _save_intermediate
 
+logger = logging.getLogger("kaiwa")
 
-torch.load = _patched_torch_load
+SAMPLE_RATE = 16000  # whisperx.load_audio の出力サンプルレート
 
-# ============================================================
-# 通常の import（torch.load パッチの後に配置する必要がある）
-# ============================================================
-import logging  # noqa: E402
-from pathlib import Path  # noqa: E402
-from typing import Any  # noqa: E402
+# 文字起こしモード
+MODES = ("native", "batched", "whisperx")
 
-import whisperx  # noqa: E402
 
-from kaiwa.utils import _save_intermediate  # noqa: E402
+def load_audio(audio_path: Path) -> Any:
+    """音声ファイルを 16kHz モノラル float32 の配列にデコードする。
 
-logger = logging.getLogger("kaiwa")
+    1ジョブにつき1回だけ呼び出し、文字起こしと話者分離で同じ配列を共有する。
+    """
+    return _import_whisperx().load_audio(str(audio_path))
 
 
 def transcribe(
     audio_path: Path,
     config: dict[str, Any],
     work_dir: Path | None = None,
+    audio: Any | None = None,
+    speech_regions: list[list[float]] | None = None,
+    detect_speech: bool = True,
+    speed: dict[str, Any] | None = None,
 ) -> tuple[Any, dict[str, Any]]:
     """音声ファイルを WhisperX で文字起こし + アラインメントする。
 
+    VAD で検出した発話区間（秒）を result["speech_regions"] に含めて返し、
+    話者分離で無音区間を省くために再利用できるようにする。
+
     Parameters
     ----------
     audio_path : Path
@@ -58,6 +53,15 @@ def transcribe(
         設定辞書（whisper セクションを使用）。
     work_dir : Path | None
         中間成果物の保存先ディレクトリ。None なら保存しない。
+    audio : Any | None
+        デコード済みの音声配列。None なら audio_path からデコードする。
+    speech_regions : list[list[float]] | None
+        detect_speech_regions() で検出済みの発話区間（秒）。None なら detect_speech に従う。
+    detect_speech : bool
+        speech_regions が None のとき、話者分離の無音除外・事前チェック用に発話区間を検出するか。
+        False なら result["speech_regions"] は None（チャンク並列モードは分割に使うため常に検出する）。
+    speed : dict | None
+        resolve_speed_settings() で決定済みの速度設定。None ならこの音声で決定する。
 
     Returns
     -------
@@ -66,7 +70,6 @@ def transcribe(
     """
     whisper_cfg = config.get("whisper", {})
     device = whisper_cfg.get("device", "cpu")
-    compute_type = whisper_cfg.get("compute_type", "float32")
     model_name = whisper_cfg.get("model", "large-v3-turbo")
     language = whisper_cfg.get("language", "ja")
     batch_size = whisper_cfg.get("batch_size", 8)
@@ -74,22 +77,53 @@ def transcribe(
     if work_dir:
         work_dir.mkdir(parents=True, exist_ok=True)
 
-    use_native_timestamps = whisper_cfg.get("use_native_word_timestamps", True)
-
-    # whisperx.load_audio は diarize.py でも使うので常に実行
-    audio = whisperx.load_audio(str(audio_path))
-
-    if use_native_timestamps:
+    mode = resolve_mode(whisper_cfg)
+
+    # デコードは1回だけ行い、同じ配列を faster-whisper と diarize.py で共有する
+    if audio is None:
+        audio = load_audio(audio_path)
+
+    # 速度プロファイル（auto で未計測ならこの音声で1回だけ計測）
+    if speed is None:
+        speed = resolve_speed_settings(whisper_cfg, audio)
+    compute_type = speed["compute_type"]
+    options = decode_options(speed)
+
+    # faster-whisper の VAD は区間を返さないため、後段で使う場合だけ同じパラメータで別に検出する
+    # （チャンク並列モードはチャンク分割に必要なので、その結果をそのまま書き出す）
+    parallel = mode == "native" and _use_parallel(whisper_cfg, len(audio))
+    if speech_regions is None and (detect_speech or parallel):
+        speech_regions = _to_seconds(_detect_speech(audio, speed["vad_parameters"]))
+
+    if parallel:
+        # ----- 長時間録音: VAD 境界でチャンク分割してプロセス並列 -----
+        result = _transcribe_parallel(
+            audio, model_name, device, compute_type, language,
+            workers=whisper_cfg.get("parallel_workers", 2),
+            chunk_seconds=whisper_cfg.get("parallel_chunk_seconds", 600),
+            options=options,
+            total_threads=speed["cpu_threads"],
+            speech_regions=_to_samples(speech_regions or []),
+        )
+    elif mode == "native":
         # ----- faster-whisper 直接モード（word_timestamps 対応） -----
         result = _transcribe_with_native_timestamps(
-            audio_path, audio, model_name, device, compute_type, language,
+            audio, model_name, device, compute_type, language,
+            cpu_threads=speed["cpu_threads"], options=options,
+        )
+    elif mode == "batched":
+        # ----- faster-whisper バッチモード（VAD 区間をバッチ推論 + word_timestamps） -----
+        result = _transcribe_batched(
+            audio, model_name, device, compute_type, language, batch_size,
+            cpu_threads=speed["cpu_threads"], options=options,
         )
     else:
         # ----- WhisperX バッチモード + wav2vec2 アラインメント -----
         result = _transcribe_with_whisperx(
-            audio, audio_path, model_name, device, compute_type, language, batch_size,
+            audio, model_name, device, compute_type, language, batch_size,
         )
 
+    result["speech_regions"] = speech_regions
     logger.info("  ✅ 文字起こし完了: %d セグメント", len(result["segments"]))
 
     # 中間成果物を保存
@@ -99,64 +133,329 @@ def transcribe(
     return audio, result
 
 
+def detect_speech_regions(
+    audio: Any,
+    whisper_cfg: dict[str, Any],
+    speed: dict[str, Any] | None = None,
+) -> list[list[float]]:
+    """文字起こしと同じ VAD パラメータで発話区間（秒）を検出する。
+
+    文字起こしと話者分離を並行実行する場合に、両方へ同じ区間を渡すために使う。
+    speed には transcribe() に渡すものと同じ速度設定を渡す。None なら計測せずに決定する。
+    """
+    if speed is None:
+        speed = resolve_speed_settings(whisper_cfg)
+    return _to_seconds(_detect_speech(audio, speed["vad_parameters"]))
+
+
+def _to_seconds(regions: list[tuple[int, int]]) -> list[list[float]]:
+    """サンプル単位の区間を秒単位（JSON に保存できるリスト）に変換する。"""
+    return [[start / SAMPLE_RATE, end / SAMPLE_RATE] for start, end in regions]
+
+
+def _to_samples(regions: list[list[float]]) -> list[tuple[int, int]]:
+    """秒単位の区間をサンプル単位に変換する。"""
+    return [(round(start * SAMPLE_RATE), round(end * SAMPLE_RATE)) for start, end in regions]
+
+
+def resolve_mode(whisper_cfg: dict[str, Any]) -> str:
+    """whisper セクションから文字起こしモードを決定する。
+
+    mode が未指定（None）なら旧設定 use_native_word_timestamps に従う
+    （True → native, False → whisperx）。
+
+    Raises
+    ------
+    ValueError
+        mode が MODES 以外の場合。
+    """
+    mode: str | None = whisper_cfg.get("mode")
+    if mode is None:
+        return "native" if whisper_cfg.get("use_native_word_timestamps", True) else "whisperx"
+    if mode not in MODES:
+        raise ValueError(
+            f"whisper.mode が不正です: {mode}（{' / '.join(MODES)} のいずれか）"
+        )
+    return mode
+
+
+def _load_whisper_model(
+    model_name: str,
+    device: str,
+    compute_type: str,
+    cpu_threads: int = 0,
+    cache: bool = True,
+) -> Any:
+    """faster-whisper の WhisperModel をロードする（常駐サーバーではキャッシュを再利用）。
+
+    cpu_threads が 0 なら CTranslate2 のデフォルトスレッド数を使う。
+    CTranslate2 のスレッド数はロード時に固定されるため、キャッシュのキーには含めない。
+    常駐サーバーでは事前ロード時（1ジョブ分の配分）のスレッド数のまま全ジョブで再利用し、
+    同時実行ジョブ数の変化でモデルを作り直したり、スレッド数ごとに保持したりしない。
+    cache が False ならキャッシュを使わず、常駐サーバーでも保持しない（一時的な計測用）。
+    """
+    import faster_whisper
+
+    kwargs: dict[str, Any] = {"device": device, "compute_type": compute_type}
+    if cpu_threads:
+        kwargs["cpu_threads"] = cpu_threads
+
+    if not cache:
+        return faster_whisper.WhisperModel(model_name, **kwargs)
+    return _get_model(
+        ("faster_whisper", model_name, device, compute_type),
+        lambda: faster_whisper.WhisperModel(model_name, **kwargs),
+    )
+
+
+def _segment_to_dict(seg: Any, offset: float = 0.0) -> dict[str, Any]:
+    """faster-whisper の Segment を result 辞書形式に変換する。
+
+    offset にはチャンクの開始秒を渡し、タイムスタンプを全体の時間軸に戻す。
+    """
+    words = []
+    if seg.words:
+        for w in seg.words:
+            words.append({
+                "word": w.word,
+                "start": w.start + offset,
+                "end": w.end + offset,
+                "score": w.probability,
+            })
+
+    return {
+        "start": seg.start + offset,
+        "end": seg.end + offset,
+        "text": seg.text.strip(),
+        "words": words,
+    }
+
+
 def _transcribe_with_native_timestamps(
-    audio_path: Path,
     audio: Any,
     model_name: str,
     device: str,
     compute_type: str,
     language: str,
+    cpu_threads: int = 0,
+    options: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     """faster-whisper を直接使い、cross-attention ベースの word_timestamps を取得する。
 
     WhisperX のバッチパイプラインは word_timestamps に対応していないため、
-    faster-whisper の transcribe() を直接呼び出す。
+    faster-whisper の transcribe() を直接呼び出す。デコード済みの float32 配列を
+    そのまま渡すので、faster-whisper 側での再デコードは発生しない。
     """
-    import faster_whisper
-
     logger.info(
         "📝 文字起こし開始 — native word_timestamps (model=%s, device=%s)",
         model_name, device,
     )
 
-    model = faster_whisper.WhisperModel(
-        model_name, device=device, compute_type=compute_type,
-    )
+    model = _load_whisper_model(model_name, device, compute_type, cpu_threads)
 
     segments_gen, info = model.transcribe(
-        str(audio_path),
+        audio,
         language=language,
         word_timestamps=True,
         vad_filter=True,  # VAD でノイズ区間をスキップ
+        **(options or {}),
     )
 
-    segments: list[dict[str, Any]] = []
-    for seg in segments_gen:
-        words = []
-        if seg.words:
-            for w in seg.words:
-                words.append({
-                    "word": w.word,
-                    "start": w.start,
-                    "end": w.end,
-                    "score": w.probability,
-                })
-
-        segments.append({
-            "start": seg.start,
-            "end": seg.end,
-            "text": seg.text.strip(),
-            "words": words,
-        })
+    segments = [_segment_to_dict(seg) for seg in segments_gen]
+
+    logger.info("  ⏱️  アラインメント不要（native word_timestamps 使用）")
+
+    return {"segments": segments, "language": info.language}
+
+
+def _transcribe_batched(
+    audio: Any,
+    model_name: str,
+    device: str,
+    compute_type: str,
+    language: str,
+    batch_size: int,
+    cpu_threads: int = 0,
+    options: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """faster-whisper の BatchedInferencePipeline で VAD 区間をまとめて推論する。
+
+    WhisperX と同様に VAD 区間をバッチでデコードしつつ、word_timestamps は
+    faster-whisper の cross-attention ベースのものを使う（wav2vec2 アラインメント不要）。
+    出力は _transcribe_with_native_timestamps と同じ形式。
+    """
+    import faster_whisper
+
+    logger.info(
+        "📝 文字起こし開始 — faster-whisper batched (model=%s, device=%s, batch_size=%d)",
+        model_name, device, batch_size,
+    )
+
+    model = _load_whisper_model(model_name, device, compute_type, cpu_threads)
+    pipeline = faster_whisper.BatchedInferencePipeline(model=model)
+
+    segments_gen, info = pipeline.transcribe(
+        audio,
+        language=language,
+        batch_size=batch_size,
+        word_timestamps=True,
+        vad_filter=True,  # バッチは VAD 区間単位で組む
+        **(options or {}),
+    )
+
+    segments = [_segment_to_dict(seg) for seg in segments_gen]
 
     logger.info("  ⏱️  アラインメント不要（native word_timestamps 使用）")
 
     return {"segments": segments, "language": info.language}
 
 
+# ---------------------------------------------------------------------------
+# VAD チャンク並列モード（長時間録音向け）
+# ---------------------------------------------------------------------------
+
+
+def _use_parallel(whisper_cfg: dict[str, Any], num_samples: int) -> bool:
+    """チャンク並列モードを使うかを判定する。
+
+    parallel: true/false で明示指定、"auto" なら parallel_min_duration 秒以上で有効。
+    """
+    parallel = whisper_cfg.get("parallel", "auto")
+    if parallel == "auto":
+        min_duration: float = whisper_cfg.get("parallel_min_duration", 1800)
+        return num_samples >= min_duration * SAMPLE_RATE
+    return bool(parallel)
+
+
+def _detect_speech(
+    audio: Any, vad_parameters: dict[str, Any] | None = None
+) -> list[tuple[int, int]]:
+    """Silero VAD（faster-whisper 同梱）で発話区間をサンプル単位で検出する。"""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    return [
+        (ts["start"], ts["end"])
+        for ts in get_speech_timestamps(audio, VadOptions(**(vad_parameters or {})))
+    ]
+
+
+def _plan_chunks(
+    speech_regions: list[tuple[int, int]],
+    total_samples: int,
+    chunk_samples: int,
+) -> list[tuple[int, int]]:
+    """発話区間を目安の長さでまとめ、無音区間の中点で切ったチャンク範囲を返す。
+
+    発話の途中では決して切らないため、1つの発話区間が chunk_samples より
+    長い場合はチャンクも長くなる。
+
+    Parameters
+    ----------
+    speech_regions : list[tuple[int, int]]
+        (開始, 終了) サンプル位置の発話区間（時刻順）。
+    total_samples : int
+        音声全体のサンプル数。
+    chunk_samples : int
+        1チャンクの目安サンプル数。
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        音声全体を隙間なく覆う (開始, 終了) サンプル範囲のリスト。
+    """
+    bounds = [0]
+    for (_, prev_end), (next_start, next_end) in zip(speech_regions, speech_regions[1:]):
+        # 次の発話を含めると目安を超える → 手前の無音区間で切る
+        if next_end - bounds[-1] > chunk_samples:
+            bounds.append((prev_end + next_start) // 2)
+    bounds.append(total_samples)
+    return list(zip(bounds, bounds[1:]))
+
+
+# ワーカープロセスごとに1つだけロードする WhisperModel
+_worker_model: Any = None
+
+
+def _init_worker(model_name: str, device: str, compute_type: str, cpu_threads: int) -> None:
+    """ワーカープロセスの初期化: スレッド数を制限して WhisperModel をロードする。"""
+    global _worker_model
+    _worker_model = _load_whisper_model(model_name, device, compute_type, cpu_threads)
+
+
+def _transcribe_chunk(
+    job: tuple[Any, float, str, dict[str, Any]],
+) -> tuple[list[dict[str, Any]], str]:
+    """1チャンクを文字起こしし、全体の時間軸に戻したセグメントを返す。"""
+    chunk, offset, language, options = job
+    segments_gen, info = _worker_model.transcribe(
+        chunk,
+        language=language,
+        word_timestamps=True,
+        vad_filter=True,
+        **options,
+    )
+    return [_segment_to_dict(seg, offset) for seg in segments_gen], info.language
+
+
+def _transcribe_parallel(
+    audio: Any,
+    model_name: str,
+    device: str,
+    compute_type: str,
+    language: str,
+    workers: int,
+    chunk_seconds: float,
+    options: dict[str, Any] | None = None,
+    total_threads: int = 0,
+    speech_regions: list[tuple[int, int]] | None = None,
+) -> dict[str, Any]:
+    """VAD の無音境界で分割したチャンクをプロセスプールで並列に文字起こしする。
+
+    各ワーカーの CTranslate2 スレッド数は total_threads（0 なら CPU コア数）/
+    ワーカー数に制限し、コアの奪い合いを防ぐ。出力は
+    _transcribe_with_native_timestamps と同じ形式。
+    """
+    workers = max(1, workers)
+    cpu_threads = max(1, (total_threads or os.cpu_count() or 1) // workers)
+
+    if speech_regions is None:
+        speech_regions = _detect_speech(audio)
+    chunks = _plan_chunks(speech_regions, len(audio), int(chunk_seconds * SAMPLE_RATE))
+
+    logger.info(
+        "📝 文字起こし開始 — VAD チャンク並列 (model=%s, %d チャンク, %d ワーカー × %d スレッド)",
+        model_name, len(chunks), workers, cpu_threads,
+    )
+
+    jobs = [
+        (audio[start:end], start / SAMPLE_RATE, language, options or {})
+        for start, end in chunks
+    ]
+
+    segments: list[dict[str, Any]] = []
+    detected_language = language
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(jobs)),
+        # torch / CTranslate2 のスレッドを持つ親プロセスの fork は危険なため spawn
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_name, device, compute_type, cpu_threads),
+    ) as executor:
+        # map は投入順に結果を返すので、そのまま連結すれば時刻順になる
+        for i, (chunk_segments, chunk_language) in enumerate(
+            executor.map(_transcribe_chunk, jobs)
+        ):
+            if i == 0:
+                detected_language = chunk_language
+            segments.extend(chunk_segments)
+
+    logger.info("  ⏱️  アラインメント不要（native word_timestamps 使用）")
+
+    return {"segments": segments, "language": detected_language}
+
+
 def _transcribe_with_whisperx(
     audio: Any,
-    audio_path: Path,
     model_name: str,
     device: str,
     compute_type: str,
@@ -169,11 +468,16 @@ def _transcribe_with_whisperx(
         model_name, device,
     )
 
-    model = whisperx.load_model(
-        model_name,
-        device=device,
-        compute_type=compute_type,
-        language=language,
+    whisperx = _import_whisperx()
+
+    model = _get_model(
+        ("whisperx", model_name, device, compute_type, language),
+        lambda: whisperx.load_model(
+            model_name,
+            device=device,
+            compute_type=compute_type,
+            language=language,
+        ),
     )
 
     result = model.transcribe(audio, batch_size=batch_size, language=language)
@@ -12,7 +12,7 @@ import subprocess
 import wave
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 
 # ---------------------------------------------------------------------------
@@ -238,6 +238,79 @@ def validate_audio(path: Path) -> tuple[bool, str]:
     return True, "OK"
 
 
+# ---------------------------------------------------------------------------
+# モデルキャッシュ（常駐サーバー用）
+# ---------------------------------------------------------------------------
+
+# None = キャッシュ無効（通常の1回限りの CLI 実行）
+_MODEL_CACHE: dict[tuple, Any] | None = None
+
+
+def enable_model_cache() -> None:
+    """ロード済みモデルをプロセス内で保持するキャッシュを有効化する。
+
+    `kaiwa serve` の常駐プロセスから呼び出し、ジョブ間でモデルを再利用する。
+    """
+    global _MODEL_CACHE
+    if _MODEL_CACHE is None:
+        _MODEL_CACHE = {}
+
+
+def _get_model(key: tuple, factory: Callable[[], Any]) -> Any:
+    """キャッシュ済みモデルを返す。キャッシュ無効時・未ロード時は factory で生成する。"""
+    if _MODEL_CACHE is None:
+        return factory()
+    if key not in _MODEL_CACHE:
+        _MODEL_CACHE[key] = factory()
+    return _MODEL_CACHE[key]
+
+
+# ---------------------------------------------------------------------------
+# 重い依存の遅延 import
+# ---------------------------------------------------------------------------
+
+
+def _patch_torch_load() -> None:
+    """torch.load パッチ（PyTorch 2.8 + pyannote 互換性のため）を適用する。
+
+    whisperx / pyannote がモデルを読み込む前に呼び出すこと。2回目以降は何もしない。
+    """
+    import warnings
+
+    import torch
+
+    if getattr(torch.load, "_kaiwa_patched", False):
+        return
+
+    original_torch_load = torch.load
+
+    def _patched_torch_load(*args, **kwargs):
+        # セキュリティ警告（初回のみ）
+        warnings.warn(
+            "torch.load で weights_only=False を使用しています。"
+            "信頼できるモデルソース（HuggingFace公式）のみを使用してください。",
+            category=RuntimeWarning,
+            stacklevel=2
+        )
+        kwargs["weights_only"] = False
+        return original_torch_load(*args, **kwargs)
+
+    _patched_torch_load._kaiwa_patched = True  # type: ignore[attr-defined]
+    torch.load = _patched_torch_load
+
+
+def _import_whisperx() -> Any:
+    """torch.load パッチを適用してから whisperx を import して返す。
+
+    torch / whisperx / pyannote の import には数秒かかるため、モジュールの
+    トップレベルでは import せず、実際に必要になったステージで呼び出す。
+    """
+    _patch_torch_load()
+    import whisperx
+
+    return whisperx
+
+
 # ---------------------------------------------------------------------------
 # 中間成果物の保存
 # ---------------------------------------------------------------------------
@@ -0,0 +1,93 @@
+"""kaiwa — 単語データの列指向表現
+
+文字起こし結果（セグメント → 単語 dict のリスト）から、単語ごとの時刻・スコア・
+話者・テキスト位置を NumPy の構造化配列にまとめる。話者割り当てやセグメント
+再分割はこの配列上でベクトル演算し、dict のリストには入出力の境界でだけ戻す。
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+# 単語1つ分の列。時刻・スコアが無い単語は NaN、話者が無い単語は -1
+WORD_DTYPE = np.dtype([
+    ("start", np.float64),
+    ("end", np.float64),
+    ("score", np.float64),
+    ("speaker", np.int32),  # speaker_labels のインデックス
+    ("segment", np.int32),  # 所属セグメントのインデックス
+    ("text_start", np.int64),  # text 内の開始位置
+    ("text_end", np.int64),  # text 内の終了位置
+])
+
+_NAN = float("nan")
+
+
+class WordTable:
+    """セグメント内の全単語を1つの構造化配列として保持する。
+
+    元の単語 dict は words に（コピーせず）保持し、出力時にスライスして再利用する。
+
+    Parameters
+    ----------
+    segments : list[dict]
+        words リストを持つセグメントのリスト。
+
+    Attributes
+    ----------
+    columns : np.ndarray
+        WORD_DTYPE の構造化配列（全単語を時刻順に連結）。
+    words : list[dict]
+        columns と同じ順の元の単語 dict。
+    offsets : np.ndarray
+        セグメント i の単語は columns[offsets[i]:offsets[i + 1]]。
+    text : str
+        全単語の word を連結した文字列。
+    """
+
+    def __init__(self, segments: list[dict[str, Any]]):
+        self.segments = segments
+        per_segment = [seg.get("words") or [] for seg in segments]
+        self.words: list[dict[str, Any]] = [w for words in per_segment for w in words]
+        self.offsets = np.concatenate(
+            ([0], np.cumsum([len(words) for words in per_segment], dtype=np.int64))
+        ).astype(np.int64)
+
+        n = len(self.words)
+        columns = np.zeros(n, dtype=WORD_DTYPE)
+        columns["start"] = [w.get("start", _NAN) for w in self.words]
+        columns["end"] = [w.get("end", _NAN) for w in self.words]
+        columns["score"] = [w.get("score", _NAN) for w in self.words]
+        columns["segment"] = np.repeat(
+            np.arange(len(segments), dtype=np.int32), np.diff(self.offsets)
+        )
+
+        texts = [w.get("word", "") for w in self.words]
+        columns["text_end"] = np.cumsum(list(map(len, texts)))
+        columns["text_start"][1:] = columns["text_end"][:-1]
+        self.text = "".join(texts)
+
+        # 話者ラベルを出現順にコード化する（None / キーなしは -1）
+        labels = [w.get("speaker") for w in self.words]
+        self._codes: dict[Any, int] = {None: -1}
+        for label in dict.fromkeys(labels):
+            self.label_code(label)
+        columns["speaker"] = list(map(self._codes.__getitem__, labels))
+
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def speaker_labels(self) -> list[Any]:
+        """speaker 列のコード順の話者ラベル。"""
+        return [label for label in self._codes if label is not None]
+
+    def label_code(self, label: Any) -> int:
+        """話者ラベルのコードを返す。未登録なら新しいコードを割り当てる。"""
+        if label not in self._codes:
+            self._codes[label] = len(self._codes) - 1
+        return self._codes[label]
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import tempfile
 from pathlib import Path
+from unittest import mock
 
 import pytest
 
@@ -34,6 +35,20 @@ def tmp_audio_file(tmp_path: Path) -> Path:
     return audio_file
 
 
+@pytest.fixture
+def mock_whisperx():
+    """kaiwa.transcribe が遅延 import する whisperx をモックに差し替える。"""
+    with mock.patch("kaiwa.transcribe._import_whisperx") as mock_import:
+        yield mock_import.return_value
+
+
+@pytest.fixture
+def mock_vad():
+    """kaiwa.transcribe の VAD（発話区間検出）をモックに差し替える。"""
+    with mock.patch("kaiwa.transcribe._detect_speech", return_value=[]) as mock_detect:
+        yield mock_detect
+
+
 @pytest.fixture
 def sample_config() -> dict:
     """テスト用の設定辞書を返す。"""
@@ -67,3 +82,17 @@ def sample_transcript_lines() -> list[str]:
         "[00:05 → 00:10] SPEAKER_01: よろしくお願いします。",
         "[00:10 → 00:15] SPEAKER_00: まず最初の議題についてです。",
     ]
+
+
+@pytest.fixture(autouse=True)
+def isolated_jobs_dir(tmp_path: Path):
+    """実行中ジョブの登録先（~/.kaiwa/jobs）をテストごとの一時ディレクトリにする。"""
+    with mock.patch("kaiwa.threads.JOBS_DIR", tmp_path / "jobs"):
+        yield tmp_path / "jobs"
+
+
+@pytest.fixture(autouse=True)
+def isolated_summary_cache(tmp_path: Path):
+    """要約キャッシュの保存先（~/.kaiwa/summaries）をテストごとの一時ディレクトリにする。"""
+    with mock.patch("kaiwa.summary_cache.SUMMARY_CACHE_DIR", tmp_path / "summaries"):
+        yield tmp_path / "summaries"
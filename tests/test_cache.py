@@ -0,0 +1,135 @@
+"""kaiwa.cache のテスト"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+
+import pytest
+
+from kaiwa.cache import STAGE_FILES, StageCache, hash_file
+
+
+@pytest.fixture
+def work_dir(tmp_path):
+    path = tmp_path / "work"
+    path.mkdir()
+    return path
+
+
+def _write_stage(work_dir, stage, data):
+    (work_dir / STAGE_FILES[stage]).write_text(json.dumps(data), encoding="utf-8")
+
+
+class TestHashFile:
+    """hash_file() のテスト"""
+
+    def test_sha256(self, tmp_path):
+        """内容の SHA-256 を返すこと（チャンク境界をまたいでも同じ）"""
+        path = tmp_path / "a.bin"
+        data = b"kaiwa" * 1000
+        path.write_bytes(data)
+        assert hash_file(path, chunk_size=7) == hashlib.sha256(data).hexdigest()
+
+
+class TestStageCache:
+    """StageCache のテスト"""
+
+    def test_miss_without_manifest(self, work_dir, tmp_audio_file):
+        """記録がなければ None"""
+        cache = StageCache(work_dir, tmp_audio_file, {})
+        assert cache.load("transcribe") is None
+
+    def test_hit_after_store(self, work_dir, tmp_audio_file):
+        """記録後は別インスタンスからも出力を読めること"""
+        _write_stage(work_dir, "transcribe", {"segments": []})
+        StageCache(work_dir, tmp_audio_file, {}).store("transcribe")
+
+        cache = StageCache(work_dir, tmp_audio_file, {})
+        assert cache.load("transcribe") == {"segments": []}
+
+    def test_store_with_data(self, work_dir, tmp_audio_file):
+        """data を渡すと出力ファイルも保存されること"""
+        cache = StageCache(work_dir, tmp_audio_file, {})
+        cache.store("transcribe")
+        cache.store("diarize")
+        cache.store("summarize", {"title": "T", "summary": "S"})
+
+        assert cache.load("summarize") == {"title": "T", "summary": "S"}
+
+    def test_missing_output_file_is_miss(self, work_dir, tmp_audio_file):
+        """記録があっても出力ファイルがなければ None"""
+        StageCache(work_dir, tmp_audio_file, {}).store("transcribe")
+        assert StageCache(work_dir, tmp_audio_file, {}).load("transcribe") is None
+
+    def test_audio_change_invalidates(self, work_dir, tmp_audio_file):
+        """音声の内容が変わればキャッシュは無効"""
+        _write_stage(work_dir, "transcribe", {"segments": []})
+        StageCache(work_dir, tmp_audio_file, {}).store("transcribe")
+
+        with open(tmp_audio_file, "ab") as f:
+            f.write(b"\x01\x00")
+        assert StageCache(work_dir, tmp_audio_file, {}).load("transcribe") is None
+
+    def test_relevant_config_change_invalidates(self, work_dir, tmp_audio_file):
+        """ステージに関係する設定が変わればキャッシュは無効"""
+        _write_stage(work_dir, "transcribe", {"segments": []})
+        StageCache(work_dir, tmp_audio_file, {"whisper": {"model": "a"}}).store("transcribe")
+
+        cache = StageCache(work_dir, tmp_audio_file, {"whisper": {"model": "b"}})
+        assert cache.load("transcribe") is None
+
+    def test_unrelated_config_change_keeps_cache(self, work_dir, tmp_audio_file):
+        """関係しない設定（claude 等）の変更では文字起こしキャッシュは有効"""
+        _write_stage(work_dir, "transcribe", {"segments": []})
+        StageCache(work_dir, tmp_audio_file, {"claude": {"model": "a"}}).store("transcribe")
+
+        cache = StageCache(work_dir, tmp_audio_file, {"claude": {"model": "b"}})
+        assert cache.load("transcribe") is not None
+
+    def test_upstream_change_invalidates_downstream(self, work_dir, tmp_audio_file):
+        """上流ステージの設定変更は下流ステージも無効にすること"""
+        _write_stage(work_dir, "transcribe", {"segments": []})
+        _write_stage(work_dir, "diarize", {"segments": []})
+        cache = StageCache(work_dir, tmp_audio_file, {"whisper": {"model": "a"}})
+        cache.store("transcribe")
+        cache.store("diarize")
+
+        cache = StageCache(work_dir, tmp_audio_file, {"whisper": {"model": "b"}})
+        assert cache.load("diarize") is None
+
+    def test_extra_params(self, work_dir, tmp_audio_file):
+        """話者数ヒントの変更で話者分離キャッシュが無効になること"""
+        _write_stage(work_dir, "transcribe", {"segments": []})
+        _write_stage(work_dir, "diarize", {"segments": []})
+        cache = StageCache(work_dir, tmp_audio_file, {}, extra={"diarize": {"min_speakers": 2}})
+        cache.store("transcribe")
+        cache.store("diarize")
+
+        same = StageCache(work_dir, tmp_audio_file, {}, extra={"diarize": {"min_speakers": 2}})
+        other = StageCache(work_dir, tmp_audio_file, {}, extra={"diarize": {"min_speakers": 3}})
+        assert same.load("diarize") is not None
+        assert other.load("diarize") is None
+        assert other.load("transcribe") is not None
+
+    def test_from_step_forces_rerun(self, work_dir, tmp_audio_file):
+        """from_step 以降のステージはキャッシュを使わないこと"""
+        _write_stage(work_dir, "transcribe", {"segments": []})
+        _write_stage(work_dir, "diarize", {"segments": []})
+        cache = StageCache(work_dir, tmp_audio_file, {})
+        cache.store("transcribe")
+        cache.store("diarize")
+
+        forced = StageCache(work_dir, tmp_audio_file, {}, from_step="diarize")
+        assert forced.load("transcribe") is not None
+        assert forced.load("diarize") is None
+
+    def test_unknown_from_step(self, work_dir, tmp_audio_file):
+        """不明なステップ名は ValueError"""
+        with pytest.raises(ValueError):
+            StageCache(work_dir, tmp_audio_file, {}, from_step="render")
+
+    def test_corrupted_manifest(self, work_dir, tmp_audio_file):
+        """壊れた記録ファイルはキャッシュなしとして扱うこと"""
+        (work_dir / "stage_manifest.json").write_text("{broken")
+        assert StageCache(work_dir, tmp_audio_file, {}).load("transcribe") is None
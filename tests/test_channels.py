@@ -0,0 +1,97 @@
+"""kaiwa.channels のテスト"""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from kaiwa.channels import channel_turns, load_channels, probe_channels
+from kaiwa.transcribe import SAMPLE_RATE
+
+
+def _stereo(seconds: float, loud: list[tuple[float, float, int]]) -> np.ndarray:
+    """指定区間だけ片方のチャンネルが大きく、もう片方にも小さく回り込む2チャンネル音声。"""
+    rng = np.random.default_rng(0)
+    channels = 0.001 * rng.standard_normal((2, int(seconds * SAMPLE_RATE)))
+    for start, end, channel in loud:
+        s, e = int(start * SAMPLE_RATE), int(end * SAMPLE_RATE)
+        voice = 0.5 * rng.standard_normal(e - s)
+        channels[channel, s:e] += voice
+        channels[1 - channel, s:e] += 0.2 * voice  # 隣のマイクへの回り込み
+    return channels.astype(np.float32)
+
+
+class TestChannelTurns:
+    """channel_turns() のテスト"""
+
+    def test_loudest_channel_per_word(self):
+        """単語ごとに最も音量の大きいチャンネルの話者になること"""
+        channels = _stereo(3.0, [(0.0, 1.0, 0), (1.0, 2.0, 1), (2.0, 3.0, 0)])
+        result = {"segments": [{
+            "start": 0.0, "end": 3.0, "text": "abc",
+            "words": [
+                {"word": "a", "start": 0.1, "end": 0.9},
+                {"word": "b", "start": 1.1, "end": 1.9},
+                {"word": "-"},  # タイムスタンプなし
+                {"word": "c", "start": 2.2, "end": 2.8},
+            ],
+        }]}
+
+        turns = channel_turns(channels, result)
+
+        assert turns["speaker"] == ["SPEAKER_00", "SPEAKER_01", "SPEAKER_00"]
+        assert turns["start"] == [0.1, 1.1, 2.2]
+        assert turns["end"] == [0.9, 1.9, 2.8]
+
+    def test_segment_without_timed_words(self):
+        """時刻付きの単語がないセグメントはセグメント全体で判定すること"""
+        channels = _stereo(2.0, [(1.0, 2.0, 1)])
+        result = {"segments": [
+            {"start": 0.0, "end": 0.5, "text": "a", "words": [{"word": "a", "start": 0.1, "end": 0.4}]},
+            {"start": 1.0, "end": 2.0, "text": "b", "words": [{"word": "b"}]},
+        ]}
+
+        turns = channel_turns(channels, result)
+
+        assert turns["start"] == [0.1, 1.0]
+        assert turns["speaker"][1] == "SPEAKER_01"
+
+    def test_empty_spans_dropped(self):
+        """長さ 0 や音声の範囲外の区間はターンにしないこと"""
+        channels = _stereo(1.0, [(0.0, 1.0, 0)])
+        result = {"segments": [{"start": 0.0, "end": 5.0, "text": "ab", "words": [
+            {"word": "a", "start": 0.5, "end": 0.5},
+            {"word": "b", "start": 2.0, "end": 3.0},
+        ]}]}
+        assert channel_turns(channels, result)["speaker"] == []
+
+
+class TestDecode:
+    """probe_channels() / load_channels() のテスト"""
+
+    def test_probe_channels(self):
+        """ffprobe の出力からチャンネル数を返すこと"""
+        proc = subprocess.CompletedProcess([], 0, stdout="2\n")
+        with mock.patch("kaiwa.channels.subprocess.run", return_value=proc) as mock_run:
+            assert probe_channels(Path("a.wav")) == 2
+        assert mock_run.call_args[0][0][0] == "ffprobe"
+
+    def test_probe_channels_failure(self):
+        """ffprobe が使えなければ 1（モノラル扱い）"""
+        with mock.patch("kaiwa.channels.subprocess.run", side_effect=FileNotFoundError("ffprobe")):
+            assert probe_channels(Path("a.wav")) == 1
+
+    def test_load_channels_deinterleaves(self):
+        """ffmpeg のインターリーブされた s16le を (チャンネル, サンプル) に戻すこと"""
+        interleaved = np.array([100, -100, 200, -200, 300], dtype="<i2")  # 端数のサンプルは捨てる
+        proc = subprocess.CompletedProcess([], 0, stdout=interleaved.tobytes())
+        with mock.patch("kaiwa.channels.subprocess.run", return_value=proc) as mock_run:
+            channels = load_channels(Path("a.wav"), 2)
+
+        command = mock_run.call_args[0][0]
+        assert command[command.index("-ac") + 1] == "2"
+        assert command[command.index("-ar") + 1] == str(SAMPLE_RATE)
+        np.testing.assert_allclose(channels * 32768, [[100, 200], [-100, -200]])
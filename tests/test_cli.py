@@ -9,7 +9,8 @@ from unittest import mock
 
 import pytest
 
-from kaiwa.cli import cmd_process, cmd_version, main
+from kaiwa.cache import hash_file
+from kaiwa.cli import cmd_live, cmd_process, cmd_recluster, cmd_version, main
 
 
 class TestCmdVersion:
@@ -60,6 +61,7 @@ class TestMain:
                 assert args.audio_file == str(tmp_audio_file)
                 assert args.min_speakers is None
                 assert args.max_speakers is None
+                assert args.daemon is True
 
     def test_process_subcommand_with_speaker_hints(self, tmp_audio_file):
         """process サブコマンドの話者数ヒントが正しく渡されること"""
@@ -75,6 +77,159 @@ class TestMain:
                 assert args.max_speakers == 4
 
 
+    def test_process_speakers_and_transcript_only(self, tmp_audio_file):
+        """--speakers / --transcript-only がparseされること"""
+        with mock.patch(
+            "sys.argv",
+            ["kaiwa", "process", str(tmp_audio_file), "--speakers", "1", "--transcript-only"],
+        ):
+            with mock.patch("kaiwa.cli.cmd_process") as mock_cmd:
+                main()
+
+                args = mock_cmd.call_args[0][0]
+                assert args.speakers == 1
+                assert args.transcript_only is True
+
+
+    def test_process_from_step(self, tmp_audio_file):
+        """--from-step がparseされること"""
+        with mock.patch(
+            "sys.argv", ["kaiwa", "process", str(tmp_audio_file), "--from-step", "summarize"]
+        ):
+            with mock.patch("kaiwa.cli.cmd_process") as mock_cmd:
+                main()
+
+                args = mock_cmd.call_args[0][0]
+                assert args.from_step == "summarize"
+
+    def test_process_from_step_invalid(self, tmp_audio_file):
+        """不明なステップ名はエラーになること"""
+        with mock.patch(
+            "sys.argv", ["kaiwa", "process", str(tmp_audio_file), "--from-step", "render"]
+        ):
+            with pytest.raises(SystemExit):
+                main()
+
+    def test_process_no_daemon_flag(self, tmp_audio_file):
+        """--no-daemon で常駐サーバーへの委譲が無効になること"""
+        with mock.patch("sys.argv", ["kaiwa", "process", str(tmp_audio_file), "--no-daemon"]):
+            with mock.patch("kaiwa.cli.cmd_process") as mock_cmd:
+                main()
+
+                args = mock_cmd.call_args[0][0]
+                assert args.daemon is False
+
+    def test_serve_subcommand_argparse(self):
+        """serve サブコマンドの引数がparseされること"""
+        with mock.patch("sys.argv", ["kaiwa", "serve", "--socket", "/tmp/k.sock"]):
+            with mock.patch("kaiwa.cli.cmd_serve") as mock_cmd:
+                main()
+
+                args = mock_cmd.call_args[0][0]
+                assert args.socket == "/tmp/k.sock"
+
+
+    def test_recluster_subcommand_argparse(self, tmp_audio_file):
+        """recluster サブコマンドの話者数ヒントがparseされること"""
+        with mock.patch(
+            "sys.argv", ["kaiwa", "recluster", str(tmp_audio_file), "--max-speakers", "3"]
+        ):
+            with mock.patch("kaiwa.cli.cmd_recluster") as mock_cmd:
+                main()
+
+                args = mock_cmd.call_args[0][0]
+                assert args.audio_file == str(tmp_audio_file)
+                assert args.min_speakers is None
+                assert args.max_speakers == 3
+
+    def test_live_subcommand_argparse(self, tmp_audio_file):
+        """live サブコマンドの引数がparseされること"""
+        with mock.patch(
+            "sys.argv",
+            ["kaiwa", "live", str(tmp_audio_file), "--recorder-pid", "123"],
+        ):
+            with mock.patch("kaiwa.cli.cmd_live") as mock_cmd:
+                main()
+
+                args = mock_cmd.call_args[0][0]
+                assert args.recorder_pid == 123
+                assert args.min_speakers is None
+
+
+class TestCmdLive:
+    """cmd_live() のテスト"""
+
+    @mock.patch("kaiwa.cli.get_keychain_password")
+    @mock.patch("kaiwa.cli.load_config")
+    @mock.patch("kaiwa.cli.setup_logging")
+    def test_disabled_returns_immediately(
+        self, mock_logging, mock_config, mock_keychain, tmp_audio_file
+    ):
+        """live.enabled が false なら何もせず終了すること"""
+        mock_config.return_value = {"live": {"enabled": False}}
+        args = argparse.Namespace(
+            audio_file=str(tmp_audio_file),
+            recorder_pid=1,
+            min_speakers=None,
+            max_speakers=None,
+        )
+
+        cmd_live(args)
+
+        assert not mock_keychain.called
+
+    @mock.patch("kaiwa.cli._finish_pipeline")
+    @mock.patch("kaiwa.cli.get_keychain_password")
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    @mock.patch("kaiwa.cli.setup_logging")
+    def test_enabled_runs_remaining_stages(
+        self,
+        mock_logging,
+        mock_config,
+        mock_notify,
+        mock_keychain,
+        mock_finish,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """録音停止後、ライブ文字起こしの結果で残りのステップを実行すること"""
+        mock_config.return_value = {
+            "live": {"enabled": True},
+            "paths": {"work": str(tmp_path / "work")},
+        }
+        mock_keychain.return_value = "hf-token-value"
+        mock_result = {"segments": []}
+        args = argparse.Namespace(
+            audio_file=str(tmp_audio_file),
+            recorder_pid=1,
+            min_speakers=None,
+            max_speakers=None,
+        )
+
+        with mock.patch(
+            "kaiwa.live.transcribe_live", return_value=("audio", mock_result, 100.0)
+        ) as mock_live:
+            cmd_live(args)
+
+        assert mock_live.call_args[0][1] == 1
+        finish_args = mock_finish.call_args[0]
+        assert finish_args[0] == "audio"
+        assert finish_args[1] is mock_result
+        assert finish_args[8] == 100.0  # 処理時間は録音停止から計測
+        # ライブ文字起こしの結果がキャッシュに記録されること
+        assert finish_args[9].load("transcribe") is None  # 出力ファイルは未保存
+        assert "transcribe" in (tmp_path / "work" / tmp_audio_file.stem / "stage_manifest.json").read_text()
+
+
+@pytest.fixture
+def sequential_pipeline():
+    """文字起こし → 話者分離を逐次実行させる（並行実行は TestConcurrentPipeline で検証）。"""
+    with mock.patch("kaiwa.cli._use_concurrent", return_value=False):
+        yield
+
+
+@pytest.mark.usefixtures("sequential_pipeline")
 class TestCmdProcess:
     """cmd_process() のテスト"""
 
@@ -177,6 +332,86 @@ class TestCmdProcess:
         # generate_markdown が呼ばれたこと
         assert mock_generate_markdown.called
 
+    @pytest.mark.parametrize(
+        ("extra", "expected_line"),
+        [
+            ({"speakers": 1}, "[00:00 → 00:05] SPEAKER_00: こんにちは"),
+            ({"transcript_only": True}, "[00:00 → 00:05] こんにちは"),
+        ],
+    )
+    @mock.patch("kaiwa.output.generate_markdown")
+    @mock.patch("kaiwa.diarize.diarize")
+    @mock.patch("kaiwa.transcribe.transcribe")
+    @mock.patch("kaiwa.cli.get_keychain_password", return_value=None)
+    @mock.patch("kaiwa.cli.notify")
+    def test_skips_pyannote_without_hf_token(
+        self,
+        mock_notify,
+        mock_keychain,
+        mock_transcribe,
+        mock_diarize,
+        mock_generate_markdown,
+        extra,
+        expected_line,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """--speakers 1 / --transcript-only は HF トークンなしで pyannote を使わずに完了すること"""
+        mock_transcribe.return_value = (
+            mock.MagicMock(),
+            {"segments": [{"start": 0.0, "end": 5.0, "text": "こんにちは"}]},
+        )
+        mock_generate_markdown.return_value = tmp_path / "output.md"
+
+        cmd_process(argparse.Namespace(
+            audio_file=str(tmp_audio_file), min_speakers=None, max_speakers=None, **extra,
+        ))
+
+        mock_diarize.assert_not_called()
+        assert mock_generate_markdown.call_args[0][0] == [expected_line]
+
+    @mock.patch("kaiwa.output.generate_markdown")
+    @mock.patch("kaiwa.diarize.diarize_by_channels")
+    @mock.patch("kaiwa.channels.probe_channels", return_value=2)
+    @mock.patch("kaiwa.diarize.diarize")
+    @mock.patch("kaiwa.transcribe.transcribe")
+    @mock.patch("kaiwa.cli.get_keychain_password", return_value=None)
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    def test_channel_diarization(
+        self,
+        mock_config,
+        mock_notify,
+        mock_keychain,
+        mock_transcribe,
+        mock_diarize,
+        mock_probe,
+        mock_by_channels,
+        mock_generate_markdown,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """diarize.policy: channels ならステレオ録音を HF トークンなしでチャンネル別に話者分離すること"""
+        mock_config.return_value = {
+            "paths": {"work": str(tmp_path / "work")},
+            "diarize": {"policy": "channels"},
+        }
+        transcribed = {"segments": [{"start": 0.0, "end": 5.0, "text": "こんにちは"}]}
+        mock_transcribe.return_value = (mock.MagicMock(), transcribed)
+        mock_by_channels.return_value = {
+            "segments": [{"start": 0.0, "end": 5.0, "text": "こんにちは", "speaker": "SPEAKER_01"}]
+        }
+        mock_generate_markdown.return_value = tmp_path / "output.md"
+
+        cmd_process(argparse.Namespace(
+            audio_file=str(tmp_audio_file), min_speakers=None, max_speakers=None,
+        ))
+
+        mock_diarize.assert_not_called()
+        assert mock_by_channels.call_args[0][0] == tmp_audio_file.resolve()
+        assert mock_by_channels.call_args[0][1] is transcribed
+        assert mock_generate_markdown.call_args[0][0] == ["[00:00 → 00:05] SPEAKER_01: こんにちは"]
+
     @mock.patch("kaiwa.summarize.summarize")
     @mock.patch("kaiwa.output.generate_markdown")
     @mock.patch("kaiwa.diarize.diarize")
@@ -225,11 +460,126 @@ class TestCmdProcess:
         # 実行
         cmd_process(args)
         
-        # summarize が呼ばれたこと
+        # summarize が呼ばれたこと（プロンプトにはコンパクトな形式の文字起こしを渡す）
         assert mock_summarize.called
+        assert mock_summarize.call_args[0][0].splitlines()[1] == "[00:00] A: こんにちは"
         # generate_markdown が呼ばれたこと
         assert mock_generate_markdown.called
 
+    @mock.patch("kaiwa.cli.get_keychain_password")
+    def test_delegates_to_daemon(self, mock_keychain, tmp_audio_file):
+        """常駐サーバーが起動していればジョブを委譲し、プロセス内では処理しないこと"""
+        args = argparse.Namespace(
+            audio_file=str(tmp_audio_file),
+            min_speakers=2,
+            max_speakers=None,
+            daemon=True,
+        )
+
+        with mock.patch("kaiwa.server.submit_job", return_value=0) as mock_submit:
+            cmd_process(args)
+
+        assert mock_submit.call_args[1]["min_speakers"] == 2
+        # プロセス内パイプライン（トークン取得以降）に進まないこと
+        assert not mock_keychain.called
+
+    def test_daemon_failure_exits(self, tmp_audio_file):
+        """常駐サーバー側の失敗が終了コードとして伝わること"""
+        args = argparse.Namespace(
+            audio_file=str(tmp_audio_file),
+            min_speakers=None,
+            max_speakers=None,
+            daemon=True,
+        )
+
+        with mock.patch("kaiwa.server.submit_job", return_value=1):
+            with pytest.raises(SystemExit) as exc_info:
+                cmd_process(args)
+
+        assert exc_info.value.code == 1
+
+    @mock.patch("kaiwa.cli.get_keychain_password")
+    def test_falls_back_without_daemon(self, mock_keychain, tmp_audio_file):
+        """常駐サーバーがなければプロセス内処理に進むこと"""
+        mock_keychain.return_value = None  # HFトークン確認まで進んだことを確認する
+        args = argparse.Namespace(
+            audio_file=str(tmp_audio_file),
+            min_speakers=None,
+            max_speakers=None,
+            daemon=True,
+        )
+
+        with mock.patch("kaiwa.server.submit_job", return_value=None):
+            with pytest.raises(SystemExit):
+                cmd_process(args)
+
+        assert mock_keychain.called
+
+    @mock.patch("kaiwa.summarize.summarize")
+    @mock.patch("kaiwa.output.generate_markdown")
+    @mock.patch("kaiwa.transcribe.load_audio")
+    @mock.patch("kaiwa.diarize.diarize")
+    @mock.patch("kaiwa.transcribe.transcribe")
+    @mock.patch("kaiwa.cli.get_keychain_password")
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    def test_rerun_uses_stage_cache(
+        self,
+        mock_config,
+        mock_notify,
+        mock_keychain,
+        mock_transcribe,
+        mock_diarize,
+        mock_load_audio,
+        mock_generate_markdown,
+        mock_summarize,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """再実行時は完了済みステージをキャッシュから読み、--from-step で再実行できること"""
+        import json
+
+        mock_config.return_value = {"paths": {"work": str(tmp_path / "work")}}
+        mock_keychain.return_value = "key-value"
+        transcribed = {"segments": [{"start": 0.0, "end": 1.0, "text": "あ"}]}
+        diarized = {"segments": [{"start": 0.0, "end": 1.0, "text": "あ", "speaker": "SPEAKER_00"}]}
+
+        def fake_transcribe(audio_path, config, work_dir, detect_speech):
+            (work_dir / "01_transcribe.json").write_text(json.dumps(transcribed))
+            return "audio", transcribed
+
+        def fake_diarize(audio, result, *args, work_dir, **kwargs):
+            (work_dir / "03_diarize.json").write_text(json.dumps(diarized))
+            return diarized
+
+        mock_transcribe.side_effect = fake_transcribe
+        mock_diarize.side_effect = fake_diarize
+        mock_summarize.return_value = ("タイトル", "要約")
+        mock_generate_markdown.return_value = tmp_path / "output.md"
+
+        def run(from_step=None):
+            cmd_process(argparse.Namespace(
+                audio_file=str(tmp_audio_file),
+                min_speakers=None,
+                max_speakers=None,
+                from_step=from_step,
+            ))
+
+        run()
+        run()
+        # 2回目は全ステージがキャッシュから読まれる
+        assert mock_transcribe.call_count == 1
+        assert mock_diarize.call_count == 1
+        assert mock_summarize.call_count == 1
+        assert mock_generate_markdown.call_args[1]["title"] == "タイトル"
+
+        run(from_step="diarize")
+        # 文字起こしはキャッシュ、話者分離以降を再実行（音声はこの時点でデコード）
+        assert mock_transcribe.call_count == 1
+        assert mock_diarize.call_count == 2
+        assert mock_summarize.call_count == 2
+        assert mock_load_audio.call_count == 1
+
     @mock.patch("kaiwa.output.generate_markdown")
     @mock.patch("kaiwa.diarize.diarize")
     @mock.patch("kaiwa.transcribe.transcribe")
@@ -340,6 +690,7 @@ class TestCmdProcess:
                     assert mock_transcribe.called
 
 
+@pytest.mark.usefixtures("sequential_pipeline")
 class TestCmdProcessIntegration:
     """cmd_process() の統合テスト（エラーハンドリング・セキュリティ）"""
 
@@ -448,3 +799,320 @@ class TestCmdProcessIntegration:
                                 work_dir = Path(call_kwargs["work_dir"])
                                 # work_baseの配下であることを確認
                                 assert work_dir.is_relative_to(work_base) or str(work_dir).startswith(str(work_base))
+
+
+@pytest.mark.usefixtures("sequential_pipeline")
+class TestCmdRecluster:
+    """cmd_recluster() のテスト"""
+
+    @pytest.fixture
+    def processed(self, tmp_path, tmp_audio_file):
+        """process 済みの作業ディレクトリを用意し、各ステージのモックを返す。"""
+        import json
+
+        transcribed = {"segments": [{"start": 0.0, "end": 1.0, "text": "あ"}]}
+        diarized = {"segments": [{"start": 0.0, "end": 1.0, "text": "あ", "speaker": "SPEAKER_00"}]}
+
+        def fake_transcribe(audio_path, config, work_dir, detect_speech):
+            (work_dir / "01_transcribe.json").write_text(json.dumps(transcribed))
+            return "audio", transcribed
+
+        def fake_diarize(audio, result, *args, work_dir, **kwargs):
+            (work_dir / "03_diarize.json").write_text(json.dumps(diarized))
+            return diarized
+
+        with mock.patch("kaiwa.cli.load_config") as mock_config, \
+                mock.patch("kaiwa.cli.notify"), \
+                mock.patch("kaiwa.cli.get_keychain_password", return_value="key-value"), \
+                mock.patch("kaiwa.transcribe.transcribe", side_effect=fake_transcribe), \
+                mock.patch("kaiwa.transcribe.load_audio") as mock_load_audio, \
+                mock.patch("kaiwa.diarize.diarize", side_effect=fake_diarize) as mock_diarize, \
+                mock.patch("kaiwa.output.generate_markdown", return_value=tmp_path / "out.md"), \
+                mock.patch("kaiwa.summarize.summarize") as mock_summarize:
+            mock_config.return_value = {"paths": {"work": str(tmp_path / "work")}}
+            mock_summarize.return_value = ("タイトル", "要約")
+            cmd_process(argparse.Namespace(
+                audio_file=str(tmp_audio_file), min_speakers=None, max_speakers=None, from_step=None
+            ))
+            yield mock_diarize, mock_load_audio, mock_summarize
+
+    def _args(self, audio_file, max_speakers=2):
+        return argparse.Namespace(audio_file=str(audio_file), min_speakers=None, max_speakers=max_speakers)
+
+    @mock.patch("kaiwa.diarize.recluster")
+    def test_reclusters_without_audio(self, mock_recluster, processed, tmp_audio_file, tmp_path):
+        """音声をデコードせずに再クラスタリングし、要約・Markdown を作り直すこと"""
+        mock_diarize, mock_load_audio, mock_summarize = processed
+        mock_recluster.return_value = {
+            "segments": [{"start": 0.0, "end": 1.0, "text": "あ", "speaker": "SPEAKER_01"}]
+        }
+
+        cmd_recluster(self._args(tmp_audio_file))
+
+        mock_recluster.assert_called_once()
+        assert mock_recluster.call_args[0][3] == tmp_path / "work" / tmp_audio_file.stem
+        assert mock_recluster.call_args[1] == {
+            "min_speakers": None,
+            "max_speakers": 2,
+            "recording": hash_file(tmp_audio_file),
+        }
+        assert mock_diarize.call_count == 1  # process の1回のみ
+        mock_load_audio.assert_not_called()
+        assert mock_summarize.call_count == 2
+        assert "SPEAKER_01" in mock_summarize.call_args[0][0]
+
+    @mock.patch("kaiwa.diarize.recluster", side_effect=FileNotFoundError("特徴量がありません"))
+    def test_falls_back_to_full_diarization(self, mock_recluster, processed, tmp_audio_file):
+        """特徴量が保存されていなければ通常の話者分離を行うこと"""
+        mock_diarize, mock_load_audio, _ = processed
+
+        cmd_recluster(self._args(tmp_audio_file))
+
+        assert mock_diarize.call_count == 2
+        assert mock_diarize.call_args[1]["max_speakers"] == 2
+        assert mock_diarize.call_args[1]["num_threads"] >= 1
+        mock_load_audio.assert_called_once()
+
+    @mock.patch("kaiwa.cli.get_keychain_password", return_value="key-value")
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    def test_requires_transcript(self, mock_config, mock_notify, mock_keychain, tmp_audio_file, tmp_path):
+        """文字起こし結果がなければ終了コード 1"""
+        mock_config.return_value = {"paths": {"work": str(tmp_path / "work")}}
+
+        with pytest.raises(SystemExit) as exc_info:
+            cmd_recluster(self._args(tmp_audio_file))
+        assert exc_info.value.code == 1
+
+
+class TestConcurrentPipeline:
+    """文字起こしと話者分離の並行実行のテスト"""
+
+    @mock.patch("kaiwa.output.generate_markdown")
+    @mock.patch("kaiwa.diarize.apply_diarization")
+    @mock.patch("kaiwa.diarize.run_diarization")
+    @mock.patch("kaiwa.transcribe.transcribe")
+    @mock.patch("kaiwa.transcribe.detect_speech_regions")
+    @mock.patch("kaiwa.transcribe.load_audio")
+    @mock.patch("kaiwa.cli.get_keychain_password")
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    def test_runs_concurrently_and_joins(
+        self,
+        mock_config,
+        mock_notify,
+        mock_keychain,
+        mock_load_audio,
+        mock_detect_speech,
+        mock_transcribe,
+        mock_run_diarization,
+        mock_apply,
+        mock_generate_markdown,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """両ステージが同時に走り、両方の完了後に話者割り当てが1回呼ばれること"""
+        import json
+        import threading
+
+        mock_config.return_value = {"paths": {"work": str(tmp_path / "work")}}
+        mock_keychain.side_effect = lambda service, account: (
+            "hf-token-value" if account == "hf-token" else None
+        )
+        audio = mock.MagicMock()
+        mock_load_audio.return_value = audio
+        transcribed = {"segments": [{"start": 0.0, "end": 1.0, "text": "あ"}]}
+        diarized = {"segments": [{"start": 0.0, "end": 1.0, "text": "あ", "speaker": "SPEAKER_00"}]}
+        turns = object()
+
+        # 逐次実行ならどちらかがもう一方を待ち続けてタイムアウトする
+        both_running = threading.Barrier(2, timeout=5)
+
+        mock_detect_speech.return_value = [[0.0, 1.0]]
+
+        def fake_transcribe(audio_path, config, work_dir, audio, speech_regions, detect_speech, speed):
+            both_running.wait()
+            return audio, transcribed
+
+        def fake_run_diarization(audio, hf_token, config, **kwargs):
+            both_running.wait()
+            return turns
+
+        mock_transcribe.side_effect = fake_transcribe
+        mock_run_diarization.side_effect = fake_run_diarization
+        mock_apply.return_value = diarized
+        mock_generate_markdown.return_value = tmp_path / "output.md"
+
+        cmd_process(argparse.Namespace(
+            audio_file=str(tmp_audio_file), min_speakers=2, max_speakers=None,
+        ))
+
+        # デコードは1回、同じ配列を両ステージで共有
+        mock_load_audio.assert_called_once()
+        assert mock_transcribe.call_args[1]["audio"] is audio
+        assert mock_run_diarization.call_args[0][0] is audio
+        assert mock_run_diarization.call_args[1]["min_speakers"] == 2
+
+        # 無音除外の発話区間は話者分離側で1回だけ検出し、文字起こしでは検出しないこと
+        mock_detect_speech.assert_called_once()
+        assert mock_transcribe.call_args[1]["speech_regions"] is None
+        assert mock_transcribe.call_args[1]["detect_speech"] is False
+        assert mock_run_diarization.call_args[1]["speech_regions"] == [[0.0, 1.0]]
+        # 検出した区間は文字起こしの結果にも残ること
+        assert mock_apply.call_args[0][1]["speech_regions"] == [[0.0, 1.0]]
+
+        # スレッド数の配分が両ステージに渡されること
+        asr_threads = mock_transcribe.call_args[0][1]["whisper"]["cpu_threads"]
+        diarize_threads = mock_run_diarization.call_args[1]["num_threads"]
+        assert asr_threads >= 1 and diarize_threads >= 1
+        assert mock_transcribe.call_args[1]["speed"]["cpu_threads"] == asr_threads
+
+        mock_apply.assert_called_once()
+        assert mock_apply.call_args[0][0] is turns
+        assert mock_apply.call_args[0][1] is transcribed
+
+        # 結合後の結果で Markdown が生成され、両ステージがキャッシュに記録されること
+        transcript_lines = mock_generate_markdown.call_args[0][0]
+        assert "SPEAKER_00" in transcript_lines[0]
+        manifest = json.loads((tmp_path / "work" / tmp_audio_file.stem / "stage_manifest.json").read_text())
+        assert set(manifest) == {"transcribe", "diarize"}
+
+    @mock.patch("kaiwa.output.generate_markdown")
+    @mock.patch("kaiwa.diarize.apply_diarization")
+    @mock.patch("kaiwa.diarize.run_diarization")
+    @mock.patch("kaiwa.transcribe.transcribe")
+    @mock.patch("kaiwa.transcribe._detect_speech", return_value=[(0, 16000)])
+    @mock.patch("kaiwa.profiles.benchmark")
+    @mock.patch("kaiwa.transcribe.load_audio")
+    @mock.patch("kaiwa.cli.get_keychain_password")
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    def test_auto_profile_measured_before_concurrent_stages(
+        self,
+        mock_config,
+        mock_notify,
+        mock_keychain,
+        mock_load_audio,
+        mock_benchmark,
+        mock_detect_speech,
+        mock_transcribe,
+        mock_run_diarization,
+        mock_apply,
+        mock_generate_markdown,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """profile: auto の計測は並行実行の前に1回だけ行い、同じ設定を発話区間の検出と文字起こしに渡すこと"""
+        import numpy as np
+
+        events = []
+        mock_keychain.side_effect = lambda service, account: (
+            "hf-token-value" if account == "hf-token" else None
+        )
+        mock_config.return_value = {
+            "paths": {"work": str(tmp_path / "work")},
+            "whisper": {"profile": "auto"},
+        }
+        mock_load_audio.return_value = np.zeros(16000 * 5, dtype=np.float32)
+        mock_benchmark.side_effect = lambda *a: events.append("benchmark") or {
+            "fast": 0.1, "balanced": 0.6, "accurate": 0.9,
+        }
+        transcribed = {"segments": [{"start": 0.0, "end": 1.0, "text": "あ"}]}
+
+        def fake_transcribe(audio_path, config, **kwargs):
+            events.append("transcribe")
+            return kwargs["audio"], transcribed
+
+        def fake_run_diarization(audio, hf_token, config, **kwargs):
+            events.append("diarize")
+            return object()
+
+        mock_transcribe.side_effect = fake_transcribe
+        mock_run_diarization.side_effect = fake_run_diarization
+        mock_apply.return_value = transcribed
+        mock_generate_markdown.return_value = tmp_path / "output.md"
+
+        with mock.patch("kaiwa.profiles.SPEED_PROFILE_PATH", tmp_path / "speed_profile.json"):
+            cmd_process(argparse.Namespace(
+                audio_file=str(tmp_audio_file), min_speakers=None, max_speakers=None,
+            ))
+
+        assert events[0] == "benchmark"
+        assert events.count("benchmark") == 1
+        speed = mock_transcribe.call_args[1]["speed"]
+        assert speed["profile"] == "fast"
+        # 発話区間の検出も計測で選んだプロファイルの VAD パラメータを使うこと
+        assert mock_detect_speech.call_args[0][1] == speed["vad_parameters"]
+
+    @mock.patch("kaiwa.diarize.run_diarization")
+    @mock.patch("kaiwa.transcribe.transcribe")
+    @mock.patch("kaiwa.transcribe.detect_speech_regions", return_value=[])
+    @mock.patch("kaiwa.transcribe.load_audio")
+    @mock.patch("kaiwa.cli.get_keychain_password", return_value="hf-token-value")
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    def test_diarization_error_propagates(
+        self,
+        mock_config,
+        mock_notify,
+        mock_keychain,
+        mock_load_audio,
+        mock_detect_speech,
+        mock_transcribe,
+        mock_run_diarization,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """話者分離側の例外が伝播すること"""
+        mock_config.return_value = {"paths": {"work": str(tmp_path / "work")}}
+        mock_transcribe.return_value = (mock.MagicMock(), {"segments": []})
+        mock_run_diarization.side_effect = RuntimeError("pyannote 失敗")
+
+        with pytest.raises(RuntimeError, match="pyannote 失敗"):
+            cmd_process(argparse.Namespace(
+                audio_file=str(tmp_audio_file), min_speakers=None, max_speakers=None,
+            ))
+
+
+    @mock.patch("kaiwa.output.generate_markdown")
+    @mock.patch("kaiwa.precheck.is_single_speaker", return_value=True)
+    @mock.patch("kaiwa.diarize.run_diarization")
+    @mock.patch("kaiwa.transcribe.transcribe")
+    @mock.patch("kaiwa.transcribe.detect_speech_regions", return_value=[[0.0, 1.0]])
+    @mock.patch("kaiwa.transcribe.load_audio")
+    @mock.patch("kaiwa.cli.get_keychain_password", return_value=None)
+    @mock.patch("kaiwa.cli.notify")
+    @mock.patch("kaiwa.cli.load_config")
+    def test_auto_single_speaker_skips_pyannote(
+        self,
+        mock_config,
+        mock_notify,
+        mock_keychain,
+        mock_load_audio,
+        mock_detect_speech,
+        mock_transcribe,
+        mock_run_diarization,
+        mock_single,
+        mock_generate_markdown,
+        tmp_audio_file,
+        tmp_path,
+    ):
+        """policy: auto で単一話者と判定されたら、文字起こしだけ行い全発話を SPEAKER_00 にすること"""
+        mock_config.return_value = {
+            "paths": {"work": str(tmp_path / "work")},
+            "diarize": {"policy": "auto"},
+        }
+        mock_transcribe.return_value = (
+            mock.MagicMock(),
+            {"segments": [{"start": 0.0, "end": 1.0, "text": "あ"}]},
+        )
+        mock_generate_markdown.return_value = tmp_path / "output.md"
+
+        cmd_process(argparse.Namespace(
+            audio_file=str(tmp_audio_file), min_speakers=None, max_speakers=None,
+        ))
+
+        mock_single.assert_called_once()
+        assert mock_single.call_args[0][1] == [[0.0, 1.0]]
+        mock_run_diarization.assert_not_called()
+        assert "SPEAKER_00" in mock_generate_markdown.call_args[0][0][0]
@@ -0,0 +1,151 @@
+"""kaiwa.clustering のテスト"""
+
+from __future__ import annotations
+
+import types
+
+import numpy as np
+import pytest
+
+from kaiwa.clustering import (
+    TwoStageClustering,
+    _normalize,
+    agglomerative,
+    select_clustering,
+    two_stage_clustering,
+)
+
+
+def _partition(labels: np.ndarray) -> set[frozenset[int]]:
+    """番号の振り方によらず比較できるよう、クラスタを要素の集合にする。"""
+    return {frozenset(np.flatnonzero(labels == k).tolist()) for k in np.unique(labels)}
+
+
+def _naive_centroid_linkage(vectors: np.ndarray, threshold: float) -> np.ndarray:
+    """毎回すべての組を調べる素朴な centroid 法（参照実装）。"""
+    members = [[i] for i in range(len(vectors))]
+    centroids = [v.astype(np.float64) for v in vectors]
+    while len(members) > 1:
+        best = None
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                d = float(np.sum((centroids[a] - centroids[b]) ** 2))
+                if best is None or d < best[0]:
+                    best = (d, a, b)
+        d, a, b = best
+        if d > threshold * threshold:
+            break
+        na, nb = len(members[a]), len(members[b])
+        centroids[a] = (na * centroids[a] + nb * centroids[b]) / (na + nb)
+        members[a] += members.pop(b)
+        centroids.pop(b)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for k, m in enumerate(members):
+        labels[m] = k
+    return labels
+
+
+def _meeting(n: int, num_speakers: int = 4, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """話者ターンが続く時間順の埋め込みと正解ラベルを作る。"""
+    rng = np.random.default_rng(seed)
+    voices = rng.standard_normal((num_speakers, 64))
+    labels = np.repeat(rng.integers(0, num_speakers, n // 25 + 1), 25)[:n]
+    return _normalize(voices[labels] + 0.3 * rng.standard_normal((n, 64))), labels
+
+
+class TestAgglomerative:
+    """agglomerative() のテスト"""
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_naive_centroid_linkage(self, seed):
+        """素朴な centroid 法と同じ分割になること"""
+        vectors = _normalize(np.random.default_rng(seed).standard_normal((40, 8)))
+        assert _partition(agglomerative(vectors, 1.1)) == _partition(
+            _naive_centroid_linkage(vectors, 1.1)
+        )
+
+    def test_cluster_count_bounds(self):
+        """max_clusters まで併合を続け、min_clusters より少なくはしないこと"""
+        vectors, _ = _meeting(200)
+        assert agglomerative(vectors, 0.7).max() + 1 == 4
+        assert agglomerative(vectors, 0.7, max_clusters=2).max() + 1 == 2
+        assert agglomerative(vectors, 0.7, min_clusters=6).max() + 1 == 6
+
+    def test_labels_in_order_of_first_appearance(self):
+        """クラスタ番号が初出順に振られること"""
+        vectors = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 0.01]])
+        assert agglomerative(vectors, 0.5).tolist() == [0, 1, 0]
+
+
+class TestTwoStageClustering:
+    """two_stage_clustering() / TwoStageClustering のテスト"""
+
+    def test_same_result_as_single_stage(self):
+        """チャンクに分けても全体を一度にまとめた場合と同じ話者になること"""
+        vectors, truth = _meeting(1200)
+        labels = two_stage_clustering(vectors, threshold=0.7, chunk_size=100)
+        assert _partition(labels) == _partition(agglomerative(vectors, 0.7))
+        assert _partition(labels) == _partition(truth)
+
+    def test_small_clusters_absorbed(self):
+        """min_cluster_size 未満のクラスタは最も近い話者に吸収されること"""
+        vectors, _ = _meeting(300)
+        outlier = _normalize(np.random.default_rng(9).standard_normal((1, 64)))
+        vectors = np.concatenate([vectors, outlier])
+        assert two_stage_clustering(vectors, 0.7, chunk_size=100).max() + 1 == 5
+        assert two_stage_clustering(vectors, 0.7, chunk_size=100, min_cluster_size=5).max() + 1 == 4
+
+    def test_pyannote_interface(self):
+        """pyannote と同じ形の hard / soft / centroids を返し、非発話の話者は除外すること"""
+        vectors, truth = _meeting(300, num_speakers=3)
+        # 3 ローカル話者のうち最後の1人はどのチャンクでも発話しない（埋め込みは NaN）
+        embeddings = np.full((100, 3, 64), np.nan)
+        embeddings[:, :2] = vectors[:200].reshape(100, 2, 64)
+        segmentations = np.zeros((100, 10, 3))
+        segmentations[:, :, :2] = 1.0
+
+        hard, soft, centroids = TwoStageClustering(threshold=0.7, chunk_size=64)(
+            embeddings, segmentations, num_clusters=None
+        )
+
+        assert hard.shape == (100, 3)
+        assert soft.shape == (100, 3, 3)
+        assert centroids.shape == (3, 64)
+        assert _partition(hard[:, :2].reshape(-1)) == _partition(truth[:200])
+
+    def test_num_clusters(self):
+        """num_clusters を指定するとその話者数になること"""
+        vectors, _ = _meeting(200)
+        hard, _, centroids = TwoStageClustering(threshold=0.7, min_cluster_size=1)(
+            vectors.reshape(100, 2, 64), num_clusters=2
+        )
+        assert len(centroids) == 2
+        assert set(hard.reshape(-1).tolist()) == {0, 1}
+
+
+class TestSelectClustering:
+    """select_clustering() のテスト"""
+
+    def test_swap_and_restore(self):
+        """two_stage で差し替え、default で元のクラスタリングに戻すこと"""
+        original = types.SimpleNamespace(threshold=0.65, min_cluster_size=8)
+        pipeline = types.SimpleNamespace(clustering=original)
+
+        select_clustering(pipeline, {"clustering": "two_stage", "clustering_chunk_size": 300})
+        assert isinstance(pipeline.clustering, TwoStageClustering)
+        assert pipeline.clustering.threshold == 0.65
+        assert pipeline.clustering.min_cluster_size == 8
+        assert pipeline.clustering.chunk_size == 300
+
+        select_clustering(pipeline, {"clustering": "two_stage", "clustering_threshold": 0.5})
+        assert pipeline.clustering.threshold == 0.5
+        assert pipeline.clustering.default is original
+
+        select_clustering(pipeline, {})
+        assert pipeline.clustering is original
+
+    def test_invalid_backend(self):
+        """不正な clustering は ValueError"""
+        pipeline = types.SimpleNamespace(clustering=object())
+        with pytest.raises(ValueError, match="diarize.clustering"):
+            select_clustering(pipeline, {"clustering": "kmeans"})
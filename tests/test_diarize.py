@@ -2,12 +2,130 @@
 
 from __future__ import annotations
 
+import copy
+import json
+import random
+import time
 from pathlib import Path
 from unittest import mock
 
+import numpy as np
 import pytest
 
-from kaiwa.diarize import _split_segments_by_speaker, diarize
+from kaiwa.diarize import (
+    _diarize_windowed,
+    _plan_windows,
+    _SpeakerLinker,
+    _speech_timeline,
+    _SpeechTimeline,
+    _split_segments_by_speaker,
+    _use_windowed,
+    apply_diarization,
+    assign_word_speakers,
+    choose_policy,
+    diarize,
+    diarize_by_channels,
+    label_without_diarization,
+    needs_speech_regions,
+    recluster,
+    resolve_policy,
+    run_diarization,
+)
+
+
+def _reference_assign(turns: dict, result: dict) -> dict:
+    """whisperx.assign_word_speakers（fill_nearest=False）の規則をそのまま書いた参照実装。
+
+    区間ごとに全ターンとの重なりを計算し、正の重なりの合計が最大の話者を選ぶ。
+    同点は話者ラベルの昇順で先のもの。
+    """
+    rows = list(zip(turns["start"], turns["end"], turns["speaker"]))
+
+    def best(start, end):
+        totals: dict[str, float] = {}
+        for t_start, t_end, speaker in rows:
+            intersection = min(t_end, end) - max(t_start, start)
+            if intersection > 0:
+                totals[speaker] = totals.get(speaker, 0.0) + intersection
+        if not totals:
+            return None
+        return min(totals, key=lambda s: (-totals[s], s))
+
+    for seg in result["segments"]:
+        speaker = best(seg["start"], seg["end"])
+        if speaker is not None:
+            seg["speaker"] = speaker
+        for word in seg.get("words", []):
+            if "start" in word:
+                speaker = best(word["start"], word["end"])
+                if speaker is not None:
+                    word["speaker"] = speaker
+    return result
+
+
+def _random_meeting(rng: random.Random, duration: float, n_turns: int, n_words: int):
+    """ランダムな話者ターン（重なりあり）と単語列を生成する。"""
+    turns = {"start": [], "end": [], "speaker": []}
+    for _ in range(n_turns):
+        start = rng.uniform(0, duration)
+        turns["start"].append(start)
+        turns["end"].append(start + rng.uniform(0.2, 20))
+        turns["speaker"].append(f"SPEAKER_{rng.randrange(4):02d}")
+
+    segments = []
+    t = 0.0
+    while len(segments) * 10 < n_words:
+        words = []
+        for _ in range(10):
+            length = rng.choice([0.0, 0.1, 0.3, 0.8])  # 長さ 0 の単語も含める
+            words.append({"word": "あ", "start": t, "end": t + length})
+            t += length + rng.uniform(0, 0.5)
+        words.append({"word": "。"})  # タイムスタンプのない単語
+        segments.append({"start": words[0]["start"], "end": words[-2]["end"], "text": "", "words": words})
+    return turns, {"segments": segments}
+
+
+def _reference_split(segments: list[dict]) -> list[dict]:
+    """列指向化する前の _split_segments_by_speaker（単語 dict を1つずつ走査する実装）。"""
+    new_segments = []
+    for seg in segments:
+        words = seg.get("words", [])
+        if not words or not any(w.get("speaker") for w in words):
+            new_segments.append(seg)
+            continue
+
+        groups, current_group, current_speaker = [], [], None
+        for word in words:
+            word_speaker = word.get("speaker")
+            if word_speaker is None:
+                word_speaker = current_speaker
+            if word_speaker != current_speaker and current_group:
+                groups.append(current_group)
+                current_group = []
+            current_speaker = word_speaker
+            current_group.append(word)
+        if current_group:
+            groups.append(current_group)
+
+        if len(groups) <= 1:
+            new_segments.append(seg)
+            continue
+
+        for group in groups:
+            timed = [w for w in group if "start" in w and "end" in w]
+            if not timed:
+                continue
+            text = "".join(w.get("word", "") for w in group).strip()
+            if not text:
+                continue
+            new_segments.append({
+                "start": timed[0]["start"],
+                "end": timed[-1]["end"],
+                "text": text,
+                "speaker": group[0].get("speaker", seg.get("speaker", "UNKNOWN")),
+                "words": group,
+            })
+    return new_segments
 
 
 class TestSplitSegmentsBySpeaker:
@@ -177,11 +295,545 @@ class TestSplitSegmentsBySpeaker:
         assert result[2]["speaker"] == "SPEAKER_00"
         assert result[3]["speaker"] == "SPEAKER_01"
 
+    @pytest.mark.parametrize("seed", range(3))
+    def test_matches_reference(self, seed):
+        """話者なし・タイミングなし・空白だけの単語が混在しても従来実装と一致すること"""
+        rng = random.Random(seed)
+        turns, result = _random_meeting(rng, duration=600, n_turns=200, n_words=2000)
+        assign_word_speakers(turns, result)
+        for seg in result["segments"]:
+            if rng.random() < 0.3:
+                seg["speaker"] = "SPEAKER_09"
+            for word in seg["words"]:
+                if rng.random() < 0.05:
+                    word["word"] = " "
+
+        assert _split_segments_by_speaker(result["segments"]) == _reference_split(result["segments"])
+
+    def test_apply_diarization_matches_reference(self):
+        """割り当てと再分割で WordTable を共有しても、別々に処理した結果と一致すること"""
+        rng = random.Random(0)
+        turns, result = _random_meeting(rng, duration=600, n_turns=200, n_words=2000)
+        # 割り当て前から話者を持つ単語（ターン外なら上書きされずに残る）
+        for seg in result["segments"][::7]:
+            seg["words"][0]["speaker"] = "SPEAKER_09"
+
+        expected = copy.deepcopy(result)
+        expected["segments"] = _reference_split(_reference_assign(turns, expected)["segments"])
+
+        assert apply_diarization(turns, result) == expected
+
+    def test_long_transcript_is_fast(self):
+        """10万語でも1秒未満で分割できること"""
+        rng = random.Random(0)
+        turns, result = _random_meeting(rng, duration=8 * 3600, n_turns=8000, n_words=100_000)
+        assign_word_speakers(turns, result)
+
+        start = time.perf_counter()
+        segments = _split_segments_by_speaker(result["segments"])
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 1.0
+        assert len(segments) > len(result["segments"])
+
+
+class TestAssignWordSpeakers:
+    """assign_word_speakers() のテスト"""
+
+    def test_max_total_overlap_wins(self):
+        """同じ話者の複数ターンの重なりは合計して比較すること"""
+        turns = {
+            "start": [0.0, 1.5, 2.5],
+            "end": [1.0, 2.0, 4.0],
+            "speaker": ["A", "A", "B"],
+        }
+        # A: 0.5 + 0.5 = 1.0, B: 0.5 → A
+        result = {"segments": [{
+            "start": 0.5, "end": 3.0, "text": "",
+            "words": [{"word": "x", "start": 0.5, "end": 3.0}],
+        }]}
+
+        assign_word_speakers(turns, result)
+
+        assert result["segments"][0]["speaker"] == "A"
+        assert result["segments"][0]["words"][0]["speaker"] == "A"
+
+    def test_touching_and_outside_not_assigned(self):
+        """境界で接するだけ・重なりなし・長さ 0 の単語には付与しないこと"""
+        turns = {"start": [1.0], "end": [2.0], "speaker": ["A"]}
+        words = [
+            {"word": "a", "start": 0.0, "end": 1.0},  # 接するだけ
+            {"word": "b", "start": 3.0, "end": 4.0},  # 重なりなし
+            {"word": "c", "start": 1.5, "end": 1.5},  # 長さ 0
+            {"word": "d"},  # タイムスタンプなし
+        ]
+        result = {"segments": [{"start": 2.0, "end": 4.0, "text": "", "words": words}]}
+
+        assign_word_speakers(turns, result)
+
+        assert "speaker" not in result["segments"][0]
+        assert all("speaker" not in w for w in words)
+
+    def test_empty_diarization(self):
+        """話者ターンがなければ何も付与しないこと"""
+        result = {"segments": [{"start": 0.0, "end": 1.0, "text": "", "words": []}]}
+        assign_word_speakers({"start": [], "end": [], "speaker": []}, result)
+        assert "speaker" not in result["segments"][0]
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_reference(self, seed):
+        """whisperx と同じ規則の参照実装と結果が一致すること"""
+        rng = random.Random(seed)
+        turns, result = _random_meeting(rng, duration=600, n_turns=200, n_words=1500)
+
+        expected = _reference_assign(turns, copy.deepcopy(result))
+        actual = assign_word_speakers(turns, result)
+
+        assert actual == expected
+
+    def test_matches_whisperx(self):
+        """whisperx.assign_word_speakers と結果が一致すること（whisperx 導入環境のみ）"""
+        pd = pytest.importorskip("pandas")
+        pytest.importorskip("whisperx.diarize")
+        from whisperx.diarize import assign_word_speakers as whisperx_assign
+
+        rng = random.Random(0)
+        turns, result = _random_meeting(rng, duration=300, n_turns=80, n_words=500)
+
+        expected = whisperx_assign(pd.DataFrame(turns), copy.deepcopy(result))
+        actual = assign_word_speakers(pd.DataFrame(turns), result)
+
+        assert actual == expected
+
+    def test_long_recording_is_fast(self):
+        """4時間・数万語・数千ターンでも一瞬で終わること"""
+        rng = random.Random(0)
+        turns, result = _random_meeting(rng, duration=4 * 3600, n_turns=5000, n_words=60000)
+
+        start = time.perf_counter()
+        assign_word_speakers(turns, result)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 1.0
+        assert sum("speaker" in w for seg in result["segments"] for w in seg["words"]) > 0
+
+
+class TestWindowedDiarization:
+    """ウィンドウ分割の話者分離のテスト"""
+
+    def test_plan_windows(self):
+        """ウィンドウが重なりを持って音声全体を覆うこと"""
+        windows = _plan_windows(250, window=100, overlap=10)
+        assert windows == [(0, 100), (90, 190), (180, 250)]
+        assert _plan_windows(80, window=100, overlap=10) == [(0, 80)]
+
+    def test_use_windowed(self):
+        """auto は windowed_min_duration 以上で有効、1ウィンドウに収まる長さでは無効"""
+        cfg = {"windowed": "auto", "windowed_min_duration": 7200, "window_seconds": 1800}
+        assert _use_windowed(cfg, 7200 * 16000)
+        assert not _use_windowed(cfg, 7199 * 16000)
+        assert _use_windowed({**cfg, "windowed": True}, 3600 * 16000)
+        assert not _use_windowed({**cfg, "windowed": True}, 1800 * 16000)
+        assert not _use_windowed({**cfg, "windowed": False}, 10 * 3600 * 16000)
+
+    def test_linker_matches_across_windows(self):
+        """ウィンドウごとにラベルが入れ替わっても同じ人は同じ番号になること"""
+        rng = np.random.default_rng(0)
+        voices = rng.standard_normal((3, 64))
+        linker = _SpeakerLinker(threshold=0.6)
+
+        first = linker.link({"SPEAKER_00": voices[0], "SPEAKER_01": voices[1]})
+        second = linker.link({
+            "SPEAKER_00": voices[1] + 0.1 * rng.standard_normal(64),
+            "SPEAKER_01": voices[2],
+            "SPEAKER_02": voices[0] + 0.1 * rng.standard_normal(64),
+        })
+
+        assert second["SPEAKER_00"] == first["SPEAKER_01"]
+        assert second["SPEAKER_02"] == first["SPEAKER_00"]
+        assert second["SPEAKER_01"] not in first.values()
+
+    def test_linker_merges_down_to_max_speakers(self):
+        """最大話者数を超えたら最も似た話者同士を統合すること"""
+        rng = np.random.default_rng(0)
+        a, b = rng.standard_normal((2, 64))
+        linker = _SpeakerLinker(threshold=0.99)
+        linker.link({"SPEAKER_00": a, "SPEAKER_01": b})
+        linker.link({"SPEAKER_00": a + 0.3 * rng.standard_normal(64)})  # 閾値が高く別人扱い
+
+        relabel = linker.merge_to(2)
+
+        assert relabel == {0: "SPEAKER_00", 1: "SPEAKER_01", 2: "SPEAKER_00"}
+        assert set(linker.embeddings()) == {"SPEAKER_00", "SPEAKER_01"}
+
+    def test_windowed_turns(self):
+        """ウィンドウの時刻を全体の時間軸に戻し、重なり部分を中点で切り分けること"""
+        pytest.importorskip("pandas")
+        rng = np.random.default_rng(0)
+        voices = {"A": rng.standard_normal(64), "B": rng.standard_normal(64)}
+        sr = 16000
+
+        def fake_pipeline(audio, return_embeddings=False, **kwargs):
+            # 1つ目のウィンドウは A → B、2つ目は B → A（ラベルは窓ごとに振り直される）
+            if len(audio) == 100 * sr:
+                frame = {"start": [0.0, 50.0], "end": [50.0, 100.0], "speaker": ["SPEAKER_00", "SPEAKER_01"]}
+                return frame, {"SPEAKER_00": voices["A"], "SPEAKER_01": voices["B"]}
+            frame = {"start": [0.0, 40.0], "end": [40.0, 80.0], "speaker": ["SPEAKER_00", "SPEAKER_01"]}
+            return frame, {"SPEAKER_00": voices["B"], "SPEAKER_01": voices["A"]}
+
+        cfg = {"window_seconds": 100, "window_overlap_seconds": 20}
+        audio = np.zeros(160 * sr, dtype=np.float32)
+        frame, embeddings = _diarize_windowed(fake_pipeline, audio, cfg, {}, return_embeddings=True)
+
+        turns = list(zip(frame["start"], frame["end"], frame["speaker"]))
+        assert turns == [
+            (0.0, 50.0, "SPEAKER_00"),
+            (50.0, 90.0, "SPEAKER_01"),  # 重なり [80, 100) の中点 90 で切る
+            (90.0, 120.0, "SPEAKER_01"),
+            (120.0, 160.0, "SPEAKER_00"),
+        ]
+        assert set(embeddings) == {"SPEAKER_00", "SPEAKER_01"}
+
+    @pytest.mark.parametrize(
+        "cfg",
+        [
+            {"window_seconds": 100, "window_overlap_seconds": 100},
+            {"window_seconds": 100, "window_overlap_seconds": 150},
+            {"window_seconds": 100, "window_overlap_seconds": -1},
+            {"window_seconds": 0, "window_overlap_seconds": 0},
+        ],
+    )
+    def test_invalid_overlap_raises(self, cfg):
+        """ウィンドウが先に進まない重なりの設定は、話者分離を始める前に ValueError"""
+        pipeline = mock.MagicMock()
+        audio = np.zeros(300 * 16000, dtype=np.float32)
+
+        with pytest.raises(ValueError, match="diarize.window_"):
+            _diarize_windowed(pipeline, audio, cfg, {}, return_embeddings=False)
+        pipeline.assert_not_called()
+
+
+class TestSkipSilence:
+    """無音区間を除いた話者分離のテスト"""
+
+    def test_timeline_maps_back_to_original(self):
+        """連結後の時刻を元の時間軸に戻し、区間境界をまたぐターンを分けること"""
+        timeline = _SpeechTimeline([[1.0, 3.0], [5.0, 6.0], [2.5, 4.0]], 10 * 16000)
+
+        # 重なる区間はまとめられる: [1, 4) と [5, 6)
+        assert timeline.starts == [16000, 80000]
+        assert timeline.lengths == [48000, 16000]
+
+        turns = timeline.to_original(
+            {"start": [0.0, 2.5], "end": [2.5, 4.0], "speaker": ["SPEAKER_00", "SPEAKER_01"]}
+        )
+        assert list(zip(turns["start"], turns["end"], turns["speaker"])) == [
+            (1.0, 3.5, "SPEAKER_00"),
+            (3.5, 4.0, "SPEAKER_01"),
+            (5.0, 6.0, "SPEAKER_01"),
+        ]
+
+    def test_extract(self):
+        """発話区間だけを連結した音声を返すこと"""
+        audio = np.arange(10 * 16000, dtype=np.float32)
+        timeline = _SpeechTimeline([[1.0, 2.0], [5.0, 5.5]], len(audio))
+        compact = timeline.extract(audio)
+        assert len(compact) == 24000
+        assert compact[0] == 16000 and compact[16000] == 80000
+
+    def test_speech_timeline_thresholds(self):
+        """無音が少ない・無効・区間未取得のときはタイムラインを使わないこと"""
+        n = 100 * 16000
+        mostly_speech = [[0.0, 90.0]]
+        half_speech = [[0.0, 50.0]]
+        assert _speech_timeline({}, None, n) is None
+        assert _speech_timeline({}, mostly_speech, n) is None
+        assert _speech_timeline({}, half_speech, n) is not None
+        assert _speech_timeline({"skip_silence": False}, half_speech, n) is None
+        assert _speech_timeline({"skip_silence_min_ratio": 0.05}, mostly_speech, n) is not None
+        # 発話がまったくない場合は空のタイムライン（話者分離自体をスキップ）
+        assert _speech_timeline({}, [], n).lengths == []
+
+    @mock.patch("kaiwa.diarize._turns_frame", side_effect=lambda turns: turns)
+    @mock.patch("kaiwa.diarize._load_diarization_pipeline")
+    def test_run_diarization_on_speech_only(self, mock_load, _mock_frame):
+        """pyannote には発話区間だけを渡し、結果の時刻は元の時間軸に戻ること"""
+        from kaiwa.diarize import run_diarization
+
+        mock_load.return_value.return_value = {
+            "start": [0.0], "end": [3.0], "speaker": ["SPEAKER_00"],
+        }
+        audio = np.zeros(60 * 16000, dtype=np.float32)
+        config = {"whisper": {"device": "cpu"}, "diarize": {}}
+
+        turns = run_diarization(audio, "token", config, speech_regions=[[10.0, 12.0], [30.0, 31.0]])
+
+        assert len(mock_load.return_value.call_args[0][0]) == 3 * 16000
+        assert list(zip(turns["start"], turns["end"], turns["speaker"])) == [
+            (10.0, 12.0, "SPEAKER_00"),
+            (30.0, 31.0, "SPEAKER_00"),
+        ]
+
+    @mock.patch("kaiwa.diarize._turns_frame", side_effect=lambda turns: turns)
+    @mock.patch("kaiwa.diarize._load_diarization_pipeline")
+    def test_no_speech_skips_model(self, mock_load, _mock_frame):
+        """発話区間がなければモデルを読み込まずに空のターンを返すこと"""
+        from kaiwa.diarize import run_diarization
+
+        audio = np.zeros(60 * 16000, dtype=np.float32)
+        config = {"whisper": {"device": "cpu"}, "diarize": {}}
+
+        turns = run_diarization(audio, "token", config, speech_regions=[])
+
+        assert turns == {"start": [], "end": [], "speaker": []}
+        mock_load.assert_not_called()
+
+
+class _FakeSpeakerDiarization:
+    """pyannote の SpeakerDiarization の代わり（特徴量の計算回数を数える）。"""
+
+    def __init__(self, segmentations, embeddings):
+        self.segmentations = segmentations
+        self.embeddings = embeddings
+        self.calls = 0
+
+    def get_segmentations(self, file, hook=None):
+        self.calls += 1
+        return self.segmentations
+
+    def get_embeddings(self, file, binary_segmentations, exclude_overlap=False, hook=None):
+        self.calls += 1
+        return self.embeddings
+
+
+class _FakeDiarizationPipeline:
+    """whisperx の DiarizationPipeline の代わり。
+
+    特徴量を pyannote パイプラインから取得し、埋め込みの平均が近い順に
+    max_speakers 人にまとめた話者ターンを返す。
+    """
+
+    def __init__(self, segmentations, embeddings):
+        self.model = _FakeSpeakerDiarization(segmentations, embeddings)
+        self.calls = []
+
+    def __call__(self, audio, **kwargs):
+        self.calls.append(kwargs)
+        self.model.get_segmentations(audio)
+        embeddings = self.model.get_embeddings(audio, None)
+        num_speakers = kwargs.get("max_speakers") or len(embeddings)
+        return {
+            "start": [float(i) for i in range(len(embeddings))],
+            "end": [float(i + 1) for i in range(len(embeddings))],
+            "speaker": [f"SPEAKER_{min(i, num_speakers - 1):02d}" for i in range(len(embeddings))],
+        }
+
+
+@mock.patch("kaiwa.diarize._turns_frame", side_effect=lambda turns: turns)
+class TestRecluster:
+    """特徴量の保存と recluster() のテスト"""
+
+    @pytest.fixture
+    def features(self):
+        rng = np.random.default_rng(0)
+        window = mock.MagicMock(start=0.0, duration=10.0, step=1.0)
+        segmentations = mock.MagicMock(data=rng.random((3, 5, 3)), sliding_window=window)
+        return segmentations, rng.standard_normal((3, 3, 8))
+
+    @pytest.fixture
+    def result(self):
+        return {
+            "segments": [{
+                "start": 0.0, "end": 3.0, "text": "あいう",
+                "words": [
+                    {"word": "あ", "start": 0.1, "end": 0.9},
+                    {"word": "い", "start": 1.1, "end": 1.9},
+                    {"word": "う", "start": 2.1, "end": 2.9},
+                ],
+            }]
+        }
+
+    def _config(self):
+        return {"whisper": {"device": "cpu"}, "diarize": {}}
+
+    def test_features_saved(self, _mock_frame, features, tmp_path):
+        """話者分離時にセグメンテーション・埋め込みと時間軸の情報を保存すること"""
+        segmentations, embeddings = features
+        with mock.patch(
+            "kaiwa.diarize._load_diarization_pipeline",
+            return_value=_FakeDiarizationPipeline(segmentations, embeddings),
+        ):
+            run_diarization(np.zeros(16000 * 4), "token", self._config(), work_dir=tmp_path)
+
+        assert np.allclose(np.load(tmp_path / "03_segmentations.npy"), segmentations.data, atol=1e-3)
+        assert np.allclose(np.load(tmp_path / "03_embeddings.npy"), embeddings)
+        meta = json.loads((tmp_path / "03_diarize_features.json").read_text())
+        assert meta["sliding_window"] == {"start": 0.0, "duration": 10.0, "step": 1.0}
+        assert meta["num_samples"] == 16000 * 4
+        assert meta["speech_regions"] is None
+
+    def test_recluster_skips_feature_extraction(self, _mock_frame, features, result, tmp_path):
+        """保存済みの特徴量を使い、セグメンテーション・埋め込みを計算し直さないこと"""
+        segmentations, embeddings = features
+        with mock.patch(
+            "kaiwa.diarize._load_diarization_pipeline",
+            return_value=_FakeDiarizationPipeline(segmentations, embeddings),
+        ):
+            run_diarization(np.zeros(16000 * 4), "token", self._config(), work_dir=tmp_path)
+
+        fresh = _FakeDiarizationPipeline(None, None)
+        with mock.patch("kaiwa.diarize._load_diarization_pipeline", return_value=fresh), \
+                mock.patch("kaiwa.diarize._sliding_window_feature", side_effect=lambda data, window: data):
+            diarized = recluster(result, "token", self._config(), tmp_path, max_speakers=2)
+
+        assert fresh.model.calls == 0
+        assert fresh.calls == [{"max_speakers": 2}]
+        speakers = [seg["speaker"] for seg in diarized["segments"]]
+        assert speakers == ["SPEAKER_00", "SPEAKER_01"]
+        assert (tmp_path / "03_diarize.json").exists()
+
+    def test_recluster_maps_back_from_compacted_audio(self, _mock_frame, features, result, tmp_path):
+        """無音を除いて話者分離した特徴量は、元の時間軸に戻して割り当てること"""
+        segmentations, embeddings = features
+        config = {"whisper": {"device": "cpu"}, "diarize": {"skip_silence_min_ratio": 0.0}}
+        with mock.patch(
+            "kaiwa.diarize._load_diarization_pipeline",
+            return_value=_FakeDiarizationPipeline(segmentations, embeddings),
+        ):
+            run_diarization(
+                np.zeros(16000 * 10), "token", config,
+                speech_regions=[[2.0, 4.0], [6.0, 7.0]], work_dir=tmp_path,
+            )
+
+        meta = json.loads((tmp_path / "03_diarize_features.json").read_text())
+        assert meta["speech_regions"] == [[2.0, 4.0], [6.0, 7.0]]
+
+        with mock.patch(
+            "kaiwa.diarize._load_diarization_pipeline",
+            return_value=_FakeDiarizationPipeline(None, None),
+        ), mock.patch("kaiwa.diarize._sliding_window_feature", side_effect=lambda data, window: data), \
+                mock.patch("kaiwa.diarize.apply_diarization", side_effect=lambda turns, *a, **k: turns):
+            turns = recluster(result, "token", config, tmp_path)
+
+        assert list(zip(turns["start"], turns["end"])) == [(2.0, 3.0), (3.0, 4.0), (6.0, 7.0)]
+
+    def test_missing_features(self, _mock_frame, result, tmp_path):
+        """特徴量が保存されていなければ FileNotFoundError"""
+        with pytest.raises(FileNotFoundError):
+            recluster(result, "token", self._config(), tmp_path)
+
+    def test_stale_features_removed_when_not_captured(self, _mock_frame, tmp_path):
+        """特徴量を取得できなかった再実行では、前回の特徴量を残さないこと"""
+        (tmp_path / "03_diarize_features.json").write_text("{}")
+        model = mock.MagicMock(return_value={"start": [], "end": [], "speaker": []})
+        with mock.patch("kaiwa.diarize._load_diarization_pipeline", return_value=model):
+            run_diarization(np.zeros(16000 * 4), "token", self._config(), work_dir=tmp_path)
+
+        assert not (tmp_path / "03_diarize_features.json").exists()
+
+
+class TestDiarizePolicy:
+    """resolve_policy() / choose_policy() / label_without_diarization() のテスト"""
+
+    @pytest.mark.parametrize(
+        ("policy", "speakers", "transcript_only", "expected"),
+        [
+            ("full", None, False, "full"),
+            ("auto", None, False, "auto"),
+            ("off", None, False, "off"),
+            ("full", 1, False, "single"),
+            ("auto", 3, False, "full"),
+            ("full", 1, True, "off"),
+        ],
+    )
+    def test_resolve_policy(self, policy, speakers, transcript_only, expected):
+        """--transcript-only > --speakers 1 > diarize.policy の順に決まること"""
+        assert resolve_policy({"policy": policy}, speakers, transcript_only) == expected
+
+    def test_resolve_policy_default_and_invalid(self):
+        """未設定は full、不正な policy は ValueError"""
+        assert resolve_policy({}) == "full"
+        with pytest.raises(ValueError, match="diarize.policy"):
+            resolve_policy({"policy": "fast"})
+
+    @pytest.mark.parametrize(("single", "expected"), [(True, "single"), (False, "full")])
+    def test_choose_policy_auto(self, single, expected):
+        """auto は事前チェックの結果で single / full になること"""
+        with mock.patch("kaiwa.precheck.is_single_speaker", return_value=single) as mock_check:
+            assert choose_policy("auto", "audio", [[0.0, 1.0]], {"diarize": {"x": 1}}) == expected
+        mock_check.assert_called_once_with("audio", [[0.0, 1.0]], {"x": 1})
+
+    def test_choose_policy_passthrough(self):
+        """auto 以外は事前チェックせずにそのまま返すこと"""
+        with mock.patch("kaiwa.precheck.is_single_speaker") as mock_check:
+            assert choose_policy("full", None, None, {}) == "full"
+        mock_check.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ("policy", "skip_silence", "expected"),
+        [
+            ("auto", False, True),
+            ("full", True, True),
+            ("full", False, False),
+            ("channels", True, True),
+            ("single", True, False),
+            ("off", True, False),
+        ],
+    )
+    def test_needs_speech_regions(self, policy, skip_silence, expected):
+        """事前チェックか無音区間の除外で使う場合だけ発話区間を検出すること"""
+        assert needs_speech_regions(policy, {"skip_silence": skip_silence}) is expected
+
+    @pytest.mark.parametrize(("num_channels", "expected"), [(2, "channels"), (1, "full")])
+    def test_choose_policy_channels(self, num_channels, expected):
+        """channels は多チャンネル録音のときだけ使い、モノラルなら full にすること"""
+        with mock.patch("kaiwa.channels.probe_channels", return_value=num_channels):
+            assert choose_policy("channels", None, None, {}, audio_path=Path("a.wav")) == expected
+
+    def test_diarize_by_channels(self, tmp_path):
+        """チャンネル別の音量で単語に話者を付け、話者交代でセグメントを分割すること"""
+        channels = np.full((2, 2 * 16000), 0.01, dtype=np.float32)
+        channels[0, :16000] = 0.5
+        channels[1, 16000:] = 0.5
+        result = {"segments": [{
+            "start": 0.0, "end": 2.0, "text": "あい",
+            "words": [{"word": "あ", "start": 0.1, "end": 0.9}, {"word": "い", "start": 1.1, "end": 1.9}],
+        }]}
+
+        with mock.patch("kaiwa.channels.probe_channels", return_value=2), \
+                mock.patch("kaiwa.channels.load_channels", return_value=channels) as mock_load:
+            diarized = diarize_by_channels(Path("a.wav"), result, work_dir=tmp_path)
+
+        mock_load.assert_called_once_with(Path("a.wav"), 2)
+        assert [(seg["text"], seg["speaker"]) for seg in diarized["segments"]] == [
+            ("あ", "SPEAKER_00"),
+            ("い", "SPEAKER_01"),
+        ]
+        assert (tmp_path / "03_diarize.json").exists()
+
+    def test_label_single(self, tmp_path):
+        """single は全セグメント・単語を SPEAKER_00 にし、03_diarize.json を保存すること"""
+        result = {"segments": [{"text": "a", "words": [{"word": "a"}]}, {"text": "b"}]}
+
+        labeled = label_without_diarization(result, "single", work_dir=tmp_path)
+
+        assert [seg["speaker"] for seg in labeled["segments"]] == ["SPEAKER_00", "SPEAKER_00"]
+        assert labeled["segments"][0]["words"][0]["speaker"] == "SPEAKER_00"
+        saved = json.loads((tmp_path / "03_diarize.json").read_text(encoding="utf-8"))
+        assert saved["segments"][1]["speaker"] == "SPEAKER_00"
+
+    def test_label_off(self, tmp_path):
+        """off は話者を付けずに保存すること"""
+        result = {"segments": [{"text": "a"}]}
+        labeled = label_without_diarization(result, "off", work_dir=tmp_path)
+        assert "speaker" not in labeled["segments"][0]
+        assert (tmp_path / "03_diarize.json").exists()
+
 
 class TestDiarize:
     """diarize() のテスト"""
 
-    @mock.patch("whisperx.assign_word_speakers")
+    @mock.patch("kaiwa.diarize.assign_word_speakers")
     @mock.patch("whisperx.diarize.DiarizationPipeline")
     def test_diarize_basic(self, mock_pipeline_class, mock_assign_speakers):
         """基本的な話者分離が動作すること"""
@@ -225,7 +877,7 @@ class TestDiarize:
         assert "segments" in output
 
     @mock.patch("kaiwa.diarize._save_intermediate")
-    @mock.patch("whisperx.assign_word_speakers")
+    @mock.patch("kaiwa.diarize.assign_word_speakers")
     @mock.patch("whisperx.diarize.DiarizationPipeline")
     def test_diarize_with_work_dir(
         self, mock_pipeline_class, mock_assign_speakers, mock_save, tmp_path
@@ -262,7 +914,7 @@ class TestDiarize:
         # _save_intermediate が2回呼ばれたこと（分割前と分割後）
         assert mock_save.call_count == 2
 
-    @mock.patch("whisperx.assign_word_speakers")
+    @mock.patch("kaiwa.diarize.assign_word_speakers")
     @mock.patch("whisperx.diarize.DiarizationPipeline")
     def test_diarize_with_speaker_hints(self, mock_pipeline_class, mock_assign_speakers):
         """min_speakers/max_speakers のヒントが渡されること"""
@@ -293,7 +945,7 @@ class TestDiarize:
         assert call_kwargs["min_speakers"] == 2
         assert call_kwargs["max_speakers"] == 4
 
-    @mock.patch("whisperx.assign_word_speakers")
+    @mock.patch("kaiwa.diarize.assign_word_speakers")
     @mock.patch("whisperx.diarize.DiarizationPipeline")
     def test_diarize_config_speaker_hints(self, mock_pipeline_class, mock_assign_speakers):
         """configから話者数ヒントが取得されること"""
@@ -320,7 +972,7 @@ class TestDiarize:
         assert call_kwargs["min_speakers"] == 3
         assert call_kwargs["max_speakers"] == 5
 
-    @mock.patch("whisperx.assign_word_speakers")
+    @mock.patch("kaiwa.diarize.assign_word_speakers")
     @mock.patch("whisperx.diarize.DiarizationPipeline")
     def test_diarize_cli_overrides_config(self, mock_pipeline_class, mock_assign_speakers):
         """CLI引数がconfigより優先されること"""
@@ -367,7 +1019,7 @@ class TestDiarizeErrorHandling:
         
         assert "HuggingFace tokenが無効です" in str(exc_info.value)
 
-    @mock.patch("whisperx.assign_word_speakers")
+    @mock.patch("kaiwa.diarize.assign_word_speakers")
     @mock.patch("whisperx.diarize.DiarizationPipeline")
     def test_diarize_exception_during_processing(
         self, mock_pipeline_class, mock_assign_speakers
@@ -390,7 +1042,7 @@ class TestDiarizeErrorHandling:
         
         assert "音声処理中にエラーが発生しました" in str(exc_info.value)
 
-    @mock.patch("whisperx.assign_word_speakers")
+    @mock.patch("kaiwa.diarize.assign_word_speakers")
     @mock.patch("whisperx.diarize.DiarizationPipeline")
     def test_diarize_assign_speakers_failure(
         self, mock_pipeline_class, mock_assign_speakers
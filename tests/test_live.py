@@ -0,0 +1,212 @@
+"""kaiwa.live のテスト"""
+
+from __future__ import annotations
+
+import struct
+import wave
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from kaiwa.live import LiveTranscriber, WavTail, transcribe_live
+
+SR = 16000
+
+
+def _write_growing_wav(path: Path, samples: np.ndarray) -> None:
+    """sox の録音中と同じく、データ長 0 のヘッダーで WAV を書き始める。"""
+    fmt = struct.pack("<HHIIHH", 1, 1, SR, SR * 2, 2, 16)
+    header = (
+        b"RIFF" + struct.pack("<I", 0) + b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + struct.pack("<I", 0)
+    )
+    path.write_bytes(header + samples.astype("<i2").tobytes())
+
+
+def _append(path: Path, samples: np.ndarray) -> None:
+    with open(path, "ab") as f:
+        f.write(samples.astype("<i2").tobytes())
+
+
+class TestWavTail:
+    """WavTail のテスト"""
+
+    def test_reads_only_new_samples(self, tmp_path):
+        """前回以降に追記されたサンプルだけを返すこと"""
+        path = tmp_path / "rec.wav"
+        _write_growing_wav(path, np.array([0, 16384], dtype=np.int16))
+        tail = WavTail(path)
+
+        first = tail.read_new()
+        np.testing.assert_allclose(first, [0.0, 0.5])
+
+        _append(path, np.array([-32768], dtype=np.int16))
+        second = tail.read_new()
+        np.testing.assert_allclose(second, [-1.0])
+
+        assert len(tail.read_new()) == 0
+
+    def test_partial_sample_deferred(self, tmp_path):
+        """サンプル途中までの書き込みは次回に持ち越すこと"""
+        path = tmp_path / "rec.wav"
+        _write_growing_wav(path, np.array([100], dtype=np.int16))
+        with open(path, "ab") as f:
+            f.write(b"\x01")  # 1 バイトだけ
+        tail = WavTail(path)
+
+        assert len(tail.read_new()) == 1
+        with open(path, "ab") as f:
+            f.write(b"\x00")
+        assert len(tail.read_new()) == 1
+
+    def test_header_not_yet_written(self, tmp_path):
+        """ヘッダー書き込み前は空配列を返すこと"""
+        path = tmp_path / "rec.wav"
+        path.write_bytes(b"RIFF")
+        assert len(WavTail(path).read_new()) == 0
+
+    def test_finalized_wav(self, tmp_path):
+        """通常の（録音完了済み）WAV も読めること"""
+        path = tmp_path / "rec.wav"
+        with wave.open(str(path), "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(SR)
+            wf.writeframes(b"\x00\x00" * 100)
+        assert len(WavTail(path).read_new()) == 100
+
+    def test_rejects_stereo(self, tmp_path):
+        """16kHz/モノラル/16bit 以外は拒否すること"""
+        path = tmp_path / "rec.wav"
+        with wave.open(str(path), "wb") as wf:
+            wf.setnchannels(2)
+            wf.setsampwidth(2)
+            wf.setframerate(SR)
+            wf.writeframes(b"\x00\x00" * 100)
+        with pytest.raises(ValueError):
+            WavTail(path).read_new()
+
+
+def _fake_model():
+    """入力チャンク長を text に入れたセグメントを1つ返すモデル"""
+    model = mock.MagicMock()
+
+    def fake_transcribe(chunk, **kwargs):
+        seg = mock.MagicMock(start=0.5, end=1.0, text=str(len(chunk)), words=[])
+        return iter([seg]), mock.MagicMock(language="ja")
+
+    model.transcribe.side_effect = fake_transcribe
+    return model
+
+
+class TestLiveTranscriber:
+    """LiveTranscriber のテスト"""
+
+    CONFIG = {"live": {"min_window_seconds": 10, "min_silence_seconds": 1.0}}
+
+    @mock.patch("kaiwa.live._detect_speech")
+    @mock.patch("kaiwa.live._load_whisper_model")
+    def test_window_finalized_at_silence(self, mock_load, mock_detect):
+        """十分な無音で区切りが確定した区間だけを文字起こしすること"""
+        mock_load.return_value = _fake_model()
+        live = LiveTranscriber(self.CONFIG)
+
+        live.feed(np.zeros(5 * SR, dtype=np.float32))
+        assert live.process_ready() is False  # min_window 未満
+        assert not mock_detect.called
+
+        live.feed(np.zeros(10 * SR, dtype=np.float32))
+        # 0-11s 発話, 11-13s 無音, 13-15s 発話中
+        mock_detect.return_value = [(0, 11 * SR), (13 * SR, 15 * SR)]
+        assert live.process_ready() is True
+
+        assert len(live.segments) == 1
+        assert live.segments[0]["text"] == str(12 * SR)  # 無音の中点 12s で切る
+
+        # 次の区間のタイムスタンプは全体の時間軸に戻されること
+        audio, result = live.finish()
+        assert len(audio) == 15 * SR
+        assert result["segments"][1]["start"] == pytest.approx(12.5)
+        assert result["language"] == "ja"
+
+    @mock.patch("kaiwa.live._detect_speech")
+    @mock.patch("kaiwa.live._load_whisper_model")
+    def test_no_cut_while_speaking(self, mock_load, mock_detect):
+        """発話が続いている間は確定しないこと"""
+        mock_load.return_value = _fake_model()
+        live = LiveTranscriber(self.CONFIG)
+
+        live.feed(np.zeros(15 * SR, dtype=np.float32))
+        mock_detect.return_value = [(0, 15 * SR)]
+        assert live.process_ready() is False
+        assert live.segments == []
+
+    @mock.patch("kaiwa.live._load_whisper_model")
+    def test_job_slot_only_while_transcribing(self, mock_load):
+        """区間の文字起こし中だけ実行中のジョブとして数え、録音を待つ間は数えないこと"""
+        from kaiwa.threads import active_jobs
+
+        counts = []
+        model = _fake_model()
+        transcribe = model.transcribe.side_effect
+
+        def counting_transcribe(chunk, **kwargs):
+            counts.append(active_jobs())
+            return transcribe(chunk, **kwargs)
+
+        model.transcribe.side_effect = counting_transcribe
+        mock_load.return_value = model
+        live = LiveTranscriber(self.CONFIG)
+        live.feed(np.zeros(2 * SR, dtype=np.float32))
+
+        assert active_jobs() == 0
+        live.finish()
+        assert counts == [1]
+        assert active_jobs() == 0
+
+    @mock.patch("kaiwa.live._load_whisper_model")
+    def test_buffer_growth_keeps_samples(self, mock_load):
+        """バッファ拡張後も全サンプルが保持されること"""
+        mock_load.return_value = _fake_model()
+        live = LiveTranscriber(self.CONFIG)
+
+        chunks = [np.full(45 * SR, i, dtype=np.float32) for i in range(3)]
+        for chunk in chunks:
+            live.feed(chunk)
+
+        np.testing.assert_array_equal(live.audio, np.concatenate(chunks))
+
+
+class TestTranscribeLive:
+    """transcribe_live() のテスト"""
+
+    @mock.patch("kaiwa.live._save_intermediate")
+    @mock.patch("kaiwa.live._is_running")
+    @mock.patch("kaiwa.live._detect_speech", return_value=[])
+    @mock.patch("kaiwa.live._load_whisper_model")
+    def test_runs_until_recorder_stops(
+        self, mock_load, mock_detect, mock_running, mock_save, tmp_path
+    ):
+        """録音プロセス終了後に残りを処理し、中間成果物を保存すること"""
+        mock_load.return_value = _fake_model()
+        path = tmp_path / "rec.wav"
+        _write_growing_wav(path, np.zeros(SR, dtype=np.int16))
+
+        def recorder_state():
+            yield True
+            _append(path, np.zeros(SR, dtype=np.int16))
+            yield False
+
+        mock_running.side_effect = recorder_state()
+
+        with mock.patch("kaiwa.live.time.sleep"):
+            audio, result, _ = transcribe_live(
+                path, 12345, {"live": {"min_window_seconds": 30}}, work_dir=tmp_path
+            )
+
+        assert len(audio) == 2 * SR
+        assert len(result["segments"]) == 1
+        assert "01_transcribe.json" in str(mock_save.call_args[0][0])
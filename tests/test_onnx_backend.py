@@ -0,0 +1,140 @@
+"""kaiwa.onnx_backend のテスト"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import types
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from kaiwa.onnx_backend import _OnnxForward, _ResNetForward, select_backend
+
+
+class _Module:
+    """forward をクラスに持つ torch モジュールの代わり。"""
+
+    def forward(self, *args):
+        return "torch"
+
+
+class _FakeSession:
+    def __init__(self, names=("waveforms",)):
+        self.names = names
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name=name) for name in self.names]
+
+
+def _pipeline() -> types.SimpleNamespace:
+    """セグメンテーションと WeSpeaker 埋め込みを持つ SpeakerDiarization の代わり。"""
+    embedding = types.SimpleNamespace(resnet=_Module(), compute_fbank=lambda waveforms: waveforms)
+    return types.SimpleNamespace(
+        _segmentation=types.SimpleNamespace(model=_Module(), duration=10.0),
+        _embedding=types.SimpleNamespace(model_=embedding),
+    )
+
+
+@pytest.fixture
+def fake_onnxruntime():
+    """onnxruntime がインストールされている状態にする（エクスポートとセッションはモック）。"""
+    with mock.patch.dict(sys.modules, {"onnxruntime": types.ModuleType("onnxruntime")}), \
+            mock.patch("kaiwa.onnx_backend.export_onnx", side_effect=lambda name, *a: Path(f"{name}.onnx")) as export, \
+            mock.patch("kaiwa.onnx_backend._create_session", return_value=_FakeSession()):
+        yield export
+
+
+class TestSelectBackend:
+    """select_backend() のテスト"""
+
+    def test_invalid_backend(self):
+        """不正な backend は ValueError"""
+        with pytest.raises(ValueError, match="diarize.backend"):
+            select_backend(_pipeline(), {"backend": "tensorrt"})
+
+    def test_replaces_forward(self, fake_onnxruntime):
+        """セグメンテーションと埋め込みの ResNet の forward を ONNX Runtime に置き換えること"""
+        pipeline = _pipeline()
+
+        select_backend(pipeline, {"backend": "onnx", "onnx_cache_dir": "/tmp/x"}, num_threads=3)
+
+        segmentation = pipeline._segmentation.model
+        resnet = pipeline._embedding.model_.resnet
+        assert type(segmentation.forward) is _OnnxForward
+        assert type(resnet.forward) is _ResNetForward
+        assert segmentation.forward.threads == 3
+        assert [call.args[0] for call in fake_onnxruntime.call_args_list] == ["segmentation", "embedding"]
+        assert fake_onnxruntime.call_args[0][3] == Path("/tmp/x")
+
+    def test_reuses_and_restores(self, fake_onnxruntime):
+        """同じスレッド数なら再エクスポートせず、torch に戻すと元の forward を使うこと"""
+        pipeline = _pipeline()
+        select_backend(pipeline, {"backend": "onnx", "onnx_threads": 2})
+        select_backend(pipeline, {"backend": "onnx", "onnx_threads": 2})
+        assert fake_onnxruntime.call_count == 2
+
+        select_backend(pipeline, {"backend": "onnx", "onnx_threads": 4})
+        assert pipeline._segmentation.model.forward.threads == 4
+
+        select_backend(pipeline, {})
+        assert pipeline._segmentation.model.forward() == "torch"
+        assert pipeline._embedding.model_.resnet.forward() == "torch"
+
+    def test_without_onnxruntime(self, caplog):
+        """onnxruntime がなければ警告して torch のまま実行すること"""
+        pipeline = _pipeline()
+        with mock.patch.dict(sys.modules, {"onnxruntime": None}), \
+                caplog.at_level(logging.WARNING, logger="kaiwa"):
+            select_backend(pipeline, {"backend": "onnx"})
+
+        assert pipeline._segmentation.model.forward() == "torch"
+        assert "onnxruntime" in caplog.text
+
+    def test_non_wespeaker_embedding_kept(self, fake_onnxruntime):
+        """WeSpeaker 以外の埋め込みモデルは置き換えないこと"""
+        pipeline = _pipeline()
+        pipeline._embedding = types.SimpleNamespace(model_=_Module())
+
+        select_backend(pipeline, {"backend": "onnx"})
+
+        assert [call.args[0] for call in fake_onnxruntime.call_args_list] == ["segmentation"]
+
+
+class TestOnnxEquivalence:
+    """実際に ONNX へエクスポートして torch と同じ出力になることを確認する。"""
+
+    def test_segmentation_like_model(self, tmp_path):
+        """Conv1d + LSTM + Linear のモデルで、バッチサイズを変えても torch と一致すること"""
+        torch = pytest.importorskip("torch")
+        pytest.importorskip("torch.onnx")
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+
+        class TinySegmentation(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.conv = torch.nn.Conv1d(1, 8, kernel_size=251, stride=160)
+                self.lstm = torch.nn.LSTM(8, 16, num_layers=2, bidirectional=True, batch_first=True)
+                self.linear = torch.nn.Linear(32, 7)
+
+            def forward(self, waveforms):
+                features = self.conv(waveforms).transpose(1, 2)
+                return torch.log_softmax(self.linear(self.lstm(features)[0]), dim=-1)
+
+        torch.manual_seed(0)
+        model = TinySegmentation().eval()
+        pipeline = types.SimpleNamespace(_segmentation=types.SimpleNamespace(model=model, duration=0.5))
+        chunks = torch.randn(3, 1, 8000)
+        with torch.inference_mode():
+            expected = model(chunks).numpy()
+
+        select_backend(pipeline, {"backend": "onnx", "onnx_cache_dir": str(tmp_path), "onnx_threads": 1})
+        with torch.inference_mode():
+            actual = model(chunks).numpy()
+
+        assert isinstance(model.__dict__["forward"], _OnnxForward)
+        assert len(list(tmp_path.glob("segmentation-*.onnx"))) == 1
+        np.testing.assert_allclose(actual, expected, atol=1e-4)
@@ -3,10 +3,11 @@
 from __future__ import annotations
 
 from pathlib import Path
+from unittest import mock
 
 import pytest
 
-from kaiwa.output import _sanitize_filename, generate_markdown
+from kaiwa.output import MarkdownDraft, _sanitize_filename, generate_markdown
 
 
 class TestSanitizeFilename:
@@ -193,3 +194,84 @@ class TestGenerateMarkdown:
         assert "/" not in output_file.name
         assert ":" not in output_file.name
         assert output_file.exists()
+
+
+class TestMarkdownDraft:
+    """MarkdownDraft のテスト"""
+
+    @pytest.fixture
+    def draft_config(self, tmp_path: Path, sample_config: dict) -> dict:
+        sample_config["paths"]["output"] = str(tmp_path)
+        sample_config["claude"]["stream_interval"] = 60
+        return sample_config
+
+    def test_writes_progress_beside_final_path(
+        self, tmp_path: Path, sample_transcript_lines: list[str], draft_config: dict
+    ):
+        """途中経過を最終出力の隣の .partial.md に書き、最終出力の後に削除されること"""
+        draft = MarkdownDraft(sample_transcript_lines, Path("/tmp/a.wav"), draft_config)
+        draft.update("週次定例", "- 要点1")
+
+        assert draft.path is not None
+        assert draft.path.name.startswith(".") and draft.path.name.endswith("_週次定例.partial.md")
+        content = draft.path.read_text(encoding="utf-8")
+        assert "# 週次定例" in content
+        assert "- 要点1" in content
+        assert "要約を生成中" in content
+        assert "SPEAKER_00: こんにちは" in content
+        assert not list(tmp_path.glob(".*.tmp"))
+
+        output_file = generate_markdown(
+            sample_transcript_lines, "- 要点1\n- 要点2", Path("/tmp/a.wav"), 1.0, draft_config,
+            title="週次定例",
+        )
+        draft.finish()
+
+        assert output_file.exists()
+        assert [p.name for p in tmp_path.glob("*.md")] == [output_file.name]
+        assert "要約を生成中" not in output_file.read_text(encoding="utf-8")
+
+    def test_throttles_writes(self, sample_transcript_lines: list[str], draft_config: dict):
+        """同じタイトルの間は stream_interval 秒に1回だけ書き込むこと"""
+        draft = MarkdownDraft(sample_transcript_lines, Path("/tmp/a.wav"), draft_config)
+        with mock.patch("kaiwa.output.time.monotonic", side_effect=[0.0, 1.0, 61.0]):
+            draft.update("会議", "- 1")
+            draft.update("会議", "- 1\n- 2")
+            assert "- 2" not in draft.path.read_text(encoding="utf-8")
+            draft.update("会議", "- 1\n- 2\n- 3")
+        assert "- 3" in draft.path.read_text(encoding="utf-8")
+
+    def test_title_change_moves_file(
+        self, tmp_path: Path, sample_transcript_lines: list[str], draft_config: dict
+    ):
+        """タイトルが変わったら古い途中経過を削除し、finish で残りも削除すること"""
+        draft = MarkdownDraft(sample_transcript_lines, Path("/tmp/a.wav"), draft_config)
+        draft.update(None, "- 1")
+        first = draft.path
+        draft.update("会議", "- 1")
+
+        assert not first.exists()
+        assert draft.path.exists()
+
+        draft.finish()
+        assert not list(tmp_path.glob("*.md"))
+
+    def test_existing_output_untouched(
+        self, tmp_path: Path, sample_transcript_lines: list[str], draft_config: dict
+    ):
+        """同じ日・同じタイトルの既存の出力を、途中経過で上書きしたり要約失敗時に削除したりしないこと"""
+        draft = MarkdownDraft(sample_transcript_lines, Path("/tmp/a.wav"), draft_config)
+        existing = tmp_path / f"{draft.started.strftime('%Y%m%d')}_週次定例.md"
+        existing.write_text("以前の文字起こし", encoding="utf-8")
+
+        draft.update("週次定例", "- 要点1")
+        assert existing.read_text(encoding="utf-8") == "以前の文字起こし"
+
+        # 要約が失敗するとタイトルなしの別ファイルが最終出力になる
+        output_file = generate_markdown(
+            sample_transcript_lines, None, Path("/tmp/a.wav"), 1.0, draft_config
+        )
+        draft.finish()
+
+        assert existing.read_text(encoding="utf-8") == "以前の文字起こし"
+        assert sorted(p.name for p in tmp_path.glob("*.md")) == sorted([existing.name, output_file.name])
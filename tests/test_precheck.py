@@ -0,0 +1,85 @@
+"""kaiwa.precheck のテスト"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from kaiwa.precheck import _sample_windows, is_single_speaker
+from kaiwa.transcribe import SAMPLE_RATE
+
+# 母音のフォルマント周波数（Hz）
+_VOWELS = [(730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240), (530, 1840, 2480), (570, 840, 2410)]
+
+
+def _speak(rng: np.random.Generator, f0: float, formant_scale: float, seconds: float) -> np.ndarray:
+    """基本周波数とフォルマントで声質を決めた、母音と子音（雑音）が続く合成音声。"""
+    pieces = []
+    total = 0.0
+    while total < seconds:
+        duration = rng.uniform(0.08, 0.25)
+        n = int(duration * SAMPLE_RATE)
+        if rng.random() < 0.25:
+            piece = 0.05 * rng.standard_normal(n)
+        else:
+            f = f0 * rng.uniform(0.9, 1.1)
+            formants = np.array(_VOWELS[rng.integers(len(_VOWELS))]) * formant_scale
+            harmonics = np.arange(1, int(3800 / f))
+            amp = sum(1 / (1 + ((harmonics * f - F) / (80 + 0.05 * F)) ** 2) for F in formants)
+            t = np.arange(n) / SAMPLE_RATE
+            phase = rng.uniform(0, 2 * np.pi, len(harmonics))[:, None]
+            piece = (amp[:, None] / np.sqrt(harmonics)[:, None]
+                     * np.sin(2 * np.pi * f * harmonics[:, None] * t + phase)).sum(axis=0)
+            piece /= np.abs(piece).max() + 1e-9
+        pieces.append(piece * rng.uniform(0.3, 1.0))
+        total += duration
+    audio = np.concatenate(pieces)[: int(seconds * SAMPLE_RATE)]
+    return (audio + 0.003 * rng.standard_normal(len(audio))).astype(np.float32)
+
+
+_LOW = (120, 1.0)
+_HIGH = (210, 1.15)
+_CFG = {"precheck_windows": 6, "precheck_window_seconds": 8, "single_speaker_threshold": 1.5}
+
+
+class TestIsSingleSpeaker:
+    """is_single_speaker() のテスト"""
+
+    @pytest.mark.parametrize("voice", [_LOW, _HIGH])
+    def test_single_voice(self, voice):
+        """1人の声だけの録音は単一話者と判定されること"""
+        audio = _speak(np.random.default_rng(0), *voice, seconds=60)
+        assert is_single_speaker(audio, None, _CFG) is True
+
+    def test_two_voices(self):
+        """途中で別の声に交代する録音は単一話者と判定されないこと"""
+        rng = np.random.default_rng(1)
+        audio = np.concatenate([_speak(rng, *_LOW, seconds=30), _speak(rng, *_HIGH, seconds=30)])
+        assert is_single_speaker(audio, None, _CFG) is False
+
+    def test_short_speech_is_single(self):
+        """比較できるほど発話がない場合は単一話者として扱うこと"""
+        audio = _speak(np.random.default_rng(2), *_LOW, seconds=10)
+        assert is_single_speaker(audio, [[0.0, 3.0]], _CFG) is True
+
+
+class TestSampleWindows:
+    """_sample_windows() のテスト"""
+
+    def test_windows_inside_speech_regions(self):
+        """ウィンドウが発話区間をまたがず、等間隔に選ばれること"""
+        regions = [[0.0, 20.0], [30.0, 31.0], [40.0, 60.0]]
+        windows = _sample_windows(regions, 60 * SAMPLE_RATE, count=4, window_seconds=8)
+
+        assert len(windows) == 4
+        for start, end in windows:
+            assert end - start == 8 * SAMPLE_RATE
+            assert any(s * SAMPLE_RATE <= start and end <= e * SAMPLE_RATE for s, e in regions)
+        assert windows[0][0] == 0
+        assert windows[-1][1] == 60 * SAMPLE_RATE
+
+    def test_window_shrinks_for_short_speech(self):
+        """発話が短いとウィンドウを縮め、2秒未満になるなら空になること"""
+        windows = _sample_windows([[0.0, 10.0]], 10 * SAMPLE_RATE, count=8, window_seconds=8)
+        assert {end - start for start, end in windows} == {5 * SAMPLE_RATE}
+        assert _sample_windows([[0.0, 3.0]], 10 * SAMPLE_RATE, count=8, window_seconds=8) == []
@@ -0,0 +1,156 @@
+"""kaiwa.profiles のテスト"""
+
+from __future__ import annotations
+
+import json
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from kaiwa.profiles import (
+    PROFILES,
+    benchmark,
+    decode_options,
+    resolve_speed_settings,
+    select_profile,
+)
+
+
+@pytest.fixture
+def speed_profile_path(tmp_path):
+    path = tmp_path / "speed_profile.json"
+    with mock.patch("kaiwa.profiles.SPEED_PROFILE_PATH", path):
+        yield path
+
+
+class TestResolveSpeedSettings:
+    """resolve_speed_settings() のテスト"""
+
+    def test_legacy_without_profile(self):
+        """profile 未指定なら従来どおり float32 で追加オプションなし"""
+        settings = resolve_speed_settings({})
+        assert settings["compute_type"] == "float32"
+        assert settings["cpu_threads"] == 0
+        assert decode_options(settings) == {}
+
+    def test_named_profile(self):
+        """名前付きプロファイルの設定が使われること"""
+        settings = resolve_speed_settings({"profile": "fast"})
+        assert settings["compute_type"] == "int8"
+        assert decode_options(settings) == {
+            "beam_size": 1,
+            "vad_parameters": {"min_silence_duration_ms": 500},
+        }
+
+    def test_explicit_keys_override_profile(self):
+        """個別キーの指定がプロファイルより優先されること（None は無視）"""
+        settings = resolve_speed_settings({
+            "profile": "fast",
+            "compute_type": "float32",
+            "beam_size": None,
+            "cpu_threads": 4,
+        })
+        assert settings["compute_type"] == "float32"
+        assert settings["beam_size"] == 1
+        assert settings["cpu_threads"] == 4
+
+    def test_invalid_profile(self):
+        """不正な profile は ValueError"""
+        with pytest.raises(ValueError):
+            resolve_speed_settings({"profile": "turbo"})
+
+
+class TestAutoProfile:
+    """profile: auto のテスト"""
+
+    CFG = {"profile": "auto", "model": "large-v3-turbo", "device": "cpu", "profile_target_rtf": 0.5}
+
+    @mock.patch("kaiwa.profiles.benchmark")
+    def test_benchmark_once_and_persist(self, mock_benchmark, speed_profile_path):
+        """初回だけ計測し、結果を保存して以降は再利用すること"""
+        mock_benchmark.return_value = {"fast": 0.1, "balanced": 0.3, "accurate": 0.8}
+        audio = np.zeros(16000, dtype=np.float32)
+
+        settings = resolve_speed_settings(self.CFG, audio)
+        assert settings["profile"] == "balanced"
+        assert settings["compute_type"] == "int8_float32"
+
+        stored = json.loads(speed_profile_path.read_text())
+        assert stored["profile"] == "balanced"
+        assert stored["rtf"]["accurate"] == 0.8
+
+        # 2回目は計測しない（音声がなくても保存済みの結果を使う）
+        assert resolve_speed_settings(self.CFG)["profile"] == "balanced"
+        mock_benchmark.assert_called_once()
+
+    @mock.patch("kaiwa.profiles.benchmark")
+    def test_remeasure_when_model_changes(self, mock_benchmark, speed_profile_path):
+        """モデルが変わったら計測し直すこと"""
+        speed_profile_path.write_text(json.dumps(
+            {"profile": "accurate", "model": "small", "device": "cpu"}
+        ))
+        mock_benchmark.return_value = {"fast": 0.6, "balanced": 0.9, "accurate": 1.5}
+
+        settings = resolve_speed_settings(self.CFG, np.zeros(16000, dtype=np.float32))
+        assert settings["profile"] == "fast"
+        mock_benchmark.assert_called_once()
+
+    @mock.patch("kaiwa.profiles.benchmark")
+    def test_no_audio_falls_back(self, mock_benchmark, speed_profile_path):
+        """未計測で音声もなければ計測せず balanced を使うこと"""
+        assert resolve_speed_settings(self.CFG)["profile"] == "balanced"
+        mock_benchmark.assert_not_called()
+        assert not speed_profile_path.exists()
+
+
+class TestSelectProfile:
+    """select_profile() のテスト"""
+
+    def test_most_accurate_within_target(self):
+        """目標 RTF 以内で最も精度の高いものを選ぶこと"""
+        assert select_profile({"fast": 0.1, "balanced": 0.2, "accurate": 0.4}, 0.5) == "accurate"
+        assert select_profile({"fast": 0.1, "balanced": 0.2, "accurate": 0.6}, 0.5) == "balanced"
+
+    def test_fastest_when_none_meet_target(self):
+        """どれも目標を満たさなければ最速のもの"""
+        assert select_profile({"fast": 0.9, "balanced": 1.2, "accurate": 2.0}, 0.5) == "fast"
+
+
+class TestBenchmark:
+    """benchmark() のテスト"""
+
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_models_not_cached(self, mock_whisper_model):
+        """計測用のモデルは常駐サーバーのモデルキャッシュに残らないこと"""
+        mock_whisper_model.return_value.transcribe.return_value = (iter([]), mock.MagicMock())
+        audio = np.zeros(16000 * 5, dtype=np.float32)
+
+        with mock.patch("kaiwa.utils._MODEL_CACHE", {}) as cache:
+            rtf = benchmark(audio, "small", "cpu", "ja")
+
+        assert set(rtf) == set(PROFILES)
+        assert cache == {}
+        assert mock_whisper_model.call_count == len(PROFILES)
+
+
+@pytest.mark.usefixtures("mock_vad")
+class TestTranscribeUsesProfile:
+    """transcribe() がプロファイルを適用すること"""
+
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_profile_applied(self, mock_whisper_model, mock_whisperx, tmp_audio_file):
+        """compute_type / cpu_threads / beam_size が WhisperModel と transcribe に渡ること"""
+        from kaiwa.transcribe import transcribe
+
+        mock_model = mock_whisper_model.return_value
+        mock_model.transcribe.return_value = (iter([]), mock.MagicMock(language="ja"))
+
+        transcribe(tmp_audio_file, {"whisper": {"profile": "fast", "cpu_threads": 4}})
+
+        mock_whisper_model.assert_called_once_with(
+            "large-v3-turbo", device="cpu", compute_type="int8", cpu_threads=4
+        )
+        call_kwargs = mock_model.transcribe.call_args[1]
+        assert call_kwargs["beam_size"] == PROFILES["fast"]["beam_size"]
+        assert call_kwargs["vad_parameters"] == {"min_silence_duration_ms": 500}
@@ -0,0 +1,136 @@
+"""kaiwa.server のテスト"""
+
+from __future__ import annotations
+
+import socketserver
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from kaiwa.server import _JobHandler, _run_job, serve, submit_job
+
+
+@pytest.fixture
+def socket_path():
+    """AF_UNIX のパス長制限に収まる短いソケットパスを返す。"""
+    with tempfile.TemporaryDirectory(prefix="kw") as d:
+        yield Path(d) / "s.sock"
+
+
+@pytest.fixture
+def running_server(socket_path):
+    """_JobHandler を使うサーバーをバックグラウンドで起動する。"""
+    server = socketserver.UnixStreamServer(str(socket_path), _JobHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+class TestSubmitJob:
+    """submit_job() のテスト"""
+
+    def test_no_socket_returns_none(self, socket_path):
+        """ソケットがなければ None（プロセス内処理へフォールバック）"""
+        assert submit_job(Path("/tmp/a.wav"), socket_path=socket_path) is None
+
+    def test_stale_socket_returns_none(self, socket_path):
+        """ソケットファイルだけ残っている場合も None"""
+        server = socketserver.UnixStreamServer(str(socket_path), _JobHandler)
+        server.server_close()  # ファイルは残るが listen していない
+        assert socket_path.exists()
+
+        assert submit_job(Path("/tmp/a.wav"), socket_path=socket_path) is None
+
+    def test_roundtrip(self, running_server):
+        """ジョブが送信され、サーバーの終了コードが返ること"""
+        with mock.patch("kaiwa.server._run_job", return_value=0) as mock_run:
+            exit_code = submit_job(
+                Path("/tmp/a.wav"),
+                min_speakers=2,
+                max_speakers=3,
+                socket_path=running_server,
+                speakers=1,
+            )
+
+        assert exit_code == 0
+        request = mock_run.call_args[0][0]
+        assert request == {
+            "audio_file": "/tmp/a.wav",
+            "min_speakers": 2,
+            "max_speakers": 3,
+            "from_step": None,
+            "speakers": 1,
+            "transcript_only": False,
+        }
+
+    def test_roundtrip_error_code(self, running_server):
+        """サーバー側の失敗が終了コードとして伝わること"""
+        with mock.patch("kaiwa.server._run_job", return_value=1):
+            assert submit_job(Path("/tmp/a.wav"), socket_path=running_server) == 1
+
+
+class TestRunJob:
+    """_run_job() のテスト"""
+
+    def test_success(self):
+        """正常終了で 0 を返し、サーバーへ再委譲しないこと"""
+        with mock.patch("kaiwa.cli.cmd_process") as mock_cmd:
+            assert _run_job({"audio_file": "/tmp/a.wav"}) == 0
+
+        args = mock_cmd.call_args[0][0]
+        assert args.audio_file == "/tmp/a.wav"
+        assert args.daemon is False
+        assert args.speakers is None
+        assert args.transcript_only is False
+
+    def test_diarize_policy_passed(self):
+        """--speakers / --transcript-only がプロセス内パイプラインに渡ること"""
+        with mock.patch("kaiwa.cli.cmd_process") as mock_cmd:
+            _run_job({"audio_file": "/tmp/a.wav", "speakers": 1, "transcript_only": True})
+
+        args = mock_cmd.call_args[0][0]
+        assert args.speakers == 1
+        assert args.transcript_only is True
+
+    def test_system_exit(self):
+        """cmd_process の sys.exit がコードに変換されること"""
+        with mock.patch("kaiwa.cli.cmd_process", side_effect=SystemExit(1)):
+            assert _run_job({"audio_file": "/tmp/a.wav"}) == 1
+
+    @mock.patch("kaiwa.server.notify")
+    def test_exception(self, mock_notify):
+        """予期しない例外でもサーバーは落ちずに 1 を返すこと"""
+        with mock.patch("kaiwa.cli.cmd_process", side_effect=RuntimeError("boom")):
+            assert _run_job({"audio_file": "/tmp/a.wav"}) == 1
+
+
+class TestServe:
+    """serve() のテスト"""
+
+    def test_refuses_when_already_running(self, running_server):
+        """既に起動中のサーバーがあればエラー"""
+        with pytest.raises(RuntimeError):
+            serve({}, "hf-token", socket_path=running_server)
+
+    @mock.patch("kaiwa.server.enable_model_cache")
+    @mock.patch("kaiwa.server._preload_models")
+    @mock.patch("kaiwa.server.socketserver.UnixStreamServer")
+    def test_removes_stale_socket(
+        self, mock_server_class, mock_preload, mock_enable_cache, socket_path
+    ):
+        """前回の残骸ソケットを削除して起動すること"""
+        socket_path.touch()
+        mock_server_class.return_value.serve_forever.side_effect = KeyboardInterrupt
+
+        with mock.patch("kaiwa.server.os.chmod"):
+            with pytest.raises(KeyboardInterrupt):
+                serve({}, "hf-token", socket_path=socket_path)
+
+        assert mock_enable_cache.called
+        assert mock_preload.called
+        assert not socket_path.exists()
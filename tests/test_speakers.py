@@ -0,0 +1,295 @@
+"""kaiwa.speakers のテスト"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from kaiwa.speakers import SpeakerStore, identify_speakers
+
+DIM = 256
+
+
+def _voice(rng: np.random.Generator, base: np.ndarray, noise: float = 0.1) -> list[float]:
+    """base の近くにある埋め込み（同じ人の別録音を想定）を返す。"""
+    return (base + noise * rng.standard_normal(DIM)).tolist()
+
+
+@pytest.fixture
+def voices():
+    rng = np.random.default_rng(0)
+    return rng, {name: rng.standard_normal(DIM) for name in ("田中", "佐藤", "鈴木")}
+
+
+class TestSpeakerStore:
+    """SpeakerStore のテスト"""
+
+    def test_enroll_and_match(self, tmp_path, voices):
+        """名前を登録した話者が別の録音で照合されること"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"]), "SPEAKER_01": _voice(rng, base["佐藤"])})
+        store.enroll("rec1", "SPEAKER_00", "田中")
+        store.enroll("rec1", "SPEAKER_01", "佐藤")
+
+        # 別インスタンス（保存済みファイル）から照合する
+        mapping = SpeakerStore(tmp_path).match(
+            {
+                "SPEAKER_00": _voice(rng, base["佐藤"]),
+                "SPEAKER_01": _voice(rng, base["田中"]),
+                "SPEAKER_02": _voice(rng, base["鈴木"]),  # 未登録の人は対応付けない
+            },
+            threshold=0.75,
+        )
+        assert mapping == {"SPEAKER_00": "佐藤", "SPEAKER_01": "田中"}
+
+    def test_one_to_one(self, tmp_path, voices):
+        """同じ名前に2人の話者を対応付けないこと"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+        store.enroll("rec1", "SPEAKER_00", "田中")
+
+        mapping = store.match(
+            {"SPEAKER_00": _voice(rng, base["田中"], 0.5), "SPEAKER_01": _voice(rng, base["田中"], 0.05)},
+            threshold=0.5,
+        )
+        assert mapping == {"SPEAKER_01": "田中"}
+
+    def test_rerun_keeps_names(self, tmp_path, voices):
+        """同じ録音を再処理しても行が重複せず、登録済みの名前を引き継ぐこと"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+        store.enroll("rec1", "SPEAKER_00", "田中")
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+
+        assert store.entries == [{"recording": "rec1", "title": None, "label": "SPEAKER_00", "name": "田中"}]
+
+    def test_same_title_different_recordings(self, tmp_path, voices):
+        """同じ名前の別の録音（内容ハッシュが異なる）は行を置き換えず、名前も引き継がないこと"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("hash-a", {"SPEAKER_00": _voice(rng, base["田中"])}, title="New Recording")
+        store.enroll("hash-a", "SPEAKER_00", "田中")
+        store.add_recording("hash-b", {"SPEAKER_00": _voice(rng, base["佐藤"])}, title="New Recording")
+
+        assert store.entries == [
+            {"recording": "hash-a", "title": "New Recording", "label": "SPEAKER_00", "name": "田中"},
+            {"recording": "hash-b", "title": "New Recording", "label": "SPEAKER_00", "name": None},
+        ]
+
+    def test_resolve_recording(self, tmp_path, voices):
+        """識別子の先頭や録音名で録音を指定でき、同じ名前の録音が複数あれば ValueError"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("abc123", {"SPEAKER_00": _voice(rng, base["田中"])}, title="New Recording")
+        store.add_recording("def456", {"SPEAKER_00": _voice(rng, base["佐藤"])}, title="New Recording")
+        store.add_recording("0789ab", {"SPEAKER_00": _voice(rng, base["鈴木"])}, title="20260301_1000")
+
+        assert store.resolve_recording("abc") == "abc123"
+        assert store.resolve_recording("20260301_1000") == "0789ab"
+        with pytest.raises(ValueError):
+            store.resolve_recording("New Recording")
+        with pytest.raises(KeyError):
+            store.resolve_recording("zzz")
+
+    def test_enroll_unknown_raises(self, tmp_path):
+        """保存されていない話者の登録は KeyError"""
+        with pytest.raises(KeyError):
+            SpeakerStore(tmp_path).enroll("rec1", "SPEAKER_00", "田中")
+
+    def test_forget(self, tmp_path, voices):
+        """登録を解除すると照合されなくなること（埋め込みは残る）"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+        store.enroll("rec1", "SPEAKER_00", "田中")
+
+        assert store.forget("田中") == 1
+        assert store.names() == {}
+        assert store.match({"SPEAKER_00": _voice(rng, base["田中"])}, 0.5) == {}
+        assert len(store.entries) == 1
+
+    def test_dimension_mismatch_skipped(self, tmp_path, voices):
+        """次元の異なる埋め込みは追加・照合しないこと"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+        store.enroll("rec1", "SPEAKER_00", "田中")
+
+        store.add_recording("rec2", {"SPEAKER_00": [1.0, 0.0]})
+        assert store.match({"SPEAKER_00": [1.0, 0.0]}, 0.0) == {}
+        assert len(store.entries) == 1
+
+    def test_lookup_fast_with_thousands_of_recordings(self, tmp_path):
+        """数千録音分の埋め込みがあっても照合が速いこと"""
+        rng = np.random.default_rng(0)
+        people = rng.standard_normal((50, DIM))
+        store = SpeakerStore(tmp_path)
+        store._load()
+        n = 4000
+        who = rng.integers(0, len(people), n)
+        store._vectors = (people[who] + 0.1 * rng.standard_normal((n, DIM))).astype(np.float32)
+        store._entries = [
+            {"recording": f"rec{i}", "label": "SPEAKER_00", "name": f"person{k:02d}"}
+            for i, k in enumerate(who)
+        ]
+        store._save()
+
+        store = SpeakerStore(tmp_path)
+        query = {f"SPEAKER_{k:02d}": _voice(rng, people[k]) for k in range(4)}
+        start = time.perf_counter()
+        mapping = store.match(query, threshold=0.75)
+        elapsed = time.perf_counter() - start
+
+        assert mapping == {f"SPEAKER_{k:02d}": f"person{k:02d}" for k in range(4)}
+        assert elapsed < 0.5
+
+    def test_saved_as_single_file(self, tmp_path, voices):
+        """埋め込みと行の情報を1ファイルに保存し、一時ファイルを残さないこと"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+        store.add_recording("rec2", {"SPEAKER_00": _voice(rng, base["佐藤"])})
+
+        assert [p.name for p in tmp_path.iterdir()] == ["store.npz"]
+        assert len(SpeakerStore(tmp_path).entries) == 2
+
+    def test_mismatched_rows_raise(self, tmp_path):
+        """行数の食い違ったストアは ValueError"""
+        np.savez(
+            tmp_path / "store.npz",
+            vectors=np.zeros((2, DIM), dtype=np.float32),
+            index=np.array(json.dumps([{"recording": "rec1", "label": "SPEAKER_00", "name": None}])),
+        )
+        with pytest.raises(ValueError):
+            SpeakerStore(tmp_path).entries
+
+
+class TestIdentifySpeakers:
+    """identify_speakers() のテスト"""
+
+    def test_relabel_and_enrol_recording(self, tmp_path, voices):
+        """照合した話者をセグメント・単語ごと置き換え、録音をストアに追加すること"""
+        rng, base = voices
+        store = SpeakerStore(tmp_path)
+        store.add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+        store.enroll("rec1", "SPEAKER_00", "田中")
+
+        result = {
+            "segments": [
+                {"speaker": "SPEAKER_01", "words": [{"word": "はい", "speaker": "SPEAKER_01"}]},
+                {"speaker": "SPEAKER_00", "words": [{"word": "ええ", "speaker": "SPEAKER_00"}]},
+            ]
+        }
+        config = {"speakers": {"enabled": True, "store_dir": str(tmp_path), "match_threshold": 0.75}}
+        embeddings = {"SPEAKER_00": _voice(rng, base["佐藤"]), "SPEAKER_01": _voice(rng, base["田中"])}
+
+        mapping = identify_speakers(result, embeddings, config, recording="rec2")
+
+        assert mapping == {"SPEAKER_01": "田中"}
+        assert result["segments"][0]["speaker"] == "田中"
+        assert result["segments"][0]["words"][0]["speaker"] == "田中"
+        assert result["segments"][1]["speaker"] == "SPEAKER_00"
+        assert {e["recording"] for e in SpeakerStore(tmp_path).entries} == {"rec1", "rec2"}
+
+    def test_no_embeddings(self, tmp_path):
+        """埋め込みがなければ何もしないこと"""
+        config = {"speakers": {"store_dir": str(tmp_path)}}
+        assert identify_speakers({"segments": []}, None, config, recording="rec1") == {}
+        assert not (tmp_path / "store.npz").exists()
+
+
+class TestDiarizeWithSpeakerStore:
+    """speakers.enabled のとき diarize() が埋め込みを要求して照合すること"""
+
+    @mock.patch("kaiwa.diarize._load_diarization_pipeline")
+    def test_embeddings_requested_and_stored(self, mock_load, tmp_path):
+        """pyannote に埋め込みを要求し、音声のハッシュで録音をストアに追加すること"""
+        from kaiwa.diarize import diarize
+
+        turns = {"start": [0.0], "end": [5.0], "speaker": ["SPEAKER_00"]}
+        mock_load.return_value.return_value = (turns, {"SPEAKER_00": [1.0] * DIM})
+        result = {
+            "segments": [
+                {"start": 0.0, "end": 5.0, "text": "はい", "words": [{"word": "はい", "start": 0.0, "end": 1.0}]}
+            ]
+        }
+        config = {
+            "whisper": {"device": "cpu"},
+            "diarize": {},
+            "speakers": {"enabled": True, "store_dir": str(tmp_path / "store")},
+        }
+
+        diarize(
+            mock.MagicMock(), result, "hf-token", config, work_dir=tmp_path / "rec1", recording="hash-1"
+        )
+
+        assert mock_load.return_value.call_args[1]["return_embeddings"] is True
+        assert SpeakerStore(tmp_path / "store").entries == [
+            {"recording": "hash-1", "title": "rec1", "label": "SPEAKER_00", "name": None}
+        ]
+
+    @mock.patch("kaiwa.diarize._load_diarization_pipeline")
+    def test_broken_store_keeps_labels(self, mock_load, tmp_path):
+        """ストアが壊れていても話者分離は失敗せず、SPEAKER_xx のラベルのまま続けること"""
+        from kaiwa.diarize import diarize
+
+        store_dir = tmp_path / "store"
+        store_dir.mkdir()
+        (store_dir / "store.npz").write_bytes(b"broken")
+        turns = {"start": [0.0], "end": [5.0], "speaker": ["SPEAKER_00"]}
+        mock_load.return_value.return_value = (turns, {"SPEAKER_00": [1.0] * DIM})
+        result = {
+            "segments": [
+                {"start": 0.0, "end": 5.0, "text": "はい", "words": [{"word": "はい", "start": 0.0, "end": 1.0}]}
+            ]
+        }
+        config = {
+            "whisper": {"device": "cpu"},
+            "diarize": {},
+            "speakers": {"enabled": True, "store_dir": str(store_dir)},
+        }
+
+        diarized = diarize(
+            mock.MagicMock(), result, "hf-token", config, work_dir=tmp_path / "rec1", recording="hash-1"
+        )
+
+        assert diarized["segments"][0]["speaker"] == "SPEAKER_00"
+
+
+class TestSpeakersCommand:
+    """kaiwa speakers サブコマンドのテスト"""
+
+    def test_enroll_and_list(self, tmp_path, voices, capsys):
+        """enroll で登録した名前が list に表示されること"""
+        from kaiwa.cli import main
+
+        rng, base = voices
+        SpeakerStore(tmp_path).add_recording("rec1", {"SPEAKER_00": _voice(rng, base["田中"])})
+        config = {"speakers": {"store_dir": str(tmp_path)}}
+
+        with mock.patch("kaiwa.cli.load_config", return_value=config):
+            with mock.patch.object(sys, "argv", ["kaiwa", "speakers", "enroll", "rec1", "SPEAKER_00", "田中"]):
+                main()
+            with mock.patch.object(sys, "argv", ["kaiwa", "speakers", "list"]):
+                main()
+
+        assert "田中\t1 録音" in capsys.readouterr().out
+
+    def test_enroll_unknown_exits(self, tmp_path):
+        """保存されていない話者の enroll は終了コード 1"""
+        from kaiwa.cli import main
+
+        config = {"speakers": {"store_dir": str(tmp_path)}}
+        with mock.patch("kaiwa.cli.load_config", return_value=config):
+            with mock.patch.object(sys, "argv", ["kaiwa", "speakers", "enroll", "rec1", "SPEAKER_00", "田中"]):
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+        assert exc_info.value.code == 1
@@ -0,0 +1,99 @@
+"""CLI 起動時間のテスト
+
+モデルを使わないサブコマンドが torch / whisperx 等の重い依存を import せず、
+起動時間の予算内に収まることを別プロセスで計測して確認する。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# 起動に数百ms〜数秒かかるため、実際に必要なステージでのみ import すべきモジュール
+HEAVY_MODULES = (
+    "torch",
+    "whisperx",
+    "pyannote",
+    "faster_whisper",
+    "ctranslate2",
+    "numpy",
+    "anthropic",
+)
+
+# サブコマンドごとの起動時間予算（ms）。インタープリタ自体の起動は含めない。
+# torch の import だけで 1 秒以上かかるため、重い依存の混入は確実に検出できる
+STARTUP_BUDGET_MS = {
+    "version": 150,
+    "process --help": 150,
+    "live（無効時）": 250,
+}
+
+_PROBE = """
+import json, sys, time
+argv, watched = json.loads(sys.argv[1]), set(json.loads(sys.argv[2]))
+start = time.perf_counter()
+from kaiwa.cli import main
+sys.argv = ["kaiwa", *argv]
+try:
+    main()
+except SystemExit:
+    pass
+elapsed = (time.perf_counter() - start) * 1000
+heavy = sorted({name.split(".")[0] for name in sys.modules} & watched)
+print("\\n" + json.dumps({"ms": elapsed, "heavy": heavy}))
+"""
+
+
+def _probe(argv: list[str], home: Path, runs: int = 3) -> dict:
+    """別プロセスで kaiwa の CLI を実行し、最短の所要時間と import された重い依存を返す。"""
+    env = {**os.environ, "HOME": str(home), "PYTHONPATH": str(SRC_DIR)}
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _PROBE, json.dumps(argv), json.dumps(HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            env=env,
+            timeout=60,
+            check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return min(results, key=lambda r: r["ms"])
+
+
+@pytest.mark.parametrize(
+    ("label", "argv"),
+    [
+        ("version", ["version"]),
+        ("process --help", ["process", "--help"]),
+        ("live（無効時）", ["live", "rec.wav", "--recorder-pid", "1"]),
+    ],
+)
+def test_startup_budget(label, argv, tmp_path):
+    """重い依存を import せず、起動時間の予算内に収まること"""
+    result = _probe(argv, home=tmp_path)
+
+    assert result["heavy"] == [], f"{label}: 重い依存が import されました: {result['heavy']}"
+    assert result["ms"] < STARTUP_BUDGET_MS[label], (
+        f"{label}: 起動に {result['ms']:.0f}ms（予算 {STARTUP_BUDGET_MS[label]}ms）"
+    )
+
+
+def test_transcribe_module_import_is_light(tmp_path):
+    """kaiwa.transcribe / kaiwa.diarize の import だけでは torch / whisperx を読み込まないこと"""
+    code = (
+        "import json, sys; import kaiwa.transcribe, kaiwa.diarize; "
+        "print(json.dumps(sorted({n.split('.')[0] for n in sys.modules} & {'torch', 'whisperx', 'pyannote'})))"
+    )
+    env = {**os.environ, "HOME": str(tmp_path), "PYTHONPATH": str(SRC_DIR)}
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    assert json.loads(proc.stdout) == []
@@ -2,11 +2,26 @@
 
 from __future__ import annotations
 
+import logging
 from unittest import mock
 
 import pytest
 
-from kaiwa.summarize import _parse_title_and_summary, _sanitize_markdown, summarize
+from kaiwa.summarize import (
+    MAP_PROMPT,
+    REDUCE_PROMPT,
+    SPEAKER_LEGEND,
+    SUMMARIZE_PROMPT,
+    _parse_partial,
+    _prompt_blocks,
+    _parse_title_and_summary,
+    _sanitize_markdown,
+    compact_transcript,
+    estimate_tokens,
+    split_transcript,
+    summarize,
+    transcript_format,
+)
 
 
 class TestParseTitleAndSummary:
@@ -381,3 +396,489 @@ class TestSummarize:
         # <script>タグが除去されていること
         assert "<script>" not in summary
         assert "本文" in summary
+
+
+def _transcript(turns: list[tuple[str, int]]) -> str:
+    """(話者, 行数) の並びから文字起こしを作る。"""
+    lines = []
+    for speaker, count in turns:
+        for _ in range(count):
+            second = len(lines)
+            lines.append(f"[00:{second:02d} → 00:{second + 1:02d}] {speaker}: {'あ' * 20}")
+    return "\n".join(lines)
+
+
+def _text(blocks: str | list[dict]) -> str:
+    """system・本文（文字列、またはキャッシュ指定付きのブロックのリスト）のテキスト。"""
+    return blocks if isinstance(blocks, str) else "".join(block["text"] for block in blocks)
+
+
+class TestSplitTranscript:
+    """split_transcript() / estimate_tokens() のテスト"""
+
+    def test_estimate_tokens(self):
+        """非 ASCII は1文字1トークン、ASCII は4文字1トークン"""
+        assert estimate_tokens("あいう") == 3
+        assert estimate_tokens("abcdefgh") == 2
+        assert estimate_tokens("") == 0
+
+    def test_splits_at_speaker_turns(self):
+        """同じ話者の連続する行を分けずにチャンクに詰めること"""
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3), ("SPEAKER_00", 3)])
+        # 1行は約 30 トークン。1発話（3行）は入るが2発話は入らない
+        chunks = split_transcript(text, 150)
+
+        assert len(chunks) == 3
+        assert ["\n".join(chunks)] == [text]
+        for chunk in chunks:
+            assert len({line.split("] ")[1].split(":")[0] for line in chunk.splitlines()}) == 1
+
+    def test_long_turn_split_by_lines(self):
+        """上限を超える1つの発話は行の切れ目で分けること"""
+        text = _transcript([("SPEAKER_00", 10)])
+        chunks = split_transcript(text, 60)
+
+        assert len(chunks) == 5
+        assert all(len(chunk.splitlines()) == 2 for chunk in chunks)
+        assert "\n".join(chunks) == text
+
+    def test_single_chunk_when_short(self):
+        """上限以下ならチャンクは1つ"""
+        text = _transcript([("SPEAKER_00", 2), ("SPEAKER_01", 2)])
+        assert split_transcript(text, 10000) == [text]
+
+    def test_without_speakers(self):
+        """話者ラベルのない文字起こしは行ごとに区切れること"""
+        text = "\n".join(f"[00:0{i} → 00:0{i + 1}] {'あ' * 20}" for i in range(4))
+        assert len(split_transcript(text, 30)) == 4
+
+
+class TestMapReduce:
+    """分割要約（claude.map_reduce）のテスト"""
+
+    @staticmethod
+    def _client(mock_anthropic_class):
+        """プロンプトに応じて部分要約・最終要約を返すクライアント。"""
+        mock_client = mock.MagicMock()
+        mock_anthropic_class.return_value = mock_client
+
+        def create(model, max_tokens, system, messages):
+            content = _text(messages[0]["content"])
+            if _text(system) == REDUCE_PROMPT:
+                text = "TITLE: 長い会議\n\n## 要点\n- 全体"
+            else:
+                first_line = content.splitlines()[1]
+                text = f"- メモ {first_line[:8]}"
+            return mock.MagicMock(content=[mock.MagicMock(text=text)])
+
+        mock_client.messages.create.side_effect = create
+        return mock_client
+
+    @mock.patch("anthropic.Anthropic")
+    def test_map_then_reduce(self, mock_anthropic_class):
+        """チャンクごとに部分要約し、統合した要約とタイトルを返すこと"""
+        mock_client = self._client(mock_anthropic_class)
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3), ("SPEAKER_00", 3)])
+        config = {
+            "claude": {
+                "model": "main-model",
+                "map_model": "cheap-model",
+                "map_reduce": True,
+                "chunk_tokens": 150,
+            }
+        }
+
+        title, summary = summarize(text, "api-key", config)
+
+        assert title == "長い会議"
+        assert summary == "## 要点\n- 全体"
+        calls = mock_client.messages.create.call_args_list
+        assert [call.kwargs["model"] for call in calls] == ["cheap-model"] * 3 + ["main-model"]
+        assert calls[0].kwargs["max_tokens"] == 1024
+        # 部分要約は時系列順に統合プロンプトへ渡る
+        reduce_content = calls[-1].kwargs["messages"][0]["content"]
+        assert reduce_content.index("パート 1/3") < reduce_content.index("パート 2/3") < reduce_content.index("パート 3/3")
+        assert "- メモ [00:06 →" in reduce_content
+
+    @mock.patch("anthropic.Anthropic")
+    def test_auto_threshold(self, mock_anthropic_class):
+        """auto では推定トークン数が map_reduce_min_tokens 未満なら1回で要約すること"""
+        mock_client = self._client(mock_anthropic_class)
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3)])
+
+        summarize(text, "api-key", {"claude": {"chunk_tokens": 100}})
+        assert mock_client.messages.create.call_count == 1
+
+        mock_client.messages.create.reset_mock()
+        summarize(text, "api-key", {"claude": {"chunk_tokens": 150, "map_reduce_min_tokens": 100}})
+        assert mock_client.messages.create.call_count == 3
+
+    @mock.patch("anthropic.Anthropic")
+    def test_map_failure(self, mock_anthropic_class):
+        """部分要約が1つでも失敗すれば (None, None) を返し、統合しないこと"""
+        import anthropic
+
+        mock_client = self._client(mock_anthropic_class)
+        create = mock_client.messages.create.side_effect
+
+        def failing(model, max_tokens, system, messages):
+            if "パート 2/2" in messages[0]["content"]:
+                raise anthropic.APIError("bad request", request=mock.MagicMock(), body=None)
+            return create(model, max_tokens, system, messages)
+
+        mock_client.messages.create.side_effect = failing
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3)])
+
+        title, summary = summarize(text, "api-key", {"claude": {"map_reduce": True, "chunk_tokens": 150}})
+
+        assert (title, summary) == (None, None)
+        assert mock_client.messages.create.call_count == 2
+
+
+class TestStreaming:
+    """ストリーミング（claude.stream）のテスト"""
+
+    def test_parse_partial_waits_for_title_line(self):
+        """TITLE: 行が改行まで届くまではタイトルを確定しないこと"""
+        assert _parse_partial("") is None
+        assert _parse_partial("TIT") is None
+        assert _parse_partial("TITLE: 途中") is None
+        assert _parse_partial("TITLE: 会議\n") == ("会議", "")
+        assert _parse_partial("TITLE: 会議\n\n- 要") == ("会議", "- 要")
+        assert _parse_partial("## 要点\n- あ") == (None, "## 要点\n- あ")
+
+    @mock.patch("anthropic.Anthropic")
+    def test_streams_progress(self, mock_anthropic_class):
+        """届いたテキストごとに途中経過を渡し、最終結果は一括の場合と同じになること"""
+        mock_client = mock.MagicMock()
+        mock_anthropic_class.return_value = mock_client
+        stream = mock_client.messages.stream.return_value.__enter__.return_value
+        stream.text_stream = iter(["TIT", "LE: 週次", "定例\n\n## 要点\n", "- 項目1", "\n- 項目2"])
+        progress = []
+
+        title, summary = summarize(
+            "文字起こし",
+            "api-key",
+            {"claude": {"stream": True}},
+            on_progress=lambda t, body: progress.append((t, body)),
+        )
+
+        assert (title, summary) == ("週次定例", "## 要点\n- 項目1\n- 項目2")
+        mock_client.messages.create.assert_not_called()
+        assert progress[0] == ("週次定例", "## 要点")
+        assert progress[-1] == ("週次定例", "## 要点\n- 項目1\n- 項目2")
+        assert all(t == "週次定例" for t, _ in progress)
+
+    @mock.patch("anthropic.Anthropic")
+    def test_stream_retry(self, mock_anthropic_class):
+        """ストリーミング中の 500 エラーもリトライすること"""
+        import anthropic
+
+        mock_client = mock.MagicMock()
+        mock_anthropic_class.return_value = mock_client
+        ok = mock.MagicMock()
+        ok.__enter__.return_value.text_stream = iter(["TITLE: 成功\n\n本文"])
+        mock_client.messages.stream.side_effect = [
+            anthropic.InternalServerError(
+                "server error", response=mock.MagicMock(status_code=500), body=None
+            ),
+            ok,
+        ]
+
+        with mock.patch("kaiwa.summarize.time.sleep"):
+            title, summary = summarize("文字起こし", "api-key", {"claude": {"stream": True}})
+
+        assert (title, summary) == ("成功", "本文")
+        assert mock_client.messages.stream.call_count == 2
+
+
+class TestPromptCache:
+    """プロンプトキャッシュ（claude.prompt_cache）のテスト"""
+
+    @staticmethod
+    def _client(mock_anthropic_class, text="TITLE: 会議\n\n本文"):
+        mock_client = mock.MagicMock()
+        mock_anthropic_class.return_value = mock_client
+        message = mock.MagicMock()
+        message.content = [mock.MagicMock(text=text)]
+        message.usage = mock.MagicMock(
+            input_tokens=50, output_tokens=20, cache_read_input_tokens=1800,
+            cache_creation_input_tokens=0,
+        )
+        mock_client.messages.create.return_value = message
+        return mock_client
+
+    @mock.patch("anthropic.Anthropic")
+    def test_transcript_block_cached(self, mock_anthropic_class, caplog):
+        """指示文だけでは最小長に届かないため、キャッシュ指定は文字起こしのブロックに付けること"""
+        mock_client = self._client(mock_anthropic_class)
+        # 120 発話・数千トークンの会話
+        text = _transcript([("SPEAKER_00", 40), ("SPEAKER_01", 40), ("SPEAKER_00", 40)])
+
+        with caplog.at_level(logging.INFO, logger="kaiwa"):
+            summarize(text, "api-key", {"claude": {"count_tokens": False}})
+
+        kwargs = mock_client.messages.create.call_args.kwargs
+        assert kwargs["system"] == SUMMARIZE_PROMPT
+        assert kwargs["messages"] == [
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}],
+            }
+        ]
+        assert "キャッシュ読み込み 1800 / 書き込み 0" in caplog.text
+
+    @mock.patch("anthropic.Anthropic")
+    def test_short_prompt_not_marked(self, mock_anthropic_class):
+        """文字起こしを含めても最小長に届かなければキャッシュ指定を付けないこと"""
+        mock_client = self._client(mock_anthropic_class)
+
+        summarize("文字起こし本文", "api-key", {"claude": {}})
+
+        kwargs = mock_client.messages.create.call_args.kwargs
+        assert kwargs["system"] == SUMMARIZE_PROMPT
+        assert kwargs["messages"] == [{"role": "user", "content": "文字起こし本文"}]
+
+    @pytest.mark.parametrize(
+        "model, minimum",
+        [
+            ("claude-3-5-haiku-latest", 2048),
+            ("claude-haiku-4-5", 4096),
+            ("claude-sonnet-4-5", 1024),
+        ],
+    )
+    def test_marker_placement_by_model_minimum(self, model, minimum):
+        """モデルの最小長に届く最初のブロック（指示文 → 本文）にキャッシュ指定を付けること"""
+        cfg: dict = {}
+        long_prompt = "指" * minimum
+        system, content = _prompt_blocks(long_prompt, "本文", cfg, model)
+        assert system[0]["cache_control"] == {"type": "ephemeral"}
+        assert content == "本文"
+
+        prompt = "指" * (minimum // 2)
+        system, content = _prompt_blocks(prompt, "文" * (minimum // 2), cfg, model)
+        assert system == prompt
+        assert content[0]["cache_control"] == {"type": "ephemeral"}
+
+        system, content = _prompt_blocks(prompt, "文" * (minimum // 2 - 1), cfg, model)
+        assert (system, content) == (prompt, "文" * (minimum // 2 - 1))
+
+    @mock.patch("anthropic.Anthropic")
+    def test_disabled(self, mock_anthropic_class):
+        """prompt_cache: false ならキャッシュ指定を付けないこと"""
+        mock_client = self._client(mock_anthropic_class)
+
+        summarize("文字起こし", "api-key", {"claude": {"prompt_cache": False}})
+
+        assert mock_client.messages.create.call_args.kwargs["system"] == SUMMARIZE_PROMPT
+
+    @mock.patch("anthropic.Anthropic")
+    def test_map_prompt_identical_across_chunks(self, mock_anthropic_class):
+        """部分要約ではすべてのチャンクで同じ system を送ること（パート番号は本文側）"""
+        mock_client = self._client(mock_anthropic_class)
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3), ("SPEAKER_00", 3)])
+
+        summarize(text, "api-key", {"claude": {"map_reduce": True, "chunk_tokens": 150}})
+
+        calls = mock_client.messages.create.call_args_list
+        systems = [_text(call.kwargs["system"]) for call in calls]
+        assert systems == [MAP_PROMPT] * 3 + [REDUCE_PROMPT]
+        assert calls[0].kwargs["messages"][0]["content"].startswith("（パート 1/3）\n")
+
+
+class TestSummaryCacheIntegration:
+    """summarize() の要約キャッシュ（claude.summary_cache）のテスト"""
+
+    @staticmethod
+    def _client(mock_anthropic_class):
+        mock_client = mock.MagicMock()
+        mock_anthropic_class.return_value = mock_client
+        message = mock.MagicMock()
+        message.content = [mock.MagicMock(text="TITLE: 会議\n\n本文")]
+        mock_client.messages.create.return_value = message
+        return mock_client
+
+    @mock.patch("anthropic.Anthropic")
+    def test_rerun_uses_cache(self, mock_anthropic_class, isolated_summary_cache):
+        """同じ文字起こし・設定の2回目は API を呼ばずに同じ結果を返すこと"""
+        mock_client = self._client(mock_anthropic_class)
+
+        first = summarize("文字起こし", "api-key", {"claude": {}})
+        second = summarize("文字起こし", "api-key", {"claude": {"timeout": 300, "stream": True}})
+
+        assert first == second == ("会議", "本文")
+        assert mock_client.messages.create.call_count == 1
+        assert len(list(isolated_summary_cache.glob("*.json"))) == 1
+
+    @mock.patch("anthropic.Anthropic")
+    def test_model_change_misses(self, mock_anthropic_class):
+        """モデルや文字起こしが変われば API を呼ぶこと"""
+        mock_client = self._client(mock_anthropic_class)
+
+        summarize("文字起こし", "api-key", {"claude": {"model": "a"}})
+        summarize("文字起こし", "api-key", {"claude": {"model": "b"}})
+        summarize("別の文字起こし", "api-key", {"claude": {"model": "a"}})
+
+        assert mock_client.messages.create.call_count == 3
+
+    @mock.patch("anthropic.Anthropic")
+    def test_disabled_and_failures_not_cached(self, mock_anthropic_class, isolated_summary_cache):
+        """summary_cache: false なら保存せず、失敗した要約も保存しないこと"""
+        import anthropic
+
+        mock_client = self._client(mock_anthropic_class)
+        summarize("文字起こし", "api-key", {"claude": {"summary_cache": False}})
+        assert not isolated_summary_cache.exists()
+
+        mock_client.messages.create.side_effect = anthropic.APIError(
+            "bad request", request=mock.MagicMock(), body=None
+        )
+        assert summarize("文字起こし", "api-key", {"claude": {}}) == (None, None)
+        assert not list(isolated_summary_cache.glob("*.json"))
+
+
+class TestCompactTranscript:
+    """compact_transcript() / transcript_format() のテスト"""
+
+    def test_merges_and_aliases(self):
+        """同じ話者の連続する発話をまとめ、自動ラベルを別名にして対応表を付けること"""
+        segments = [
+            {"start": 0.0, "end": 3.0, "speaker": "SPEAKER_01", "text": "こんにちは"},
+            {"start": 3.5, "end": 6.0, "speaker": "SPEAKER_01", "text": "よろしく"},
+            {"start": 6.0, "end": 8.0, "speaker": "田中", "text": "はい"},
+            {"start": 65.0, "end": 70.0, "speaker": "SPEAKER_00", "text": "では"},
+            {"start": 70.0, "end": 71.0, "speaker": "SPEAKER_00", "text": " "},
+        ]
+        assert compact_transcript(segments) == "\n".join([
+            SPEAKER_LEGEND + "A=SPEAKER_01, B=SPEAKER_00",
+            "[00:00] A: こんにちは よろしく",
+            "[00:06] 田中: はい",
+            "[01:05] B: では",
+        ])
+
+    def test_long_turn_keeps_timestamps(self):
+        """同じ話者が長く話し続けても一定時間ごとに行を分けて時刻を残すこと"""
+        segments = [
+            {"start": float(i * 20), "end": float(i * 20 + 19), "speaker": "SPEAKER_00", "text": "あ"}
+            for i in range(6)
+        ]
+        lines = compact_transcript(segments).splitlines()[1:]
+        assert lines == ["[00:00] A: あ あ あ", "[01:00] A: あ あ あ"]
+
+    def test_without_speakers(self):
+        """話者分離なしでは話者ラベルと対応表を付けないこと"""
+        segments = [{"start": 0.0, "end": 2.0, "text": "一"}, {"start": 2.0, "end": 4.0, "text": "二"}]
+        assert compact_transcript(segments) == "[00:00] 一 二"
+
+    def test_fewer_tokens(self):
+        """出力と同じ形式より推定トークン数が少ないこと"""
+        segments = [
+            {"start": float(i * 4), "end": float(i * 4 + 3), "speaker": f"SPEAKER_0{i // 3 % 2}", "text": "確認します"}
+            for i in range(60)
+        ]
+        full = "\n".join(
+            f"[00:{i * 4 % 60:02d} → 00:{(i * 4 + 3) % 60:02d}] {seg['speaker']}: {seg['text']}"
+            for i, seg in enumerate(segments)
+        )
+        assert estimate_tokens(compact_transcript(segments)) < estimate_tokens(full) * 0.6
+
+    def test_format_validation(self):
+        """transcript_format の既定は compact で、不正な値はエラーになること"""
+        assert transcript_format({}) == "compact"
+        assert transcript_format({"claude": {"transcript_format": "full"}}) == "full"
+        with pytest.raises(ValueError, match="claude.transcript_format"):
+            transcript_format({"claude": {"transcript_format": "short"}})
+
+
+class TestTokenPreflight:
+    """トークンカウント API による分割要約の判定（claude.count_tokens）のテスト"""
+
+    @staticmethod
+    def _client(mock_anthropic_class, input_tokens):
+        mock_client = TestMapReduce._client(mock_anthropic_class)
+        mock_client.messages.count_tokens.return_value = mock.MagicMock(input_tokens=input_tokens)
+        return mock_client
+
+    @mock.patch("anthropic.Anthropic")
+    def test_counted_tokens_switch_to_map_reduce(self, mock_anthropic_class):
+        """推定が閾値未満でも、数えたトークン数が閾値以上なら分割要約すること"""
+        mock_client = self._client(mock_anthropic_class, 500)
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3)])
+        config = {"claude": {"map_reduce_min_tokens": 300, "chunk_tokens": 300}}
+
+        title, _ = summarize(text, "api-key", config)
+
+        assert title == "長い会議"
+        count_kwargs = mock_client.messages.count_tokens.call_args.kwargs
+        assert count_kwargs["messages"][0]["content"] == text
+        # 推定と実際のトークン数の比でチャンクを小さくする
+        assert mock_client.messages.create.call_count > 2
+
+    @mock.patch("anthropic.Anthropic")
+    def test_counted_tokens_below_threshold(self, mock_anthropic_class):
+        """推定が閾値以上でも、数えたトークン数が閾値未満なら1回で要約すること"""
+        mock_client = self._client(mock_anthropic_class, 50)
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3)])
+
+        summarize(text, "api-key", {"claude": {"map_reduce_min_tokens": 100, "chunk_tokens": 150}})
+
+        assert mock_client.messages.create.call_count == 1
+
+    @mock.patch("anthropic.Anthropic")
+    def test_skips_short_and_disabled(self, mock_anthropic_class):
+        """閾値より十分短い場合や count_tokens: false では数えないこと"""
+        mock_client = self._client(mock_anthropic_class, 50)
+        text = _transcript([("SPEAKER_00", 1)])
+
+        summarize(text, "api-key", {"claude": {}})
+        summarize(text, "api-key", {"claude": {"map_reduce_min_tokens": 10, "count_tokens": False}})
+        summarize(text, "api-key", {"claude": {"map_reduce": False, "map_reduce_min_tokens": 10}})
+
+        mock_client.messages.count_tokens.assert_not_called()
+
+    @mock.patch("anthropic.Anthropic")
+    def test_count_failure_falls_back_to_estimate(self, mock_anthropic_class, caplog):
+        """トークン数を数えられなければ推定値で判定すること"""
+        import anthropic
+
+        mock_client = TestMapReduce._client(mock_anthropic_class)
+        mock_client.messages.count_tokens.side_effect = anthropic.APIError(
+            "unavailable", request=mock.MagicMock(), body=None
+        )
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3)])
+
+        with caplog.at_level(logging.WARNING, logger="kaiwa"):
+            summarize(text, "api-key", {"claude": {"map_reduce_min_tokens": 100, "chunk_tokens": 150}})
+
+        assert mock_client.messages.create.call_count == 3
+        assert "推定値で判定" in caplog.text
+
+    @mock.patch("anthropic.Anthropic")
+    def test_cache_hit_skips_count(self, mock_anthropic_class):
+        """要約キャッシュがあればトークン数を数えず、クライアントも作らないこと"""
+        mock_client = self._client(mock_anthropic_class, 500)
+        text = _transcript([("SPEAKER_00", 3), ("SPEAKER_01", 3)])
+        config = {"claude": {"map_reduce_min_tokens": 300, "chunk_tokens": 300}}
+        first = summarize(text, "api-key", config)
+
+        mock_anthropic_class.reset_mock()
+        mock_client.messages.count_tokens.reset_mock()
+        assert summarize(text, "api-key", config) == first
+
+        mock_anthropic_class.assert_not_called()
+        mock_client.messages.count_tokens.assert_not_called()
+
+    @mock.patch("anthropic.Anthropic")
+    def test_legend_in_every_chunk(self, mock_anthropic_class):
+        """分割要約では話者の対応表を各チャンクの先頭に付けること"""
+        mock_client = self._client(mock_anthropic_class, 0)
+        legend = SPEAKER_LEGEND + "A=SPEAKER_00, B=SPEAKER_01"
+        lines = [f"[00:{i:02d}] {'AB'[i // 3]}: {'あ' * 20}" for i in range(6)]
+
+        summarize("\n".join([legend, *lines]), "api-key", {"claude": {"map_reduce": True, "chunk_tokens": 100}})
+
+        map_contents = [
+            call.kwargs["messages"][0]["content"] for call in mock_client.messages.create.call_args_list[:-1]
+        ]
+        assert len(map_contents) == 2
+        assert all(content.splitlines()[1] == legend for content in map_contents)
@@ -0,0 +1,74 @@
+"""kaiwa.summary_cache のテスト"""
+
+from __future__ import annotations
+
+import os
+import stat
+import time
+
+from kaiwa.summary_cache import SummaryCache, summary_cache_key
+
+_PROMPTS = ("指示文",)
+
+
+class TestSummaryCacheKey:
+    """summary_cache_key() のテスト"""
+
+    def test_depends_on_all_inputs(self):
+        """文字起こし・設定・プロンプトのどれが変わってもキーが変わること"""
+        base = summary_cache_key("文字起こし", {"model": "a", "max_tokens": 10}, _PROMPTS)
+
+        assert base == summary_cache_key("文字起こし", {"max_tokens": 10, "model": "a"}, _PROMPTS)
+        assert base != summary_cache_key("文字起こし2", {"model": "a", "max_tokens": 10}, _PROMPTS)
+        assert base != summary_cache_key("文字起こし", {"model": "b", "max_tokens": 10}, _PROMPTS)
+        assert base != summary_cache_key("文字起こし", {"model": "a", "max_tokens": 20}, _PROMPTS)
+        assert base != summary_cache_key("文字起こし", {"model": "a", "max_tokens": 10}, ("指示文v2",))
+
+
+class TestSummaryCache:
+    """SummaryCache のテスト"""
+
+    def test_roundtrip(self, tmp_path):
+        """保存した要約を読み出せ、ファイルは所有者のみ読めること"""
+        cache = SummaryCache(tmp_path / "cache")
+        assert cache.get("k") is None
+
+        cache.put("k", "週次定例", "- 要点", "model")
+
+        assert cache.get("k") == ("週次定例", "- 要点")
+        assert stat.S_IMODE((tmp_path / "cache" / "k.json").stat().st_mode) == 0o600
+        assert not list((tmp_path / "cache").glob("*.tmp"))
+
+    def test_corrupt_entry_is_miss(self, tmp_path):
+        """壊れたエントリはキャッシュなしとして扱うこと"""
+        (tmp_path / "k.json").write_text("{", encoding="utf-8")
+        assert SummaryCache(tmp_path).get("k") is None
+
+    def test_evicts_expired(self, tmp_path):
+        """最後に使われてから max_age_days を過ぎたエントリを削除すること"""
+        cache = SummaryCache(tmp_path, max_age_days=30)
+        cache.put("old", None, "古い", "model")
+        old = time.time() - 31 * 86400
+        os.utime(tmp_path / "old.json", (old, old))
+
+        cache.put("new", None, "新しい", "model")
+
+        assert cache.get("old") is None
+        assert cache.get("new") == (None, "新しい")
+
+    def test_evicts_least_recently_used_over_size(self, tmp_path):
+        """合計サイズの上限を超えたら、最後に使われたのが古いものから削除すること"""
+        cache = SummaryCache(tmp_path, max_age_days=0, max_mb=0.003)  # 約 3KB
+        body = "あ" * 300  # 1エントリ約 1KB
+        for i, key in enumerate(["a", "b"]):
+            cache.put(key, None, body, "model")
+            past = time.time() - 100 + i
+            os.utime(tmp_path / f"{key}.json", (past, past))
+        cache.get("a")  # a を最近使ったことにする
+
+        cache.put("c", None, body, "model")
+        cache.put("d", None, body, "model")
+
+        remaining = sorted(p.stem for p in tmp_path.glob("*.json"))
+        assert "b" not in remaining
+        assert "d" in remaining and "a" in remaining
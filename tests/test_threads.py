@@ -0,0 +1,82 @@
+"""kaiwa.threads のテスト"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from kaiwa.threads import active_jobs, job_slot, plan_threads
+
+
+class TestPlanThreads:
+    """plan_threads() のテスト"""
+
+    @mock.patch("kaiwa.threads.os.cpu_count", return_value=8)
+    def test_auto_split_fits_cores(self, mock_cpu_count):
+        """並行実行の自動配分の合計がコア数を超えないこと"""
+        assert plan_threads({}, concurrent=True, jobs=1) == {"asr": 6, "diarize": 2, "jobs": 1}
+
+    @mock.patch("kaiwa.threads.os.cpu_count", return_value=1)
+    def test_single_core(self, mock_cpu_count):
+        """1コアでも両方に最低1スレッド割り当てること"""
+        assert plan_threads({}, concurrent=True, jobs=1) == {"asr": 1, "diarize": 1, "jobs": 1}
+
+    def test_explicit_values(self):
+        """明示指定はそのまま使うこと"""
+        config = {"whisper": {"cpu_threads": 3}, "diarize": {"threads": 5}}
+        plan = plan_threads(config, concurrent=True, jobs=4)
+        assert (plan["asr"], plan["diarize"]) == (3, 5)
+
+    @mock.patch("kaiwa.threads.os.cpu_count", return_value=8)
+    def test_sequential_uses_whole_share(self, mock_cpu_count):
+        """逐次実行ではどちらのステージもジョブの上限まで使うこと"""
+        assert plan_threads({}, jobs=1) == {"asr": 8, "diarize": 8, "jobs": 1}
+
+    @mock.patch("kaiwa.threads.os.cpu_count", return_value=8)
+    def test_divides_budget_among_jobs(self, mock_cpu_count):
+        """同時実行ジョブ数で予算を等分すること"""
+        assert plan_threads({}, jobs=4)["asr"] == 2
+        assert plan_threads({}, concurrent=True, jobs=2) == {"asr": 3, "diarize": 1, "jobs": 2}
+        # ジョブ数がコア数を超えても最低1スレッド
+        assert plan_threads({}, jobs=16)["asr"] == 1
+
+    def test_budget_and_share(self):
+        """threads.budget / diarize_share に従うこと"""
+        config = {"threads": {"budget": 12, "diarize_share": 0.5}}
+        assert plan_threads(config, concurrent=True, jobs=2) == {"asr": 3, "diarize": 3, "jobs": 2}
+
+    @mock.patch("kaiwa.threads.os.cpu_count", return_value=8)
+    def test_counts_registered_jobs(self, mock_cpu_count, isolated_jobs_dir):
+        """jobs を省略すると登録済みの実行中ジョブ数を使うこと"""
+        assert plan_threads({})["jobs"] == 1
+        with job_slot():
+            (isolated_jobs_dir / f"{os.getppid()}.job").touch()
+            assert plan_threads({}) == {"asr": 4, "diarize": 4, "jobs": 2}
+
+
+class TestJobSlot:
+    """job_slot() / active_jobs() のテスト"""
+
+    def test_registers_and_releases(self, isolated_jobs_dir):
+        """実行中だけ登録され、終了後（例外時も）に解除されること"""
+        assert active_jobs() == 0
+        try:
+            with job_slot():
+                assert active_jobs() == 1
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        assert active_jobs() == 0
+
+    def test_removes_stale_jobs(self, tmp_path):
+        """終了済みプロセスの登録は数えずに削除すること"""
+        proc = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                              capture_output=True, text=True, check=True)
+        stale = tmp_path / f"{proc.stdout.strip()}.job"
+        stale.touch()
+        (tmp_path / "notes.txt").touch()
+
+        assert active_jobs(tmp_path) == 0
+        assert not stale.exists()
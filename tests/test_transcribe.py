@@ -7,13 +7,20 @@ from unittest import mock
 
 import pytest
 
-from kaiwa.transcribe import transcribe
+from kaiwa.transcribe import (
+    _load_whisper_model,
+    _plan_chunks,
+    _transcribe_parallel,
+    _use_parallel,
+    resolve_mode,
+    transcribe,
+)
 
 
+@pytest.mark.usefixtures("mock_vad")
 class TestTranscribe:
     """transcribe() のテスト"""
 
-    @mock.patch("kaiwa.transcribe.whisperx")
     @mock.patch("faster_whisper.WhisperModel")
     def test_transcribe_native_mode(
         self, mock_whisper_model, mock_whisperx, tmp_audio_file
@@ -67,8 +74,9 @@ class TestTranscribe:
             "large-v3-turbo", device="cpu", compute_type="float32"
         )
         
-        # transcribe が呼ばれたこと
+        # transcribe が呼ばれたこと（デコード済み配列が渡され、再デコードしない）
         mock_model.transcribe.assert_called_once()
+        assert mock_model.transcribe.call_args[0][0] is mock_audio
         call_kwargs = mock_model.transcribe.call_args[1]
         assert call_kwargs["language"] == "ja"
         assert call_kwargs["word_timestamps"] is True
@@ -80,7 +88,6 @@ class TestTranscribe:
         assert result["segments"][0]["text"] == "こんにちは世界"
         assert result["language"] == "ja"
 
-    @mock.patch("kaiwa.transcribe.whisperx")
     def test_transcribe_whisperx_mode(self, mock_whisperx, tmp_audio_file):
         """whisperx mode（use_native_word_timestamps=false）のフロー"""
         # モックの設定
@@ -161,10 +168,9 @@ class TestTranscribe:
         assert len(result["segments"]) == 1
 
     @mock.patch("kaiwa.transcribe._save_intermediate")
-    @mock.patch("kaiwa.transcribe.whisperx")
     @mock.patch("faster_whisper.WhisperModel")
     def test_transcribe_with_work_dir(
-        self, mock_whisper_model, mock_whisperx, mock_save, tmp_audio_file, tmp_path
+        self, mock_whisper_model, mock_save, mock_whisperx, tmp_audio_file, tmp_path
     ):
         """work_dir指定時に中間ファイルが保存されること"""
         # モックの設定
@@ -205,7 +211,6 @@ class TestTranscribe:
         call_args = mock_save.call_args[0]
         assert "01_transcribe.json" in str(call_args[0])
 
-    @mock.patch("kaiwa.transcribe.whisperx")
     @mock.patch("faster_whisper.WhisperModel")
     def test_transcribe_default_config(
         self, mock_whisper_model, mock_whisperx, tmp_audio_file
@@ -246,10 +251,159 @@ class TestTranscribe:
         assert call_kwargs["language"] == "ja"  # デフォルト
 
 
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_transcribe_with_decoded_audio(
+        self, mock_whisper_model, mock_whisperx, tmp_audio_file
+    ):
+        """デコード済み配列を渡すと再デコードせずに共有されること"""
+        mock_model = mock.MagicMock()
+        mock_whisper_model.return_value = mock_model
+        mock_info = mock.MagicMock()
+        mock_info.language = "ja"
+        mock_model.transcribe.return_value = (iter([]), mock_info)
+
+        decoded = mock.MagicMock()
+
+        audio, result = transcribe(tmp_audio_file, {}, audio=decoded)
+
+        mock_whisperx.load_audio.assert_not_called()
+        assert audio is decoded
+        assert mock_model.transcribe.call_args[0][0] is decoded
+
+    @mock.patch("faster_whisper.BatchedInferencePipeline")
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_transcribe_batched_mode(
+        self, mock_whisper_model, mock_pipeline_cls, mock_whisperx, tmp_audio_file
+    ):
+        """batched mode: バッチ推論 + native word_timestamps、出力は native と同じ形式"""
+        mock_model = mock.MagicMock()
+        mock_whisper_model.return_value = mock_model
+        mock_pipeline = mock.MagicMock()
+        mock_pipeline_cls.return_value = mock_pipeline
+
+        mock_word = mock.MagicMock(word="こんにちは", start=0.0, end=2.5, probability=0.9)
+        mock_segment = mock.MagicMock(start=0.0, end=5.0, text=" こんにちは ", words=[mock_word])
+        mock_info = mock.MagicMock(language="ja")
+        mock_pipeline.transcribe.return_value = (iter([mock_segment]), mock_info)
+
+        config = {"whisper": {"mode": "batched", "batch_size": 4}}
+        audio, result = transcribe(tmp_audio_file, config)
+
+        mock_pipeline_cls.assert_called_once_with(model=mock_model)
+        call_kwargs = mock_pipeline.transcribe.call_args[1]
+        assert call_kwargs["batch_size"] == 4
+        assert call_kwargs["word_timestamps"] is True
+        mock_model.transcribe.assert_not_called()
+        mock_whisperx.align.assert_not_called()
+
+        assert result == {
+            "segments": [{
+                "start": 0.0,
+                "end": 5.0,
+                "text": "こんにちは",
+                "words": [{"word": "こんにちは", "start": 0.0, "end": 2.5, "score": 0.9}],
+            }],
+            "language": "ja",
+            "speech_regions": [],
+        }
+
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_speech_regions_exported(
+        self, mock_whisper_model, mock_whisperx, mock_vad, tmp_audio_file
+    ):
+        """VAD の発話区間を秒単位で result に含め、話者分離で再利用できること"""
+        mock_vad.return_value = [(16000, 48000), (80000, 96000)]
+        mock_info = mock.MagicMock()
+        mock_info.language = "ja"
+        mock_whisper_model.return_value.transcribe.return_value = (iter([]), mock_info)
+
+        _, result = transcribe(tmp_audio_file, {"whisper": {"device": "cpu"}})
+
+        assert result["speech_regions"] == [[1.0, 3.0], [5.0, 6.0]]
+        mock_vad.assert_called_once()
+
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_detect_speech_disabled(
+        self, mock_whisper_model, mock_whisperx, mock_vad, tmp_audio_file
+    ):
+        """後段で発話区間を使わない場合は VAD を別に実行しないこと"""
+        mock_info = mock.MagicMock()
+        mock_info.language = "ja"
+        mock_whisper_model.return_value.transcribe.return_value = (iter([]), mock_info)
+
+        _, result = transcribe(tmp_audio_file, {"whisper": {"device": "cpu"}}, detect_speech=False)
+
+        assert result["speech_regions"] is None
+        mock_vad.assert_not_called()
+
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_given_speech_regions_skip_vad(
+        self, mock_whisper_model, mock_whisperx, mock_vad, tmp_audio_file
+    ):
+        """検出済みの発話区間を渡したときは VAD を再実行しないこと"""
+        mock_info = mock.MagicMock()
+        mock_info.language = "ja"
+        mock_whisper_model.return_value.transcribe.return_value = (iter([]), mock_info)
+
+        _, result = transcribe(
+            tmp_audio_file, {"whisper": {"device": "cpu"}}, speech_regions=[[0.5, 2.0]]
+        )
+
+        assert result["speech_regions"] == [[0.5, 2.0]]
+        mock_vad.assert_not_called()
+
+
+class TestLoadWhisperModel:
+    """_load_whisper_model() のテスト"""
+
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_cache_ignores_thread_count(self, mock_whisper_model):
+        """常駐サーバーではスレッド数が変わっても同じモデルを再利用し、複数保持しないこと"""
+        with mock.patch("kaiwa.utils._MODEL_CACHE", {}) as cache:
+            first = _load_whisper_model("small", "cpu", "int8", cpu_threads=8)
+            second = _load_whisper_model("small", "cpu", "int8", cpu_threads=4)
+
+        assert first is second
+        assert len(cache) == 1
+        mock_whisper_model.assert_called_once_with("small", device="cpu", compute_type="int8", cpu_threads=8)
+
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_cache_disabled(self, mock_whisper_model):
+        """cache=False ならキャッシュに保持せず、毎回ロードすること"""
+        with mock.patch("kaiwa.utils._MODEL_CACHE", {}) as cache:
+            _load_whisper_model("small", "cpu", "int8", cache=False)
+            _load_whisper_model("small", "cpu", "int8", cache=False)
+
+        assert cache == {}
+        assert mock_whisper_model.call_count == 2
+
+
+class TestResolveMode:
+    """resolve_mode() のテスト"""
+
+    def test_default_native(self):
+        """未指定なら native"""
+        assert resolve_mode({}) == "native"
+
+    def test_legacy_flag(self):
+        """mode 未指定時は use_native_word_timestamps に従うこと"""
+        assert resolve_mode({"use_native_word_timestamps": False}) == "whisperx"
+        assert resolve_mode({"mode": None, "use_native_word_timestamps": True}) == "native"
+
+    def test_mode_overrides_legacy_flag(self):
+        """mode を指定すれば旧設定より優先されること"""
+        assert resolve_mode({"mode": "batched", "use_native_word_timestamps": False}) == "batched"
+
+    def test_invalid_mode(self):
+        """不正な mode は ValueError"""
+        with pytest.raises(ValueError):
+            resolve_mode({"mode": "turbo"})
+
+
+@pytest.mark.usefixtures("mock_vad")
 class TestTranscribeErrorHandling:
     """transcribe() のエラーハンドリングテスト"""
 
-    @mock.patch("kaiwa.transcribe.whisperx")
     @mock.patch("faster_whisper.WhisperModel")
     def test_transcribe_model_load_failure(self, mock_whisper_model, mock_whisperx, tmp_audio_file):
         """モデルロード失敗時のエラーハンドリング"""
@@ -274,7 +428,6 @@ class TestTranscribeErrorHandling:
         
         assert "モデルのロードに失敗しました" in str(exc_info.value)
 
-    @mock.patch("kaiwa.transcribe.whisperx")
     @mock.patch("faster_whisper.WhisperModel")
     def test_transcribe_corrupted_audio(self, mock_whisper_model, mock_whisperx, tmp_path):
         """不正な音声データでのエラーハンドリング"""
@@ -301,7 +454,6 @@ class TestTranscribeErrorHandling:
         
         assert "音声ファイルの読み込みに失敗しました" in str(exc_info.value)
 
-    @mock.patch("kaiwa.transcribe.whisperx")
     @mock.patch("faster_whisper.WhisperModel")
     def test_transcribe_exception_during_transcription(
         self, mock_whisper_model, mock_whisperx, tmp_audio_file
@@ -332,3 +484,106 @@ class TestTranscribeErrorHandling:
             transcribe(tmp_audio_file, config)
         
         assert "GPU メモリ不足" in str(exc_info.value)
+
+
+class TestPlanChunks:
+    """_plan_chunks() のテスト"""
+
+    def test_short_audio_single_chunk(self):
+        """目安より短い音声は1チャンク"""
+        chunks = _plan_chunks([(100, 200), (300, 400)], 500, 1000)
+        assert chunks == [(0, 500)]
+
+    def test_cut_at_silence_midpoint(self):
+        """発話区間の間の無音の中点で切る"""
+        regions = [(0, 400), (500, 900), (1100, 1500)]
+        chunks = _plan_chunks(regions, 1600, 1000)
+        # (500, 900) を含めても 900 <= 1000 → 続行、(1100, 1500) で超える → 1000 で切る
+        assert chunks == [(0, 1000), (1000, 1600)]
+
+    def test_chunks_cover_whole_audio(self):
+        """チャンクが隙間なく音声全体を覆うこと"""
+        regions = [(i * 100, i * 100 + 60) for i in range(50)]
+        chunks = _plan_chunks(regions, 5000, 700)
+        assert chunks[0][0] == 0
+        assert chunks[-1][1] == 5000
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            assert end == start
+        # 発話区間を分断しないこと
+        for start, end in regions:
+            assert any(c_start <= start and end <= c_end for c_start, c_end in chunks)
+
+    def test_long_speech_region_not_split(self):
+        """目安より長い発話区間は分割しない"""
+        chunks = _plan_chunks([(0, 3000)], 3000, 1000)
+        assert chunks == [(0, 3000)]
+
+    def test_no_speech(self):
+        """発話なしでも全体を1チャンクとして返す"""
+        assert _plan_chunks([], 1000, 100) == [(0, 1000)]
+
+
+class TestUseParallel:
+    """_use_parallel() のテスト"""
+
+    def test_auto_threshold(self):
+        """auto は parallel_min_duration 以上で有効"""
+        cfg = {"parallel": "auto", "parallel_min_duration": 60}
+        assert _use_parallel(cfg, 59 * 16000) is False
+        assert _use_parallel(cfg, 60 * 16000) is True
+
+    def test_explicit(self):
+        """true/false の明示指定は長さに関係なく優先"""
+        assert _use_parallel({"parallel": True}, 16000) is True
+        assert _use_parallel({"parallel": False}, 10 * 3600 * 16000) is False
+
+
+class _InlineExecutor:
+    """ProcessPoolExecutor の代わりに同一プロセスで逐次実行するテスト用 Executor"""
+
+    def __init__(self, max_workers, mp_context, initializer, initargs):
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, jobs):
+        return [fn(job) for job in jobs]
+
+
+class TestTranscribeParallel:
+    """_transcribe_parallel() のテスト"""
+
+    @mock.patch("kaiwa.transcribe.ProcessPoolExecutor", _InlineExecutor)
+    @mock.patch("kaiwa.transcribe._detect_speech")
+    @mock.patch("faster_whisper.WhisperModel")
+    def test_offsets_and_stitching(self, mock_whisper_model, mock_detect):
+        """チャンクごとのタイムスタンプが全体の時間軸に戻され、順に連結されること"""
+        sr = 16000
+        audio = list(range(30 * sr))  # スライス可能な 30 秒分のダミー
+        mock_detect.return_value = [(0, 8 * sr), (12 * sr, 18 * sr), (22 * sr, 28 * sr)]
+
+        def fake_transcribe(chunk, **kwargs):
+            word = mock.MagicMock(word="w", start=1.0, end=2.0, probability=0.9)
+            seg = mock.MagicMock(start=1.0, end=2.0, text=f" {len(chunk)} ", words=[word])
+            return iter([seg]), mock.MagicMock(language="ja")
+
+        mock_whisper_model.return_value.transcribe.side_effect = fake_transcribe
+
+        result = _transcribe_parallel(
+            audio, "large-v3-turbo", "cpu", "float32", "ja",
+            workers=2, chunk_seconds=10,
+        )
+
+        # 10 秒目安 → 10s / 20s の無音中点で3分割
+        starts = [seg["start"] for seg in result["segments"]]
+        assert starts == [1.0, 11.0, 21.0]
+        assert result["segments"][1]["words"][0]["start"] == 11.0
+        assert result["segments"][2]["words"][0]["end"] == 22.0
+        assert result["language"] == "ja"
+
+        # ワーカーのモデルはスレッド数を制限してロードされること
+        assert "cpu_threads" in mock_whisper_model.call_args[1]